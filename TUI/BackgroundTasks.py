@@ -27,6 +27,7 @@ History:
 2012-12-07 ROwen    Improved time keeping so TUI can show the correct time even if the clock is not keeping perfect UTC.
                     Sets time error using RO.Astro.Tm.setClockError(0) based on TAI reported by the TCC.
                     If the clock appears to be keeping UTC or TAI then the clock is assumed to be keeping that time perfectly.
+2026-10-18 ROwen    Added startDataCollectors, to collect data for windows that are not created until first shown.
 """
 import sys
 import time
@@ -39,6 +40,9 @@ from RO.Comm.Generic import Timer
 import TUI.PlaySound
 import TUI.TUIModel
 import TUI.TCC.TCCModel
+import TUI.Guide.GuideImageHistory
+import TUI.Guide.GuideMonitor.GuideMonitorData
+import TUI.Inst.ExposeModel
 
 class BackgroundKwds(object):
     """Processes various keywords that are handled in the background.
@@ -197,6 +201,20 @@ class BackgroundKwds(object):
                 RO.Astro.Tm.setClockError(-utcMinusTAI)
 
 
+def startDataCollectors():
+    """Start collecting data for windows that are only created when first shown
+    
+    Window modules are loaded lazily (see TUI.LazyToplevelSet), so any data a window needs
+    that arrives while it is hidden must be collected elsewhere. Call after TUI.LoadStdModules.loadAll,
+    since downloading images requires the Downloads window.
+    """
+    # creating the exposure models starts automatic download of instrument images
+    # and lets them play the exposure failed sound
+    list(TUI.Inst.ExposeModel.modelIter())
+    TUI.Guide.GuideImageHistory.startHistories()
+    TUI.Guide.GuideMonitor.GuideMonitorData.getGuideMonitorData()
+
+
 if __name__ == "__main__":
     import TUI.TUIModel
     import RO.Wdg
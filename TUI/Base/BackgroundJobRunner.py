@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""Run jobs in worker threads and report the results on the Tk thread.
+
+Used by TUI.Guide.ImageDecoder (to decode guide images), TUI.Guide.Centroider
+(to centroid stars) and TUI.TCC.Catalog.ParseCat (to parse catalogs). The worker threads
+never touch Tk; results (and optional progress reports) are passed back through a queue
+that is polled by a Tk timer while jobs are pending.
+
+Each job returns a job ID that may be used to cancel its callback. Cancelling does not stop
+the job itself; the result is simply discarded, so callers can ignore stale results
+(e.g. for an image that is no longer displayed) without any bookkeeping of their own.
+
+History:
+2026-10-18 ROwen
+2026-10-18 ROwen    Bug fix: submit restarted the poll timer, so frequent submissions could prevent polling.
+                    Added errFunc argument to report failed jobs to their callbacks.
+                    Added submitWithProgress.
+"""
+__all__ = ["BackgroundJobRunner"]
+
+import sys
+import threading
+import traceback
+import Queue
+import RO.StringUtil
+import RO.TkUtil
+
+_DefPollInterval = 0.05 # default interval at which to check for finished jobs (sec)
+
+class _JobFailed(object):
+    """Result of a job function that raised an exception"""
+    def __init__(self, errMsg):
+        self.errMsg = errMsg
+
+class _Progress(object):
+    """A progress report from a job function"""
+    def __init__(self, value):
+        self.value = value
+
+class BackgroundJobRunner(object):
+    """Run a job function in a pool of worker threads
+    """
+    def __init__(self, name, jobFunc, numWorkers=1, pollInterval=_DefPollInterval, errFunc=None):
+        """Create a BackgroundJobRunner and start its worker threads
+
+        Inputs:
+        - name: name used for the worker threads and in error messages
+        - jobFunc: function to run in a worker thread for each job; it receives the arguments
+            given to submit and returns the job's result. It must not touch Tk and should not raise;
+            if it does raise then the traceback is printed to stderr and errFunc is used to report the failure.
+        - numWorkers: number of worker threads
+        - pollInterval: interval at which to check for finished jobs (sec)
+        - errFunc: function that returns a result reporting a failed job (e.g. an object with an errMsg);
+            it receives one argument: the error message. If errFunc is None then the callback
+            of a failed job is not called (the failure is still reported on stderr).
+        """
+        self.name = name
+        self._jobFunc = jobFunc
+        self._errFunc = errFunc
+        self._pollInterval = float(pollInterval)
+        self._jobQueue = Queue.Queue()
+        self._doneQueue = Queue.Queue()
+        self._callFuncDict = {} # dict of job ID: callback function, for jobs in progress
+        self._nextJobID = 1
+        self._timer = None
+        self._workerList = []
+        for i in range(numWorkers):
+            workerName = "%s%d" % (name, i) if numWorkers > 1 else name
+            worker = threading.Thread(target=self._workerLoop, name=workerName)
+            worker.daemon = True
+            worker.start()
+            self._workerList.append(worker)
+
+    def submit(self, callFunc, *args, **kargs):
+        """Run the job function in the background
+
+        Inputs:
+        - callFunc: function to call (on the Tk thread) when the job is finished;
+            it receives one argument: the result of the job function
+        - *args, **kargs: arguments for the job function
+
+        Returns a job ID that may be used to cancel the callback.
+        """
+        return self._submit(callFunc, None, args, kargs)
+
+    def submitWithProgress(self, callFunc, progressFunc, *args, **kargs):
+        """Run the job function in the background, reporting progress
+
+        Inputs:
+        - callFunc: function to call (on the Tk thread) when the job is finished;
+            it receives one argument: the result of the job function
+        - progressFunc: function to call (on the Tk thread) with the latest progress report, if any,
+            each time finished jobs are checked; None if not wanted
+        - *args, **kargs: arguments for the job function. If progressFunc is not None then
+            the job function also receives keyword argument progressFunc: a function that
+            the job function may call (in the worker thread) with one argument: a progress report.
+
+        Returns a job ID that may be used to cancel the callbacks.
+        """
+        return self._submit(callFunc, progressFunc, args, kargs)
+
+    def _submit(self, callFunc, progressFunc, args, kargs):
+        """Queue a job; see submitWithProgress for details"""
+        jobID = self._nextJobID
+        self._nextJobID += 1
+        self._callFuncDict[jobID] = (callFunc, progressFunc)
+        self._jobQueue.put((jobID, args, kargs, progressFunc is not None))
+        if self._timer is None:
+            self._timer = RO.TkUtil.Timer()
+        if not self._timer.isActive:
+            # do not restart a pending timer, else frequent submissions would postpone polling indefinitely
+            self._timer.start(self._pollInterval, self._poll)
+        return jobID
+
+    def cancel(self, jobID):
+        """Cancel the callbacks for a job; the job may still run
+        """
+        self._callFuncDict.pop(jobID, None)
+
+    @property
+    def nPending(self):
+        """Number of jobs in progress"""
+        return len(self._callFuncDict)
+
+    def _poll(self):
+        """Report progress and call callback functions for finished jobs; runs on the Tk thread"""
+        progressDict = {} # dict of job ID: latest progress report
+        while True:
+            try:
+                jobID, result = self._doneQueue.get_nowait()
+            except Queue.Empty:
+                break
+            if isinstance(result, _Progress):
+                progressDict[jobID] = result.value
+                continue
+            progressDict.pop(jobID, None)
+            callFunc = self._callFuncDict.pop(jobID, (None, None))[0]
+            if callFunc and isinstance(result, _JobFailed):
+                if self._errFunc is None:
+                    sys.stderr.write("%s job %s failed; not calling callback %s\n" % (self.name, jobID, callFunc))
+                    continue
+                result = self._errFunc(result.errMsg)
+            if callFunc:
+                try:
+                    callFunc(result)
+                except Exception:
+                    sys.stderr.write("%s callback %s failed:\n" % (self.name, callFunc))
+                    traceback.print_exc(file=sys.stderr)
+        for jobID, progress in progressDict.iteritems():
+            progressFunc = self._callFuncDict.get(jobID, (None, None))[1]
+            if progressFunc:
+                try:
+                    progressFunc(progress)
+                except Exception:
+                    sys.stderr.write("%s progress function %s failed:\n" % (self.name, progressFunc))
+                    traceback.print_exc(file=sys.stderr)
+        if self._callFuncDict:
+            self._timer.start(self._pollInterval, self._poll)
+
+    def _workerLoop(self):
+        """Run jobs; runs in a worker thread"""
+        while True:
+            jobID, args, kargs, wantProgress = self._jobQueue.get()
+            if wantProgress:
+                def progressFunc(value, jobID=jobID):
+                    self._doneQueue.put((jobID, _Progress(value)))
+                kargs = dict(kargs, progressFunc=progressFunc)
+            try:
+                result = self._jobFunc(*args, **kargs)
+            except Exception as e:
+                sys.stderr.write("%s job %s failed:\n" % (self.name, jobID))
+                traceback.print_exc(file=sys.stderr)
+                result = _JobFailed(RO.StringUtil.strFromException(e))
+            self._doneQueue.put((jobID, result))
@@ -141,11 +141,15 @@ History:
                     fixed by adding a method doRestoreBoresight.
                     Changed to not log diagnostic information when sr.ScriptError is raised.
 2014-04-22 ROwen    Updated to use instInfo.centroidActor. Removed a few unused imports.
+2026-10-18 ROwen    Modified waitFocusSweep to fit focus using TUI.Base.FocusFit after every measurement,
+                    rejecting outliers, and to show the running best focus estimate on the graph.
+                    Added Fit Model (quadratic or hyperbolic) and Adaptive Sweep widgets;
+                    an adaptive sweep stops once the minimum is bracketed
+                    and extends the sweep if the minimum lies outside it.
 """
 import inspect
 import traceback
 import sys
-import math
 import random # for debug
 import numpy
 import Tkinter
@@ -156,6 +160,7 @@ import TUI.TUIModel
 import TUI.TCC.TCCModel
 import TUI.Inst.ExposeModel
 import TUI.Guide.GuideModel
+from TUI.Base import FocusFit
 
 import matplotlib
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
@@ -261,6 +266,12 @@ class BaseFocusScript(object):
     FocGraphMargin = 5 # margin on graph for x axis limits, in um
     MaxFocSigmaFac = 0.5 # maximum allowed sigma of best fit focus as a multiple of focus range
     MinFocusIncr = 10 # minimum focus increment, in um
+    DefFitModel = FocusFit.ModelQuadratic # default model for fitting FWHM vs. focus
+    DefAdaptiveSweep = False # default for adaptive sweep
+    MaxExtraFocusPos = 3 # maximum number of focus positions an adaptive sweep may add
+    BracketFWHMFac = 1.2 # adaptive sweep: minimum is bracketed if FWHM at both ends >= this * min FWHM
+    MaxStopFocSigmaFac = 0.25 # adaptive sweep: stop early only if sigma of best focus <= this * focus range
+    MinStopNumPastBest = 2 # adaptive sweep: stop early only after this many focus positions past best focus
     def __init__(self,
         sr,
         gcamActor,
@@ -472,6 +483,27 @@ class BaseFocusScript(object):
             helpURL = self.helpURL,
         )
         self.gr.gridWdg(None, self.moveBestFocus, colSpan = 3, sticky="w")
+
+        self.fitModelWdg = RO.Wdg.OptionMenu(
+            master = self.sr.master,
+            label = "Fit Model",
+            items = FocusFit.ModelList,
+            defValue = self.DefFitModel,
+            defMenu = "Default",
+            helpText = "Model for FWHM vs. focus: quadratic or hyperbolic (seeing-limited)",
+            helpURL = self.helpURL,
+        )
+        self.gr.gridWdg(self.fitModelWdg.label, self.fitModelWdg, sticky="w")
+
+        self.adaptiveSweepWdg = RO.Wdg.Checkbutton(
+            master = self.sr.master,
+            text = "Adaptive Sweep",
+            defValue = self.DefAdaptiveSweep,
+            relief = "flat",
+            helpText = "Stop the sweep once best focus is bracketed; extend it if best focus is outside?",
+            helpURL = self.helpURL,
+        )
+        self.gr.gridWdg(None, self.adaptiveSweepWdg, colSpan = 3, sticky="w")
         
         graphCol =  self.gr.getNextCol()
         graphRowSpan = self.gr.getNextRow()
@@ -562,6 +594,10 @@ class BaseFocusScript(object):
         self.plotAxis.set_autoscale_on(False)
         self.figCanvas.draw()
         self.plotLine = None
+        self.fitLine = None
+        self.bestFocLine = None
+        self.focSigmaLine = None
+        self.rejectedLine = None
     
     def doClear(self, wdg=None):
         self.logWdg.clearOutput()
@@ -758,7 +794,51 @@ class BaseFocusScript(object):
             self.plotLine.set_data(focList[:], fwhmList[:])
         
         self.setGraphRange(extremeFocPos=extremeFocPos, extremeFWHM=extremeFWHM)
-        
+
+    def graphFocusFit(self, focusFit, minFocPos, maxFocPos, extremeFocPos=None, extremeFWHM=None):
+        """Graph a fit of FWHM vs focus: the fit curve, best focus +/- sigma and rejected points.
+
+        Inputs:
+        - focusFit: fit, a TUI.Base.FocusFit.FocusFit; if None then the fit is not shown
+        - minFocPos, maxFocPos: range of focus positions over which to graph the fit curve
+        - extremeFocPos: extremes of focus position
+        - extremeFWHM: extremes of FWHM
+        """
+        fitFocList = fitFWHMList = bestFocList = bestFWHMList = sigmaFocList = sigmaFWHMList = ()
+        rejFocList = rejFWHMList = ()
+        title = ""
+        if focusFit is not None:
+            fitFocList = numpy.linspace(minFocPos, maxFocPos, 100)
+            fitFWHMList = focusFit.getFWHM(fitFocList)
+            if focusFit.isMin:
+                bestFocList = (focusFit.bestFocPos,)
+                bestFWHMList = (focusFit.bestFWHM,)
+                if focusFit.focSigma is not None:
+                    sigmaFocList = (focusFit.bestFocPos - focusFit.focSigma, focusFit.bestFocPos + focusFit.focSigma)
+                    sigmaFWHMList = bestFWHMList * 2
+                    title = u"best focus %0.0f \N{PLUS-MINUS SIGN} %0.0f %s" % \
+                        (focusFit.bestFocPos, focusFit.focSigma, MicronStr)
+                else:
+                    title = "best focus %0.0f %s" % (focusFit.bestFocPos, MicronStr)
+            else:
+                title = "fit has no minimum"
+            if focusFit.rejectedList:
+                rejFocList, rejFWHMList = zip(*focusFit.rejectedList)
+
+        if not self.fitLine:
+            self.fitLine = self.plotAxis.plot(fitFocList, fitFWHMList, '-k', linewidth=2)[0]
+            self.focSigmaLine = self.plotAxis.plot(sigmaFocList, sigmaFWHMList, '-g', linewidth=2)[0]
+            self.bestFocLine = self.plotAxis.plot(bestFocList, bestFWHMList, 'go')[0]
+            self.rejectedLine = self.plotAxis.plot(rejFocList, rejFWHMList, 'rx')[0]
+        else:
+            self.fitLine.set_data(fitFocList, fitFWHMList)
+            self.focSigmaLine.set_data(sigmaFocList, sigmaFWHMList)
+            self.bestFocLine.set_data(bestFocList, bestFWHMList)
+            self.rejectedLine.set_data(rejFocList, rejFWHMList)
+        self.plotAxis.set_title(title, fontsize="small")
+
+        self.setGraphRange(extremeFocPos=extremeFocPos, extremeFWHM=extremeFWHM)
+
     def initAll(self):
         """Initialize variables, table and graph.
         """
@@ -1181,6 +1261,11 @@ class BaseFocusScript(object):
     def waitFocusSweep(self):
         """Conduct a focus sweep.
         
+        FWHM vs. focus is fit after every measurement and the fit is graphed.
+        If Adaptive Sweep is checked then the sweep stops as soon as the minimum is bracketed
+        and best focus is known well enough, and if the minimum is outside the sweep
+        then up to MaxExtraFocusPos focus positions are added beyond the end of the sweep.
+        
         Sets self.sr.value to True if successful.
         """
         scriptException = None
@@ -1200,17 +1285,28 @@ class BaseFocusScript(object):
             if focusIncr < self.MinFocusIncr:
                 raise self.sr.ScriptError("focus increment too small (< %s %s)" % (self.MinFocusIncr, MicronStr))
             self.focDir = (endFocPos > startFocPos)
+            isAdaptive = self.adaptiveSweepWdg.getBool()
+            focusFitter = FocusFit.FocusFitter(
+                model = self.fitModelWdg.getString(),
+                refFocPos = centerFocPos,
+                focScale = focusRange / 2.0,
+            )
             
             extremeFocPos = Extremes(startFocPos)
             extremeFocPos.addVal(endFocPos)
             extremeFWHM = Extremes()
             self.setGraphRange(extremeFocPos=extremeFocPos)
-            numMeas = 0
             self.focPosToRestore = centerFocPos
-            for focInd in range(numFocPos):
-                focPos = float(startFocPos + (focInd*focusIncr))
+            focPosList = [float(startFocPos + (focInd*focusIncr)) for focInd in range(numFocPos)]
+            numExtraFocPos = 0
+            prevFocPos = None
+            focInd = 0
+            while focInd < len(focPosList):
+                focPos = focPosList[focInd]
     
-                doBacklashComp = (focInd == 0)
+                # compensate for backlash on the first move and whenever the sweep reverses direction
+                doBacklashComp = (prevFocPos is None) or ((focPos > prevFocPos) != self.focDir)
+                prevFocPos = focPos
                 yield self.waitSetFocus(focPos, doBacklashComp)
                 self.sr.showMsg("Exposing for %s sec at focus %0.0f %s" % \
                     (self.expTime, focPos, MicronStr))
@@ -1219,54 +1315,88 @@ class BaseFocusScript(object):
                 if self.sr.debug:
                     starMeas.fwhm = 0.0001 * (focPos - centerFocPos) ** 2
                     starMeas.fwhm += random.gauss(1.0, 0.25)
+                extremeFocPos.addVal(focPos)
                 extremeFWHM.addVal(starMeas.fwhm)
     
                 self.logStarMeas("Sw %d" % (focInd+1,), focPos, starMeas)
+                focInd += 1
                 
+                focusFit = None
                 if starMeas.fwhm is not None:
                     focPosFWHMList.append((focPos, starMeas.fwhm))
+                    focusFitter.addMeas(focPos, starMeas.fwhm)
                     self.graphFocusMeas(focPosFWHMList, extremeFWHM=extremeFWHM)
+                    focusFit = focusFitter.getFit()
+                    if focusFit is not None:
+                        self.graphFocusFit(focusFit, extremeFocPos.minVal, extremeFocPos.maxVal,
+                            extremeFocPos=extremeFocPos, extremeFWHM=extremeFWHM)
+
+                if not isAdaptive or focusFit is None:
+                    continue
+
+                if focInd < len(focPosList):
+                    # stop early if the minimum is bracketed and best focus is known well enough
+                    if self.focDir:
+                        numPastBest = len([meas for meas in focPosFWHMList if meas[0] > focusFit.bestFocPos])
+                    else:
+                        numPastBest = len([meas for meas in focPosFWHMList if meas[0] < focusFit.bestFocPos])
+                    if focusFit.isMin and focusFit.focSigma is not None \
+                        and focusFit.focSigma <= self.MaxStopFocSigmaFac * abs(focusRange) \
+                        and numPastBest >= self.MinStopNumPastBest \
+                        and focusFitter.isMinBracketed(self.BracketFWHMFac):
+                        self.logWdg.addMsg("Best focus bracketed; skipping %d focus positions" % \
+                            (len(focPosList) - focInd,))
+                        break
+                elif numExtraFocPos < self.MaxExtraFocusPos:
+                    # if the minimum is beyond either end of the sweep, extend the sweep in that direction
+                    measFocList, measFWHMList = zip(*focPosFWHMList)
+                    minFocPos = min(measFocList)
+                    maxFocPos = max(measFocList)
+                    if focusFit.isMin:
+                        isBelow = focusFit.bestFocPos < minFocPos
+                        isAbove = focusFit.bestFocPos > maxFocPos
+                    else:
+                        bestMeasFocPos = measFocList[measFWHMList.index(min(measFWHMList))]
+                        isBelow = bestMeasFocPos == minFocPos
+                        isAbove = bestMeasFocPos == maxFocPos
+                    if isAbove or isBelow:
+                        newFocPos = maxFocPos + focusIncr if isAbove else minFocPos - focusIncr
+                        focPosList.append(newFocPos)
+                        numExtraFocPos += 1
+                        self.logWdg.addMsg("Best focus outside sweep; adding focus %0.0f %s" % (newFocPos, MicronStr))
             
             # Fit a curve to the data
             numMeas = len(focPosFWHMList)
             if numMeas < 3:
                 raise self.sr.ScriptError("need at least 3 measurements to fit best focus")
-            focList, fwhmList = zip(*focPosFWHMList)
-            focPosArr = numpy.array(focList, dtype=float)
-            fwhmArr  = numpy.array(fwhmList, dtype=float)
-            weightArr = numpy.ones(numMeas, dtype=float)
-            if numMeas > 3:
-                coeffs, dumYFit, dumYBand, fwhmSigma, dumCorrMatrix = polyfitw(focPosArr, fwhmArr, weightArr, 2, True)
-            elif numMeas == 3:
-                # too few points to measure fwhmSigma
-                coeffs = polyfitw(focPosArr, fwhmArr, weightArr, 2, False)
-                fwhmSigma = None
+            focusFit = focusFitter.getFit()
+            if focusFit is None:
+                raise self.sr.ScriptError("could not fit best focus")
+            for rejFocPos, rejFWHM in focusFit.rejectedList:
+                self.logFitFWHM("Reject", rejFocPos, rejFWHM)
             
             # Make sure fit curve has a minimum
-            if coeffs[2] <= 0.0:
+            if not focusFit.isMin:
                 raise self.sr.ScriptError("could not find minimum focus")
             
             # find the best focus position
-            bestEstFocPos = (-1.0*coeffs[1])/(2.0*coeffs[2])
-            bestEstFWHM = coeffs[0]+coeffs[1]*bestEstFocPos+coeffs[2]*bestEstFocPos*bestEstFocPos
+            bestEstFocPos = focusFit.bestFocPos
+            bestEstFWHM = focusFit.bestFWHM
             extremeFocPos.addVal(bestEstFocPos)
             extremeFWHM.addVal(bestEstFWHM)
             self.logFitFWHM("Fit", bestEstFocPos, bestEstFWHM)
     
             # compute and log standard deviation, if possible
-            if fwhmSigma is not None:
-                focSigma = math.sqrt(fwhmSigma / coeffs[2])
-                self.logFitFWHM(u"Fit \N{GREEK SMALL LETTER SIGMA}", focSigma, fwhmSigma)
+            focSigma = focusFit.focSigma
+            if focSigma is not None:
+                self.logFitFWHM(u"Fit \N{GREEK SMALL LETTER SIGMA}", focSigma, focusFit.fwhmSigma)
             else:
-                focSigma = None
                 self.logWdg.addMsg(u"Warning: too few points to compute \N{GREEK SMALL LETTER SIGMA}")
     
             # plot fit as a curve and best fit focus as a point
-            fitFocArr = numpy.arange(min(focPosArr), max(focPosArr), 1)
-            fitFWHMArr = coeffs[0] + coeffs[1]*fitFocArr + coeffs[2]*(fitFocArr**2.0)
-            self.plotAxis.plot(fitFocArr, fitFWHMArr, '-k', linewidth=2)
-            self.plotAxis.plot([bestEstFocPos], [bestEstFWHM], 'go')
-            self.setGraphRange(extremeFocPos=extremeFocPos, extremeFWHM=extremeFWHM)
+            measFocList = zip(*focPosFWHMList)[0]
+            self.graphFocusFit(focusFit, min(measFocList), max(measFocList),
+                extremeFocPos=extremeFocPos, extremeFWHM=extremeFWHM)
     
             # check fit error
             if focSigma is not None:
@@ -1274,8 +1404,8 @@ class BaseFocusScript(object):
                 if focSigma > maxFocSigma:
                     raise self.sr.ScriptError("focus std. dev. too large: %0.0f > %0.0f" % (focSigma, maxFocSigma))
             
-            # check that estimated best focus is in sweep range
-            if not startFocPos <= bestEstFocPos <= endFocPos:
+            # check that estimated best focus is in sweep range (including any added focus positions)
+            if not min(focPosList) <= bestEstFocPos <= max(focPosList):
                 raise self.sr.ScriptError("best focus=%0.0f out of sweep range" % (bestEstFocPos,))
     
             # move to best focus if "Move to best Focus" checked
@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+"""A basic script for taking twilight (evening or morning) sky flats with an imager.
+
+Subclass for more functionality (e.g. override waitExtraSetup to set a filter).
+
+Takes a series of flats, dithering the telescope between flats.
+The exposure time of each flat is chosen to achieve the desired sky level,
+based on the sky level measured in the previous flats (see TUI.Base.SkyFlatFit):
+each flat is downloaded (to a temporary directory, ahead of any other queued downloads)
+while the telescope dithers, then its sky level is measured in a background thread.
+If no measurements are available (e.g. the download failed, or in debug mode) then
+the exposure time is predicted from the previous exposure time, assuming a sky brightness
+that changes exponentially with the default decay time.
+
+History:
+2026-10-18 ROwen
+2026-10-18 ROwen    end aborts running flat downloads, and a download that finishes after the script ends
+                    deletes its temporary directory.
+2026-10-18 ROwen    biasLevel may be None to measure the bias from each flat's bias section.
+"""
+__all__ = ["BaseSkyFlatScript"]
+
+import math
+import os
+import shutil
+import tempfile
+import time
+import RO.Alg
+import RO.Constants
+import RO.MathUtil
+import RO.Wdg
+import TUI.TUIModel
+import TUI.TCC.TelConst
+import TUI.Inst.ExposeModel
+import TUI.Models.HubModel
+from TUI.Inst.ExposeStatusWdg import ExposeStatusWdg
+from TUI.Inst.ExposeInputWdg import ExposeInputWdg
+from TUI.Base import SkyFlatFit
+
+# time limit for downloading a flat (sec); if exceeded then the flat is not measured
+DownloadTimeLim = 60.0
+
+# interval at which to check if a download has finished (msec)
+DownloadPollMS = 100
+
+class _FlatDownload(object):
+    """Information about the download of one flat"""
+    def __init__(self, startTime, expTime):
+        self.startTime = startTime
+        self.expTime = expTime
+        self.isDone = False
+        self.filePath = None
+
+    def doneFunc(self, httpGet):
+        """Call when the download finishes (successfully or not)"""
+        self.isDone = True
+        if httpGet.state == httpGet.Done:
+            self.filePath = httpGet.toPath
+
+
+class BaseSkyFlatScript(object):
+    """Take a series of twilight or morning sky flats
+
+    Inputs:
+    - sr: script runner
+    - instName: name of instrument, e.g. "SPIcam"; must be a name known to TUI.Inst.ExposeModel
+    - desCounts: default desired sky level (ADU above bias)
+    - saturationLevel: sky level (ADU above bias) at or above which a flat is saturated
+    - biasLevel: bias level (ADU) to subtract from the measured sky level,
+        or None to measure it from the bias section of each flat (see SkyFlatFit.readSkyLevel)
+    - maxExpTime: maximum exposure time (sec)
+    - decayTime: default sky brightness decay time (sec); see SkyFlatFit
+    - ditherArcSec: size of dither between flats (arcsec)
+    - helpURL: URL of help file
+    - debug: if True, run in debug mode (which doesn't DO anything, it just pretends)
+    """
+    def __init__(self,
+        sr,
+        instName,
+        desCounts,
+        saturationLevel,
+        biasLevel = 0.0,
+        maxExpTime = 160.0,
+        decayTime = SkyFlatFit.DefDecayTime,
+        ditherArcSec = 30.0,
+        helpURL = None,
+        debug = False,
+    ):
+        self.sr = sr
+        self.sr.debug = bool(debug)
+        self.instName = instName
+        self.saturationLevel = float(saturationLevel)
+        self.biasLevel = None if biasLevel is None else float(biasLevel)
+        self.maxExpTime = float(maxExpTime)
+        self.decayTime = float(decayTime)
+        self.ditherArcSec = float(ditherArcSec)
+        self.helpURL = helpURL
+
+        self.expModel = TUI.Inst.ExposeModel.getModel(instName)
+        self.hubModel = TUI.Models.HubModel.getModel()
+        self.tuiModel = TUI.TUIModel.getModel()
+
+        downloadTL = self.tuiModel.tlSet.getToplevel("TUI.Downloads")
+        downloadWdg = downloadTL and downloadTL.getWdg()
+        self.scheduler = downloadWdg and downloadWdg.scheduler
+        self.downloadGroup = "%s Sky Flats" % (self.instName,)
+        self.tempDir = None
+
+        row = 0
+
+        expStatusWdg = ExposeStatusWdg(
+            master = sr.master,
+            instName = instName,
+            helpURL = helpURL,
+        )
+        expStatusWdg.grid(row=row, column=0, columnspan=3, sticky="w")
+        row += 1
+
+        self.expWdg = ExposeInputWdg(
+            master = sr.master,
+            instName = instName,
+            expTypes = "object",
+            helpURL = helpURL,
+        )
+        self.expWdg.grid(row=row, column=0, columnspan=3, sticky="w")
+        row += 1
+
+        self.desCountsWdg = RO.Wdg.IntEntry(
+            master = self.expWdg,
+            minValue = 1,
+            maxValue = int(self.saturationLevel) - 1,
+            defValue = int(desCounts),
+            helpText = "desired sky level (above bias)",
+            helpURL = helpURL,
+        )
+        self.expWdg.gridder.gridWdg("Desired Level", self.desCountsWdg, "ADU")
+
+        self.skyLevelWdg = RO.Wdg.StrLabel(
+            master = self.expWdg,
+            anchor = "w",
+            helpText = "sky level (above bias) of the last flat, and predicted level of the next flat",
+            helpURL = helpURL,
+        )
+        self.expWdg.gridder.gridWdg("Sky Level", self.skyLevelWdg, sticky="w", colSpan=3)
+
+        self.createSpecialWdg()
+
+    def createSpecialWdg(self):
+        """Create instrument-specific widgets (e.g. a filter menu); called at the end of __init__
+
+        The default implementation does nothing.
+        """
+        pass
+
+    def end(self, sr):
+        """Clean up: stop downloads and delete the temporary directory"""
+        if self.scheduler:
+            self.scheduler.abort(self.downloadGroup)
+        if self.tempDir:
+            shutil.rmtree(self.tempDir, ignore_errors=True)
+            self.tempDir = None
+
+    def isMorning(self):
+        """Return True if it is morning (local time at the telescope), False if evening"""
+        utcHours = time.gmtime().tm_hour
+        locHours = utcHours + (TUI.TCC.TelConst.Longitude / 15.0)
+        locHours = RO.MathUtil.wrapPos(locHours * 15.0) / 15.0
+        return locHours < 12.0
+
+    def run(self, sr):
+        """Take a series of sky flats"""
+        # record user inputs
+        expTime = self.expWdg.timeWdg.getNum()
+        numExp = self.expWdg.numExpWdg.getNum()
+        fileName = self.expWdg.fileNameWdg.getString()
+        comment = self.expWdg.commentWdg.getString()
+        desCounts = self.desCountsWdg.getNum()
+
+        if expTime <= 0:
+            raise sr.ScriptError("Specify exposure time")
+        if numExp <= 0:
+            raise sr.ScriptError("Specify number of exposures")
+        if desCounts <= 0:
+            raise sr.ScriptError("Specify desired level")
+        nTimeFields = self.expWdg.timeWdg.getString().count(":") + 1
+        nTimeFields = max(1, min(3, nTimeFields))
+        self.expWdg.timeWdg.defFormat = (nTimeFields, 1)
+        self.skyLevelWdg.set(None)
+
+        isMorning = self.isMorning()
+        fitter = SkyFlatFit.SkyFlatFitter(
+            isMorning = isMorning,
+            decayTime = self.decayTime,
+            saturationLevel = self.saturationLevel,
+        )
+        minExpTime = self.expModel.instInfo.minExpTime
+        maxExpTime = min(self.maxExpTime, self.expModel.instInfo.maxExpTime)
+
+        yield self.waitExtraSetup()
+
+        if self.scheduler and not sr.debug:
+            self.tempDir = tempfile.mkdtemp(prefix="TUI%sSkyFlats" % (self.instName,))
+
+        download = None
+        lastCounts = None
+        for expNum in range(numExp):
+            # offset telescope; the previous flat downloads meanwhile
+            sr.showMsg("Dither %s of %s" % (expNum+1, numExp))
+            yield sr.waitCmd(
+                actor = "tcc",
+                cmdStr = "offset arc/computed %0.7f, %0.7f" % (self.ditherArcSec / 3600.0, 0.0)
+            )
+
+            # measure the previous flat
+            if download:
+                yield self.waitMeasure(download, fitter)
+                if sr.value is not None:
+                    lastCounts = sr.value
+                download = None
+
+            # compute next exposure time
+            startTime = time.time()
+            predExpTime = fitter.predictExpTime(startTime, desCounts, minExpTime, maxExpTime)
+            if predExpTime is not None:
+                expTime = predExpTime
+            elif isMorning:
+                expTime = self.nextMorningExpTime(expTime)
+            else:
+                expTime = self.nextTwilightExpTime(expTime)
+            self.expWdg.timeWdg.set(expTime)
+            self.showSkyLevel(lastCounts, fitter.getCounts(startTime, expTime))
+
+            cmdStr = self.expModel.formatExpCmd(
+                expType = "flat",
+                expTime = expTime,
+                fileName = fileName,
+                numExp = 1,
+                comment = comment,
+                startNum = expNum + 1,
+                totNum = numExp,
+            )
+
+            sr.showMsg("Exposure %s of %s: %.1f sec" % (expNum+1, numExp, expTime))
+            yield sr.waitCmd(
+                actor = self.expModel.actor,
+                cmdStr = cmdStr,
+                abortCmdStr = "abort",
+                keyVars = [self.expModel.files],
+            )
+            if expNum + 1 < numExp:
+                fileInfo = sr.value.getLastKeyVarData(self.expModel.files, ind=None)
+                download = self.startDownload(fileInfo, startTime, expTime)
+
+    def nextTwilightExpTime(self, prevExpTime):
+        """Compute next exposure time for a twilight flat
+        (compensating for the darkening sky)
+
+        This equation is from the original SPIcam scripts;
+        it blows up around 180 seconds, so a ceiling is used.
+        """
+        temp = math.exp(-prevExpTime / self.decayTime) + math.exp(-(prevExpTime + 45.0) / self.decayTime) - 1.0
+        if temp <= 0:
+            return self.maxExpTime
+        desExpTime = -self.decayTime * (math.log(temp)) - (prevExpTime + 45.0)
+        return min(self.maxExpTime, desExpTime)
+
+    def nextMorningExpTime(self, prevExpTime):
+        """Compute next exposure time for a morning flat
+        (compensating for the brightening sky)
+
+        The equation is from the original SPIcam scripts.
+        """
+        temp = math.exp(prevExpTime / self.decayTime) + math.exp((prevExpTime + 45.0) / self.decayTime) - 1.0
+        desExpTime = self.decayTime * (math.log(temp)) - (prevExpTime + 45.0)
+        return max(self.expModel.instInfo.minExpTime, desExpTime)
+
+    def showSkyLevel(self, lastCounts, predCounts):
+        """Display the measured sky level of the last flat and the predicted level of the next flat
+        """
+        def fmtCounts(counts):
+            if counts is None:
+                return "?"
+            return "%0.0f" % (counts,)
+        self.skyLevelWdg.set("%s; next %s ADU" % (fmtCounts(lastCounts), fmtCounts(predCounts)))
+
+    def startDownload(self, fileInfo, startTime, expTime):
+        """Start downloading a flat, ahead of other queued downloads
+
+        Inputs:
+        - fileInfo: data from the <inst>Files keyword for the flat
+        - startTime: time at which the exposure command was sent (sec)
+        - expTime: exposure time (sec)
+
+        Returns a _FlatDownload, or None if the flat cannot be downloaded.
+        """
+        if not self.tempDir or not fileInfo or None in fileInfo[0:6]:
+            return None
+        host, fromRootDir = self.hubModel.httpRoot.get()[0]
+        if None in (host, fromRootDir):
+            return None
+        progDir, userDir = fileInfo[3:5]
+        fileNames = [fileName for fileName in fileInfo[5:] if fileName not in (None, "None")]
+        if not fileNames:
+            return None
+        fileName = fileNames[0]
+
+        download = _FlatDownload(startTime, expTime)
+        self.scheduler.submit(
+            group = self.downloadGroup,
+            argList = [dict(
+                fromURL = "".join(("http://", host, fromRootDir, progDir, userDir, fileName)),
+                toPath = os.path.join(self.tempDir, fileName),
+                isBinary = True,
+                overwrite = True,
+                createDir = True,
+                dispStr = "".join((progDir, userDir, fileName)),
+                doneFunc = RO.Alg.GenericCallback(self._downloadDone, download, self.tempDir),
+            )],
+            priority = 1,
+        )
+        return download
+
+    def _downloadDone(self, download, tempDir, httpGet):
+        """Call when the download of a flat finishes (successfully or not)
+
+        If the script has ended (or been restarted) since the download started then
+        delete the download's temporary directory again, in case the download recreated it.
+        """
+        download.doneFunc(httpGet)
+        if tempDir != self.tempDir:
+            shutil.rmtree(tempDir, ignore_errors=True)
+
+    def waitExtraSetup(self):
+        """Executed once at the start of each run, before any flats are taken
+
+        Override to do things such as set the filter.
+        """
+        yield self.sr.waitMS(1)
+
+    def waitMeasure(self, download, fitter):
+        """Wait for a flat to download, measure its sky level and add the measurement to fitter
+
+        Sets sr.value to the measured sky level, or None if it could not be measured.
+
+        A yield is required.
+        """
+        self.sr.value = None
+        endTime = time.time() + DownloadTimeLim
+        while not download.isDone and time.time() < endTime:
+            yield self.sr.waitMS(DownloadPollMS)
+        if not download.filePath:
+            self.sr.showMsg("Could not download flat; predicting exposure time without it",
+                severity = RO.Constants.sevWarning)
+            self.sr.value = None
+            return
+
+        yield self.sr.waitThread(_measSkyLevel, download.filePath, self.biasLevel)
+        counts, errMsg = self.sr.value
+        self.sr.value = None
+        if errMsg:
+            self.sr.showMsg("Could not measure flat: %s" % (errMsg,), severity=RO.Constants.sevWarning)
+            return
+        fitter.addMeas(download.startTime, download.expTime, counts)
+        self.sr.value = counts
+
+def _measSkyLevel(filePath, biasLevel):
+    """Measure the sky level of a flat and delete the file; run in a background thread
+
+    Returns (sky level, None) if successful, else (None, error message).
+    """
+    try:
+        try:
+            return SkyFlatFit.readSkyLevel(filePath, biasLevel=biasLevel), None
+        finally:
+            os.remove(filePath)
+    except Exception as e:
+        return None, str(e) or repr(e)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+"""Measure the time spent dispatching keywords and running keyword variable callbacks.
+
+Profiling is opt-in: it is enabled at startup if environment variable TUI_PROFILE_CALLBACKS
+is set to a nonempty value, or later from the TUI.Callback Profile window.
+
+While enabled, these methods are replaced with timed versions (for all instances):
+- RO.KeyDispatcher.KeyDispatcher.dispatch: time per message, recorded by actor
+- RO.KeyVariable.KeyVar.set: time to set a keyword variable (including parsing and callbacks),
+    recorded by actor.keyword
+- RO.KeyVariable.KeyVar._basicDoCallbacks: time for each callback function,
+    recorded by callback function name
+
+Times are inclusive: if a callback sets another keyword variable then that time is also
+included in the callback's time.
+
+History:
+2026-10-18 ROwen
+2026-10-18 ROwen    Cache callback names with weak keys, so profiling does not keep callbacks alive,
+                    and clear the cache in reset.
+"""
+__all__ = ["EnvVarName", "Categories", "TimingStats", "CallbackProfiler", "getProfiler", "installFromEnv"]
+
+import collections
+import csv
+import os
+import time
+import weakref
+import RO.AddCallback
+import RO.KeyDispatcher
+import RO.KeyVariable
+
+EnvVarName = "TUI_PROFILE_CALLBACKS"
+
+# categories of statistics
+Categories = ("Keyword", "Callback", "Actor")
+
+# number of recent times retained (per item) for computing the 99th percentile
+_MaxRecentTimes = 1000
+
+class TimingStats(object):
+    """Timing statistics for one item (e.g. one keyword or one callback function)
+
+    Attributes:
+    - name      name of item
+    - count     number of calls
+    - totTime   total time (sec)
+    - maxTime   maximum time of one call (sec)
+    """
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.totTime = 0.0
+        self.maxTime = 0.0
+        self._recentTimes = collections.deque(maxlen=_MaxRecentTimes)
+
+    def addTime(self, dTime):
+        """Record one call that took dTime seconds"""
+        self.count += 1
+        self.totTime += dTime
+        if dTime > self.maxTime:
+            self.maxTime = dTime
+        self._recentTimes.append(dTime)
+
+    @property
+    def meanTime(self):
+        """Mean time per call (sec); 0 if no calls"""
+        if self.count == 0:
+            return 0.0
+        return self.totTime / self.count
+
+    @property
+    def p99Time(self):
+        """99th percentile time per call (sec) of the most recent calls; 0 if no calls"""
+        if not self._recentTimes:
+            return 0.0
+        sortedTimes = sorted(self._recentTimes)
+        return sortedTimes[min(len(sortedTimes) - 1, int(len(sortedTimes) * 0.99))]
+
+    def __repr__(self):
+        return "%s(name=%r, count=%s, totTime=%0.4f)" % (self.__class__.__name__, self.name, self.count, self.totTime)
+
+
+def _getFuncName(func):
+    """Return a descriptive name for a callback function
+
+    Unwraps functools.partial and RO.Alg.GenericCallback,
+    and includes the module and class name (if any).
+    """
+    for attrName in ("func", "_GC__callback", "_GCNoKWArgs__callback"):
+        wrappedFunc = getattr(func, attrName, None)
+        if wrappedFunc is not None and callable(wrappedFunc):
+            return _getFuncName(wrappedFunc)
+
+    funcName = getattr(func, "__name__", None)
+    if funcName is None:
+        # callable object
+        cls = func.__class__
+        return "%s.%s" % (cls.__module__, cls.__name__)
+
+    im_self = getattr(func, "im_self", None)
+    if im_self is not None:
+        cls = im_self.__class__
+        return "%s.%s.%s" % (cls.__module__, cls.__name__, funcName)
+    return "%s.%s" % (getattr(func, "__module__", "?"), funcName)
+
+
+class CallbackProfiler(object):
+    """Record timing statistics for keyword dispatching and keyword variable callbacks.
+
+    Usually there is only one profiler: the one returned by getProfiler.
+    """
+    def __init__(self):
+        self._origMethodDict = {}
+        self.reset()
+
+    @property
+    def isInstalled(self):
+        """Return True if profiling is enabled"""
+        return bool(self._origMethodDict)
+
+    def install(self):
+        """Enable profiling by replacing the dispatch, set and callback methods with timed versions.
+
+        A no-op if already installed.
+        """
+        if self.isInstalled:
+            return
+        profiler = self
+        origDispatch = RO.KeyDispatcher.KeyDispatcher.dispatch
+        origKeyVarSet = RO.KeyVariable.KeyVar.set
+
+        def dispatch(dispatcher, msgDict):
+            startTime = time.time()
+            try:
+                return origDispatch(dispatcher, msgDict)
+            finally:
+                profiler._addTime(profiler.actorStatsDict, msgDict.get("actor"), time.time() - startTime)
+
+        def keyVarSet(obj, *args, **kargs):
+            startTime = time.time()
+            try:
+                return origKeyVarSet(obj, *args, **kargs)
+            finally:
+                profiler._addTime(profiler.keywordStatsDict, "%s.%s" % (obj.actor, obj.keyword),
+                    time.time() - startTime)
+
+        def _basicDoCallbacks(obj, *args, **kwargs):
+            # same as RO.AddCallback.BaseMixin._basicDoCallbacks, but times each callback;
+            # note: the callbacks are called with a "keyVar" keyword argument, so "obj" is used for self
+            if not obj._enableCallbacks:
+                return
+
+            try:
+                obj._enableCallbacks = False
+                for func in obj._callbacks[:]:
+                    startTime = time.time()
+                    RO.AddCallback.safeCall2(str(obj), func, *args, **kwargs)
+                    profiler._addTime(profiler.callbackStatsDict, profiler._getFuncName(func),
+                        time.time() - startTime)
+            finally:
+                obj._enableCallbacks = True
+
+        for cls, name, func in (
+            (RO.KeyDispatcher.KeyDispatcher, "dispatch", dispatch),
+            (RO.KeyVariable.KeyVar, "set", keyVarSet),
+            (RO.KeyVariable.KeyVar, "_basicDoCallbacks", _basicDoCallbacks),
+        ):
+            # record the class's own attribute (or None if inherited), so uninstall can restore it
+            self._origMethodDict[(cls, name)] = cls.__dict__.get(name)
+            setattr(cls, name, func)
+
+    def uninstall(self):
+        """Disable profiling by restoring the original methods.
+
+        The statistics are retained. A no-op if not installed.
+        """
+        for (cls, name), origMethod in self._origMethodDict.iteritems():
+            if origMethod is None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, origMethod)
+        self._origMethodDict = {}
+
+    def reset(self):
+        """Discard all statistics"""
+        self.keywordStatsDict = {}
+        self.callbackStatsDict = {}
+        self.actorStatsDict = {}
+        # cache of callback function: name; weak keys so callbacks (and the objects
+        # that bound methods refer to) can be garbage collected once they are removed
+        self._funcNameDict = weakref.WeakKeyDictionary()
+
+    def getStatsList(self, category):
+        """Return a list of TimingStats for the specified category, in arbitrary order
+
+        Inputs:
+        - category: one of Categories
+
+        Raise ValueError if category unknown
+        """
+        try:
+            statsDict = {
+                "Keyword": self.keywordStatsDict,
+                "Callback": self.callbackStatsDict,
+                "Actor": self.actorStatsDict,
+            }[category]
+        except KeyError:
+            raise ValueError("Unknown category %r; must be one of %s" % (category, Categories))
+        return statsDict.values()
+
+    def writeCSV(self, outFile):
+        """Write statistics for all categories to an open file, in CSV format
+
+        Times are in msec.
+        """
+        writer = csv.writer(outFile)
+        writer.writerow(("category", "name", "count", "total (ms)", "mean (ms)", "p99 (ms)", "max (ms)"))
+        for category in Categories:
+            for stats in sorted(self.getStatsList(category), key=lambda st: -st.totTime):
+                writer.writerow((category, stats.name, stats.count) + tuple(
+                    "%0.4f" % (val * 1000.0,) for val in
+                    (stats.totTime, stats.meanTime, stats.p99Time, stats.maxTime)
+                ))
+
+    def _addTime(self, statsDict, name, dTime):
+        """Add a call time to the TimingStats for name in statsDict, creating the entry if necessary
+        """
+        stats = statsDict.get(name)
+        if stats is None:
+            stats = TimingStats(name)
+            statsDict[name] = stats
+        stats.addTime(dTime)
+
+    def _getFuncName(self, func):
+        """Return a descriptive name for a callback function (cached)
+        """
+        try:
+            return self._funcNameDict[func]
+        except KeyError:
+            funcName = _getFuncName(func)
+            self._funcNameDict[func] = funcName
+            return funcName
+        except TypeError:
+            # unhashable or cannot be weakly referenced
+            return _getFuncName(func)
+
+
+_Profiler = None
+
+def getProfiler():
+    """Return the callback profiler, creating it if necessary"""
+    global _Profiler
+    if _Profiler is None:
+        _Profiler = CallbackProfiler()
+    return _Profiler
+
+def installFromEnv():
+    """Enable profiling if environment variable TUI_PROFILE_CALLBACKS is set to a nonempty value
+
+    Return True if profiling is enabled.
+    """
+    profiler = getProfiler()
+    if os.environ.get(EnvVarName):
+        profiler.install()
+    return profiler.isInstalled
+
+
+if __name__ == "__main__":
+    # measure the overhead of profiling by dispatching messages to keyword variables with callbacks
+    import sys
+    import RO.CnvUtil
+
+    class FakeConnection(object):
+        cmdr = "me.me"
+
+    def nullCallback(valueList, isCurrent, keyVar):
+        pass
+
+    dispatcher = RO.KeyDispatcher.KeyDispatcher()
+    dispatcher.connection = FakeConnection()
+    nKeys = 20
+    for keyInd in range(nKeys):
+        keyVar = RO.KeyVariable.KeyVar(
+            actor = "tcc",
+            keyword = "key%d" % (keyInd,),
+            converters = RO.CnvUtil.asFloatOrNone,
+            dispatcher = dispatcher,
+        )
+        for i in range(3):
+            keyVar.addCallback(nullCallback, callNow=False)
+    msgDict = dict(
+        cmdr = "other.other",
+        cmdID = 0,
+        actor = "tcc",
+        msgType = ":",
+        data = dict(("key%d" % (keyInd,), ("1.5",)) for keyInd in range(nKeys)),
+    )
+
+    def timeDispatch(nMsg=2000):
+        startTime = time.time()
+        for i in xrange(nMsg):
+            dispatcher.dispatch(msgDict)
+        return (time.time() - startTime) / nMsg
+
+    profiler = getProfiler()
+    plainTime = timeDispatch()
+    profiler.install()
+    profTime = timeDispatch()
+    profiler.uninstall()
+    print "Dispatch one message with %d keywords and %d callbacks:" % (nKeys, nKeys * 3)
+    print "profiling disabled %0.3f ms; enabled %0.3f ms" % (plainTime * 1000, profTime * 1000)
+    profiler.writeCSV(sys.stdout)
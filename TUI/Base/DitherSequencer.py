@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+"""Take exposures at a sequence of telescope offsets (a dither or nod pattern),
+offsetting the telescope while the detector is read out.
+
+A simple dither script offsets the telescope, waits for the offset to finish,
+exposes, and waits for the exposure command to finish (including readout and writing the file).
+DitherSequencer instead starts the next offset as soon as the last exposure at a position
+stops integrating (as reported by the instrument's <inst>ExpState keyword),
+so the offset overlaps readout. For safety:
+- An offset is only started if the shutter is closed: the exposure state must not be
+  flushing, integrating, paused or resume (else the offset waits for the exposure command to finish).
+- An exposure is only started once the previous offset and exposure commands have finished.
+
+Each sequence reports the time it took and the time saved by overlapping offsets with readout;
+the totals for the night are logged and available from getNightStats.
+
+Typical use in a script (see Scripts/NICFPS/Dither/Point Source.py):
+    # in __init__
+    self.ditherSeq = DitherSequencer(sr, expModel, "offset boresight %.7f, %.7f/pabs/vabs/computed", "Dither")
+    # in run
+    self.ditherSeq.start(begOffset)
+    for each position:
+        yield self.ditherSeq.waitOffset(desOffset)
+        yield self.ditherSeq.waitExpose(expCmdStr, numExp)
+    yield self.ditherSeq.waitOffset(self.ditherSeq.begOffset)
+    yield self.ditherSeq.waitFinish()
+    # in end
+    self.ditherSeq.abort()
+    self.ditherSeq.startRestoreOffset()
+
+History:
+2026-10-18 ROwen
+"""
+__all__ = ["DitherSequencer", "getNightStats"]
+
+import time
+import numpy
+import RO.Alg
+import RO.StringUtil
+import TUI.TUIModel
+
+# exposure states during which the telescope must not move
+# ("resume" means integrating again after a pause)
+_ShutterStates = ("flushing", "integrating", "paused", "resume")
+
+# exposure states after integration is finished
+_ReadoutStates = ("reading", "processing", "done")
+
+# a night runs from noon to noon (local time)
+_NightStartHour = 12
+
+# dict of (night date as YYYY-MM-DD, sequence name): _NightStats
+_NightStatsDict = {}
+
+class _NightStats(object):
+    """Statistics for all sequences of one kind taken in one night
+
+    Attributes:
+    - numSeq: number of sequences
+    - seqTime: total duration of the sequences (sec)
+    - savedTime: total time saved by offsetting during readout (sec)
+    """
+    def __init__(self):
+        self.numSeq = 0
+        self.seqTime = 0.0
+        self.savedTime = 0.0
+
+def _getNightDate(utcTime=None):
+    """Return the date of the start of the night containing utcTime (default: now) as YYYY-MM-DD
+    """
+    if utcTime is None:
+        utcTime = time.time()
+    return time.strftime("%Y-%m-%d", time.localtime(utcTime - (_NightStartHour * 3600.0)))
+
+def getNightStats(nightDate=None):
+    """Return statistics for tonight (or another night) as a dict of sequence name: _NightStats
+
+    Inputs:
+    - nightDate: date of start of night as YYYY-MM-DD; if None then tonight
+    """
+    if nightDate is None:
+        nightDate = _getNightDate()
+    return dict((seqName, stats) for (statsDate, seqName), stats in _NightStatsDict.iteritems()
+        if statsDate == nightDate)
+
+
+class DitherSequencer(object):
+    """Take exposures at a sequence of telescope offsets, offsetting during readout
+
+    Inputs:
+    - sr: script runner
+    - expModel: exposure model for the instrument (TUI.Inst.ExposeModel.getModel(instName))
+    - offsetCmdFmt: format string for the TCC offset command; it is formatted with the x, y offset (deg),
+        e.g. "offset boresight %.7f, %.7f/pabs/vabs/computed"
+    - seqName: name of this kind of sequence, for reports (e.g. "NICFPS Dither Point Source")
+    - overlap: if True then offset while the detector is read out; if False then offset after
+        each exposure command finishes (the traditional behavior)
+    """
+    def __init__(self, sr, expModel, offsetCmdFmt, seqName, overlap=True):
+        self.sr = sr
+        self.expModel = expModel
+        self.offsetCmdFmt = offsetCmdFmt
+        self.seqName = seqName
+        self.overlap = bool(overlap)
+        self.tuiModel = TUI.TUIModel.getModel()
+
+        self.begOffset = numpy.array((numpy.nan, numpy.nan))
+        self.currOffset = self.begOffset[:]
+        self._expCmdVar = None
+        self._offsetCmdVar = None
+        self._expStateCBAdded = False
+        self._prevExpState = None
+        self._numIntegrated = 0
+        self._numExpWanted = 0
+        self._isWaitingUser = False
+        self._startTime = None
+        # list of [offset start time, offset end time, end time of exposure command it overlapped]
+        # (times are None until known)
+        self._offsetTimeList = []
+
+    def start(self, begOffset):
+        """Start a new sequence
+
+        Inputs:
+        - begOffset: x, y offset (deg) before the sequence (restored by startRestoreOffset)
+        """
+        self.begOffset = numpy.array(begOffset, dtype=float)
+        self.currOffset = self.begOffset[:]
+        self._expCmdVar = None
+        self._offsetCmdVar = None
+        self._offsetTimeList = []
+        self._startTime = time.time()
+
+    def needMove(self, desOffset):
+        """Return True if telescope not at desired offset"""
+        if numpy.any(numpy.isnan(self.currOffset)):
+            return False
+        return not numpy.allclose(self.currOffset, desOffset)
+
+    def waitOffset(self, desOffset):
+        """Start offsetting the telescope, if not already at desOffset
+
+        Returns as soon as the offset has started, unless the shutter may be open,
+        in which case it first waits for the current exposure command to finish.
+        waitExpose and waitFinish wait for the offset to finish.
+
+        A yield is required.
+        """
+        if not self.needMove(desOffset):
+            return
+        if self._offsetCmdVar and not self._offsetCmdVar.isDone():
+            yield self.sr.waitCmdVars(self._offsetCmdVar)
+
+        expCmdVar = self._expCmdVar
+        if expCmdVar and not expCmdVar.isDone() and not self._isShutterClosed():
+            yield self.sr.waitCmdVars(expCmdVar)
+
+        offsetTimes = [time.time(), None, None]
+        if expCmdVar and not expCmdVar.isDone():
+            self._offsetTimeList.append(offsetTimes)
+            expCmdVar.addCallback(RO.Alg.GenericCallback(self._setTime, offsetTimes, 2))
+        self.currOffset = numpy.array(desOffset, dtype=float)
+        self._offsetCmdVar = self.sr.startCmd(
+            actor = "tcc",
+            cmdStr = self.offsetCmdFmt % tuple(self.currOffset),
+            callFunc = RO.Alg.GenericCallback(self._setTime, offsetTimes, 1),
+        )
+
+    def waitExpose(self, expCmdStr, numExp=1):
+        """Take one or more exposures at the current offset
+
+        Waits for the previous offset and exposure commands to finish, starts the exposure command,
+        then waits until the last exposure has stopped integrating or the exposure command has finished
+        (if overlap is True) or until the exposure command has finished (if overlap is False).
+
+        A yield is required.
+
+        Inputs:
+        - expCmdStr: exposure command
+        - numExp: number of exposures the command will take
+        """
+        yield self._waitCmds()
+
+        self._prevExpState = None
+        self._numIntegrated = 0
+        self._expCmdVar = self.sr.startCmd(
+            actor = self.expModel.actor,
+            cmdStr = expCmdStr,
+            abortCmdStr = "abort",
+        )
+        if not self.overlap or self.sr.debug:
+            yield self.sr.waitCmdVars(self._expCmdVar)
+            return
+
+        # wait for the exposure state callback or the exposure command to wake the script
+        self._numExpWanted = numExp
+        self._addExpStateCallback()
+        self._expCmdVar.addCallback(self._wakeExpose)
+        try:
+            while not self._isExposeDone():
+                self._isWaitingUser = True
+                yield self.sr.waitUser()
+        finally:
+            self._isWaitingUser = False
+            self._removeExpStateCallback()
+
+    def waitFinish(self):
+        """Wait for all commands to finish, then report statistics for this sequence
+
+        A yield is required.
+        """
+        yield self._waitCmds()
+
+        seqTime = time.time() - self._startTime
+        savedTime = 0.0
+        for offsetBeg, offsetEnd, expEnd in self._offsetTimeList:
+            if None not in (offsetEnd, expEnd):
+                savedTime += max(0.0, min(offsetEnd, expEnd) - offsetBeg)
+
+        stats = _NightStatsDict.setdefault((_getNightDate(), self.seqName), _NightStats())
+        stats.numSeq += 1
+        stats.seqTime += seqTime
+        stats.savedTime += savedTime
+        self.tuiModel.logMsg(
+            "%s: sequence took %0.1f sec; offsetting during readout saved %0.1f sec; " \
+            "tonight %d %s saved %0.1f sec" % (self.seqName, seqTime, savedTime,
+                stats.numSeq, RO.StringUtil.plural(stats.numSeq, "sequence", "sequences"), stats.savedTime),
+        )
+
+    def abort(self):
+        """Abort the exposure command, if running; call from the script's end method
+        """
+        self._isWaitingUser = False
+        self._removeExpStateCallback()
+        if self._expCmdVar and not self._expCmdVar.isDone():
+            self._expCmdVar.abort()
+
+    def startRestoreOffset(self):
+        """Start restoring the initial offset, if changed; call from the script's end method
+        """
+        if self.needMove(self.begOffset):
+            self.currOffset = self.begOffset[:]
+            self.sr.startCmd(
+                actor = "tcc",
+                cmdStr = self.offsetCmdFmt % tuple(self.begOffset),
+            )
+
+    def _waitCmds(self):
+        """Wait for the current offset and exposure commands to finish"""
+        cmdVars = [cmdVar for cmdVar in (self._offsetCmdVar, self._expCmdVar)
+            if cmdVar and not cmdVar.isDone()]
+        if cmdVars:
+            yield self.sr.waitCmdVars(cmdVars)
+
+    def _isShutterClosed(self):
+        """Return True if the exposure state says the shutter is closed and will stay so
+        (until the next exposure command)
+        """
+        expState, isCurrent = self.expModel.expState.get()
+        if not isCurrent or expState[1] is None:
+            return False
+        return self._numIntegrated > 0 and expState[1].lower() not in _ShutterStates
+
+    def _addExpStateCallback(self):
+        if not self._expStateCBAdded:
+            self.expModel.expState.addCallback(self._expStateCallback, callNow=False)
+            self._expStateCBAdded = True
+
+    def _removeExpStateCallback(self):
+        if self._expStateCBAdded:
+            self.expModel.expState.removeCallback(self._expStateCallback, doRaise=False)
+            self._expStateCBAdded = False
+
+    def _expStateCallback(self, expState, isCurrent, keyVar=None):
+        """Count exposures that have stopped integrating"""
+        if not isCurrent or expState[1] is None:
+            return
+        state = expState[1].lower()
+        if self._prevExpState in _ShutterStates and state not in _ShutterStates:
+            self._numIntegrated += 1
+        elif self._prevExpState is None and state in _ReadoutStates:
+            # missed the end of integration
+            self._numIntegrated += 1
+        self._prevExpState = state
+        self._wakeExpose()
+
+    def _isExposeDone(self):
+        """Return True if waitExpose is done waiting"""
+        return self._numIntegrated >= self._numExpWanted or self._expCmdVar.isDone()
+
+    def _wakeExpose(self, *args, **kargs):
+        """Resume waitExpose if it is done waiting"""
+        if self._isWaitingUser and self._isExposeDone():
+            self._isWaitingUser = False
+            self.sr.resumeUser()
+
+    def _setTime(self, timeList, ind, *args, **kargs):
+        """Command callback: record the time a command finished"""
+        timeList[ind] = time.time()
+
+
+if __name__ == "__main__":
+    # test counting of exposures that have stopped integrating, including pause and resume
+    class FakeKeyVar(object):
+        def __init__(self):
+            self.val = (None, None, None, None, None)
+        def get(self):
+            return self.val, True
+        def addCallback(self, callFunc, callNow=True):
+            pass
+        def removeCallback(self, callFunc, doRaise=True):
+            pass
+
+    class FakeCmdVar(object):
+        def isDone(self):
+            return False
+
+    class FakeExpModel(object):
+        actor = "fakeExpose"
+        expState = FakeKeyVar()
+
+    expModel = FakeExpModel()
+    ditherSeq = DitherSequencer(sr=None, expModel=expModel, offsetCmdFmt="offset %.7f, %.7f", seqName="Test")
+    ditherSeq._expCmdVar = FakeCmdVar()
+    for stateList, numIntegrated in (
+        (("flushing", "integrating", "reading", "done"), 1),
+        (("flushing", "integrating", "paused", "resume", "reading", "done"), 1),
+        (("flushing", "integrating", "paused", "resume", "paused", "resume", "reading", "processing",
+            "flushing", "integrating", "reading", "done"), 2),
+        # the end of integration was missed
+        (("reading", "done"), 1),
+    ):
+        ditherSeq._prevExpState = None
+        ditherSeq._numIntegrated = 0
+        ditherSeq._numExpWanted = numIntegrated
+        for state in stateList:
+            expModel.expState.val = ("me", state, None, None, None)
+            ditherSeq._expStateCallback(expModel.expState.val, True)
+            isClosed = ditherSeq._isShutterClosed()
+            if state in ("flushing", "integrating", "paused", "resume") and isClosed:
+                print "Bug: shutter reported closed in state %r of %s" % (state, stateList)
+        if ditherSeq._numIntegrated != numIntegrated:
+            print "Bug: counted %d exposures for %s; should be %d" % (ditherSeq._numIntegrated, stateList, numIntegrated)
+    print "Test done"
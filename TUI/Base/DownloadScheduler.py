@@ -0,0 +1,478 @@
+#!/usr/bin/env python
+"""Schedule image downloads for all instruments and guiders.
+
+One DownloadScheduler is owned by the Downloads window and shared by every FileGetter
+(one per ExposeModel) and every guide window. Requests are held here until there is room
+to start them, then handed to the Downloads window's HTTPGetWdg (which displays them).
+This allows:
+- A global limit on simultaneous transfers and a separate limit for each group
+  (typically one group per instrument or guide actor), so one slow instrument
+  cannot starve the others.
+- Priority for the most recent image: queued requests are started in order of
+  priority, then newest first.
+- Cancellation of superseded requests: a new request may cancel all queued
+  (not yet started) requests in its group, e.g. for "get every" -1.
+- Throughput statistics for each completed transfer.
+
+Each request is a list of argument dicts for HTTPGetWdg.getFile; all files in one request
+(e.g. the red and blue images of one DIS exposure) are started together.
+
+History:
+2026-10-18 ROwen
+2026-10-18 ROwen    Added cancelFunc argument to submit.
+2026-10-18 ROwen    Added abort.
+"""
+__all__ = ["DownloadScheduler", "DownloadRequest", "TransferStats"]
+
+import collections
+import itertools
+import sys
+import time
+import traceback
+import RO.AddCallback
+import RO.Alg
+
+_DefMaxTransfersPerGroup = 2
+_NumStatsToSave = 200
+
+class TransferStats(object):
+    """Throughput information about one finished transfer
+
+    Attributes:
+    - group: download group
+    - dispStr: display string of the transfer
+    - state: final state of the HTTPGet (e.g. Done or Failed)
+    - nBytes: number of bytes read
+    - duration: time from start to finish (sec)
+    - waitTime: time spent queued in the scheduler before starting (sec)
+    """
+    def __init__(self, group, dispStr, state, nBytes, duration, waitTime):
+        self.group = group
+        self.dispStr = dispStr
+        self.state = state
+        self.nBytes = nBytes
+        self.duration = duration
+        self.waitTime = waitTime
+
+    @property
+    def rate(self):
+        """Transfer rate (bytes/sec), or None if unknown"""
+        if self.duration <= 0:
+            return None
+        return self.nBytes / self.duration
+
+    def __str__(self):
+        rate = self.rate
+        rateStr = "?" if rate is None else "%0.0f kB/sec" % (rate / 1000.0,)
+        return "%s: %s %d bytes in %0.2f sec (%s) after waiting %0.2f sec" % \
+            (self.dispStr, self.state, self.nBytes, self.duration, rateStr, self.waitTime)
+
+
+class DownloadRequest(object):
+    """A set of files to be downloaded together
+
+    Do not create directly; use DownloadScheduler.submit.
+
+    Attributes:
+    - group: download group
+    - argList: list of argument dicts for HTTPGetWdg.getFile
+    - priority: priority; larger is more important
+    - seqNum: submission sequence number; larger is more recent
+    - state: one of Queued, Started or Cancelled
+    - httpGetList: list of HTTPGet objects, once started
+    - cancelFunc: function to call if the request is cancelled, or None;
+        it receives one argument: this request
+    """
+    Queued = "Queued"
+    Started = "Started"
+    Cancelled = "Cancelled"
+
+    def __init__(self, group, argList, priority, seqNum, cancelFunc=None):
+        self.group = group
+        self.argList = argList
+        self.priority = priority
+        self.seqNum = seqNum
+        self.cancelFunc = cancelFunc
+        self.state = self.Queued
+        self.queueTime = time.time()
+        self.httpGetList = []
+
+    @property
+    def nFiles(self):
+        return len(self.argList)
+
+    def _sortKey(self):
+        return (self.priority, self.seqNum)
+
+    def __str__(self):
+        return "%s(group=%r, seqNum=%s, state=%s)" % (self.__class__.__name__, self.group, self.seqNum, self.state)
+
+
+class DownloadScheduler(RO.AddCallback.BaseMixin):
+    """Schedule downloads for a shared download widget
+
+    Callback functions receive one argument: this scheduler.
+    They are called whenever the set of queued or running transfers changes
+    and whenever a transfer finishes (so statistics can be displayed).
+    """
+    def __init__(self,
+        downloadWdg,
+        maxTransfers = None,
+        maxTransfersPerGroup = _DefMaxTransfersPerGroup,
+        callFunc = None,
+    ):
+        """Create a DownloadScheduler
+
+        Inputs:
+        - downloadWdg: an RO.Wdg.HTTPGetWdg (or anything with a compatible getFile method)
+        - maxTransfers: maximum number of simultaneous transfers;
+            if None then use downloadWdg.maxTransfers
+        - maxTransfersPerGroup: default maximum number of simultaneous transfers per group;
+            override for a particular group using setGroupLimit
+        - callFunc: callback function, or None
+        """
+        RO.AddCallback.BaseMixin.__init__(self)
+        self.downloadWdg = downloadWdg
+        if maxTransfers is None:
+            maxTransfers = downloadWdg.maxTransfers
+        self.maxTransfers = int(maxTransfers)
+        self.maxTransfersPerGroup = int(maxTransfersPerGroup)
+        self._groupLimitDict = {} # dict of group: max transfers, for groups with non-default limits
+
+        self._queue = [] # list of queued DownloadRequests
+        self._runningDict = {} # dict of group: set of running HTTPGets
+        self._nRunning = 0
+        self._seqNumIter = itertools.count(1)
+        self._isStarting = False
+
+        # statistics
+        self.statsList = collections.deque(maxlen=_NumStatsToSave) # recent TransferStats
+        self.nDone = 0
+        self.nFailed = 0
+        self.nCancelled = 0
+        self.totBytes = 0
+        self.totDuration = 0.0
+
+        if callFunc:
+            self.addCallback(callFunc, callNow=False)
+
+    def cancel(self, group):
+        """Cancel all queued (not yet started) requests in the specified group
+
+        Transfers that are already running are not affected
+        (use abort to stop those, or the user may abort them from the Downloads window).
+
+        Returns the number of requests cancelled.
+        """
+        cancelledList = []
+        for request in self._queue:
+            if request.group == group and request.state == request.Queued:
+                request.state = request.Cancelled
+                cancelledList.append(request)
+        if not cancelledList:
+            return 0
+
+        self._queue = [request for request in self._queue if request.state == request.Queued]
+        self.nCancelled += len(cancelledList)
+        for request in cancelledList:
+            if request.cancelFunc:
+                try:
+                    request.cancelFunc(request)
+                except Exception:
+                    sys.stderr.write("DownloadScheduler: cancel function %s failed:\n" % (request.cancelFunc,))
+                    traceback.print_exc(file=sys.stderr)
+        return len(cancelledList)
+
+    def abort(self, group):
+        """Cancel all queued requests in the specified group and abort its running transfers
+
+        Aborted transfers delete their partially written files.
+        """
+        self.cancel(group)
+        for httpGet in list(self._runningDict.get(group, ())):
+            httpGet.abort()
+
+    def getGroupLimit(self, group):
+        """Return the maximum number of simultaneous transfers for the specified group"""
+        return self._groupLimitDict.get(group, self.maxTransfersPerGroup)
+
+    def getMeanRate(self):
+        """Return mean transfer rate (bytes/sec) of all successful transfers, or None if unknown"""
+        if self.totDuration <= 0:
+            return None
+        return self.totBytes / self.totDuration
+
+    def getNumQueued(self, group=None):
+        """Return the number of queued requests (in the specified group, if not None)"""
+        if group is None:
+            return len(self._queue)
+        return sum(1 for request in self._queue if request.group == group)
+
+    def getNumRunning(self, group=None):
+        """Return the number of running transfers (in the specified group, if not None)"""
+        if group is None:
+            return self._nRunning
+        return len(self._runningDict.get(group, ()))
+
+    def getStatsStr(self):
+        """Return a brief summary of the state of the scheduler and transfer statistics"""
+        strList = ["%d running, %d queued" % (self._nRunning, len(self._queue))]
+        if self.statsList:
+            lastRate = self.statsList[-1].rate
+            if lastRate is not None:
+                strList.append("last %0.0f kB/sec" % (lastRate / 1000.0,))
+        meanRate = self.getMeanRate()
+        if meanRate is not None:
+            strList.append("mean %0.0f kB/sec" % (meanRate / 1000.0,))
+        if self.nFailed:
+            strList.append("%d failed" % (self.nFailed,))
+        if self.nCancelled:
+            strList.append("%d superseded" % (self.nCancelled,))
+        return "; ".join(strList)
+
+    def setGroupLimit(self, group, maxTransfers):
+        """Set the maximum number of simultaneous transfers for a group
+
+        If maxTransfers is None then the default limit is restored.
+        """
+        if maxTransfers is None:
+            self._groupLimitDict.pop(group, None)
+        else:
+            self._groupLimitDict[group] = int(maxTransfers)
+        self._startNew()
+
+    def submit(self, group, argList, priority=0, supersede=False, cancelFunc=None):
+        """Submit a set of files to download
+
+        Inputs:
+        - group: download group (e.g. instrument name); used for the per-group transfer limit
+            and to determine which requests are superseded
+        - argList: a list of dicts of keyword arguments for HTTPGetWdg.getFile,
+            one per file; all files are started together.
+            If a dict contains doneFunc then it is called (with the HTTPGet as its argument)
+            when that transfer finishes, as usual.
+        - priority: queued requests with higher priority are started first;
+            requests of equal priority are started newest first
+        - supersede: if True then cancel all queued (not yet started) requests in the same group
+        - cancelFunc: function to call if this request is cancelled before it starts, or None;
+            it receives one argument: the DownloadRequest
+
+        Returns a DownloadRequest.
+        """
+        if supersede:
+            self.cancel(group)
+        request = DownloadRequest(
+            group = group,
+            argList = list(argList),
+            priority = priority,
+            seqNum = self._seqNumIter.next(),
+            cancelFunc = cancelFunc,
+        )
+        if request.nFiles > 0:
+            self._queue.append(request)
+            self._startNew()
+        else:
+            request.state = request.Started
+        return request
+
+    def _startNew(self):
+        """Start as many queued requests as the transfer limits allow"""
+        if self._isStarting:
+            # called from a done function or submit while starting requests;
+            # the outer call will handle any new requests
+            return
+        self._isStarting = True
+        try:
+            didStart = True
+            while didStart:
+                didStart = False
+                for request in sorted(self._queue, key=DownloadRequest._sortKey, reverse=True):
+                    if request.state != request.Queued:
+                        continue
+                    if self._nRunning >= self.maxTransfers:
+                        break
+                    # require room for the whole request, but if the request has more files
+                    # than a limit allows then only require that limit
+                    groupLimit = self.getGroupLimit(request.group)
+                    nGroupRunning = len(self._runningDict.get(request.group, ()))
+                    nNeeded = min(request.nFiles, groupLimit, self.maxTransfers)
+                    if self.maxTransfers - self._nRunning < nNeeded or groupLimit - nGroupRunning < nNeeded:
+                        continue
+                    self._startRequest(request)
+                    didStart = True
+                self._queue = [request for request in self._queue if request.state == request.Queued]
+        finally:
+            self._isStarting = False
+        self._doCallbacks()
+
+    def _startRequest(self, request):
+        """Start all transfers for a request"""
+        request.state = request.Started
+        runningSet = self._runningDict.setdefault(request.group, set())
+        for argDict in request.argList:
+            argDict = argDict.copy()
+            userDoneFunc = argDict.pop("doneFunc", None)
+            startTime = time.time()
+            httpGet = self.downloadWdg.getFile(**argDict)
+            request.httpGetList.append(httpGet)
+            doneFunc = RO.Alg.GenericCallback(self._transferDone, request, startTime, userDoneFunc)
+            if httpGet.isDone:
+                # failed immediately (e.g. file exists and overwrite False)
+                doneFunc(httpGet)
+            else:
+                runningSet.add(httpGet)
+                self._nRunning += 1
+                httpGet.addDoneCallback(doneFunc)
+
+    def _transferDone(self, request, startTime, userDoneFunc, httpGet):
+        """Called when a transfer finishes"""
+        endTime = time.time()
+        runningSet = self._runningDict.get(request.group, set())
+        if httpGet in runningSet:
+            runningSet.remove(httpGet)
+            self._nRunning -= 1
+            if not runningSet:
+                del self._runningDict[request.group]
+
+        nBytes = httpGet.readBytes or 0
+        stats = TransferStats(
+            group = request.group,
+            dispStr = httpGet.dispStr,
+            state = httpGet.state,
+            nBytes = nBytes,
+            duration = endTime - startTime,
+            waitTime = startTime - request.queueTime,
+        )
+        self.statsList.append(stats)
+        if httpGet.state == httpGet.Done:
+            self.nDone += 1
+            self.totBytes += nBytes
+            self.totDuration += stats.duration
+        else:
+            self.nFailed += 1
+
+        if userDoneFunc:
+            try:
+                userDoneFunc(httpGet)
+            except Exception:
+                sys.stderr.write("DownloadScheduler: done function %s failed:\n" % (userDoneFunc,))
+                traceback.print_exc(file=sys.stderr)
+
+        self._startNew()
+
+
+if __name__ == "__main__":
+    # Test harness: serve fake FITS files from a local http server and download them
+    # through a Downloads window, reporting throughput and which requests were superseded.
+    import BaseHTTPServer
+    import os
+    import shutil
+    import SimpleHTTPServer
+    import tempfile
+    import threading
+    import Tkinter
+    import TUI.TUIMenu.DownloadsWindow
+
+    NumImages = 12
+    ImageShape = (512, 512)
+    ChunkSize = 16384
+    ChunkDelay = 0.01 # delay between chunks of served data (sec), to simulate a slow link
+
+    def writeFITS(path, shape, value):
+        """Write a minimal 16-bit FITS file"""
+        cardList = [
+            "SIMPLE  = %20s" % ("T",),
+            "BITPIX  = %20d" % (16,),
+            "NAXIS   = %20d" % (2,),
+            "NAXIS1  = %20d" % (shape[1],),
+            "NAXIS2  = %20d" % (shape[0],),
+            "END",
+        ]
+        hdr = "".join(card.ljust(80) for card in cardList)
+        hdr = hdr.ljust(((len(hdr) + 2879) // 2880) * 2880)
+        dataLen = shape[0] * shape[1] * 2
+        with open(path, "wb") as f:
+            f.write(hdr)
+            f.write(chr(value % 256) * dataLen)
+            f.write("\0" * (-dataLen % 2880))
+
+    class SlowHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
+        def copyfile(self, source, outputfile):
+            while True:
+                data = source.read(ChunkSize)
+                if not data:
+                    break
+                outputfile.write(data)
+                time.sleep(ChunkDelay)
+        def log_message(self, *args):
+            pass
+
+    class ThreadedServer(BaseHTTPServer.HTTPServer):
+        def process_request(self, request, client_address):
+            thread = threading.Thread(
+                target = self._handleRequest,
+                args = (request, client_address),
+            )
+            thread.daemon = True
+            thread.start()
+        def _handleRequest(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            self.shutdown_request(request)
+
+    serveDir = tempfile.mkdtemp(prefix="dlserve")
+    saveDir = tempfile.mkdtemp(prefix="dlsave")
+    for ii in range(NumImages):
+        for camName in ("r", "b"):
+            writeFITS(os.path.join(serveDir, "im%02d%s.fits" % (ii, camName)), ImageShape, ii)
+    os.chdir(serveDir)
+    server = ThreadedServer(("127.0.0.1", 0), SlowHandler)
+    serverThread = threading.Thread(target=server.serve_forever)
+    serverThread.daemon = True
+    serverThread.start()
+    baseURL = "http://127.0.0.1:%d/" % (server.server_address[1],)
+    print "Serving %d FITS files from %s at %s" % (NumImages * 2, serveDir, baseURL)
+
+    root = Tkinter.Tk()
+    downloadWdg = TUI.TUIMenu.DownloadsWindow.DownloadsWdg(root, maxTransfers=5, maxLines=100)
+    downloadWdg.pack(fill="both", expand=True)
+    scheduler = downloadWdg.scheduler
+
+    def printDone(httpGet):
+        print "%s %s" % (httpGet.state, httpGet.dispStr)
+
+    def makeArgList(ii, camNames):
+        return [dict(
+            fromURL = baseURL + "im%02d%s.fits" % (ii, camName),
+            toPath = os.path.join(saveDir, "im%02d%s.fits" % (ii, camName)),
+            isBinary = True,
+            overwrite = True,
+            dispStr = "im%02d%s.fits" % (ii, camName),
+            doneFunc = printDone,
+        ) for camName in camNames]
+
+    def submitNext(ii=0):
+        if ii >= NumImages:
+            root.after(500, checkDone)
+            return
+        # "dis" wants every image (red and blue), "spicam" only the most recent image
+        scheduler.submit("dis", makeArgList(ii, ("r", "b")))
+        scheduler.submit("spicam", makeArgList(ii, ("r",)), supersede=True)
+        root.after(100, submitNext, ii + 1)
+
+    def checkDone():
+        if scheduler.getNumRunning() or scheduler.getNumQueued():
+            root.after(500, checkDone)
+            return
+        for stats in scheduler.statsList:
+            print stats
+        print scheduler.getStatsStr()
+        server.shutdown()
+        shutil.rmtree(serveDir, ignore_errors=True)
+        shutil.rmtree(saveDir, ignore_errors=True)
+        root.quit()
+
+    submitNext()
+    root.mainloop()
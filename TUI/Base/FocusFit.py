@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+"""Fit FWHM vs. focus, one measurement at a time.
+
+Used by BaseFocusScript to update the best focus estimate after every exposure of a focus sweep.
+Two models are supported:
+- Quadratic: FWHM = c0 + c1 foc + c2 foc^2
+- Hyperbolic: FWHM^2 = c0 + c1 foc + c2 foc^2; a seeing-limited star image is the quadrature sum
+  of seeing and defocus blur, so FWHM is a hyperbola in focus (a better fit far from focus).
+Both are linear least squares fits, so the normal equations are kept as running sums
+that are updated as each measurement is added; a fit is a 3x3 solve.
+
+Outliers (e.g. a measurement spoiled by a cosmic ray or a passing cloud) are rejected one at a time,
+worst first, if the FWHM residual from a fit to the other measurements exceeds RejectSigma times
+the scatter of the other measurements about that fit; this requires at least MinPointsToReject measurements,
+and at most MaxRejectFrac of the measurements are rejected.
+
+History:
+2026-10-18 ROwen
+"""
+__all__ = ["ModelQuadratic", "ModelHyperbolic", "ModelList", "FocusFit", "FocusFitter"]
+
+import math
+import numpy
+
+ModelQuadratic = "Quadratic"
+ModelHyperbolic = "Hyperbolic"
+ModelList = (ModelQuadratic, ModelHyperbolic)
+
+# reject a point if its residual from a fit to the other points
+# is greater than this many standard deviations of the other points about that fit
+RejectSigma = 5.0
+
+# minimum number of points for outlier rejection
+MinPointsToReject = 6
+
+# maximum fraction of points that may be rejected
+MaxRejectFrac = 0.2
+
+class FocusFit(object):
+    """The result of fitting FWHM vs. focus
+
+    Attributes:
+    - model: the model (ModelQuadratic or ModelHyperbolic)
+    - coeffs: coefficients c0, c1, c2 of the model (see module doc string)
+    - isMin: True if the fit curve has a minimum (rather than a maximum)
+    - bestFocPos: focus position of minimum FWHM (None if not isMin)
+    - bestFWHM: FWHM at bestFocPos (None if not isMin)
+    - fwhmSigma: standard deviation of FWHM about the fit, or None if too few points
+    - focSigma: estimated standard deviation of bestFocPos, or None if unknown
+    - numUsed: number of measurements used for the fit
+    - rejectedList: list of (focus position, FWHM) of measurements rejected as outliers
+    """
+    def __init__(self, model, coeffs, fwhmSigma, numUsed, rejectedList):
+        self.model = model
+        self.coeffs = tuple(coeffs)
+        self.fwhmSigma = fwhmSigma
+        self.numUsed = numUsed
+        self.rejectedList = rejectedList
+
+        c0, c1, c2 = self.coeffs
+        self.isMin = c2 > 0.0
+        self.bestFocPos = None
+        self.bestFWHM = None
+        self.focSigma = None
+        if not self.isMin:
+            return
+
+        self.bestFocPos = -c1 / (2.0 * c2)
+        minVal = c0 - (c1 * c1 / (4.0 * c2))
+        if model == ModelHyperbolic:
+            self.bestFWHM = math.sqrt(max(minVal, 0.0))
+            # curvature of FWHM at best focus: FWHM ~= bestFWHM + (c2 / (2 bestFWHM)) dFoc^2
+            curvature = c2 / (2.0 * self.bestFWHM) if self.bestFWHM > 0 else None
+        else:
+            self.bestFWHM = minVal
+            curvature = c2
+        if fwhmSigma is not None and curvature:
+            self.focSigma = math.sqrt(fwhmSigma / curvature)
+
+    def getFWHM(self, focPos):
+        """Return the fit FWHM at one or more focus positions
+
+        Inputs:
+        - focPos: focus position, or a numpy array of focus positions
+        """
+        c0, c1, c2 = self.coeffs
+        val = c0 + (c1 + c2 * focPos) * focPos
+        if self.model == ModelHyperbolic:
+            return numpy.sqrt(numpy.maximum(val, 0.0))
+        return val
+
+    def __repr__(self):
+        return "FocusFit(model=%s, bestFocPos=%s, bestFWHM=%s, focSigma=%s, numUsed=%s, numRejected=%s)" % \
+            (self.model, self.bestFocPos, self.bestFWHM, self.focSigma, self.numUsed, len(self.rejectedList))
+
+
+class FocusFitter(object):
+    """Accumulate FWHM vs. focus measurements and fit them
+
+    Inputs:
+    - model: the model to fit (one of ModelList)
+    - refFocPos: a focus position near the middle of the sweep (um)
+    - focScale: approximately half the focus range (um)
+    - doReject: reject outliers?
+
+    refFocPos and focScale are used to scale focus positions to roughly [-1, 1]
+    so the normal equations are well conditioned; they do not affect the result.
+    """
+    def __init__(self, model=ModelQuadratic, refFocPos=0.0, focScale=100.0, doReject=True):
+        if model not in ModelList:
+            raise RuntimeError("Unknown model %r; must be one of %s" % (model, ", ".join(ModelList)))
+        self.model = model
+        self.refFocPos = float(refFocPos)
+        self.focScale = float(focScale) or 1.0
+        self.doReject = bool(doReject)
+
+        self.focPosList = []
+        self.fwhmList = []
+        # rows of terms for the normal equations: u^0..u^4, v, v u, v u^2,
+        # where u is scaled focus position and v is FWHM (quadratic) or FWHM^2 (hyperbolic)
+        self._termList = []
+        self._sumArr = numpy.zeros(8, dtype=float)
+        self._fit = None
+        self._fitIsCurrent = True
+
+    def addMeas(self, focPos, fwhm):
+        """Add a measurement
+
+        Inputs:
+        - focPos: focus position (um)
+        - fwhm: measured FWHM (any units)
+        """
+        focPos = float(focPos)
+        fwhm = float(fwhm)
+        u = (focPos - self.refFocPos) / self.focScale
+        v = fwhm * fwhm if self.model == ModelHyperbolic else fwhm
+        terms = numpy.array((1.0, u, u**2, u**3, u**4, v, v * u, v * u**2))
+        self.focPosList.append(focPos)
+        self.fwhmList.append(fwhm)
+        self._termList.append(terms)
+        self._sumArr += terms
+        self._fitIsCurrent = False
+
+    def getFit(self):
+        """Return the current fit as a FocusFit, or None if fewer than 3 measurements or the fit fails
+
+        The fit is only recomputed if measurements have been added since the last call.
+        """
+        if not self._fitIsCurrent:
+            self._fit = self._computeFit()
+            self._fitIsCurrent = True
+        return self._fit
+
+    def getNumMeas(self):
+        """Return the number of measurements"""
+        return len(self.focPosList)
+
+    def isMinBracketed(self, minRiseFac=1.1):
+        """Return True if the minimum FWHM has been bracketed by measurements
+
+        The minimum is bracketed if the fit has a minimum within the range of focus positions used,
+        and the lowest and highest focus positions used both have FWHM
+        at least minRiseFac times the minimum measured FWHM.
+        """
+        fit = self.getFit()
+        if fit is None or not fit.isMin:
+            return False
+        rejectedSet = set(fit.rejectedList)
+        measList = sorted(meas for meas in zip(self.focPosList, self.fwhmList) if meas not in rejectedSet)
+        if len(measList) < 3:
+            return False
+        if not measList[0][0] < fit.bestFocPos < measList[-1][0]:
+            return False
+        minFWHM = min(meas[1] for meas in measList)
+        return min(measList[0][1], measList[-1][1]) >= minFWHM * minRiseFac
+
+    def _computeFit(self):
+        """Compute the fit, rejecting outliers if wanted"""
+        numMeas = len(self._termList)
+        if numMeas < 3:
+            return None
+        termArr = numpy.array(self._termList)
+        uArr = termArr[:, 1]
+        vArr = termArr[:, 5]
+        if self.model == ModelHyperbolic:
+            dFWHMdVArr = 0.5 / numpy.maximum(numpy.array(self.fwhmList), 1.0e-6)
+        else:
+            dFWHMdVArr = numpy.ones(numMeas, dtype=float)
+        isUsedArr = numpy.ones(numMeas, dtype=bool)
+        sumArr = self._sumArr.copy()
+        # Outliers are found using externally studentized residuals: for each point, fit the other points
+        # (removing a point from the running sums is cheap), then divide the point's residual from that fit
+        # by the standard deviation of the other points about that fit.
+        # Thus an outlier can neither drag the fit towards itself nor inflate the scatter it is compared to.
+        maxNumRejected = int(numMeas * MaxRejectFrac) if self.doReject else 0
+        while numMeas - isUsedArr.sum() < maxNumRejected and isUsedArr.sum() >= MinPointsToReject:
+            usedIndArr = numpy.flatnonzero(isUsedArr)
+            numUsed = len(usedIndArr)
+            looCoeffArr = self._solve(sumArr - termArr[usedIndArr])
+            if looCoeffArr is None:
+                break
+            # residMat[i, j] = residual of used point j from the fit without used point i
+            residMat = self._getResid(looCoeffArr[:, :, numpy.newaxis],
+                uArr[usedIndArr], vArr[usedIndArr], dFWHMdVArr[usedIndArr])
+            looResidArr = residMat.diagonal()
+            looSigmaArr = numpy.sqrt((numpy.sum(residMat**2, axis=1) - looResidArr**2) / (numUsed - 4))
+            studResidArr = numpy.abs(looResidArr) / numpy.maximum(looSigmaArr, 1.0e-10)
+            worstInd = numpy.argmax(studResidArr)
+            if studResidArr[worstInd] <= RejectSigma:
+                break
+            isUsedArr[usedIndArr[worstInd]] = False
+            sumArr -= termArr[usedIndArr[worstInd]]
+        numUsed = int(isUsedArr.sum())
+        coeffs = self._solve(sumArr)
+        if coeffs is None:
+            return None
+        residArr = self._getResid(coeffs, uArr, vArr, dFWHMdVArr)
+
+        # compute standard deviation of FWHM about the fit
+        if numUsed > 3:
+            fwhmSigma = math.sqrt(numpy.sum(residArr[isUsedArr]**2) / (numUsed - 3))
+        else:
+            fwhmSigma = None
+
+        # convert coefficients from scaled focus u = (foc - ref) / scale to focus
+        d0, d1, d2 = coeffs
+        ref = self.refFocPos
+        scale = self.focScale
+        focCoeffs = (
+            d0 - (d1 * ref / scale) + (d2 * ref * ref / (scale * scale)),
+            (d1 / scale) - (2.0 * d2 * ref / (scale * scale)),
+            d2 / (scale * scale),
+        )
+        rejectedList = [(self.focPosList[ind], self.fwhmList[ind]) for ind in numpy.flatnonzero(~isUsedArr)]
+        return FocusFit(
+            model = self.model,
+            coeffs = focCoeffs,
+            fwhmSigma = fwhmSigma,
+            numUsed = numUsed,
+            rejectedList = rejectedList,
+        )
+
+    def _getResid(self, coeffs, uArr, vArr, dFWHMdVArr):
+        """Return FWHM residuals given coefficients for scaled focus (one set, or one set per point)
+
+        Residuals are computed for v (FWHM or FWHM^2) and converted to FWHM using dFWHM/dv;
+        unlike computing the fit FWHM this works even if the fit FWHM^2 is negative.
+        """
+        coeffs = numpy.rollaxis(numpy.asarray(coeffs), -2 if numpy.ndim(coeffs) > 2 else -1)
+        return (vArr - (coeffs[0] + (coeffs[1] + coeffs[2] * uArr) * uArr)) * dFWHMdVArr
+
+    def _solve(self, sumArr):
+        """Solve the normal equations given the sums, or a 2-d array of sums (one row per fit);
+        return coefficients (one row per fit if sumArr is 2-d), or None if singular
+        """
+        s0, s1, s2, s3, s4, sv, svu, svu2 = numpy.asarray(sumArr).T
+        aMat = numpy.array(((s0, s1, s2), (s1, s2, s3), (s2, s3, s4)))
+        bVec = numpy.array((sv, svu, svu2))
+        if aMat.ndim > 2:
+            aMat = numpy.rollaxis(aMat, 2)
+            bVec = bVec.T
+        try:
+            return numpy.linalg.solve(aMat, bVec)
+        except numpy.linalg.LinAlgError:
+            return None
+
+
+if __name__ == "__main__":
+    # benchmark refitting after every measurement and compare robust and non-robust fits
+    # of a simulated seeing-limited focus sweep with one outlier
+    import random
+    import time
+
+    random.seed(1)
+    trueFocPos = 130.0
+    seeingFWHM = 3.0
+    defocusFac = 0.02 # FWHM per um of defocus
+    focPosArr = numpy.linspace(-200, 200, 9)
+    nTrials = 200
+
+    def simFWHM(focPos):
+        return math.hypot(seeingFWHM, defocusFac * (focPos - trueFocPos)) * random.gauss(1.0, 0.03)
+
+    for model in ModelList:
+        errList = []
+        polyErrList = []
+        fitTime = 0.0
+        polyTime = 0.0
+        for trial in range(nTrials):
+            fwhmList = [simFWHM(focPos) for focPos in focPosArr]
+            fwhmList[2] *= 2.0 # outlier
+            fitter = FocusFitter(model=model, refFocPos=0, focScale=200)
+            startTime = time.time()
+            for focPos, fwhm in zip(focPosArr, fwhmList):
+                fitter.addMeas(focPos, fwhm)
+                fit = fitter.getFit()
+            fitTime += time.time() - startTime
+            errList.append(fit.bestFocPos - trueFocPos)
+
+            startTime = time.time()
+            for numMeas in range(3, len(focPosArr) + 1):
+                coeffs = numpy.polyfit(focPosArr[0:numMeas], fwhmList[0:numMeas], 2)
+            polyTime += time.time() - startTime
+            polyErrList.append((-coeffs[1] / (2.0 * coeffs[0])) - trueFocPos)
+
+        def rms(valList):
+            return math.sqrt(sum(val**2 for val in valList) / len(valList))
+        print "%-10s robust fit: best focus rms error %5.1f um; refit after each of %d points: %0.0f usec/sweep" % \
+            (model, rms(errList), len(focPosArr), fitTime * 1.0e6 / nTrials)
+    print "%-10s numpy.polyfit: best focus rms error %5.1f um; refit after each point: %0.0f usec/sweep" % \
+        ("Quadratic", rms(polyErrList), polyTime * 1.0e6 / nTrials)
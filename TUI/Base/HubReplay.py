@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+"""Replay recorded hub replies through the keyword dispatcher, to benchmark keyword dispatch
+and the resulting model and widget updates without a live hub.
+
+Recorded replies may come from:
+- A text file (optionally gzipped) with one hub reply per line:
+    [timestamp] cmdr cmdID actor msgCode keyword1=value11, value12...; keyword2=...
+  The optional timestamp may be an ISO date and time (e.g. 2026-10-18T03:14:15.9265 or 2026-10-18 03:14:15)
+  or a time of day (e.g. 03:14:15.9265; times that go backwards are assumed to be the next day).
+  Lines that cannot be parsed (e.g. other output in a runtuiWithLog log) are skipped.
+- A log archive (see TUI.LogArchive); hub replies are logged with the full reply as the message.
+
+Replies are dispatched by a Tk timer using KeyDispatcher.doRead, so keyword callbacks run
+exactly as they do in normal use. Timing may be preserved, sped up, compressed
+(long gaps are shortened) or ignored (replies are dispatched as fast as possible,
+while still letting Tk process events between batches).
+
+Statistics (see ReplayStats) include throughput, dispatch time per actor
+(parsing plus all keyword variable callbacks) and Tk event loop lag,
+which is measured by a probe timer that records how late it fires.
+
+History:
+2026-10-18 ROwen
+"""
+__all__ = ["HubReplayer", "ReplayStats", "readReplayFile", "readLogArchive"]
+
+import datetime
+import gzip
+import re
+import time
+import RO.AddCallback
+from RO.TkUtil import Timer
+
+_BatchTime = 0.02 # dispatch at most this long before letting Tk process events (sec)
+_ProbeInterval = 0.1 # interval between event loop lag probes (sec)
+
+# optional timestamp at the start of a line: ISO date and time, or time of day
+_TimestampRE = re.compile(r"^\s*(?:(\d{4}-\d\d-\d\d)[T ])?(\d\d):(\d\d):(\d\d(?:\.\d*)?)Z?\s+")
+# a hub reply header: cmdr cmdID actor msgCode
+_HeaderRE = re.compile(r"^(\S+)\s+(-?\d+)\s+(\S+)\s+([a-zA-Z:>!])(?:\s|$)")
+
+def readReplayFile(path):
+    """Read hub replies from a text file (which may be gzipped)
+
+    Returns an iterator over (time, replyStr), where time is in seconds (the origin is arbitrary)
+    or None if the line has no timestamp, and replyStr is a hub reply.
+    Lines that are not hub replies are skipped.
+    """
+    if path.endswith(".gz"):
+        fileObj = gzip.open(path, "rb")
+    else:
+        fileObj = open(path, "rU")
+    try:
+        prevDaySec = None
+        dayOffset = 0.0
+        for line in fileObj:
+            timestamp = None
+            match = _TimestampRE.match(line)
+            if match:
+                dateStr, hourStr, minStr, secStr = match.groups()
+                daySec = (int(hourStr) * 60 + int(minStr)) * 60 + float(secStr)
+                if dateStr:
+                    dateObj = datetime.datetime.strptime(dateStr, "%Y-%m-%d").date()
+                    timestamp = dateObj.toordinal() * 86400.0 + daySec
+                else:
+                    if prevDaySec is not None and daySec < prevDaySec - 3600.0:
+                        # time of day went back by more than a hour; assume it is the next day
+                        dayOffset += 86400.0
+                    prevDaySec = daySec
+                    timestamp = dayOffset + daySec
+                line = line[match.end():]
+            replyStr = line.strip()
+            if not _HeaderRE.match(replyStr):
+                continue
+            yield (timestamp, replyStr)
+    finally:
+        fileObj.close()
+
+def readLogArchive(basePath, startTAI=None, endTAI=None):
+    """Read hub replies from a log archive (see TUI.LogArchive)
+
+    Inputs:
+    - basePath: path of archive files, without extension
+    - startTAI, endTAI: range of times to read (TAI, MJD seconds); None for no limit
+
+    Returns an iterator over (time, replyStr); see readReplayFile for details.
+    Messages that are not hub replies (e.g. messages generated by TUI) are skipped.
+    """
+    import TUI.LogArchive
+    archive = TUI.LogArchive.LogArchive(basePath)
+    try:
+        for logEntry in archive.query(startTAI=startTAI, endTAI=endTAI):
+            if _HeaderRE.match(logEntry.msgStr):
+                yield (logEntry.taiSec, logEntry.msgStr)
+    finally:
+        archive.close()
+
+
+class ActorStats(object):
+    """Dispatch statistics for one actor
+    """
+    def __init__(self, actor):
+        self.actor = actor
+        self.nReplies = 0
+        self.totTime = 0.0
+        self.maxTime = 0.0
+
+    def add(self, dispatchTime):
+        self.nReplies += 1
+        self.totTime += dispatchTime
+        if dispatchTime > self.maxTime:
+            self.maxTime = dispatchTime
+
+
+class ReplayStats(object):
+    """Statistics for a replay
+
+    Attributes:
+    - nReplies: number of replies dispatched
+    - recordedDuration: duration of the replayed replies, from their timestamps (sec),
+        or None if unknown
+    - wallTime: elapsed time of the replay (sec)
+    - dispatchTime: total time spent in KeyDispatcher.doRead (sec)
+    - actorStatsDict: dict of actor: ActorStats
+    - maxLag: maximum lag of the replay schedule (sec)
+    - probeLagList: list of event loop lags measured by the probe timer (sec)
+    """
+    def __init__(self):
+        self.nReplies = 0
+        self.recordedDuration = None
+        self.wallTime = 0.0
+        self.dispatchTime = 0.0
+        self.actorStatsDict = {}
+        self.maxLag = 0.0
+        self.probeLagList = []
+
+    def addReply(self, actor, dispatchTime):
+        """Record the dispatch of one reply"""
+        self.nReplies += 1
+        self.dispatchTime += dispatchTime
+        actorStats = self.actorStatsDict.get(actor)
+        if actorStats is None:
+            actorStats = ActorStats(actor)
+            self.actorStatsDict[actor] = actorStats
+        actorStats.add(dispatchTime)
+
+    def getReport(self):
+        """Return a multi-line report of the statistics"""
+        lineList = []
+        wallTime = max(self.wallTime, 1.0e-9)
+        lineList.append("%d replies in %0.2f sec = %0.0f replies/sec; dispatch used %0.0f%% of the time" % \
+            (self.nReplies, self.wallTime, self.nReplies / wallTime, 100.0 * self.dispatchTime / wallTime))
+        if self.recordedDuration:
+            lineList.append("recorded duration %0.1f sec; replay speed %0.1fx" % \
+                (self.recordedDuration, self.recordedDuration / wallTime))
+        if self.probeLagList:
+            sortedLags = sorted(self.probeLagList)
+            lineList.append("Tk event loop lag: mean %0.1f ms, 95%% %0.1f ms, max %0.1f ms (%d probes)" % (
+                1000.0 * sum(sortedLags) / len(sortedLags),
+                1000.0 * sortedLags[int(0.95 * (len(sortedLags) - 1))],
+                1000.0 * sortedLags[-1],
+                len(sortedLags),
+            ))
+        lineList.append("max replay schedule lag: %0.1f ms" % (1000.0 * self.maxLag,))
+        lineList.append("%-16s %8s %10s %10s %10s %7s" % ("actor", "replies", "total ms", "mean ms", "max ms", "% time"))
+        actorStatsList = sorted(self.actorStatsDict.itervalues(), key=lambda a: a.totTime, reverse=True)
+        for actorStats in actorStatsList:
+            lineList.append("%-16s %8d %10.1f %10.3f %10.2f %7.1f" % (
+                actorStats.actor,
+                actorStats.nReplies,
+                1000.0 * actorStats.totTime,
+                1000.0 * actorStats.totTime / actorStats.nReplies,
+                1000.0 * actorStats.maxTime,
+                100.0 * actorStats.totTime / wallTime,
+            ))
+        return "\n".join(lineList)
+
+
+class HubReplayer(RO.AddCallback.BaseMixin):
+    """Replay recorded hub replies through a keyword dispatcher
+
+    Inputs:
+    - dispatcher: keyword dispatcher (an RO.KeyDispatcher.KeyDispatcher)
+    - speed: replay speed: 1 to preserve the original timing, 2 for twice as fast, etc.;
+        0 (or None) to dispatch as fast as possible
+    - maxGap: maximum time between replies (sec, after applying speed); longer gaps are shortened;
+        None for no limit
+    - probeInterval: interval at which to measure Tk event loop lag (sec); 0 or None for no measurement
+    - callFunc: function to call when the replay finishes or is cancelled;
+        it receives one argument: this replayer
+
+    Replies without timestamps are dispatched as fast as possible.
+    """
+    def __init__(self,
+        dispatcher,
+        speed = 1.0,
+        maxGap = None,
+        probeInterval = _ProbeInterval,
+        callFunc = None,
+    ):
+        RO.AddCallback.BaseMixin.__init__(self)
+        self.dispatcher = dispatcher
+        self.speed = float(speed or 0)
+        self.maxGap = maxGap
+        self.probeInterval = probeInterval
+        self.stats = ReplayStats()
+        self.isRunning = False
+
+        self._replyIter = None
+        self._nextItem = None
+        self._startTime = None
+        self._firstRecTime = None
+        self._lastRecTime = None
+        self._schedOffset = 0.0 # accumulated time removed from the schedule by maxGap
+        self._prevRecTime = None
+        self._dispatchTimer = Timer()
+        self._probeTimer = Timer()
+        self._probeDueTime = None
+        if callFunc:
+            self.addCallback(callFunc, callNow=False)
+
+    def cancel(self):
+        """Stop the replay"""
+        if self.isRunning:
+            self._finish()
+
+    def start(self, replyIter):
+        """Start replaying
+
+        Inputs:
+        - replyIter: an iterable of (time, replyStr), e.g. as returned by readReplayFile
+        """
+        if self.isRunning:
+            raise RuntimeError("Replay already running")
+        self.isRunning = True
+        self.stats = ReplayStats()
+        self._replyIter = iter(replyIter)
+        self._nextItem = None
+        self._firstRecTime = None
+        self._lastRecTime = None
+        self._schedOffset = 0.0
+        self._prevRecTime = None
+        self._startTime = time.time()
+        if self.probeInterval:
+            self._startProbe()
+        self._dispatchTimer.start(0, self._dispatchBatch)
+
+    def _dispatchBatch(self):
+        """Dispatch all replies that are due, for at most _BatchTime, then reschedule
+        """
+        batchEndTime = time.time() + _BatchTime
+        while True:
+            if self._nextItem is None:
+                try:
+                    self._nextItem = next(self._replyIter)
+                except StopIteration:
+                    self._finish()
+                    return
+            recTime, replyStr = self._nextItem
+
+            schedTime = self._getSchedTime(recTime)
+            now = time.time()
+            if schedTime is not None:
+                if schedTime > now:
+                    self._dispatchTimer.start(schedTime - now, self._dispatchBatch)
+                    return
+                self.stats.maxLag = max(self.stats.maxLag, now - schedTime)
+            if now > batchEndTime:
+                # let Tk process events
+                self._dispatchTimer.start(0, self._dispatchBatch)
+                return
+
+            self._nextItem = None
+            headerMatch = _HeaderRE.match(replyStr)
+            actor = headerMatch.group(3) if headerMatch else "?"
+            startTime = time.time()
+            self.dispatcher.doRead(None, replyStr)
+            self.stats.addReply(actor, time.time() - startTime)
+
+    def _finish(self):
+        """Finish the replay (normally or by cancellation)
+        """
+        self._dispatchTimer.cancel()
+        self._probeTimer.cancel()
+        self.isRunning = False
+        self.stats.wallTime = time.time() - self._startTime
+        if self._firstRecTime is not None:
+            self.stats.recordedDuration = self._lastRecTime - self._firstRecTime
+        self._replyIter = None
+        self._doCallbacks()
+
+    def _getSchedTime(self, recTime):
+        """Return the time (as time.time()) at which to dispatch a reply with the given recorded time,
+        or None to dispatch it now
+        """
+        if recTime is None:
+            return None
+        if self._firstRecTime is None:
+            self._firstRecTime = recTime
+            self._prevRecTime = recTime
+        if recTime != self._prevRecTime:
+            # apply maxGap once per reply (using the previous reply's time)
+            if self.maxGap is not None and self.speed > 0:
+                gap = (recTime - self._prevRecTime) / self.speed
+                if gap > self.maxGap:
+                    self._schedOffset += gap - self.maxGap
+            self._prevRecTime = recTime
+        self._lastRecTime = recTime
+        if self.speed <= 0:
+            return None
+        return self._startTime + ((recTime - self._firstRecTime) / self.speed) - self._schedOffset
+
+    def _probe(self):
+        """Measure how late the probe timer fired, then restart it
+        """
+        self.stats.probeLagList.append(max(0.0, time.time() - self._probeDueTime))
+        self._startProbe()
+
+    def _startProbe(self):
+        self._probeDueTime = time.time() + self.probeInterval
+        self._probeTimer.start(self.probeInterval, self._probe)
+
+
+if __name__ == "__main__":
+    # Replay a recorded file with all standard TUI windows loaded, then print statistics.
+    # Usage: python HubReplay.py replayFile [speed [maxGap]]
+    # speed = 0 dispatches as fast as possible (the default)
+    import sys
+    import TUI.TUIModel
+    import TUI.LoadStdModules
+
+    if len(sys.argv) < 2:
+        print "Usage: python HubReplay.py replayFile [speed [maxGap]]"
+        sys.exit(1)
+    replayPath = sys.argv[1]
+    speed = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    maxGap = float(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    tuiModel = TUI.TUIModel.getModel(True)
+    TUI.LoadStdModules.loadAll()
+
+    def replayDone(replayer):
+        print replayer.stats.getReport()
+        tuiModel.tkRoot.quit()
+
+    replayer = HubReplayer(
+        dispatcher = tuiModel.dispatcher,
+        speed = speed,
+        maxGap = maxGap,
+        callFunc = replayDone,
+    )
+    replayer.start(readReplayFile(replayPath))
+    tuiModel.tkRoot.mainloop()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""A size-bounded least-recently-used cache of decoded images.
+
+Used by the guide windows so that browsing the image history and toggling "Current"
+do not re-read and re-decode FITS files from disk. Items are evicted (least recently used
+first) when the total size exceeds the byte budget, which is set by the
+"Guide Image Cache" preference; items are also removed when their image expires.
+
+Cached items may be any object with an nBytes attribute (e.g. TUI.Guide.ImageDecoder.DecodedImage).
+An item's size is measured again each time it is retrieved, since an item may compute
+its data lazily (e.g. a memory-mapped image whose scaled data is computed when first displayed).
+
+History:
+2026-10-18 ROwen
+2026-10-18 ROwen    Re-measure item size on retrieval.
+2026-10-18 ROwen    Call callbacks on every lookup, so the displayed hit rate stays current.
+"""
+__all__ = ["ImageCache", "getImageCache"]
+
+import collections
+import RO.AddCallback
+import TUI.TUIModel
+
+_DefMaxMB = 256
+_BytesPerMB = float(1024 * 1024)
+
+class ImageCache(RO.AddCallback.BaseMixin):
+    """Least-recently-used cache of decoded images with a byte budget
+
+    Callback functions receive one argument: this cache.
+    They are called when items are added or removed and on every lookup
+    (so displayed statistics, such as the hit rate, stay current).
+    """
+    def __init__(self, maxBytes=_DefMaxMB * _BytesPerMB, callFunc=None):
+        RO.AddCallback.BaseMixin.__init__(self)
+        self.maxBytes = int(maxBytes)
+        self._itemDict = collections.OrderedDict() # key: (item, nBytes); most recently used last
+        self.nBytes = 0
+        self.nHits = 0
+        self.nMisses = 0
+        self.nEvicted = 0
+        if callFunc:
+            self.addCallback(callFunc, callNow=False)
+
+    def clear(self):
+        """Remove all items (statistics are retained)"""
+        self._itemDict.clear()
+        self.nBytes = 0
+        self._doCallbacks()
+
+    def get(self, key):
+        """Return the item for the given key, or None if not cached; counts as a use of the item
+        """
+        entry = self._itemDict.pop(key, None)
+        if entry is None:
+            self.nMisses += 1
+            self._doCallbacks()
+            return None
+        self.nHits += 1
+        item, nBytes = entry
+        newNBytes = item.nBytes
+        if newNBytes != nBytes:
+            # the item's size changed (e.g. lazily computed data); update the total
+            self.nBytes += newNBytes - nBytes
+            entry = (item, newNBytes)
+        self._itemDict[key] = entry
+        if newNBytes != nBytes:
+            self._evict()
+        self._doCallbacks()
+        return item
+
+    def getHitRate(self):
+        """Return the fraction of lookups that were hits, or None if no lookups yet"""
+        nLookups = self.nHits + self.nMisses
+        if nLookups == 0:
+            return None
+        return self.nHits / float(nLookups)
+
+    def getStatsStr(self):
+        """Return a brief summary of cache use"""
+        hitRate = self.getHitRate()
+        hitRateStr = "?" if hitRate is None else "%0.0f%%" % (hitRate * 100.0,)
+        return "image cache: %d images, %0.0f of %0.0f MB, %s hits" % \
+            (len(self._itemDict), self.nBytes / _BytesPerMB, self.maxBytes / _BytesPerMB, hitRateStr)
+
+    def put(self, key, item):
+        """Add or replace an item
+
+        If the item is larger than the byte budget then it is not cached.
+        """
+        self._remove(key)
+        nBytes = item.nBytes
+        if nBytes <= self.maxBytes:
+            self._itemDict[key] = (item, nBytes)
+            self.nBytes += nBytes
+            self._evict()
+        self._doCallbacks()
+
+    def remove(self, key):
+        """Remove an item, if present"""
+        if self._remove(key):
+            self._doCallbacks()
+
+    def setMaxBytes(self, maxBytes):
+        """Set the byte budget, evicting items as necessary"""
+        self.maxBytes = int(maxBytes)
+        self._evict()
+        self._doCallbacks()
+
+    def _evict(self):
+        """Evict least recently used items until within the byte budget"""
+        while self.nBytes > self.maxBytes and self._itemDict:
+            key, (item, nBytes) = self._itemDict.popitem(last=False)
+            self.nBytes -= nBytes
+            self.nEvicted += 1
+
+    def _remove(self, key):
+        """Remove an item without calling callbacks; return True if the item was present"""
+        entry = self._itemDict.pop(key, None)
+        if entry is None:
+            return False
+        self.nBytes -= entry[1]
+        return True
+
+    def _setMaxMBFromPref(self, maxMB, prefVar=None):
+        """Set the byte budget from the "Guide Image Cache" preference (MB)"""
+        if maxMB is None:
+            return
+        self.setMaxBytes(maxMB * _BytesPerMB)
+
+    def __contains__(self, key):
+        return key in self._itemDict
+
+    def __len__(self):
+        return len(self._itemDict)
+
+
+_theCache = None
+
+def getImageCache():
+    """Return the shared ImageCache, creating it if necessary
+
+    The byte budget tracks the "Guide Image Cache" preference (if the preference exists).
+    """
+    global _theCache
+    if _theCache is None:
+        _theCache = ImageCache()
+        prefVar = TUI.TUIModel.getModel().prefs.getPrefVar("Guide Image Cache")
+        if prefVar:
+            prefVar.addCallback(_theCache._setMaxMBFromPref, callNow=True)
+    return _theCache
@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+"""A cache of the script directory tree and of compiled scripts.
+
+Script directories (especially shared TUIAdditions directories on NFS) can be slow to scan,
+so the contents of each directory are cached along with the directory's modification time,
+and a directory is only rescanned if its modification time changes.
+A worker thread periodically rescans the script directories and precompiles new or changed scripts,
+so neither posting the Scripts menu nor opening a script window needs to touch the file system
+(except the first time). The worker thread never touches Tk.
+
+History:
+2026-10-18 ROwen
+"""
+__all__ = ["findScriptDirs", "DirInfo", "ScriptCache", "getScriptCache"]
+
+import os
+import sys
+import threading
+import time
+import traceback
+import RO.OS
+import TUI.TUIPaths
+
+# interval between background rescans of the script directories (sec)
+_RescanInterval = 30.0
+
+# resolution of directory modification times (sec); a directory modified less than this long
+# before it was scanned is rescanned next time, since it may have changed again in the same tick
+_MTimeResolution = 2.0
+
+def findScriptDirs():
+    """Return script directories (checking the file system)
+
+    Return order is:
+    - built-in
+    - local TUIAdditions/Scripts
+    - shared TUIAdditions/Scripts
+    """
+    # look for TUIAddition script dirs
+    addPathList = TUI.TUIPaths.getAddPaths()
+    addScriptDirs = [os.path.join(path, "Scripts") for path in addPathList]
+    addScriptDirs = [path for path in addScriptDirs if os.path.isdir(path)]
+
+    # prepend the standard script dir and remove duplicates
+    stdScriptDir = TUI.TUIPaths.getResourceDir("Scripts")
+    scriptDirs = [stdScriptDir] + addScriptDirs
+    scriptDirs = RO.OS.removeDupPaths(scriptDirs)
+    return scriptDirs
+
+
+class DirInfo(object):
+    """Contents of one script directory
+
+    Attributes:
+    - path: path of directory
+    - mtime: modification time of directory when scanned
+    - scanTime: time at which the directory was scanned
+    - scriptDict: dict of script name (file name without .py): full path of script file
+    - subDirDict: dict of subdirectory name: full path of subdirectory
+    """
+    def __init__(self, path):
+        self.path = path
+        self.scanTime = time.time()
+        self.scriptDict = {}
+        self.subDirDict = {}
+        try:
+            self.mtime = os.stat(path).st_mtime
+            baseNameList = os.listdir(path)
+        except OSError:
+            self.mtime = None
+            return
+
+        for baseName in baseNameList:
+            # reject files that would be invisible on unix
+            if baseName.startswith("."):
+                continue
+
+            baseBody, baseExt = os.path.splitext(baseName)
+            fullPath = os.path.normpath(os.path.join(path, baseName))
+            if baseExt.lower() == ".py":
+                if os.path.isfile(fullPath):
+                    self.scriptDict[baseBody] = fullPath
+            elif os.path.isdir(fullPath):
+                self.subDirDict[baseName] = fullPath
+
+    def isCurrent(self):
+        """Return True if the directory has not been modified since it was scanned
+        """
+        if self.mtime is None or self.scanTime - self.mtime < _MTimeResolution:
+            return False
+        try:
+            return os.stat(self.path).st_mtime == self.mtime
+        except OSError:
+            return False
+
+
+class ScriptCache(object):
+    """A cache of the script directory tree and of compiled scripts
+
+    Usually there is only one: the one returned by getScriptCache.
+
+    Inputs:
+    - findDirsFunc: function that returns a list of script directories
+
+    Attributes:
+    - changeCount: incremented whenever the cached directory tree changes
+    """
+    def __init__(self, findDirsFunc=findScriptDirs):
+        self._findDirsFunc = findDirsFunc
+        self._lock = threading.Lock()
+        self._scriptDirs = None
+        self._dirInfoDict = {}  # dict of directory path: DirInfo
+        self._codeDict = {}     # dict of script path: (mtime, size, code object)
+        self.changeCount = 0
+        self._refreshEvent = threading.Event()
+        self._worker = threading.Thread(target=self._workerLoop, name="ScriptCache")
+        self._worker.daemon = True
+        self._worker.start()
+
+    def getScriptDirs(self):
+        """Return the script directories (see findScriptDirs), from the cache if possible
+        """
+        scriptDirs = self._scriptDirs
+        if scriptDirs is None:
+            scriptDirs = self._findDirsFunc()
+            self._scriptDirs = scriptDirs
+        return scriptDirs[:]
+
+    def getDirInfo(self, path):
+        """Return the DirInfo for a directory, from the cache if possible
+
+        The directory is scanned now if it is not cached, else it is up to date
+        as of the most recent background rescan.
+        """
+        with self._lock:
+            dirInfo = self._dirInfoDict.get(path)
+        if dirInfo is None:
+            dirInfo = DirInfo(path)
+            with self._lock:
+                self._dirInfoDict[path] = dirInfo
+        return dirInfo
+
+    def findScript(self, scriptDir, subPathList):
+        """Return the full path to a script, or None if not found
+
+        Inputs:
+        - scriptDir: script directory
+        - subPathList: list of subdirectories followed by the script name (without .py)
+        """
+        dirInfo = self.getDirInfo(scriptDir)
+        for subDir in subPathList[:-1]:
+            subDirPath = dirInfo.subDirDict.get(subDir)
+            if subDirPath is None:
+                return None
+            dirInfo = self.getDirInfo(subDirPath)
+        return dirInfo.scriptDict.get(subPathList[-1])
+
+    def getCode(self, path):
+        """Return the compiled code object for a script file
+
+        The file is only read and compiled if it is not cached or has changed.
+        Raise an exception if the file cannot be read or compiled.
+        """
+        fileStat = os.stat(path)
+        with self._lock:
+            cachedInfo = self._codeDict.get(path)
+        if cachedInfo is not None and cachedInfo[0:2] == (fileStat.st_mtime, fileStat.st_size):
+            return cachedInfo[2]
+
+        with open(path, "rU") as scriptFile:
+            source = scriptFile.read()
+        code = compile(source, path, "exec")
+        with self._lock:
+            self._codeDict[path] = (fileStat.st_mtime, fileStat.st_size, code)
+        return code
+
+    def requestRefresh(self):
+        """Ask the worker thread to rescan the script directories now
+        """
+        self._refreshEvent.set()
+
+    def refresh(self):
+        """Rescan the script directories and precompile new or changed scripts
+
+        Only directories whose modification time has changed are rescanned.
+        Called by the worker thread, but may be called from any thread.
+        """
+        scriptDirs = self._findDirsFunc()
+        self._scriptDirs = scriptDirs
+
+        with self._lock:
+            oldDirInfoDict = self._dirInfoDict.copy()
+        newDirInfoDict = {}
+        scriptPathList = []
+        dirPathList = list(scriptDirs)
+        while dirPathList:
+            dirPath = dirPathList.pop()
+            if dirPath in newDirInfoDict:
+                continue
+            dirInfo = oldDirInfoDict.get(dirPath)
+            if dirInfo is None or not dirInfo.isCurrent():
+                dirInfo = DirInfo(dirPath)
+            newDirInfoDict[dirPath] = dirInfo
+            scriptPathList += dirInfo.scriptDict.values()
+            dirPathList += dirInfo.subDirDict.values()
+
+        with self._lock:
+            if newDirInfoDict != self._dirInfoDict:
+                self._dirInfoDict = newDirInfoDict
+                self.changeCount += 1
+
+        for scriptPath in scriptPathList:
+            try:
+                self.getCode(scriptPath)
+            except Exception:
+                # report the error when the script is opened
+                pass
+
+    def _workerLoop(self):
+        """Periodically rescan the script directories; runs in the worker thread"""
+        while True:
+            self._refreshEvent.wait(_RescanInterval)
+            self._refreshEvent.clear()
+            try:
+                self.refresh()
+            except Exception:
+                sys.stderr.write("Could not refresh the script cache:\n")
+                traceback.print_exc(file=sys.stderr)
+
+
+_theScriptCache = None
+
+def getScriptCache():
+    """Return the shared ScriptCache, creating it if necessary"""
+    global _theScriptCache
+    if _theScriptCache is None:
+        _theScriptCache = ScriptCache()
+    return _theScriptCache
+
+
+if __name__ == "__main__":
+    # benchmark scanning a tree of scripts and compiling a script, with and without the cache
+    import shutil
+    import tempfile
+
+    nDirs = 20
+    nScriptsPerDir = 20
+    rootDir = tempfile.mkdtemp()
+    try:
+        scriptBody = "".join("def func%d(sr):\n    yield sr.waitMS(%d)\n" % (i, i) for i in range(100))
+        for dirInd in range(nDirs):
+            dirPath = os.path.join(rootDir, "Dir%d" % (dirInd,))
+            os.mkdir(dirPath)
+            for scriptInd in range(nScriptsPerDir):
+                with open(os.path.join(dirPath, "Script%d.py" % (scriptInd,)), "w") as scriptFile:
+                    scriptFile.write(scriptBody)
+        # make the directories old enough to be trusted
+        oldTime = time.time() - 10
+        for dirPath in [rootDir] + [os.path.join(rootDir, "Dir%d" % (dirInd,)) for dirInd in range(nDirs)]:
+            os.utime(dirPath, (oldTime, oldTime))
+
+        scriptCache = ScriptCache(findDirsFunc=lambda: [rootDir])
+
+        startTime = time.time()
+        scriptCache.refresh()
+        firstTime = time.time() - startTime
+
+        startTime = time.time()
+        scriptCache.refresh()
+        secondTime = time.time() - startTime
+
+        startTime = time.time()
+        for dirInd in range(nDirs):
+            DirInfo(os.path.join(rootDir, "Dir%d" % (dirInd,)))
+        uncachedScanTime = time.time() - startTime
+
+        scriptPath = os.path.join(rootDir, "Dir0", "Script0.py")
+        nOpen = 100
+        startTime = time.time()
+        for i in range(nOpen):
+            scriptCache.getCode(scriptPath)
+        cachedCodeTime = (time.time() - startTime) / nOpen
+        startTime = time.time()
+        for i in range(nOpen):
+            with open(scriptPath, "rU") as scriptFile:
+                compile(scriptFile.read(), scriptPath, "exec")
+        compileTime = (time.time() - startTime) / nOpen
+
+        print "%d directories with %d scripts each:" % (nDirs, nScriptsPerDir)
+        print "first refresh (scan and compile) %0.3f sec; later refresh %0.4f sec" % (firstTime, secondTime)
+        print "rescan all directories without the cache %0.4f sec" % (uncachedScanTime,)
+        print "get code for a script: cached %0.1f usec; read and compile %0.1f usec" % \
+            (cachedCodeTime * 1.0e6, compileTime * 1.0e6)
+    finally:
+        shutil.rmtree(rootDir)
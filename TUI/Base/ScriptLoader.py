@@ -4,17 +4,17 @@
 History:
 2014-02-12 ROwen    Extracted from TUI.ScriptMenu and renamed from _LoadScript
 2015-11-05 ROwen    Ditched obsolete "except (SystemExit, KeyboardInterrupt): raise" code
+2026-10-18 ROwen    Modified to use TUI.Base.ScriptCache to find scripts and to get compiled script code.
+                    Added CachedScriptFileWdg.
 """
-import os
 import tkMessageBox
 import RO.Constants
-import RO.OS
 import RO.Wdg
 from RO.StringUtil import strFromException
-import TUI.TUIPaths
+from TUI.Base.ScriptCache import getScriptCache
 import TUI.TUIModel
 
-__all__ = ("getScriptDirs", "ScriptLoader", "reopenScriptWindows", "ScriptWindowNamePrefix")
+__all__ = ("getScriptDirs", "ScriptLoader", "CachedScriptFileWdg", "reopenScriptWindows", "ScriptWindowNamePrefix")
 
 ScriptWindowNamePrefix = "ScriptNone"
 
@@ -26,16 +26,41 @@ def getScriptDirs():
     - local TUIAdditions/Scripts
     - shared TUIAdditions/Scripts
     """
-    # look for TUIAddition script dirs
-    addPathList = TUI.TUIPaths.getAddPaths()
-    addScriptDirs = [os.path.join(path, "Scripts") for path in addPathList]
-    addScriptDirs = [path for path in addScriptDirs if os.path.isdir(path)]
+    return getScriptCache().getScriptDirs()
 
-    # prepend the standard script dir and remove duplicates
-    stdScriptDir = TUI.TUIPaths.getResourceDir("Scripts")
-    scriptDirs = [stdScriptDir] + addScriptDirs
-    scriptDirs = RO.OS.removeDupPaths(scriptDirs)
-    return scriptDirs
+
+class CachedScriptFileWdg(RO.Wdg.ScriptFileWdg):
+    """A ScriptFileWdg that gets its compiled script code from TUI.Base.ScriptCache,
+    so the script file is only read and compiled if it has changed.
+
+    Inputs are the same as RO.Wdg.ScriptFileWdg.
+    """
+    def _getScriptFuncs(self, isFirst=None):
+        """Return a dictionary containing either scriptClass
+        or one or more of initFunc, runFunc, endFunc;
+        it may also contain HelpURL.
+        """
+        scriptLocals = {"__file__": self.fullPath}
+        exec getScriptCache().getCode(self.fullPath) in scriptLocals
+
+        retDict = {}
+        helpURL = scriptLocals.get("HelpURL")
+        if helpURL:
+            retDict["HelpURL"] = helpURL
+
+        scriptClass = scriptLocals.get("ScriptClass")
+        if scriptClass:
+            retDict["scriptClass"] = scriptClass
+            return retDict
+
+        for attrName in ("run", "init", "end"):
+            attr = scriptLocals.get(attrName)
+            if attr:
+                retDict["%sFunc" % attrName] = attr
+            elif attrName == "run":
+                raise RuntimeError("%r has no %s function" % (self.filename, attrName))
+
+        return retDict
 
 
 class ScriptLoader:
@@ -82,7 +107,7 @@ class ScriptLoader:
 
     def makeWdg(self, master):
 #       print "ScriptLoader.makeWdg(%r); tlName=%s" % (master, tlName,)
-        return RO.Wdg.ScriptFileWdg(
+        return CachedScriptFileWdg(
             master=master,
             filename = self.fullPath,
             dispatcher = self.tuiModel.dispatcher,
@@ -91,7 +116,8 @@ class ScriptLoader:
 def reopenScriptWindows():
     """Reopen script windows that were open before
     """
-    scriptDirs = getScriptDirs()
+    scriptCache = getScriptCache()
+    scriptDirs = scriptCache.getScriptDirs()
     tuiModel = TUI.TUIModel.getModel()
     tlSet = tuiModel.tlSet
     scriptNames = tlSet.getNamesInGeomFile(prefix=ScriptWindowNamePrefix)
@@ -99,13 +125,8 @@ def reopenScriptWindows():
         if tlSet.getDesVisible(name):
             # name format is <ScriptWindowNamePrefix>.<colon-separated-subPath>
             subPathList = name.split(".")[1].split(":")
-            subPath = os.path.join(*subPathList) + ".py"
             for scriptDir in scriptDirs:
-                fullPath = os.path.join(scriptDir, subPath)
-                if os.path.isfile(fullPath):
+                fullPath = scriptCache.findScript(scriptDir, subPathList)
+                if fullPath:
                     ScriptLoader(subPathList=subPathList, fullPath=fullPath, showErrDialog=False)()
-                    continue
-
-
-
-
+                    break
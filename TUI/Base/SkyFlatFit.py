@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+"""Measure the sky level of twilight flats and predict exposure times.
+
+Used by BaseSkyFlatScript to choose the exposure time of each sky flat from the counts actually
+achieved by the previous flats, rather than from a fixed formula.
+
+The twilight sky brightness is modelled as an exponential in time:
+    rate(t) = exp(a - k t)  (counts/sec)
+where k > 0 in the evening (darkening sky) and k < 0 in the morning (brightening sky).
+An exposure of duration E that starts at time ts then collects:
+    counts = rate(ts) (1 - exp(-k E)) / k
+Taking logs, log(counts/E) = a - k ts + log(g(k E)) where g(x) = (1 - exp(-x)) / x,
+so a and k are fit by linear least squares of log(counts/E) - log(g(k E)) vs. ts,
+iterating a few times to refine the correction term g. Only the most recent measurements are used,
+since the decay rate changes during twilight. Until there are enough measurements
+to fit k, a default decay rate is assumed.
+
+Any consistent convention for the start time of an exposure is fine
+(e.g. the time the exposure command was sent) since a constant offset is absorbed by the fit.
+
+This module does not use Tk.
+
+History:
+2026-10-18 ROwen
+2026-10-18 ROwen    readSkyLevel can measure the bias level from the BIASSEC region.
+"""
+__all__ = ["readSkyLevel", "SkyFlatFitter"]
+
+import math
+import numpy
+try:
+    import astropy.io.fits as pyfits
+except ImportError:
+    import pyfits
+
+# default sky brightness decay time (sec); this is the value used by the original SPIcam sky flat script
+DefDecayTime = 288.0
+
+# maximum number of measurements used for a fit
+MaxFitPoints = 6
+
+# number of iterations of the fit (to refine the correction for the change in brightness during an exposure)
+NumFitIter = 3
+
+# the fit decay rate is restricted to this range of multiples of the default decay rate;
+# this protects against bad fits due to noise or clouds
+MinDecayRateMult = 0.2
+MaxDecayRateMult = 5.0
+
+# when the sky level is measured, a border of this fraction of the image size is ignored
+# (to avoid overscan and vignetting)
+BorderFrac = 0.05
+
+def readSkyLevel(filePath, biasLevel=0.0, maxSamples=65536):
+    """Return the sky level of a flat field image: the median of a subsampled grid of pixels, minus the bias
+
+    Inputs:
+    - filePath: path to FITS file; the first HDU with 2 or more dimensions of data is used
+    - biasLevel: bias level to subtract (ADU), or None to subtract the median of the bias section
+        (the region given by the BIASSEC header card, e.g. the overscan)
+    - maxSamples: maximum number of pixels to use for the median
+
+    Raises RuntimeError if the file has no image data, or if biasLevel is None
+    and the image has no valid BIASSEC header card.
+    """
+    fitsFile = pyfits.open(filePath)
+    try:
+        for hdu in fitsFile:
+            data = hdu.data
+            if data is not None and data.ndim >= 2:
+                break
+        else:
+            raise RuntimeError("No image data in %s" % (filePath,))
+        # use the first plane of a cube
+        while data.ndim > 2:
+            data = data[0]
+        numY, numX = data.shape
+        begY = int(numY * BorderFrac)
+        begX = int(numX * BorderFrac)
+        step = max(1, int(math.ceil(math.sqrt((numY - 2 * begY) * (numX - 2 * begX) / float(maxSamples)))))
+        sampleArr = numpy.array(data[begY:numY-begY:step, begX:numX-begX:step], dtype=float)
+        if biasLevel is None:
+            biasSec = hdu.header.get("BIASSEC") or fitsFile[0].header.get("BIASSEC")
+            if not biasSec:
+                raise RuntimeError("No BIASSEC header card in %s" % (filePath,))
+            xSlice, ySlice = _parseSection(biasSec)
+            biasArr = data[ySlice, xSlice]
+            if biasArr.size == 0:
+                raise RuntimeError("BIASSEC %r is outside the image in %s" % (biasSec, filePath))
+            biasLevel = float(numpy.median(biasArr))
+    finally:
+        fitsFile.close()
+    return float(numpy.median(sampleArr)) - biasLevel
+
+def _parseSection(secStr):
+    """Parse a FITS section string such as "[2051:2078,1:2048]"
+
+    Returns (x slice, y slice) for indexing a numpy array as arr[y slice, x slice].
+    The section uses 1-based inclusive pixel numbers.
+
+    Raises RuntimeError if the string cannot be parsed.
+    """
+    try:
+        xStr, yStr = secStr.strip().strip("[]").split(",")
+        (begX, endX), (begY, endY) = [[int(val) for val in rangeStr.split(":")] for rangeStr in (xStr, yStr)]
+    except Exception:
+        raise RuntimeError("Cannot parse section %r" % (secStr,))
+    return slice(min(begX, endX) - 1, max(begX, endX)), slice(min(begY, endY) - 1, max(begY, endY))
+
+
+class SkyFlatFitter(object):
+    """Fit the sky brightness vs. time from sky flat measurements and predict exposure times
+
+    Inputs:
+    - isMorning: True for morning flats (brightening sky), False for evening flats (darkening sky)
+    - decayTime: default sky brightness decay time (sec), used until there are enough measurements
+    - saturationLevel: counts at or above which an image is saturated (ADU above bias);
+        saturated measurements are not used for the fit
+    """
+    def __init__(self, isMorning, decayTime=DefDecayTime, saturationLevel=None):
+        self.isMorning = bool(isMorning)
+        self.defDecayRate = 1.0 / decayTime
+        if self.isMorning:
+            self.defDecayRate = -self.defDecayRate
+        self.saturationLevel = saturationLevel
+        self.clear()
+
+    def clear(self):
+        """Clear all measurements"""
+        # list of (start time, exposure time, counts) of unsaturated measurements
+        self._measList = []
+        # (start time, exposure time) of the last measurement, if it was saturated, else None
+        self._satMeas = None
+        self._refTime = 0.0
+        self.logRate0 = None
+        self.decayRate = self.defDecayRate
+
+    def addMeas(self, startTime, expTime, counts):
+        """Add a measurement and update the fit
+
+        Inputs:
+        - startTime: time at which the exposure started (sec); see module doc string
+        - expTime: exposure time (sec)
+        - counts: sky level (ADU above bias), e.g. as returned by readSkyLevel
+        """
+        if self.saturationLevel is not None and counts >= self.saturationLevel:
+            self._satMeas = (startTime, expTime)
+            return
+        self._satMeas = None
+        if counts <= 0 or expTime <= 0:
+            # useless measurement; ignore it
+            return
+        self._measList.append((startTime, expTime, counts))
+        self._fit()
+
+    @property
+    def numMeas(self):
+        """Number of measurements used for the fit"""
+        return min(len(self._measList), MaxFitPoints)
+
+    def getRate(self, startTime):
+        """Return the predicted sky rate (ADU/sec) at the specified time, or None if unknown"""
+        if self.logRate0 is None:
+            return None
+        return math.exp(self.logRate0 - self.decayRate * (startTime - self._refTime))
+
+    def getCounts(self, startTime, expTime):
+        """Return the predicted counts (ADU above bias) for an exposure, or None if unknown"""
+        rate = self.getRate(startTime)
+        if rate is None:
+            return None
+        return rate * expTime * _gain(self.decayRate * expTime)
+
+    def predictExpTime(self, startTime, desCounts, minExpTime, maxExpTime):
+        """Return the exposure time that will collect the desired counts, or None if unknown
+
+        The result is limited to the range [minExpTime, maxExpTime]; if the sky is too faint
+        to reach desCounts then maxExpTime is returned.
+
+        Inputs:
+        - startTime: time at which the exposure will start (sec)
+        - desCounts: desired counts (ADU above bias)
+        - minExpTime, maxExpTime: minimum and maximum exposure time (sec)
+        """
+        rate = self.getRate(startTime)
+        if rate is None:
+            if self._satMeas is None:
+                return None
+            # the only information is a saturated image; try a much shorter exposure
+            expTime = self._satMeas[1] * desCounts / (2.0 * self.saturationLevel)
+            return max(minExpTime, min(maxExpTime, expTime))
+
+        k = self.decayRate
+        if abs(k * maxExpTime) < 1.0e-6:
+            expTime = desCounts / rate
+        else:
+            temp = 1.0 - (desCounts * k / rate)
+            if temp <= 0:
+                return maxExpTime
+            expTime = -math.log(temp) / k
+        if self._satMeas is not None:
+            # the sky is brighter than predicted; make sure the next exposure is shorter than the saturated one
+            expTime = min(expTime, self._satMeas[1] * desCounts / (2.0 * self.saturationLevel))
+        return max(minExpTime, min(maxExpTime, expTime))
+
+    def _fit(self):
+        """Fit the most recent measurements"""
+        measArr = numpy.array(self._measList[-MaxFitPoints:], dtype=float)
+        startTimeArr, expTimeArr, countsArr = measArr.transpose()
+        # measure times relative to the most recent exposure, to keep the fit well conditioned
+        self._refTime = startTimeArr[-1]
+        tArr = startTimeArr - self._refTime
+        logRateArr = numpy.log(countsArr / expTimeArr)
+        canFitRate = len(tArr) > 1 and numpy.ptp(tArr) > 0
+
+        k = self.decayRate
+        for i in range(NumFitIter):
+            yArr = logRateArr - numpy.log(_gain(k * expTimeArr))
+            if canFitRate:
+                slope, intercept = numpy.polyfit(tArr, yArr, 1)
+                k = _limitDecayRate(-slope, self.defDecayRate)
+                # refit the intercept using the limited decay rate
+                self.logRate0 = float(numpy.mean(yArr + k * tArr))
+            else:
+                k = self.defDecayRate
+                self.logRate0 = float(yArr[-1])
+        self.decayRate = k
+
+def _gain(x):
+    """Return (1 - exp(-x)) / x: the fraction of the counts collected in an exposure
+    compared to a sky of constant brightness; x = decay rate * exposure time
+
+    x may be a scalar or numpy array.
+    """
+    x = numpy.asarray(x, dtype=float)
+    smallX = numpy.abs(x) < 1.0e-6
+    safeX = numpy.where(smallX, 1.0, x)
+    retArr = numpy.where(smallX, 1.0 - x / 2.0, -numpy.expm1(-safeX) / safeX)
+    if retArr.ndim == 0:
+        return float(retArr)
+    return retArr
+
+def _limitDecayRate(decayRate, defDecayRate):
+    """Limit a fit decay rate to a sensible range based on the default decay rate"""
+    minRate = abs(defDecayRate) * MinDecayRateMult
+    maxRate = abs(defDecayRate) * MaxDecayRateMult
+    return math.copysign(max(minRate, min(maxRate, decayRate * math.copysign(1.0, defDecayRate))), defDecayRate)
+
+
+if __name__ == "__main__":
+    # simulate evening and morning twilight flats: compare the fixed formula
+    # used by the original SPIcam script with measured-count feedback;
+    # then time the subsampled median of a 2048x2048 image
+    import os
+    import random
+    import tempfile
+    import time
+
+    random.seed(1)
+    desCounts = 25000.0
+    minExpTime = 1.0
+    maxExpTime = 160.0
+    overhead = 45.0 # time from start of one exposure to the next, excluding exposure time (sec)
+    numExp = 10
+    goodRange = (0.7 * desCounts, 1.3 * desCounts)
+
+    def nextExpTimeFormula(prevExpTime, isMorning):
+        # the formulas from the original SPIcam sky flat script
+        if isMorning:
+            temp = math.exp(prevExpTime / 288.0) + math.exp((prevExpTime + 45.0) / 288.0) - 1.0
+            return max(minExpTime, 288.0 * math.log(temp) - (prevExpTime + 45.0))
+        temp = math.exp(-prevExpTime / 288.0) + math.exp(-(prevExpTime + 45.0) / 288.0) - 1.0
+        if temp <= 0:
+            return maxExpTime
+        return min(maxExpTime, -288.0 * math.log(temp) - (prevExpTime + 45.0))
+
+    def simCounts(startTime, expTime, logRate0, decayTime):
+        k = 1.0 / decayTime
+        counts = math.exp(logRate0 - k * startTime) * expTime * _gain(k * expTime)
+        return counts * random.gauss(1.0, 0.02)
+
+    for isMorning in (False, True):
+        nGood = [0, 0]
+        nTotal = 0
+        for trial in range(50):
+            # the real decay time varies from night to night and with the filter
+            decayTime = random.uniform(200.0, 450.0)
+            if isMorning:
+                decayTime = -decayTime
+            # the first exposure is chosen by the user and lands within a factor of 2 of the desired level
+            firstExpTime = random.uniform(5.0, 20.0)
+            logRate0 = math.log(desCounts * random.uniform(0.5, 2.0) / firstExpTime)
+            for useFeedback in (False, True):
+                fitter = SkyFlatFitter(isMorning=isMorning, saturationLevel=55000.0)
+                t = 0.0
+                expTime = firstExpTime
+                for expNum in range(numExp):
+                    if expNum > 0:
+                        predExpTime = None
+                        if useFeedback:
+                            predExpTime = fitter.predictExpTime(t, desCounts, minExpTime, maxExpTime)
+                        if predExpTime is None:
+                            predExpTime = nextExpTimeFormula(expTime, isMorning)
+                        expTime = predExpTime
+                    counts = simCounts(t, expTime, logRate0, decayTime)
+                    fitter.addMeas(t, expTime, min(counts, 60000.0))
+                    if goodRange[0] <= counts <= goodRange[1] and expNum > 0:
+                        nGood[useFeedback] += 1
+                    t += expTime + overhead
+            nTotal += numExp - 1
+        print "%s flats: fraction of exposures within 30%% of desired level: formula %0.2f; feedback %0.2f" % \
+            (("Evening", "Morning")[isMorning], nGood[0] / float(nTotal), nGood[1] / float(nTotal))
+
+    imArr = numpy.random.normal(20000.0, 150.0, size=(2048, 2048)).astype(numpy.float32)
+    fd, filePath = tempfile.mkstemp(suffix=".fits")
+    os.close(fd)
+    try:
+        imArr[:, -32:] = 1000.0
+        hdu = pyfits.PrimaryHDU(imArr)
+        hdu.header["BIASSEC"] = "[2019:2046,1:2048]"
+        hdu.writeto(filePath, clobber=True)
+        biasSubLevel = readSkyLevel(filePath, biasLevel=None)
+        if abs(biasSubLevel - 19000.0) > 50.0:
+            raise RuntimeError("bias-subtracted level %0.1f != 19000" % (biasSubLevel,))
+        startTime = time.time()
+        subLevel = readSkyLevel(filePath)
+        subTime = time.time() - startTime
+        startTime = time.time()
+        fullLevel = float(numpy.median(pyfits.getdata(filePath)))
+        fullTime = time.time() - startTime
+        print "2048x2048 image: subsampled median %0.1f in %0.3f sec; full median %0.1f in %0.3f sec" % \
+            (subLevel, subTime, fullLevel, fullTime)
+    finally:
+        os.remove(filePath)
@@ -13,11 +13,13 @@ History:
 2012-07-09 ROwen    Modified to use RO.TkUtil.Timer.
 2014-02-07 ROwen    Bug fix: added missing import.
                     Updated runDataDictSet docs to indicate actor is a valid keyword in the data.
+2026-10-18 ROwen    Added runReplay method to replay recorded hub replies.
 """
 import random
 import RO.SeqUtil
 from RO.TkUtil import Timer
 import TUI.TUIModel
+import TUI.Base.HubReplay
 
 class GaussRandomValue(object):
     def __init__(self, minValue, maxValue, homeValue, sigma):
@@ -123,6 +125,26 @@ class TestDispatcher(object):
             item.setdefault("delay", self.delay)
         self._dispatchIter(iter(dataDictSet))
     
+    def runReplay(self, replyIter, speed=1.0, maxGap=None, callFunc=None):
+        """Replay recorded hub replies; see TUI.Base.HubReplay.HubReplayer for details
+
+        Inputs:
+        - replyIter: an iterable of (time, replyStr), e.g. from TUI.Base.HubReplay.readReplayFile
+        - speed: replay speed; 0 to dispatch as fast as possible
+        - maxGap: maximum time between replies (sec); None for no limit
+        - callFunc: function to call when the replay finishes; receives the replayer
+
+        Returns the HubReplayer; its stats attribute contains the replay statistics.
+        """
+        replayer = TUI.Base.HubReplay.HubReplayer(
+            dispatcher = self.dispatcher,
+            speed = speed,
+            maxGap = maxGap,
+            callFunc = callFunc,
+        )
+        replayer.start(replyIter)
+        return replayer
+
     def _dispatchIter(self, dataDictIter):
         """Dispatch and iterator over dataDictSet; see runDataDictSet for details
         """
@@ -19,7 +19,16 @@ History:
                     Display FWHM in arcsec.
 2010-04-22 ROwen    Released as part of TUI.
 2010-04-23 ROwen    Stopped using Exception.message to make Python 2.6 happier.
+2026-10-18 ROwen    Added optional local centroiding (Local checkbox): download each image
+                    and centroid it in a worker thread using TUI.Guide.Centroider,
+                    instead of sending a centroid command to the guide camera actor.
+2026-10-18 ROwen    Added LoadEagerly.
+2026-10-18 ROwen    Moved LocalCentroidGain next to the other centroid constants and documented it.
+2026-10-18 ROwen    Removed LoadEagerly; this window collects no data while hidden.
 """
+import os
+import shutil
+import tempfile
 import numpy
 import Tkinter
 import RO.Constants
@@ -29,7 +38,9 @@ import RO.Wdg
 import TUI.TUIModel
 import TUI.TCC.TCCModel
 import TUI.PlaySound
+import TUI.Guide.Centroider
 import TUI.Guide.GuideModel
+import TUI.Models.HubModel
 import TUI.Inst.ExposeModel
 import TUI.Inst.Agile.AgileModel
 
@@ -116,6 +127,20 @@ class StarMeas(object):
             ampl = starKeyData[14],
         )
     fromStarKey = classmethod(fromStarKey)
+    
+    def fromCentroidData(cls, centroidData):
+        """Create an instance from a TUI.Guide.Centroider.CentroidData
+        """
+        return cls(
+            typeChar = "c",
+            xyPos = centroidData.xyPos,
+            xyStdDev = centroidData.xyStdDev,
+            centroidRad = centroidData.centroidRad,
+            fwhm = centroidData.fwhm,
+            sky = centroidData.sky,
+            ampl = centroidData.ampl,
+        )
+    fromCentroidData = classmethod(fromCentroidData)
 
 class AgileGuideWdg(Tkinter.Frame):
     """Agile guide widget
@@ -125,6 +150,10 @@ class AgileGuideWdg(Tkinter.Frame):
     DefUserCorrFrac = 1.0 # default user correction fraction
     MinCentroidRadiusPix = 2.0 # minimum centroid radius, in binned pixels
     MaxFindAmpl = 45000 # maximum allowed star amplitude
+    # Detector gain (e-/ADU) used by local centroiding (the Local checkbox) to estimate photon noise
+    # for the centroid uncertainty and minimum signal to noise test. It does not affect the centroid position.
+    # 1.0 is a conservative stand-in: if the real gain is larger, photon noise is overestimated, not underestimated.
+    LocalCentroidGain = 1.0
     # FitErrCorrFracList uses the error estimate to scale the generated offsets.
     # The array contains pairs of numbers: an error threshhold, and a scale.
     # If the error is less than a given threshold, the corresponding factor is applied to the offset.
@@ -144,11 +173,16 @@ class AgileGuideWdg(Tkinter.Frame):
         self.instName = "Agile"
 
         self.pendingCmd = None
-        self.pendingImagePath = None
+        self.pendingPath = None
+        # local centroiding: image being downloaded or centroided, if any
+        self.pendingLocalPath = None
+        self.pendingCentroidJobID = None
+        self.localImageDir = None
         
         # get various models
         self.tccModel = TUI.TCC.TCCModel.getModel()
         self.tuiModel = TUI.TUIModel.getModel()
+        self.hubModel = TUI.Models.HubModel.getModel()
         if self.gcamActor not in TUI.Guide.GuideModel._GCamInfoDict:
             TUI.Guide.GuideModel._GCamInfoDict[self.gcamActor] = TUI.Guide.GuideModel._GCamInfo(imSize = (1024, 1024))
         self.guideModel = TUI.Guide.GuideModel.getModel(self.gcamActor)
@@ -168,6 +202,7 @@ class AgileGuideWdg(Tkinter.Frame):
         # add callbacks
         self.exposeModel.files.addCallback(self.exposeFilesCallback)
         self.tccModel.moveItems.addIndexedCallback(self.tccMoveItemsCallback, ind=0)
+        self.bind("<Destroy>", self._destroyEvt)
 
     def createStdWdg(self):
         """Create the standard widgets.
@@ -275,6 +310,15 @@ class AgileGuideWdg(Tkinter.Frame):
         )
         self.doGuideBtn.pack(side="left")
         
+        self.localCentroidBtn = RO.Wdg.Checkbutton(
+            master = cmdBtnFrame,
+            text = "Local",
+            defValue = False,
+            helpText = "Centroid guide star in TUI (requires downloading each image)?",
+            helpURL = HelpURL,
+        )
+        self.localCentroidBtn.pack(side="left")
+        
         self.gr.gridWdg(False, cmdBtnFrame, colSpan=numCols)
         
         self.grid_columnconfigure(numCols - 1, weight=1) 
@@ -382,8 +426,12 @@ class AgileGuideWdg(Tkinter.Frame):
          # add callback after doCmd so errors in this callback are reported in status bar
         self.pendingCmd.addCallback(self.findCmdDone)
 
-    def doGuide(self, filePath):
+    def doGuide(self, filePath, imageName):
         """Centroid star on specified image and apply pointing correction
+        
+        Inputs:
+        - filePath: path of image on the hub's computer
+        - imageName: path of image relative to the hub's http root directory
         """
         if _Debug:
             print "doGuide(filePath=%r)" % (filePath,)
@@ -398,6 +446,10 @@ class AgileGuideWdg(Tkinter.Frame):
             self.doGuideBtn.setBool(False)
             return
 
+        if self.localCentroidBtn.getBool():
+            self.doLocalGuide(filePath, imageName, starPos, centroidRadius)
+            return
+
         self.pendingCmd = RO.KeyVariable.CmdVar(
             actor = self.gcamActor,
             cmdStr = "centroid file=%r on=%0.1f,%0.1f cradius=%0.1f" % \
@@ -412,6 +464,61 @@ class AgileGuideWdg(Tkinter.Frame):
          # add callback after doCmd so errors in this callback are reported in status bar
         self.pendingCmd.addCallback(self.centroidCmdDone)
         
+    def doLocalGuide(self, filePath, imageName, starPos, centroidRadius):
+        """Download an image, centroid the star in a worker thread and apply pointing correction
+        
+        Inputs:
+        - filePath: path of image on the hub's computer
+        - imageName: path of image relative to the hub's http root directory
+        - starPos: initial star position (binned pixels)
+        - centroidRadius: centroid radius (binned pixels)
+        """
+        downloadWdg = self.guideModel.downloadWdg
+        host, hostRootDir = self.hubModel.httpRoot.get()[0]
+        if None in (host, hostRootDir) or not downloadWdg:
+            self.statusBar.setMsg("Cannot centroid locally: cannot download images", severity=RO.Constants.sevError)
+            self.localCentroidBtn.setBool(False)
+            return
+        
+        if self.localImageDir is None:
+            self.localImageDir = tempfile.mkdtemp(prefix="TUIAgileGuide")
+        localPath = os.path.join(self.localImageDir, os.path.basename(imageName))
+        self.pendingPath = filePath
+        self.pendingLocalPath = localPath
+        if _Debug:
+            print "pending path = %s; local path = %s" % (self.pendingPath, self.pendingLocalPath)
+        
+        def downloadDone(httpGet, self=self, localPath=localPath, starPos=starPos, centroidRadius=centroidRadius):
+            if localPath != self.pendingLocalPath:
+                # guiding was stopped or restarted
+                return
+            if httpGet.state != httpGet.Done:
+                self.pendingLocalPath = None
+                self.logMsg("%s\tguide\tdownload failed: %s" % (self.pendingFileName, httpGet.errMsg),
+                    severity=RO.Constants.sevError)
+                return
+            self.pendingCentroidJobID = TUI.Guide.Centroider.getCentroider().centroid(
+                path = localPath,
+                xyPos = starPos,
+                rad = centroidRadius,
+                gain = self.LocalCentroidGain,
+                callFunc = self.localCentroidDone,
+            )
+        
+        def downloadCancelled(request, self=self, localPath=localPath):
+            if localPath == self.pendingLocalPath:
+                self.pendingLocalPath = None
+        
+        downloadWdg.scheduler.submit("agileGuide", [dict(
+            fromURL = "".join(("http://", host, hostRootDir, imageName)),
+            toPath = localPath,
+            isBinary = True,
+            overwrite = True,
+            createDir = True,
+            doneFunc = downloadDone,
+            dispStr = imageName,
+        )], priority=1, supersede=True, cancelFunc=downloadCancelled)
+
     def exposeFilesCallback(self, fileInfo, isCurrent, keyVar=None):
         """Handle the files keyword
 
@@ -431,6 +538,7 @@ class AgileGuideWdg(Tkinter.Frame):
         cmdr = fileInfo[0]
         prog = cmdr.split(".", 1)[0]
         filePath = "".join(fileInfo[2:6])
+        imageName = "".join(fileInfo[3:6])
         fileName = fileInfo[5]
         
         try:
@@ -448,7 +556,7 @@ class AgileGuideWdg(Tkinter.Frame):
         if self.doFindBtn.getBool():
             self.doFind(filePath)
         elif self.doGuideBtn.getBool():
-            self.doGuide(filePath)
+            self.doGuide(filePath, imageName)
         else:
             self.logMsg("%s\tskipped: guiding is off" % (fileName,))
     
@@ -532,8 +640,32 @@ class AgileGuideWdg(Tkinter.Frame):
 
     @property
     def isBusy(self):
+        if self.pendingLocalPath is not None:
+            return True
         return self.pendingCmd and not self.pendingCmd.isDone()
 
+    def localCentroidDone(self, centroidData):
+        """Local centroid finished; compute pointing error and start the offset command
+        
+        Inputs:
+        - centroidData: a TUI.Guide.Centroider.CentroidData
+        """
+        if _Debug:
+            print "localCentroidDone(centroidData=%s)" % (centroidData,)
+        localPath = self.pendingLocalPath
+        self.pendingLocalPath = None
+        self.pendingCentroidJobID = None
+        try:
+            os.remove(localPath)
+        except Exception:
+            pass
+        if not centroidData.isOK:
+            self.logMsg("%s\tguide\tstar not found: %s" % (self.pendingFileName, centroidData.errMsg),
+                severity=RO.Constants.sevError)
+            return
+        self.statusBar.setMsg("Centroided locally in %0.0f ms" % (centroidData.duration * 1000.0,))
+        self.doCorrect(StarMeas.fromCentroidData(centroidData))
+
     def logMsg(self, outStr, severity=RO.Constants.sevNormal):
         """Log a message to the log widget and play Command Failed if severity >= RO.Constants.sevError
         
@@ -598,6 +730,14 @@ class AgileGuideWdg(Tkinter.Frame):
             return "?"
         return self.pendingPath.rsplit("/", 1)[-1]
 
+    def stopLocalCentroid(self):
+        """Stop pending local centroiding, if any (does not stop a pending offset command)
+        """
+        if self.pendingCentroidJobID is not None:
+            TUI.Guide.Centroider.getCentroider().cancel(self.pendingCentroidJobID)
+            self.pendingCentroidJobID = None
+        self.pendingLocalPath = None
+
     def tccMoveItemsCallback(self, moveItems, isCurrent, keyVar=None):
         """Turn off guiding if slewing to a new object
         """
@@ -614,12 +754,23 @@ class AgileGuideWdg(Tkinter.Frame):
             if self.doGuideBtn.getBool():
                 self.doGuideBtn.setBool(False)
                 itemList.append("Guide")
+            self.stopLocalCentroid()
             if itemList:
                 self.statusBar.setMsg(
                     "%s off; slewing to new object" % (",".join(itemList)),
                     severity=RO.Constants.sevWarning,
                 )
 
+    def _destroyEvt(self, evt=None):
+        """Stop local centroiding and delete local image directory
+        """
+        if evt is not None and evt.widget != self:
+            return
+        self.stopLocalCentroid()
+        if self.localImageDir is not None:
+            shutil.rmtree(self.localImageDir, ignore_errors=True)
+            self.localImageDir = None
+
 def vecMag(vec):
     """Compute the magnitude of a vector
     """
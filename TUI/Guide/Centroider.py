@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+"""Measure star centroids locally (in TUI) instead of asking a guide camera actor.
+
+Used by the Agile guider so that guiding does not need a hub round trip
+to centroid each image. The measurement is a simplified version of PyGuide.centroid:
+- the sky level and noise are the median and (robust) standard deviation of the pixels
+  in an annulus outside the centroid radius
+- the centroid is the sky-subtracted intensity-weighted mean position of the pixels
+  within the centroid radius, iterated until the centroid stops moving
+- FWHM is computed from the intensity-weighted second moment,
+  assuming a circular gaussian star
+- the centroid uncertainty is computed by propagating per-pixel noise
+  (sky noise plus photon noise) through the weighted mean
+
+Positions are in image coordinates of the (binned) image: x,y, with 0.5, 0.5
+at the center of the lower left pixel (as for GrayImageDispWdg and the guide star keyword).
+
+Only the region around the star is read from the FITS file (see ImageDecoder.MappedImage).
+Centroiding runs in a worker thread (see TUI.Base.BackgroundJobRunner), which never touches Tk;
+results are passed back through a queue that is polled by a Tk timer while jobs are pending.
+
+History:
+2026-10-18 ROwen
+2026-10-18 ROwen    Modified Centroider to use TUI.Base.BackgroundJobRunner.
+"""
+__all__ = ["CentroidData", "Centroider", "centroidImage", "centroidFile", "getCentroider"]
+
+import math
+import time
+import numpy
+import RO.StringUtil
+import TUI.Base.BackgroundJobRunner
+import ImageDecoder
+
+_PollInterval = 0.02 # interval at which to check for finished jobs (sec)
+_DefSkyWidth = 5.0 # default width of sky annulus (pixels)
+_DefMinSNR = 3.0 # default minimum signal to noise ratio
+_MaxIter = 20 # maximum number of centroid iterations
+_MinShift = 0.01 # stop iterating when the centroid moves less than this (pixels)
+_FWHMPerSigma = 2.0 * math.sqrt(2.0 * math.log(2.0))
+
+class CentroidData(object):
+    """Results of measuring a star
+
+    Lengths and positions are in binned pixels and intensities are in ADUs.
+
+    Attributes (all but errMsg are None if the measurement failed):
+    - xyPos: centroid x,y position
+    - xyStdDev: estimated standard deviation of x,y position
+    - centroidRad: radius of centroid region
+    - counts: sum of sky-subtracted unmasked pixels within the centroid radius
+    - sky: sky level
+    - ampl: peak sky-subtracted pixel value within the centroid radius
+    - fwhm: full width at half maximum
+    - nIter: number of iterations
+    - errMsg: reason the measurement failed, or None if successful
+    - duration: time to read the data and measure the star (sec), or None if not measured
+    """
+    def __init__(self,
+        xyPos = None,
+        xyStdDev = None,
+        centroidRad = None,
+        counts = None,
+        sky = None,
+        ampl = None,
+        fwhm = None,
+        nIter = None,
+        errMsg = None,
+    ):
+        self.xyPos = xyPos
+        self.xyStdDev = xyStdDev
+        self.centroidRad = centroidRad
+        self.counts = counts
+        self.sky = sky
+        self.ampl = ampl
+        self.fwhm = fwhm
+        self.nIter = nIter
+        self.errMsg = errMsg
+        self.duration = None
+
+    @property
+    def isOK(self):
+        return self.errMsg is None
+
+    def __repr__(self):
+        if not self.isOK:
+            return "CentroidData(errMsg=%r)" % (self.errMsg,)
+        return "CentroidData(xyPos=(%0.2f, %0.2f), xyStdDev=(%0.2f, %0.2f), fwhm=%0.2f, counts=%0.0f, sky=%0.1f)" % \
+            (self.xyPos[0], self.xyPos[1], self.xyStdDev[0], self.xyStdDev[1], self.fwhm, self.counts, self.sky)
+
+
+def centroidImage(decodedImage, xyPos, rad, skyWidth=_DefSkyWidth, gain=1.0, minSNR=_DefMinSNR):
+    """Centroid a star on a decoded image, reading only the region near the star
+
+    Inputs:
+    - decodedImage: image data (an ImageDecoder.DecodedImage)
+    - xyPos: initial x,y position of star (binned pixels)
+    - rad: centroid radius (binned pixels)
+    - skyWidth: width of the sky annulus, which lies just outside the centroid radius (pixels)
+    - gain: detector gain (e-/ADU), for estimating photon noise
+    - minSNR: minimum signal to noise ratio for a successful measurement
+
+    Returns a CentroidData.
+    """
+    if decodedImage.errMsg:
+        return CentroidData(errMsg=decodedImage.errMsg)
+    outerRad = rad + skyWidth
+    # region containing the sky annulus, as x,y index of lower left pixel and x,y size
+    begInd = [int(math.floor(xyPos[ii] - outerRad)) for ii in range(2)]
+    endInd = [int(math.ceil(xyPos[ii] + outerRad)) for ii in range(2)]
+    size = [endInd[ii] - begInd[ii] for ii in range(2)]
+    imShape = decodedImage.shape
+    begInd = [max(0, min(imShape[1 - ii], begInd[ii])) for ii in range(2)]
+    dataArr = decodedImage.getArr(begInd, size)
+    if dataArr is None or dataArr.size == 0:
+        return CentroidData(errMsg="star position %0.1f, %0.1f is off the image" % tuple(xyPos[0:2]))
+    dataArr = numpy.asarray(dataArr, dtype=float)
+    maskArr = decodedImage.getMask(begInd, size)
+    if maskArr is None:
+        isGood = numpy.ones(dataArr.shape, dtype=bool)
+    else:
+        isGood = numpy.asarray(maskArr) == 0
+
+    # x,y image position of the center of each pixel of the region
+    yPosArr, xPosArr = numpy.indices(dataArr.shape, dtype=float)
+    xPosArr += begInd[0] + 0.5
+    yPosArr += begInd[1] + 0.5
+    return _centroidRegion(dataArr, isGood, xPosArr, yPosArr, xyPos, rad, outerRad, gain, minSNR)
+
+def _centroidRegion(dataArr, isGood, xPosArr, yPosArr, xyPos, rad, outerRad, gain, minSNR):
+    """Centroid a star on a region of an image; see centroidImage for details
+
+    Inputs:
+    - dataArr: image data for the region (float array)
+    - isGood: True for pixels that may be used (bool array)
+    - xPosArr, yPosArr: image position of the center of each pixel
+    - remaining inputs: as for centroidImage, plus outerRad = outer radius of sky annulus
+    """
+    xCtr, yCtr = [float(val) for val in xyPos[0:2]]
+    radSq = rad**2
+
+    # sky level and noise from the annulus around the initial position
+    rSqArr = (xPosArr - xCtr)**2 + (yPosArr - yCtr)**2
+    skyData = dataArr[isGood & (rSqArr >= radSq) & (rSqArr < outerRad**2)]
+    if len(skyData) < 5:
+        return CentroidData(errMsg="too few sky pixels")
+    sky = numpy.median(skyData)
+    skyStdDev = 1.4826 * numpy.median(numpy.abs(skyData - sky))
+    skyVar = max(skyStdDev**2, 1.0 / max(gain, 1.0e-10))
+
+    # iterate weighted mean position
+    for nIter in range(1, _MaxIter + 1):
+        inStar = isGood & (((xPosArr - xCtr)**2 + (yPosArr - yCtr)**2) < radSq)
+        weightArr = numpy.clip(dataArr[inStar] - sky, 0.0, None)
+        totWeight = weightArr.sum()
+        if totWeight <= 0:
+            return CentroidData(errMsg="no signal above sky")
+        newXCtr = numpy.dot(weightArr, xPosArr[inStar]) / totWeight
+        newYCtr = numpy.dot(weightArr, yPosArr[inStar]) / totWeight
+        shift = math.hypot(newXCtr - xCtr, newYCtr - yCtr)
+        xCtr, yCtr = newXCtr, newYCtr
+        if math.hypot(xCtr - xyPos[0], yCtr - xyPos[1]) > rad:
+            return CentroidData(errMsg="centroid moved more than the centroid radius")
+        if shift < _MinShift:
+            break
+
+    # measure the star at the final position
+    inStar = isGood & (((xPosArr - xCtr)**2 + (yPosArr - yCtr)**2) < radSq)
+    netArr = dataArr[inStar] - sky
+    weightArr = numpy.clip(netArr, 0.0, None)
+    totWeight = weightArr.sum()
+    if totWeight <= 0:
+        return CentroidData(errMsg="no signal above sky")
+    dxArr = xPosArr[inStar] - xCtr
+    dyArr = yPosArr[inStar] - yCtr
+    counts = netArr.sum()
+    noiseVarArr = skyVar + weightArr / gain
+    snr = counts / math.sqrt(noiseVarArr.sum())
+    if snr < minSNR:
+        return CentroidData(errMsg="star too faint: S/N = %0.1f" % (snr,))
+    xyStdDev = (
+        math.sqrt(numpy.dot(noiseVarArr, dxArr**2)) / totWeight,
+        math.sqrt(numpy.dot(noiseVarArr, dyArr**2)) / totWeight,
+    )
+    sigma = math.sqrt(numpy.dot(weightArr, dxArr**2 + dyArr**2) / (2.0 * totWeight))
+    return CentroidData(
+        xyPos = (xCtr, yCtr),
+        xyStdDev = xyStdDev,
+        centroidRad = rad,
+        counts = counts,
+        sky = sky,
+        ampl = netArr.max(),
+        fwhm = sigma * _FWHMPerSigma,
+        nIter = nIter,
+    )
+
+def centroidFile(path, xyPos, rad, **kargs):
+    """Read a FITS file and centroid a star on it; see centroidImage for details
+
+    Sets the duration attribute of the returned CentroidData.
+    """
+    startTime = time.time()
+    try:
+        centroidData = centroidImage(ImageDecoder.decodeFITSFile(path), xyPos, rad, **kargs)
+    except Exception as e:
+        centroidData = CentroidData(errMsg=RO.StringUtil.strFromException(e))
+    centroidData.duration = time.time() - startTime
+    return centroidData
+
+
+def _centroidFailed(errMsg):
+    """Return a CentroidData reporting that centroiding failed"""
+    return CentroidData(errMsg=errMsg)
+
+
+class Centroider(object):
+    """Centroid stars on FITS files using a worker thread
+    """
+    def __init__(self):
+        self._jobRunner = TUI.Base.BackgroundJobRunner.BackgroundJobRunner(
+            name = "Centroider",
+            jobFunc = centroidFile,
+            pollInterval = _PollInterval,
+            errFunc = _centroidFailed,
+        )
+
+    def centroid(self, path, xyPos, rad, callFunc, **kargs):
+        """Centroid a star on a FITS file in the background
+
+        Inputs:
+        - path: path to FITS file
+        - xyPos: initial x,y position of star (binned pixels)
+        - rad: centroid radius (binned pixels)
+        - callFunc: function to call (on the Tk thread) when the measurement is finished;
+            it receives one argument: a CentroidData
+        - **kargs: additional arguments for centroidImage
+
+        Returns a job ID that may be used to cancel the callback.
+        """
+        return self._jobRunner.submit(callFunc, path, xyPos, rad, **kargs)
+
+    def cancel(self, jobID):
+        """Cancel the callback for a job; the star may still be measured
+        """
+        self._jobRunner.cancel(jobID)
+
+    @property
+    def nPending(self):
+        """Number of jobs in progress"""
+        return self._jobRunner.nPending
+
+
+_theCentroider = None
+
+def getCentroider():
+    """Return the shared Centroider, creating it if necessary"""
+    global _theCentroider
+    if _theCentroider is None:
+        _theCentroider = Centroider()
+    return _theCentroider
+
+
+if __name__ == "__main__":
+    # Benchmark per-frame latency (read FITS file + centroid) on 1k x 1k guide images
+    # and check accuracy on simulated stars.
+    import os
+    import shutil
+    import tempfile
+    try:
+        import astropy.io.fits as pyfits
+    except ImportError:
+        import pyfits
+
+    ImSize = 1024
+    NumFrames = 50
+    Rad = 8.0
+    Sky = 1000.0
+    Gain = 2.0
+    FWHM = 3.0
+
+    def writeStarFile(path, xyPos):
+        """Write a 1k x 1k uint16 image with a gaussian star at xyPos and sky + photon noise"""
+        sigma = FWHM / _FWHMPerSigma
+        yPosArr, xPosArr = numpy.indices((ImSize, ImSize), dtype=float)
+        rSqArr = (xPosArr + 0.5 - xyPos[0])**2 + (yPosArr + 0.5 - xyPos[1])**2
+        electronArr = (Sky + 20000.0 * numpy.exp(-rSqArr / (2.0 * sigma**2))) * Gain
+        imArr = numpy.random.poisson(electronArr) / Gain
+        pyfits.PrimaryHDU(imArr.astype(numpy.uint16)).writeto(path)
+
+    tempDir = tempfile.mkdtemp()
+    try:
+        pathPosList = []
+        for ind in range(NumFrames):
+            xyPos = numpy.random.uniform(100, ImSize - 100, size=2)
+            path = os.path.join(tempDir, "im%d.fits" % (ind,))
+            writeStarFile(path, xyPos)
+            pathPosList.append((path, xyPos))
+
+        for useMemmap in (False, True):
+            errList = []
+            durList = []
+            for path, xyPos in pathPosList:
+                startPos = xyPos + numpy.random.uniform(-2, 2, size=2)
+                startTime = time.time()
+                centroidData = centroidImage(ImageDecoder.decodeFITSFile(path, useMemmap=useMemmap),
+                    startPos, Rad, gain=Gain)
+                durList.append(time.time() - startTime)
+                if not centroidData.isOK:
+                    raise RuntimeError("centroid failed: %s" % (centroidData.errMsg,))
+                errList.append(numpy.array(centroidData.xyPos) - xyPos)
+            errArr = numpy.array(errList)
+            print "%s read: per-frame latency mean %5.1f ms, max %5.1f ms; position error rms %0.3f pix" % \
+                ("mmap " if useMemmap else "eager", numpy.mean(durList) * 1000, numpy.max(durList) * 1000,
+                numpy.sqrt(numpy.mean(errArr**2)))
+        print "last measurement:", centroidData, "; true position = (%0.2f, %0.2f); FWHM = %0.2f" % \
+            (xyPos[0], xyPos[1], FWHM)
+    finally:
+        shutil.rmtree(tempDir)
@@ -6,6 +6,9 @@ History:
 2005-06-27 ROwen    Removed unused _HelpURL.
 2005-07-14 ROwen    Removed local test mode support.
 2006-04-13 ROwen    Modified for updated GuideTest.runDownload.
+2026-10-18 ROwen    Added LoadEagerly.
+2026-10-18 ROwen    Removed LoadEagerly; the image history is now collected by TUI.Guide.GuideImageHistory,
+                    which is started at startup by TUI.BackgroundTasks.startDataCollectors.
 """
 import RO.Alg
 import GuideWdg
@@ -14,6 +14,9 @@ History:
 2008-02-11 ROwen    Modified the code to match NA2 Guider window, including:
                     - Added a cancel button
                     - Hid the current filter by default
+2026-10-18 ROwen    Added LoadEagerly.
+2026-10-18 ROwen    Removed LoadEagerly; the image history is now collected by TUI.Guide.GuideImageHistory,
+                    which is started at startup by TUI.BackgroundTasks.startDataCollectors.
 """
 import Tkinter
 import RO.InputCont
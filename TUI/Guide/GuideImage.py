@@ -20,6 +20,16 @@ History:
                     and removed two unused imports.
 2014-09-17 ROwen    Modified to use astropy instead of pyfits, if available.
                     Corrected the import of HubModel.
+2026-10-18 ROwen    Modified to download using the shared download scheduler;
+                    added downloadGroup argument.
+2026-10-18 ROwen    Decode downloaded images in background threads (see ImageDecoder);
+                    added Decoding state and getDecodedImage.
+                    Queued downloads superseded by a newer image revert to Ready.
+2026-10-18 ROwen    Keep decoded images in the shared TUI.Base.ImageCache instead of in each image;
+                    expire removes the image from the cache.
+2026-10-18 ROwen    Image files are memory-mapped (see ImageDecoder.MappedImage).
+2026-10-18 ROwen    Added onDemand argument to fetchFile, so fetching an image from the history
+                    does not cancel the download of the current image.
 """
 import os
 try:
@@ -29,6 +39,8 @@ except ImportError:
 import RO.StringUtil
 import TUI.TUIModel
 import TUI.Models.HubModel
+import TUI.Base.ImageCache
+import ImageDecoder
 import SubFrame
 
 _DebugMem = False # print a message when a file is deleted from disk?
@@ -42,12 +54,14 @@ class BasicImage(object):
                 if isLocal False, then a URL relative to the download host
                 if isLocal True, then a local path relative to localBaseDir
     - imageName unix path to image, relative to host root directory
-    - guideModel    guide model for this actor
+    - downloadWdg   Downloads window widget (a TUI.TUIMenu.DownloadsWindow.DownloadsWdg)
     - fetchCallFunc function to call when image info changes state
     - isLocal   set True if image is local or already downloaded
+    - downloadGroup download scheduler group (e.g. the guide actor)
     """
     Ready = "Ready to download"
     Downloading = "Downloading"
+    Decoding = "Decoding"
     Downloaded = "Downloaded"
     FileReadFailed = "Cannot read file"
     DownloadFailed = "Download failed"
@@ -61,6 +75,7 @@ class BasicImage(object):
         downloadWdg = None,
         fetchCallFunc = None,
         isLocal = False,
+        downloadGroup = "guide",
     ):
         #print "%s localBaseDir=%r, imageName=%s" % (self.__class__.__name__, localBaseDir, imageName)
         self.localBaseDir = localBaseDir
@@ -70,6 +85,9 @@ class BasicImage(object):
         self.errMsg = None
         self.fetchCallFunc = fetchCallFunc
         self.isLocal = isLocal
+        self.downloadGroup = downloadGroup
+        self.imageCache = TUI.Base.ImageCache.getImageCache()
+        self._decodeJobID = None
         self.keepGuideImagesPref = TUI.TUIModel.getModel().prefs.getPrefVar("Keep Guide Images")
         if not self.isLocal:
             self.state = self.Ready
@@ -98,11 +116,15 @@ class BasicImage(object):
         The image file is deleted only if "Keep Guide Images" preference is False
         and the file can be found.
         """
+        self.imageCache.remove(self.localPath)
+        if self._decodeJobID is not None:
+            ImageDecoder.getDecoder().cancel(self._decodeJobID)
+            self._decodeJobID = None
         if self.isLocal:
             if _DebugMem:
                 print "Would delete %r, but is local" % (self.imageName,)
             return
-        if self.state == self.Downloaded:
+        if self.state in (self.Downloaded, self.Decoding):
             # don't use _setState because no callback wanted and _setState rejects new states once done
             self.state = self.Expired
             if not self.keepGuideImagesPref.getValue():
@@ -117,8 +139,19 @@ class BasicImage(object):
         elif _DebugMem:
             print "Would delete %r, but state = %r is not %r" % (self.imageName, self.state, self.Downloaded)
 
-    def fetchFile(self):
-        """Start downloading the file."""
+    def fetchFile(self, onDemand=False):
+        """Start downloading the file.
+
+        Inputs:
+        - onDemand: if False, this is the newest image: the download supersedes queued downloads
+            in downloadGroup, and if it is superseded by a newer image before it starts,
+            the state reverts to Ready.
+            If True, the user asked to see this image (e.g. from the image history): the download
+            is queued in a separate group and neither supersedes nor is superseded by other downloads.
+
+        Once the download finishes the file is decoded in the background;
+        the state becomes Downloaded when the decoded data is ready.
+        """
         #print "%s fetchFile; isLocal=%s" % (self, self.isLocal)
         if self.isLocal:
             self._setState(self.Downloaded)
@@ -135,7 +168,11 @@ class BasicImage(object):
         self._setState(self.Downloading)
 
         fromURL = "".join(("http://", host, hostRootDir, self.imageName))
-        self.downloadWdg.getFile(
+        if onDemand:
+            downloadGroup = "%s history" % (self.downloadGroup,)
+        else:
+            downloadGroup = self.downloadGroup
+        self.downloadWdg.scheduler.submit(downloadGroup, [dict(
             fromURL = fromURL,
             toPath = self.localPath,
             isBinary = True,
@@ -143,7 +180,26 @@ class BasicImage(object):
             createDir = True,
             doneFunc = self._fetchDoneFunc,
             dispStr = self.imageName,
-        )
+        )], supersede=not onDemand, cancelFunc=self._fetchCancelFunc)
+
+    def getDecodedImage(self):
+        """Return the decoded image (an ImageDecoder.DecodedImage) if available, else None.
+
+        Decoded images are kept in a shared cache. If the file has been downloaded
+        but is not in the cache (e.g. a local file, or the image was evicted)
+        then it is decoded now. If decoding fails then the state is set to FileReadFailed.
+        """
+        if self.state != self.Downloaded:
+            return None
+        decodedImage = self.imageCache.get(self.localPath)
+        if decodedImage is None:
+            decodedImage = ImageDecoder.decodeFITSFile(self.getLocalPath())
+            if decodedImage.header is None:
+                self.state = self.FileReadFailed
+                self.errMsg = decodedImage.errMsg
+                return None
+            self._setDecoded(decodedImage)
+        return decodedImage
         
     def getFITSObj(self):
         """If the file is available, return a pyfits object,
@@ -179,15 +235,45 @@ class BasicImage(object):
         """Return True if download finished (successfully or otherwise)"""
         return self.state in self.DoneStates
 
+    def _decodeDoneFunc(self, decodedImage):
+        """Called when background decoding of the image ends.
+        """
+        self._decodeJobID = None
+        if self.state != self.Decoding:
+            return
+        if decodedImage.header is None:
+            self._setState(self.FileReadFailed, decodedImage.errMsg)
+        else:
+            self._setDecoded(decodedImage)
+            self._setState(self.Downloaded)
+
+    def _fetchCancelFunc(self, request):
+        """Called if the download is superseded before it starts.
+        """
+        if self.state == self.Downloading:
+            # don't use _setState because no callback is wanted;
+            # the image will be fetched again if it is displayed
+            self.state = self.Ready
+
     def _fetchDoneFunc(self, httpGet):
         """Called when image download ends.
         """
         if httpGet.state == httpGet.Done:
-            self._setState(self.Downloaded)
+            self._setState(self.Decoding)
+            self._decodeJobID = ImageDecoder.getDecoder().decode(self.getLocalPath(), self._decodeDoneFunc)
         else:
             self._setState(self.DownloadFailed, httpGet.errMsg)
             #print "%s download failed: %s" % (self, self.errMsg)
     
+    def _parseHeader(self, imHdr):
+        """Set attributes from the FITS header of the image."""
+        pass
+
+    def _setDecoded(self, decodedImage):
+        """Cache decoded image data and parse its header."""
+        self.imageCache.put(self.localPath, decodedImage)
+        self._parseHeader(decodedImage.header)
+
     def _setState(self, state, errMsg=None):
         if self.isDone():
             return
@@ -214,6 +300,7 @@ class GuideImage(BasicImage):
         radMult = None,
         thresh = None,
         isLocal = False,
+        downloadGroup = "guide",
     ):
         self.starDataDict = {} # dict of star type char: star keyword data
         self.defSelDataColor = None
@@ -232,6 +319,7 @@ class GuideImage(BasicImage):
             downloadWdg = downloadWdg,
             fetchCallFunc = fetchCallFunc,
             isLocal = isLocal,
+            downloadGroup = downloadGroup,
         )
 
     def getFITSObj(self):
@@ -246,14 +334,22 @@ class GuideImage(BasicImage):
         - binSubSize: subframe size (binned pixels)
         """
         fitsObj = BasicImage.getFITSObj(self)
-        if fitsObj and not self.parsedFITSHeader:
-            imHdr = fitsObj[0].header
-            self.expTime = imHdr.get("EXPTIME")
-            self.binFac = imHdr.get("BINX")
-            try:
-                self.subFrame = SubFrame.SubFrame.fromFITS(imHdr)
-            except ValueError:
-                pass
-            self.parsedFITSHeader = True
-
+        if fitsObj:
+            self._parseHeader(fitsObj[0].header)
         return fitsObj
+
+    def _parseHeader(self, imHdr):
+        """Parse the FITS header, if not already done, and set the following attributes:
+        - binFac: bin factor (a scalar; x = y)
+        - expTime: exposure time (floating seconds)
+        - subFrame: a SubFrame object
+        """
+        if self.parsedFITSHeader:
+            return
+        self.expTime = imHdr.get("EXPTIME")
+        self.binFac = imHdr.get("BINX")
+        try:
+            self.subFrame = SubFrame.SubFrame.fromFITS(imHdr)
+        except ValueError:
+            pass
+        self.parsedFITSHeader = True
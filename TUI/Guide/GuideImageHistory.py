@@ -0,0 +1,407 @@
+#!/usr/bin/env python
+"""GuideImageHistory collects the image history of a guide camera
+
+The history (new images and the star and findStars data for them) is collected whether or not
+the guide window for the camera exists, so guide windows can be created when first shown
+(see TUI.LazyToplevelSet) without losing the images that arrived while they were hidden.
+Images are not downloaded until they are displayed; see GuideWdg.showImage.
+
+Separated out of GuideWdg.py; see GuideWdg for earlier history.
+
+History:
+2026-10-18 ROwen
+"""
+__all__ = ["getHistory", "startHistories"]
+
+import atexit
+import weakref
+import RO.Alg
+from RO.Comm.Generic import Timer
+import RO.Prefs
+import TUI.TUIModel
+import GuideImage
+import GuideModel
+
+_HistLen = 100
+
+_DebugMem = False # print a message when a file is deleted from disk?
+
+# dict of star data type character: (name of color preference, default color)
+_StarColorPrefInfoDict = {
+    "c": ("Centroid Color", "cyan"),
+    "f": ("Found Star Color", "green"),
+    "g": ("Guide Star Color", "magenta"),
+}
+
+def getColorPref(prefName, defColor):
+    """Get a color preference. If not found, make one."""
+    pref = TUI.TUIModel.getModel().prefs.getPrefVar(prefName, None)
+    if pref is None:
+        pref = RO.Prefs.PrefVar.ColorPrefVar(
+            name = prefName,
+            defValue = defColor,
+        )
+    return pref
+
+
+class CmdInfo(object):
+    """Information about one image-related command"""
+    Centroid = "c"
+    Findstars = "f"
+    def __init__(self,
+        cmdr,
+        cmdID,
+        cmdChar,
+        imObj,
+        isNewImage,
+    ):
+        self.cmdr = cmdr
+        self.cmdID = cmdID
+        self.cmdChar = cmdChar.lower()
+        self.imObj = imObj
+        self.isNewImage = isNewImage
+
+        self._sawStarData = set()
+
+    def sawStarData(self, dataType):
+        """Set sawStarData flag for the specified dataType and return old value of flag.
+        dataType is a character from the star keyword; it is presently one of "c", "f" or "g".
+        """
+        dataType = dataType.lower()
+        retVal = dataType in self._sawStarData
+        self._sawStarData.add(dataType)
+        return retVal
+
+    def _clear(self):
+        """Clear any data that might cause memory leaks"""
+        self.imObj = None
+
+
+class CurrCmds(object):
+    """Information about all current image-related commands"""
+    def __init__(self, timeLim=60):
+        self.timeLim = timeLim
+        self.currCmds = dict() # dict of (cmdr, cmdID): CmdInfo
+        self._cmdTimer = Timer()
+
+    def addCmd(self, cmdr, cmdID, cmdChar, imObj, isNewImage):
+        cmdInfo = CmdInfo(
+            cmdr = cmdr,
+            cmdID = cmdID,
+            cmdChar = cmdChar,
+            imObj = imObj,
+            isNewImage = isNewImage
+        )
+        self.currCmds[(cmdr, cmdID)] = cmdInfo
+        self._cmdTimer.start(self.timeLim, self.delCmdInfo, cmdInfo.cmdr, cmdInfo.cmdID)
+
+    def getCmdInfo(self, cmdr, cmdID):
+        """Return cmdInfo, or None if no such command."""
+        return self.currCmds.get((cmdr, cmdID), None)
+
+    def getCmdInfoFromKeyVar(self, keyVar):
+        """Return cmdInfo based on keyVar, or None if no such command."""
+        cmdr, cmdID = keyVar.getCmdrCmdID()
+        return self.getCmdInfo(cmdr, cmdID)
+
+    def delCmdInfo(self, cmdr, cmdID):
+        #print "deleting cmd (%s, %s)" % (cmdr, cmdID)
+        cmdInfo = self.currCmds.pop((cmdr, cmdID), None)
+        if cmdInfo:
+            cmdInfo._clear()
+
+
+class GuideImageHistory(object):
+    """The image history of one guide camera
+
+    Do not create directly; use getHistory.
+
+    Useful attributes:
+    - actor: guide camera actor
+    - guideModel: guide model for the actor
+    - imObjDict: the history: an RO.Alg.ReverseOrderedDict of image name: GuideImage.GuideImage
+        (most recent image first)
+    - starColorPrefDict: dict of star data type character ("c", "f" or "g"): color preference
+    - wdg: the guide widget that displays this history, or None; see setWdg
+    """
+    def __init__(self, actor):
+        self.actor = actor
+        self.guideModel = GuideModel.getModel(actor)
+        self.tuiModel = TUI.TUIModel.getModel()
+        self.nToSave = _HistLen # eventually allow user to set?
+        self.imObjDict = RO.Alg.ReverseOrderedDict()
+        self.currCmds = CurrCmds()
+        self.wdg = None
+        self._memDebugDict = {}
+
+        self.starColorPrefDict = dict(
+            (typeChar, getColorPref(prefName, defColor))
+            for typeChar, (prefName, defColor) in _StarColorPrefInfoDict.iteritems()
+        )
+
+        self.guideModel.fsActRadMult.addIndexedCallback(self._updFSActRadMult)
+        self.guideModel.fsActThresh.addIndexedCallback(self._updFSActThresh)
+        self.guideModel.files.addCallback(self._updFiles)
+        self.guideModel.star.addCallback(self._updStar)
+
+        # exit handler
+        atexit.register(self._exitHandler)
+
+    def setWdg(self, wdg):
+        """Set the guide widget that displays this history
+
+        The widget must have attribute dispImObj: the displayed image, or None,
+        and the following methods, which are called as the history changes:
+        - newImage(imObj): a new image has been added to the history
+        - enableHistButtons(): old images have (or may have) been purged from the history
+        - fetchCallback(imObj): the state of an image has changed, e.g. it has been downloaded
+        - newStar(imObj, starData, isNewSel, doClear): star data has been added to an image;
+            isNewSel is True if the image's selected star has been set to this star;
+            doClear is True if older star data of this type was replaced
+        - newRadMult(imObj): the findStars radius multiplier of an image has changed
+        - newThresh(imObj): the findStars threshold of an image has changed
+        """
+        self.wdg = wdg
+
+    def imObjFromKeyVar(self, keyVar):
+        """Return imObj that matches keyVar's cmdr and cmdID, or None if none"""
+        cmdInfo = self.currCmds.getCmdInfoFromKeyVar(keyVar)
+        if not cmdInfo:
+            return None
+        return cmdInfo.imObj
+
+    def _doExistingImage(self, imageName, cmdChar, cmdr, cmdID):
+        """Data is about to arrive for an existing image.
+        Decide whether we are interested in it,
+        and if so, get ready to receive it.
+        """
+        #print "_doExistingImage(imageName=%r, cmdChar=%r, cmdr=%r, cmdID=%r" % (imageName, cmdChar, cmdr, cmdID)
+        # see if this data is of interest
+        imObj = self.imObjDict.get(imageName)
+        if not imObj:
+            # I have no knowledge of this image, so ignore the data
+            return
+        isMe = (cmdr == self.tuiModel.getCmdr())
+        if not isMe:
+            # I didn't trigger this command, so ignore the data
+            return
+
+        self.currCmds.addCmd(
+            cmdr = cmdr,
+            cmdID = cmdID,
+            cmdChar = cmdChar,
+            imObj = imObj,
+            isNewImage = False,
+        )
+
+    def _exitHandler(self):
+        """Delete all image files
+        """
+        for imObj in self.imObjDict.itervalues():
+            imObj.expire()
+
+    def _fetchCallback(self, imObj):
+        """Called when an image changes state, e.g. is finished downloading.
+        """
+        if self.wdg is not None:
+            self.wdg.fetchCallback(imObj)
+
+    def _trackMem(self, obj, objName):
+        """Print a message when an object is deleted.
+        """
+        if not _DebugMem:
+            return
+        objID = id(obj)
+        def refGone(ref=None, objID=objID, objName=objName):
+            print "GuideImageHistory deleting %s" % (objName,)
+            del(self._memDebugDict[objID])
+
+        self._memDebugDict[objID] = weakref.ref(obj, refGone)
+
+    def _updFiles(self, fileData, isCurrent, keyVar):
+        """Handle files keyword
+        """
+        #print "%s _updFiles(fileData=%r; isCurrent=%r)" % (self.actor, fileData, isCurrent)
+        if not isCurrent:
+            return
+
+        cmdChar, isNew, imageDir, imageName = fileData[0:4]
+        cmdr, cmdID = keyVar.getCmdrCmdID()
+        imageName = imageDir + imageName
+
+        if not isNew:
+            # handle data for existing image
+            self._doExistingImage(imageName, cmdChar, cmdr, cmdID)
+            return
+
+        # at this point we know we have a new image
+
+        # create new object data
+        localBaseDir = self.guideModel.ftpSaveToPref.getValue()
+        imObj = GuideImage.GuideImage(
+            localBaseDir = localBaseDir,
+            imageName = imageName,
+            downloadWdg = self.guideModel.downloadWdg,
+            fetchCallFunc = self._fetchCallback,
+            downloadGroup = self.actor,
+        )
+        self._trackMem(imObj, str(imObj))
+        self.imObjDict[imageName] = imObj
+
+        if self.wdg is not None:
+            self.wdg.newImage(imObj)
+
+        # create command info
+        self.currCmds.addCmd(
+            cmdr = cmdr,
+            cmdID = cmdID,
+            cmdChar = cmdChar,
+            imObj = imObj,
+            isNewImage = True,
+        )
+
+        # purge excess images
+        if self.wdg is not None and self.wdg.dispImObj:
+            dispImName = self.wdg.dispImObj.imageName
+        else:
+            dispImName = ()
+        isNewest = True
+        if len(self.imObjDict) > self.nToSave:
+            keys = self.imObjDict.keys()
+            for imName in keys[self.nToSave:]:
+                if imName == dispImName:
+                    if not isNewest:
+                        self.imObjDict[imName].isInSequence = False
+                    continue
+                if _DebugMem:
+                    print "Purging %r from history" % (imName,)
+                purgeImObj = self.imObjDict.pop(imName)
+                purgeImObj.expire()
+                isNewest = False
+        if self.wdg is not None:
+            self.wdg.enableHistButtons()
+
+    def _updStar(self, starData, isCurrent, keyVar):
+        """New star data found.
+
+        Overwrite existing findStars data if:
+        - No existing data and cmdr, cmdID match
+        - I generated the command
+        else ignore.
+
+        Replace existing centroid data if I generated the command,
+        else ignore.
+        """
+        #print "%s _updStar(starData=%r, isCurrent=%r)" % (self.actor, starData, isCurrent)
+        if not isCurrent:
+            return
+
+        # get data about current command
+        cmdInfo = self.currCmds.getCmdInfoFromKeyVar(keyVar)
+        if not cmdInfo:
+            return
+
+        imObj = cmdInfo.imObj
+
+        typeChar = starData[0].lower()
+        try:
+            color = self.starColorPrefDict[typeChar].getValue()
+        except KeyError:
+            raise RuntimeError("Unknown type character %r for star data" % (typeChar,))
+
+        sawStarData = cmdInfo.sawStarData(typeChar)
+
+        doClear = False
+        if cmdInfo.isNewImage:
+            if (typeChar == "c") and (cmdInfo.cmdChar == "g"):
+                # ignore "c" star data for guide images,
+                # at least until the hub stops sending it as duplicates of "g" star data
+                return
+            if typeChar in imObj.starDataDict:
+                imObj.starDataDict[typeChar].append(starData)
+            else:
+                imObj.starDataDict[typeChar] = [starData]
+        else:
+            if sawStarData:
+                if typeChar in imObj.starDataDict:
+                    imObj.starDataDict[typeChar].append(starData)
+                else:
+                    imObj.starDataDict[typeChar] = [starData]
+            else:
+                """Note: if we ever support multiple guide stars
+                then it will be important to allow multiple current centroids;
+                the trick then will be to delete any existing centroid that is "too close"
+                to the new one.
+
+                Meanwhile, it is much easier to clear out all existing data,
+                regardless of where it came from.
+                """
+                imObj.starDataDict[typeChar] = [starData]
+                doClear = True
+
+        if not sawStarData:
+            if None in starData[2:4]:
+                imObj.defSelDataColor = None
+            else:
+                imObj.defSelDataColor = (starData, color)
+            imObj.selDataColor = imObj.defSelDataColor
+
+        if self.wdg is not None:
+            self.wdg.newStar(imObj, starData, isNewSel=not sawStarData, doClear=doClear)
+
+    def _updFSActRadMult(self, radMult, isCurrent, keyVar):
+        """New radMult data found.
+        """
+#         print "%s _updFSActRadMult(radMult=%r, isCurrent=%r)" % (self.actor, radMult, isCurrent)
+        if not isCurrent:
+            return
+
+        imObj = self.imObjFromKeyVar(keyVar)
+        if imObj is None:
+            return
+
+        imObj.radMult = radMult
+
+        if self.wdg is not None:
+            self.wdg.newRadMult(imObj)
+
+    def _updFSActThresh(self, thresh, isCurrent, keyVar):
+        """New threshold data found.
+        """
+#         print "%s _updFSActThresh(thresh=%r, isCurrent=%r)" % (self.actor, thresh, isCurrent)
+        if not isCurrent:
+            return
+
+        imObj = self.imObjFromKeyVar(keyVar)
+        if imObj is None:
+            return
+
+        imObj.thresh = thresh
+
+        if self.wdg is not None:
+            self.wdg.newThresh(imObj)
+
+
+# dict of guide actor: GuideImageHistory
+_historyDict = {}
+
+def getHistory(actor):
+    """Get the image history for a guide camera, creating it if necessary
+    """
+    actor = actor.lower()
+    history = _historyDict.get(actor)
+    if history is None:
+        history = GuideImageHistory(actor)
+        _historyDict[actor] = history
+    return history
+
+def startHistories():
+    """Start collecting the image history of each guide camera that has a guide window
+
+    (i.e. each guide camera except the focus cameras, such as "afocus").
+    Call at startup, after the Downloads window is registered (since the guide model uses it).
+    """
+    for guideModel in GuideModel.modelIter():
+        if guideModel.actor.endswith("focus"):
+            continue
+        getHistory(guideModel.actor)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+"""Collect the data shown by the Guide Monitor window
+
+The data is collected whether or not the Guide Monitor window exists,
+so the window can be created when first shown (see TUI.LazyToplevelSet)
+and still show the data that arrived while it was hidden.
+
+History:
+2026-10-18 ROwen
+"""
+__all__ = ["getGuideMonitorData"]
+
+import collections
+import math
+import time
+import RO.AddCallback
+import RO.PhysConst
+import TUI.Guide.GuideModel
+import TUI.TCC.TCCModel
+
+_TimeRange = 3600 # range of time for which data is kept (sec)
+
+class DataSeries(RO.AddCallback.BaseMixin):
+    """Recent values of one quantity, and the time of each
+
+    Callback functions receive two arguments: value and time of the new point
+    (the same arguments as a strip chart line's addPoint method).
+    """
+    def __init__(self, timeRange=_TimeRange):
+        """Create a DataSeries
+
+        Inputs:
+        - timeRange: points older than this (sec) are discarded
+        """
+        RO.AddCallback.BaseMixin.__init__(self)
+        self.timeRange = float(timeRange)
+        self._pointList = collections.deque() # list of (time, value)
+
+    def addPoint(self, val, t=None):
+        """Append a new data point
+
+        Inputs:
+        - val: value; if None the point is silently ignored
+        - t: time as a POSIX timestamp (e.g. time.time()); if None then "now"
+        """
+        if val is None:
+            return
+        if t is None:
+            t = time.time()
+        self._pointList.append((t, val))
+        minTime = t - self.timeRange
+        while self._pointList[0][0] < minTime:
+            self._pointList.popleft()
+        self._basicDoCallbacks(val, t)
+
+    def getPoints(self):
+        """Return a list of (time, value) for all points, oldest first
+        """
+        return list(self._pointList)
+
+
+class GuideMonitorData(object):
+    """Data for the Guide Monitor
+
+    Do not create directly; use getGuideMonitorData.
+
+    Each of the following attributes is a DataSeries:
+    - fwhm: FWHM of guide stars (pixels)
+    - brightness: counts of guide stars (ADU)
+    - secPiston: secondary mirror piston (um)
+    - userFocus: user focus offset (um)
+    - azOff: guide offset in azimuth, on the sky (arcsec)
+    - altOff: guide offset in altitude (arcsec)
+    """
+    def __init__(self):
+        self.tccModel = TUI.TCC.TCCModel.getModel()
+
+        self.fwhm = DataSeries()
+        self.brightness = DataSeries()
+        self.secPiston = DataSeries()
+        self.userFocus = DataSeries()
+        self.azOff = DataSeries()
+        self.altOff = DataSeries()
+
+        for guideModel in TUI.Guide.GuideModel.modelIter():
+            if guideModel.gcamName.endswith("focus"):
+                continue
+            guideModel.star.addCallback(self._updStar, callNow=False)
+
+        self._addKeyVarSeries(self.secPiston, self.tccModel.secOrient)
+        self._addKeyVarSeries(self.userFocus, self.tccModel.secFocus)
+
+        self.tccModel.guideOff.addCallback(self._updGuideOff, callNow=False)
+
+    def _addKeyVarSeries(self, series, keyVar, keyInd=0):
+        """Record one value of one keyVar in a DataSeries
+        """
+        def callFunc(valList, isCurrent, keyVar=None, series=series, keyInd=keyInd):
+            if not isCurrent or not keyVar.isGenuine():
+                return
+            series.addPoint(valList[keyInd])
+
+        keyVar.addCallback(callFunc, callNow=False)
+
+    def _updGuideOff(self, *args, **kargs):
+        """Updated actual guide offset in az, alt (")
+        """
+        if not self.tccModel.guideOff.isCurrent():
+            return
+        if not self.tccModel.guideOff.isGenuine():
+            return
+
+        guideOffPVTList = self.tccModel.guideOff.get()[0]
+        if None in guideOffPVTList:
+            return
+        guideOffArcSecList = [pvt.getPos() * RO.PhysConst.ArcSecPerDeg for pvt in guideOffPVTList]
+        currAlt = self.tccModel.axePos.getInd(1)[0]
+        if currAlt is None:
+            return
+        azOffsetOnSky = guideOffArcSecList[0] * math.cos(currAlt * RO.PhysConst.RadPerDeg)
+
+        self.azOff.addPoint(azOffsetOnSky)
+        self.altOff.addPoint(guideOffArcSecList[1])
+
+    def _updStar(self, valList, isCurrent=True, keyVar=None):
+        """Updated star data
+
+        The fields are as follows, where lengths and positions are in binned pixels
+        and intensities are in ADUs:
+        0       type characer: c = centroid, f = findstars, g = guide star
+        1       index: an index identifying the star within the list of stars returned by the command.
+        2,3     x,yCenter: centroid
+        4,5     x,yError: estimated standard deviation of x,yCenter
+        6       radius: radius of centroid region
+        7       asymmetry: a measure of the asymmetry of the object;
+                the value minimized by PyGuide.centroid.
+                Warning: not normalized, so probably not much use.
+        8       FWHM major
+        9       FWHM minor
+        10      ellMajAng: angle of ellipse major axis in x,y frame (deg)
+        11      chiSq: goodness of fit to model star (a double gaussian). From PyGuide.starShape.
+        12      counts: sum of all unmasked pixels within the centroid radius. From PyGuide.centroid
+        13      background: background level of fit to model star. From PyGuide.starShape
+        14      amplitude: amplitude of fit to model star. From PyGuide.starShape
+        For "g" stars, the two following fields are added:
+        15,16   predicted x,y position
+        """
+        if not isCurrent:
+            return
+        if valList[0] != "g":
+            return
+        self.fwhm.addPoint(valList[8])
+        self.brightness.addPoint(valList[12])
+
+
+_guideMonitorData = None
+
+def getGuideMonitorData():
+    """Get the Guide Monitor data, creating it (and starting to collect data) if necessary
+    """
+    global _guideMonitorData
+    if _guideMonitorData is None:
+        _guideMonitorData = GuideMonitorData()
+    return _guideMonitorData
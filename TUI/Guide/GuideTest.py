@@ -34,12 +34,13 @@ History:
 2006-05-24 ROwen    setParams: added mode, removed count.
 2007-04-24 ROwen    Removed unused import of numarray.
 2009-04-21 ROwen    Updated for tuiModel root->tkRoot.
+2026-10-18 ROwen    Set the history length in GuideImageHistory (GuideWdg._HistLength was no longer used).
 """
 import gc
 import TUI.TUIModel
 import TUI.TUIMenu.LogWindow
 import TUI.TUIMenu.DownloadsWindow
-import GuideWdg
+import GuideImageHistory
 
 g_actor = None
 g_ccdInfo = None
@@ -121,7 +122,7 @@ def incrCmdID():
 def init(actor, bias=0, readNoise=21, ccdGain=1.6, histLen=5):
     global tuiModel, g_actor, g_ccdInfo
     
-    GuideWdg._HistLength = histLen
+    GuideImageHistory._HistLen = histLen
     
     tuiModel = TUI.TUIModel.getModel(True)
     g_actor = actor
@@ -249,8 +249,18 @@ History:
                     Switch from numpy.alltrue to numpy.all.
                     Simplify some use of numpy and specify data types where ambiguous.
 2015-11-05 ROwen    Fix a numpy warning when dealing with boresight.
+2026-10-18 ROwen    Download guide images in a download scheduler group named for the guide actor.
+2026-10-18 ROwen    Download new images as soon as they arrive (the download scheduler limits concurrency
+                    and drops superseded queued images) and decode them in background threads,
+                    so showImage only has to display ready arrays. Removed currDownload and nextDownload.
+2026-10-18 ROwen    Decoded images are kept in a shared LRU cache, so browsing the history
+                    and toggling Current usually need not read the image file.
+2026-10-18 ROwen    Fetch an image that was not downloaded while the window was hidden in a separate
+                    download group, so it does not cancel the download of the current image.
+2026-10-18 ROwen    Moved collection of the image history (files, star and findStars keywords)
+                    to GuideImageHistory, so the history is collected even if the window has not been created.
+                    Moved CmdInfo and CurrCmds to GuideImageHistory.
 """
-import atexit
 import os
 import sys
 import weakref
@@ -260,12 +270,10 @@ import numpy
 if __name__ == "__main__":
     import RO.Comm.Generic
     RO.Comm.Generic.setFramework("tk")
-import RO.Alg
 import RO.Constants
 import RO.DS9
 import RO.KeyVariable
 import RO.OS
-import RO.Prefs
 import RO.StringUtil
 from RO.Comm.Generic import Timer
 import RO.Wdg
@@ -273,12 +281,9 @@ import RO.Wdg.GrayImageDispWdg as GImDisp
 import TUI.TUIModel
 import GuideModel
 import GuideImage
+import GuideImageHistory
 import SubFrame
 import SubFrameWdg
-try:
-    set
-except NameError:
-    from sets import Set as set
 
 _DebugCtrlClick = False
 
@@ -300,78 +305,9 @@ _GuideRad = 18
 _GuideHoleRad = 9
 _GuidePredPosRad = 9
 
-_HistLen = 100
-
 _DebugMem = False # print a message when a file is deleted from disk?
 _DebugBtnEnable = False # print messages that help debug button enable?
 
-class CmdInfo(object):
-    """Information about one image-related command"""
-    Centroid = "c"
-    Findstars = "f"
-    def __init__(self,
-        cmdr,
-        cmdID,
-        cmdChar,
-        imObj,
-        isNewImage,
-    ):
-        self.cmdr = cmdr
-        self.cmdID = cmdID
-        self.cmdChar = cmdChar.lower()
-        self.imObj = imObj
-        self.isNewImage = isNewImage
-
-        self._sawStarData = set()
-
-    def sawStarData(self, dataType):
-        """Set sawStarData flag for the specified dataType and return old value of flag.
-        dataType is a character from the star keyword; it is presently one of "c", "f" or "g".
-        """
-        dataType = dataType.lower()
-        retVal = dataType in self._sawStarData
-        self._sawStarData.add(dataType)
-        return retVal
-
-    def _clear(self):
-        """Clear any data that might cause memory leaks"""
-        self.imObj = None
-
-
-class CurrCmds(object):
-    """Information about all current image-related commands"""
-    def __init__(self, timeLim=60):
-        self.timeLim = timeLim
-        self.currCmds = dict() # dict of (cmdr, cmdID): CmdInfo
-        self._cmdTimer = Timer()
-
-    def addCmd(self, cmdr, cmdID, cmdChar, imObj, isNewImage):
-        cmdInfo = CmdInfo(
-            cmdr = cmdr,
-            cmdID = cmdID,
-            cmdChar = cmdChar,
-            imObj = imObj,
-            isNewImage = isNewImage
-        )
-        self.currCmds[(cmdr, cmdID)] = cmdInfo
-        self._cmdTimer.start(self.timeLim, self.delCmdInfo, cmdInfo.cmdr, cmdInfo.cmdID)
-
-    def getCmdInfo(self, cmdr, cmdID):
-        """Return cmdInfo, or None if no such command."""
-        return self.currCmds.get((cmdr, cmdID), None)
-
-    def getCmdInfoFromKeyVar(self, keyVar):
-        """Return cmdInfo based on keyVar, or None if no such command."""
-        cmdr, cmdID = keyVar.getCmdrCmdID()
-        return self.getCmdInfo(cmdr, cmdID)
-
-    def delCmdInfo(self, cmdr, cmdID):
-        #print "deleting cmd (%s, %s)" % (cmdr, cmdID)
-        cmdInfo = self.currCmds.pop((cmdr, cmdID), None)
-        if cmdInfo:
-            cmdInfo._clear()
-
-
 class HistoryBtn(RO.Wdg.Button):
     """Arrow button to show the previous or next image in a list
     """
@@ -422,6 +358,7 @@ class GuideWdg(Tkinter.Frame):
 
         self.actor = actor
         self.guideModel = GuideModel.getModel(actor)
+        self.history = GuideImageHistory.getHistory(actor)
         self.tuiModel = TUI.TUIModel.getModel()
         self.boreXY = None
         self.ctrlClickOK = False
@@ -429,37 +366,29 @@ class GuideWdg(Tkinter.Frame):
         self.dragStart = None
         self.dragRect = None
         self.exposing = None # True, False or None if unknown
-        self.currDownload = None # image object being downloaded
-        self.nextDownload = None # next image object to download
 
         # color prefs
-        def getColorPref(prefName, defColor, isMask = False):
-            """Get a color preference. If not found, make one."""
-            pref = self.tuiModel.prefs.getPrefVar(prefName, None)
-            if pref is None:
-                pref = RO.Prefs.PrefVar.ColorPrefVar(
-                    name = prefName,
-                    defValue = "cyan",
-                )
+        def addColorPrefCallback(pref, isMask = False):
+            """Redisplay the image when a color preference changes; return the preference."""
             if isMask:
                 pref.addCallback(self.updMaskColor, callNow=False)
             else:
                 pref.addCallback(self.redisplayImage, callNow=False)
             return pref
 
+        starColorPrefDict = self.history.starColorPrefDict
         self.typeTagColorPrefDict = {
-            "c": (_CentroidTag, getColorPref("Centroid Color", "cyan")),
-            "f": (_FindTag, getColorPref("Found Star Color", "green")),
-            "g": (_GuideTag, getColorPref("Guide Star Color", "magenta")),
+            "c": (_CentroidTag, addColorPrefCallback(starColorPrefDict["c"])),
+            "f": (_FindTag, addColorPrefCallback(starColorPrefDict["f"])),
+            "g": (_GuideTag, addColorPrefCallback(starColorPrefDict["g"])),
         }
-        self.boreColorPref = getColorPref("Boresight Color", "cyan")
+        self.boreColorPref = addColorPrefCallback(GuideImageHistory.getColorPref("Boresight Color", "cyan"))
         self.maskColorPrefs = ( # for sat and bad pixel mask
-            getColorPref("Saturated Pixel Color", "red", isMask = True),
-            getColorPref("Masked Pixel Color", "green", isMask = True),
+            addColorPrefCallback(GuideImageHistory.getColorPref("Saturated Pixel Color", "red"), isMask = True),
+            addColorPrefCallback(GuideImageHistory.getColorPref("Masked Pixel Color", "green"), isMask = True),
         )
 
-        self.nToSave = _HistLen # eventually allow user to set?
-        self.imObjDict = RO.Alg.ReverseOrderedDict()
+        self.imObjDict = self.history.imObjDict
         self._memDebugDict = {}
         self.dispImObj = None # object data for most recently taken image, or None
         self.ds9Win = None
@@ -467,8 +396,6 @@ class GuideWdg(Tkinter.Frame):
         self.doingCmd = None # (cmdVar, cmdButton, isGuideOn) used for currently executing cmd
         self._btnsLaidOut = False
 
-        self.currCmds = CurrCmds()
-
         totCols = 4
 
         row=0
@@ -1070,12 +997,8 @@ class GuideWdg(Tkinter.Frame):
 
         # keyword variable bindings
         self.guideModel.expState.addCallback(self.updExpState)
-        self.guideModel.fsActRadMult.addIndexedCallback(self.updFSActRadMult)
-        self.guideModel.fsActThresh.addIndexedCallback(self.updFSActThresh)
         self.guideModel.fsDefRadMult.addIndexedCallback(self.updFSDefRadMult)
         self.guideModel.fsDefThresh.addIndexedCallback(self.updFSDefThresh)
-        self.guideModel.files.addCallback(self.updFiles)
-        self.guideModel.star.addCallback(self.updStar)
         self.guideModel.guideState.addCallback(self.updGuideState)
         self.guideModel.guideMode.addCallback(self.setGuideState)
         self.guideModel.locGuideMode.addIndexedCallback(self.updLocGuideMode)
@@ -1085,19 +1008,14 @@ class GuideWdg(Tkinter.Frame):
         tl.bind("<Control-KeyPress>", self.eraseDragRect, add=True)
         tl.bind("<Control-KeyRelease>", self.ignoreEvt, add=True)
 
-        # exit handler
-        atexit.register(self._exitHandler)
+        # show images collected while this widget did not exist, and the ones to come
+        self.history.setWdg(self)
+        if self.imObjDict and self.showCurrWdg.getBool():
+            self.showImage(self.imObjDict.values()[0])
 
         self.enableCmdButtons()
         self.enableHistButtons()
 
-    def addImToHist(self, imObj, ind=None):
-        imageName = imObj.imageName
-        if ind is None:
-            self.imObjDict[imageName] = imObj
-        else:
-            self.imObjDict.insert(ind, imageName, imObj)
-
     def areParamsModified(self):
         """Return True if any guiding parameter has been modified"""
         for wdg in self.guideParamWdgSet:
@@ -1298,30 +1216,6 @@ class GuideWdg(Tkinter.Frame):
         self.statusBar.doCmd(cmdVar, cmdSummary)
         return cmdVar
 
-    def doExistingImage(self, imageName, cmdChar, cmdr, cmdID):
-        """Data is about to arrive for an existing image.
-        Decide whether we are interested in it,
-        and if so, get ready to receive it.
-        """
-        #print "doExistingImage(imageName=%r, cmdChar=%r, cmdr=%r, cmdID=%r" % (imageName, cmdChar, cmdr, cmdID)
-        # see if this data is of interest
-        imObj = self.imObjDict.get(imageName)
-        if not imObj:
-            # I have no knowledge of this image, so ignore the data
-            return
-        isMe = (cmdr == self.tuiModel.getCmdr())
-        if not isMe:
-            # I didn't trigger this command, so ignore the data
-            return
-
-        self.currCmds.addCmd(
-            cmdr = cmdr,
-            cmdID = cmdID,
-            cmdChar = cmdChar,
-            imObj = imObj,
-            isNewImage = False,
-        )
-
     def doDragStart(self, evt):
         """Mouse down for current drag (whatever that might be).
         """
@@ -1846,17 +1740,6 @@ class GuideWdg(Tkinter.Frame):
             # a new image is ready; display it
             self.showImage(imObj)
 
-        if self.currDownload and self.currDownload.isDone():
-            # start downloading next image, if any
-            if self.nextDownload:
-                self.currDownload = self.nextDownload
-                self.nextDownload = None
-                if self.currDownload.state == imObj.Ready:
-                    # download not already started, so start it already
-                    self.currDownload.fetchFile()
-            else:
-                self.currDownload = None
-
     def getExpArgStr(self, inclThresh = True, inclRadMult = False, inclImgFile = True, modOnly = False):
         """Return exposure time, bin factor, etc.
         as a string suitable for a guide camera command.
@@ -2012,13 +1895,6 @@ class GuideWdg(Tkinter.Frame):
         """
         return self.dispImObj and (self.gim.dataArr is not None)
 
-    def imObjFromKeyVar(self, keyVar):
-        """Return imObj that matches keyVar's cmdr and cmdID, or None if none"""
-        cmdInfo = self.currCmds.getCmdInfoFromKeyVar(keyVar)
-        if not cmdInfo:
-            return None
-        return cmdInfo.imObj
-
     def isDispObj(self, imObj):
         """Return True if imObj is being displayed, else False"""
         return self.dispImObj and (self.dispImObj.imageName == imObj.imageName)
@@ -2127,22 +2003,18 @@ class GuideWdg(Tkinter.Frame):
             sys.stderr.write("GuideWdg warning: expiring display image that was not in history\n")
             self.dispImObj.expire()
 
-        fitsIm = imObj.getFITSObj() # note: this sets various useful attributes of imObj such as binFac
+        decodedIm = imObj.getDecodedImage() # note: this sets various useful attributes of imObj such as binFac
         mask = None
-        #print "fitsIm=%s, self.gim.ismapped=%s" % (fitsIm, self.gim.winfo_ismapped())
-        if fitsIm:
+        #print "decodedIm=%s, self.gim.ismapped=%s" % (decodedIm, self.gim.winfo_ismapped())
+        if decodedIm is not None:
             #self.statusBar.setMsg("", RO.Constants.sevNormal)
-            imArr = fitsIm[0].data
+            imArr = decodedIm.imArr
             if imArr is None:
                 self.gim.showMsg("Image %s has no data in plane 0" % (imObj.imageName,),
                     severity=RO.Constants.sevWarning)
                 return
-            imHdr = fitsIm[0].header
-
-            if len(fitsIm) > 1 and \
-                fitsIm[1].data.shape == imArr.shape and \
-                fitsIm[1].data.dtype == numpy.uint8:
-                mask = fitsIm[1].data
+            imHdr = decodedIm.header
+            mask = decodedIm.mask
 
         else:
             if imObj.didFail():
@@ -2151,7 +2023,7 @@ class GuideWdg(Tkinter.Frame):
                 if (imObj.state == imObj.Ready) and self.gim.winfo_ismapped():
                     # image not downloaded earlier because guide window was hidden at the time
                     # get it now
-                    imObj.fetchFile()
+                    imObj.fetchFile(onDemand=True)
                 sev = RO.Constants.sevNormal
             self.gim.showMsg(imObj.getStateStr(), sev)
             imArr = None
@@ -2315,77 +2187,55 @@ class GuideWdg(Tkinter.Frame):
 
         self.subFrameWdg.setBinFac(newBinFac)
 
-    def updFiles(self, fileData, isCurrent, keyVar):
-        """Handle files keyword
+    def newRadMult(self, imObj):
+        """The findStars radius multiplier of an image in the history has changed
         """
-        #print "%s updFiles(fileData=%r; isCurrent=%r)" % (self.actor, fileData, isCurrent)
-        if not isCurrent:
-            return
-
-        cmdChar, isNew, imageDir, imageName = fileData[0:4]
-        cmdr, cmdID = keyVar.getCmdrCmdID()
-        imageName = imageDir + imageName
-
-        if not isNew:
-            # handle data for existing image
-            self.doExistingImage(imageName, cmdChar, cmdr, cmdID)
-            return
-
-        # at this point we know we have a new image
+        if self.isDispObj(imObj):
+            self.setRadMultWdg(imObj)
 
-        # create new object data
-        localBaseDir = self.guideModel.ftpSaveToPref.getValue()
-        imObj = GuideImage.GuideImage(
-            localBaseDir = localBaseDir,
-            imageName = imageName,
-            downloadWdg = self.guideModel.downloadWdg,
-            fetchCallFunc = self.fetchCallback,
-        )
-        self._trackMem(imObj, str(imObj))
-        self.addImToHist(imObj)
+    def newThresh(self, imObj):
+        """The findStars threshold of an image in the history has changed
+        """
+        if self.isDispObj(imObj):
+            self.setThreshWdg(imObj)
 
+    def newImage(self, imObj):
+        """A new image has been added to the history
+        """
         if self.gim.winfo_ismapped():
-            if not self.currDownload:
-                # nothing being downloaded, start downloading this image
-                self.currDownload = imObj
-                imObj.fetchFile()
-                if (self.dispImObj is None or self.dispImObj.didFail()) and self.showCurrWdg.getBool():
-                    # nothing already showing so display the "downloading" message for this image
-                    self.showImage(imObj)
-            else:
-                # queue this up to be downloaded (replacing any image already there)
-                self.nextDownload = imObj
+            # start downloading this image; it is decoded in the background once downloaded
+            imObj.fetchFile()
+            if (self.dispImObj is None or self.dispImObj.didFail()) and self.showCurrWdg.getBool():
+                # nothing already showing so display the "downloading" message for this image
+                self.showImage(imObj)
         elif self.showCurrWdg.getBool():
             self.showImage(imObj)
 
-        # create command info
-        self.currCmds.addCmd(
-            cmdr = cmdr,
-            cmdID = cmdID,
-            cmdChar = cmdChar,
-            imObj = imObj,
-            isNewImage = True,
-        )
+    def newStar(self, imObj, starData, isNewSel, doClear):
+        """Star data has been added to an image in the history
 
-        # purge excess images
-        if self.dispImObj:
-            dispImName = self.dispImObj.imageName
-        else:
-            dispImName = ()
-        isNewest = True
-        if len(self.imObjDict) > self.nToSave:
-            keys = self.imObjDict.keys()
-            for imName in keys[self.nToSave:]:
-                if imName == dispImName:
-                    if not isNewest:
-                        self.imObjDict[imName].isInSequence = False
-                    continue
-                if _DebugMem:
-                    print "Purging %r from history" % (imName,)
-                purgeImObj = self.imObjDict.pop(imName)
-                purgeImObj.expire()
-                isNewest = False
-        self.enableHistButtons()
+        Inputs:
+        - imObj: the image
+        - starData: the new star data
+        - isNewSel: if True then the image's selected star has been set to this star
+        - doClear: if True then older star data of this type was replaced
+        """
+        isVisible = imObj.isDone() and self.isDispObj(imObj) and self.winfo_ismapped()
+        if not isVisible:
+            # this image is not being displayed, so we're done
+            return
+
+        if isNewSel:
+            self.showSelection()
+
+        typeChar = starData[0].lower()
+        if doClear:
+            # clear all stars of this type
+            tag = self.typeTagColorPrefDict[typeChar][0]
+            self.gim.removeAnnotation(tag)
+
+        # add this star to the display
+        self.showStar(starData)
 
     def updLocGuideMode(self, guideMode, isCurrent, keyVar):
         """New locGuideMode data found.
@@ -2493,118 +2343,6 @@ class GuideWdg(Tkinter.Frame):
             self.gim.maskInfo[ind].setColor(self.maskColorPrefs[ind].getValue())
         self.redisplayImage()
 
-    def updStar(self, starData, isCurrent, keyVar):
-        """New star data found.
-
-        Overwrite existing findStars data if:
-        - No existing data and cmdr, cmdID match
-        - I generated the command
-        else ignore.
-
-        Replace existing centroid data if I generated the command,
-        else ignore.
-        """
-        #print "%s updStar(starData=%r, isCurrent=%r)" % (self.actor, starData, isCurrent)
-        if not isCurrent:
-            return
-
-        # get data about current command
-        cmdInfo = self.currCmds.getCmdInfoFromKeyVar(keyVar)
-        if not cmdInfo:
-            return
-
-        imObj = cmdInfo.imObj
-        isVisible = imObj.isDone() and self.isDispObj(imObj) and self.winfo_ismapped()
-
-        typeChar = starData[0].lower()
-        try:
-            tag, colorPref = self.typeTagColorPrefDict[typeChar]
-            color = colorPref.getValue()
-        except KeyError:
-            raise RuntimeError("Unknown type character %r for star data" % (typeChar,))
-
-        sawStarData = cmdInfo.sawStarData(typeChar)
-
-        doClear = False
-        if cmdInfo.isNewImage:
-            if (typeChar == "c") and (cmdInfo.cmdChar == "g"):
-                # ignore "c" star data for guide images,
-                # at least until the hub stops sending it as duplicates of "g" star data
-                return
-            if typeChar in imObj.starDataDict:
-                imObj.starDataDict[typeChar].append(starData)
-            else:
-                imObj.starDataDict[typeChar] = [starData]
-        else:
-            if sawStarData:
-                if typeChar in imObj.starDataDict:
-                    imObj.starDataDict[typeChar].append(starData)
-                else:
-                    imObj.starDataDict[typeChar] = [starData]
-            else:
-                """Note: if we ever support multiple guide stars
-                then it will be important to allow multiple current centroids;
-                the trick then will be to delete any existing centroid that is "too close"
-                to the new one.
-
-                Meanwhile, it is much easier to clear out all existing data,
-                regardless of where it came from.
-                """
-                imObj.starDataDict[typeChar] = [starData]
-                doClear = True
-
-        if not sawStarData:
-            if None in starData[2:4]:
-                imObj.defSelDataColor = None
-            else:
-                imObj.defSelDataColor = (starData, color)
-            imObj.selDataColor = imObj.defSelDataColor
-            if isVisible:
-                self.showSelection()
-
-        if not isVisible:
-            # this image is not being displayed, so we're done
-            return
-
-        if doClear:
-            # clear all stars of this type
-            self.gim.removeAnnotation(tag)
-
-        # add this star to the display
-        self.showStar(starData)
-
-    def updFSActRadMult(self, radMult, isCurrent, keyVar):
-        """New radMult data found.
-        """
-#         print "%s updFSActRadMult(radMult=%r, isCurrent=%r)" % (self.actor, radMult, isCurrent)
-        if not isCurrent:
-            return
-
-        imObj = self.imObjFromKeyVar(keyVar)
-        if imObj is None:
-            return
-
-        imObj.radMult = radMult
-
-        if self.isDispObj(imObj):
-            self.setRadMultWdg(imObj)
-
-    def updFSActThresh(self, thresh, isCurrent, keyVar):
-        """New threshold data found.
-        """
-#         print "%s updFSActThresh(thresh=%r, isCurrent=%r)" % (self.actor, thresh, isCurrent)
-        if not isCurrent:
-            return
-
-        imObj = self.imObjFromKeyVar(keyVar)
-        if imObj is None:
-            return
-
-        imObj.thresh = thresh
-
-        if self.isDispObj(imObj):
-            self.setThreshWdg(imObj)
-
     def updFSDefRadMult(self, radMult, isCurrent, keyVar):
         """Saw fsDefRadMult
 
@@ -2664,12 +2402,6 @@ class GuideWdg(Tkinter.Frame):
 
         return None
 
-    def _exitHandler(self):
-        """Delete all image files
-        """
-        for imObj in self.imObjDict.itervalues():
-            imObj.expire()
-
     def _trackMem(self, obj, objName):
         """Print a message when an object is deleted.
         """
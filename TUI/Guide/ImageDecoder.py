@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+"""Decode guide images in background threads.
+
+Reading a FITS file and converting its data to numpy arrays can take long enough
+(for large frames on a slow disk) to make the guide window lag behind the guider.
+An ImageDecoder reads and decodes files using a small pool of worker threads
+and reports the results back on the Tk thread, so display only costs the blit.
+
+The worker threads (see TUI.Base.BackgroundJobRunner) never touch Tk; results are passed back
+through a queue that is polled by a Tk timer while decoding is in progress.
+
+Files are memory-mapped (see MappedImage), except on Windows, where a mapped file
+cannot be deleted (as GuideImage.expire does). Unscaled data and masks are then
+zero-copy views of the file, so only the pixels actually used are paged in.
+
+History:
+2026-10-18 ROwen
+2026-10-18 ROwen    Added MappedImage and modified decodeFITSFile to use it.
+2026-10-18 ROwen    Modified ImageDecoder to use TUI.Base.BackgroundJobRunner.
+"""
+__all__ = ["DecodedImage", "ImageDecoder", "MappedImage", "decodeFITSFile", "getDecoder", "getRegionSlices"]
+
+import mmap
+import sys
+import numpy
+try:
+    import astropy.io.fits as pyfits
+except ImportError:
+    import pyfits
+import RO.StringUtil
+import TUI.Base.BackgroundJobRunner
+
+_NumWorkers = 2
+_PollInterval = 0.05 # interval at which to check for decoded images (sec)
+_UseMemmap = not sys.platform.startswith("win")
+
+def isMapped(arr):
+    """Return True if the data of a numpy array is in a memory-mapped file"""
+    while arr is not None:
+        if isinstance(arr, (mmap.mmap, numpy.memmap)):
+            return True
+        arr = getattr(arr, "base", None)
+    return False
+
+class DecodedImage(object):
+    """Decoded contents of a guide image file
+
+    Attributes:
+    - imArr: image data (a numpy array) or None if unavailable
+    - mask: mask data (a numpy uint8 array the same shape as imArr) or None if no mask
+    - header: image header (of HDU 0), or None if unavailable
+    - errMsg: reason the data is unavailable, or None if data available
+    - mappedImage: a MappedImage if the file is memory-mapped, else None
+
+    If mappedImage is specified then imArr is computed from it when first needed,
+    and getArr and getMask read only the requested region of the file.
+    """
+    def __init__(self, imArr=None, mask=None, header=None, errMsg=None, mappedImage=None):
+        self._imArr = imArr
+        self._mask = mask
+        self.header = header
+        self.errMsg = errMsg
+        self.mappedImage = mappedImage
+
+    @property
+    def imArr(self):
+        if self._imArr is None and self.mappedImage is not None:
+            self._imArr = self.mappedImage.getArr()
+        return self._imArr
+
+    @property
+    def mask(self):
+        if self._mask is None and self.mappedImage is not None:
+            self._mask = self.mappedImage.getMask()
+        return self._mask
+
+    @property
+    def shape(self):
+        """Image shape (y, x), or None if no image data"""
+        if self._imArr is not None:
+            return self._imArr.shape
+        if self.mappedImage is not None:
+            return self.mappedImage.shape
+        return None
+
+    def load(self):
+        """Compute the full image array and mask now (e.g. in a worker thread, before display)"""
+        # the properties compute and save the data
+        self.imArr
+        self.mask
+
+    def getArr(self, begInd=None, size=None):
+        """Return image data for a region; see MappedImage.getArr for details"""
+        if self._imArr is None and self.mappedImage is not None:
+            return self.mappedImage.getArr(begInd, size)
+        if self._imArr is None:
+            return None
+        return self._imArr[getRegionSlices(self._imArr.shape, begInd, size)]
+
+    def getMask(self, begInd=None, size=None):
+        """Return mask for a region (a view), or None if no mask"""
+        mask = self.mask
+        if mask is None:
+            return None
+        return mask[getRegionSlices(mask.shape, begInd, size)]
+
+    @property
+    def nBytes(self):
+        """Approximate memory used by the data arrays (bytes)
+
+        Arrays that are views of a memory-mapped file are not counted,
+        since their pages are shared with the file cache and can be discarded.
+        """
+        nBytes = 0
+        for arr in (self._imArr, self._mask):
+            if arr is not None and not isMapped(arr):
+                nBytes += arr.nbytes
+        return nBytes
+
+    def __nonzero__(self):
+        return self.shape is not None
+
+
+class MappedImage(object):
+    """Memory-mapped access to the image and mask HDUs of a guide image FITS file
+
+    Image data is read without applying BSCALE and BZERO; getArr applies them
+    to just the requested region. If no scaling is needed then getArr returns
+    a zero-copy view of the file. Masks are never scaled, so getMask always returns a view.
+
+    Regions are specified as x,y beginning index and x,y size (unbinned pixels of this image);
+    as for SubFrame, 0,0 is the lower left pixel.
+
+    Attributes:
+    - header: header of HDU 0
+    - shape: image shape (y, x), or None if no image data
+    - bscale, bzero: data scaling from the header
+    - hasMask: True if HDU 1 contains a uint8 mask the same shape as the image
+
+    Raise RuntimeError if the file contains no HDUs.
+    """
+    def __init__(self, path):
+        self.path = path
+        fitsIm = pyfits.open(path, memmap=True, do_not_scale_image_data=True)
+        try:
+            if not fitsIm:
+                # pyfits.open can return [] for certain kinds of invalid files
+                raise RuntimeError("No image data found")
+            self.header = fitsIm[0].header
+            self._rawArr = fitsIm[0].data
+            self.bscale = self.header.get("BSCALE", 1)
+            self.bzero = self.header.get("BZERO", 0)
+            self._mask = None
+            if self._rawArr is not None and len(fitsIm) > 1:
+                maskArr = fitsIm[1].data
+                if maskArr is not None and maskArr.shape == self._rawArr.shape and maskArr.dtype == numpy.uint8:
+                    self._mask = maskArr
+        finally:
+            # the mapped arrays remain valid after the file is closed
+            fitsIm.close()
+
+    @property
+    def shape(self):
+        if self._rawArr is None:
+            return None
+        return self._rawArr.shape
+
+    @property
+    def hasMask(self):
+        return self._mask is not None
+
+    def getArr(self, begInd=None, size=None):
+        """Return image data for a region, with BSCALE and BZERO applied
+
+        Inputs:
+        - begInd: x,y index of lower left pixel of region; None for the full image
+        - size: x,y size of region; None for the rest of the image
+
+        Returns None if there is no image data.
+        """
+        if self._rawArr is None:
+            return None
+        rawArr = self._rawArr[getRegionSlices(self._rawArr.shape, begInd, size)]
+        if self.bscale == 1 and self.bzero == 0:
+            return rawArr
+        if self.bscale == 1 and self.bzero == 32768 and rawArr.dtype.kind == "i" and rawArr.dtype.itemsize == 2:
+            # unsigned 16-bit data (the usual case for guide cameras): flip the sign bit
+            uintDType = rawArr.dtype.str.replace("i", "u") # e.g. ">i2" -> ">u2"
+            return numpy.bitwise_xor(rawArr.view(uintDType), 0x8000)
+        arr = numpy.multiply(rawArr, self.bscale, dtype=numpy.float32)
+        arr += self.bzero
+        return arr
+
+    def getMask(self, begInd=None, size=None):
+        """Return the mask for a region (a view), or None if no mask
+        """
+        if self._mask is None:
+            return None
+        return self._mask[getRegionSlices(self._mask.shape, begInd, size)]
+
+
+def getRegionSlices(shape, begInd=None, size=None):
+    """Return a (y, x) tuple of slices for a region of an array, clipped to the array
+
+    Inputs:
+    - shape: array shape (y, x)
+    - begInd: x,y index of lower left pixel of region; None for 0,0
+    - size: x,y size of region; None for the rest of the array
+    """
+    if begInd is None:
+        begInd = (0, 0)
+    ySize, xSize = shape
+    if size is None:
+        size = (xSize - begInd[0], ySize - begInd[1])
+    x0 = min(xSize, max(0, int(begInd[0])))
+    y0 = min(ySize, max(0, int(begInd[1])))
+    x1 = max(x0, min(xSize, int(begInd[0] + size[0])))
+    y1 = max(y0, min(ySize, int(begInd[1] + size[1])))
+    return (slice(y0, y1), slice(x0, x1))
+
+
+def decodeFITSFile(path, useMemmap=_UseMemmap):
+    """Read a guide image FITS file and return a DecodedImage
+
+    Inputs:
+    - path: path to FITS file
+    - useMemmap: if True, memory-map the file (see MappedImage);
+        otherwise read it fully into memory and close it.
+
+    A mask is returned if HDU 1 contains uint8 data the same shape as the image.
+    Errors are reported in the errMsg attribute of the returned object.
+    """
+    try:
+        if useMemmap:
+            mappedIm = MappedImage(path)
+            if mappedIm.shape is None:
+                return DecodedImage(header=mappedIm.header, errMsg="No data in plane 0")
+            return DecodedImage(header=mappedIm.header, mappedImage=mappedIm)
+
+        fitsIm = pyfits.open(path, memmap=False)
+        try:
+            if not fitsIm:
+                # pyfits.open can return [] for certain kinds of invalid files
+                return DecodedImage(errMsg="No image data found")
+            imArr = fitsIm[0].data
+            header = fitsIm[0].header
+            mask = None
+            if imArr is None:
+                return DecodedImage(header=header, errMsg="No data in plane 0")
+            if len(fitsIm) > 1:
+                maskArr = fitsIm[1].data
+                if maskArr is not None and maskArr.shape == imArr.shape and maskArr.dtype == numpy.uint8:
+                    mask = maskArr
+            return DecodedImage(imArr=imArr, mask=mask, header=header)
+        finally:
+            fitsIm.close()
+    except Exception as e:
+        return DecodedImage(errMsg=RO.StringUtil.strFromException(e))
+
+
+class ImageDecoder(object):
+    """Decode FITS files using a pool of worker threads
+    """
+    def __init__(self, numWorkers=_NumWorkers):
+        self._jobRunner = TUI.Base.BackgroundJobRunner.BackgroundJobRunner(
+            name = "ImageDecoder",
+            jobFunc = _decodeAndLoad,
+            numWorkers = numWorkers,
+            pollInterval = _PollInterval,
+            errFunc = _decodeFailed,
+        )
+
+    def decode(self, path, callFunc):
+        """Decode a FITS file in the background
+
+        Inputs:
+        - path: path to FITS file
+        - callFunc: function to call (on the Tk thread) when decoding is finished;
+            it receives one argument: a DecodedImage
+
+        Returns a job ID that may be used to cancel the callback.
+        """
+        return self._jobRunner.submit(callFunc, path)
+
+    def cancel(self, jobID):
+        """Cancel the callback for a job; the file may still be decoded
+        """
+        self._jobRunner.cancel(jobID)
+
+    @property
+    def nPending(self):
+        """Number of jobs in progress"""
+        return self._jobRunner.nPending
+
+
+def _decodeFailed(errMsg):
+    """Return a DecodedImage reporting that decoding failed"""
+    return DecodedImage(errMsg=errMsg)
+
+def _decodeAndLoad(path):
+    """Decode a FITS file and compute its full image array and mask; runs in a worker thread"""
+    decodedImage = decodeFITSFile(path)
+    try:
+        decodedImage.load()
+    except Exception as e:
+        decodedImage = DecodedImage(errMsg=RO.StringUtil.strFromException(e))
+    return decodedImage
+
+
+_theDecoder = None
+
+def getDecoder():
+    """Return the shared ImageDecoder, creating it if necessary"""
+    global _theDecoder
+    if _theDecoder is None:
+        _theDecoder = ImageDecoder()
+    return _theDecoder
+
+
+if __name__ == "__main__":
+    # Benchmark: compare eager reading with memory mapping for large guide frames.
+    # Each case runs in a forked process so that peak RSS can be measured independently.
+    # "Display" is simulated by scaling the displayed region to 8 bits, as the image display widget does.
+    import os
+    import resource
+    import shutil
+    import tempfile
+    import time
+
+    NumReps = 5
+    ImSizeList = (1024, 2048, 4096)
+    SubSize = 256 # size of displayed subregion for the "sub" cases
+
+    def writeTestFile(path, size):
+        # unsigned 16-bit data is typical of guide cameras; it is stored with BZERO=32768
+        imArr = numpy.random.randint(0, 60000, size=(size, size)).astype(numpy.uint16)
+        maskArr = (imArr > 59000).astype(numpy.uint8)
+        pyfits.HDUList([pyfits.PrimaryHDU(imArr), pyfits.ImageHDU(maskArr)]).writeto(path)
+
+    def display(arr, mask):
+        fArr = numpy.asarray(arr, dtype=numpy.float32)
+        minVal, maxVal = fArr.min(), fArr.max()
+        scaled = ((fArr - minVal) * (255.0 / max(maxVal - minVal, 1))).astype(numpy.uint8)
+        if mask is not None:
+            scaled[numpy.asarray(mask) > 0] = 255
+        return scaled
+
+    def runCase(path, useMemmap, size, doSub):
+        begInd = ((size - SubSize) // 2,) * 2 if doSub else None
+        subSize = (SubSize, SubSize) if doSub else None
+        t0 = time.time()
+        for rep in range(NumReps):
+            decodedIm = decodeFITSFile(path, useMemmap=useMemmap)
+            if decodedIm.errMsg:
+                raise RuntimeError(decodedIm.errMsg)
+            display(decodedIm.getArr(begInd, subSize), decodedIm.getMask(begInd, subSize))
+        return (time.time() - t0) / NumReps
+
+    def runForked(*args):
+        readFd, writeFd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(readFd)
+            startRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            dt = runCase(*args)
+            peakRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            os.write(writeFd, "%r %r" % (dt, peakRSS - startRSS))
+            os._exit(0)
+        os.close(writeFd)
+        result = os.read(readFd, 1000)
+        os.close(readFd)
+        os.waitpid(pid, 0)
+        dt, dRSS = [float(val) for val in result.split()]
+        rssScale = 1.0e6 if sys.platform == "darwin" else 1.0e3 # ru_maxrss is bytes on MacOS, else kB
+        return dt, dRSS / rssScale
+
+    tempDir = tempfile.mkdtemp()
+    try:
+        print "%6s %-5s %-7s %10s %14s" % ("size", "area", "access", "time (ms)", "peak RSS (MB)")
+        for size in ImSizeList:
+            path = os.path.join(tempDir, "im%d.fits" % (size,))
+            writeTestFile(path, size)
+            for doSub in (False, True):
+                for useMemmap in (False, True):
+                    dt, dRSS = runForked(path, useMemmap, size, doSub)
+                    print "%6d %-5s %-7s %10.1f %14.1f" % (size, "sub" if doSub else "full",
+                        "mmap" if useMemmap else "eager", dt * 1000, dRSS)
+    finally:
+        shutil.rmtree(tempDir)
@@ -28,6 +28,9 @@ History:
 					Changed format from %.1f to %.0f.
 2010-01-19 ROwen    Bug fix: some help strings said Echelle instead of NA2.
 2012-07-09 ROwen    Removed some unused imports.
+2026-10-18 ROwen    Added LoadEagerly.
+2026-10-18 ROwen    Removed LoadEagerly; the image history is now collected by TUI.Guide.GuideImageHistory,
+                    which is started at startup by TUI.BackgroundTasks.startDataCollectors.
 """
 import Tkinter
 import TUI.Base.FocusWdg
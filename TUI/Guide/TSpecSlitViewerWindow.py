@@ -4,6 +4,9 @@
 History:
 2008-03-14 ROwen
 2008-05-14 Added support for background subtraction.
+2026-10-18 ROwen    Added LoadEagerly.
+2026-10-18 ROwen    Removed LoadEagerly; the image history is now collected by TUI.Guide.GuideImageHistory,
+                    which is started at startup by TUI.BackgroundTasks.startDataCollectors.
 """
 import Tkinter
 import RO.Alg
@@ -4,6 +4,9 @@
 History:
 2015-07-31 CS       Created
 2016-01-25 CS       Use statusBar.doCmd instead of script runner for config
+2026-10-18 ROwen    Added LoadEagerly.
+2026-10-18 ROwen    Removed LoadEagerly; images are now downloaded by the exposure model,
+                    which is created at startup by TUI.BackgroundTasks.startDataCollectors.
 """
 import RO.Alg
 import TUI.Inst.ExposeWdg
@@ -14,6 +14,9 @@ History:
 2010-09-20 ROwen    Modified Abort and Stop to command agile directly instead of going through agileExpose;
                     this works around a bug in agileExpose whereby it goes catatonic when it receives
                     stop or abort.
+2026-10-18 ROwen    Added LoadEagerly.
+2026-10-18 ROwen    Removed LoadEagerly; images are now downloaded by the exposure model,
+                    which is created at startup by TUI.BackgroundTasks.startDataCollectors.
 """
 import RO.Alg
 import TUI.Inst.ExposeWdg
@@ -22,6 +22,9 @@ History:
 2008-02-12 ROwen    Modified to use InstName for the Expose window.
 2008-03-13 ROwen    Simplified the test code (copying that for NICFPS).
 2011-08-11 ROwen    Modified to save state.
+2026-10-18 ROwen    Added LoadEagerly.
+2026-10-18 ROwen    Removed LoadEagerly; images are now downloaded by the exposure model,
+                    which is created at startup by TUI.BackgroundTasks.startDataCollectors.
 """
 import RO.Alg
 import TUI.Inst.ExposeWdg
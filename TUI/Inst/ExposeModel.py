@@ -91,6 +91,8 @@ Notes:
 2015-09-22 ROwen    Renamed Arctic to ARCTIC
 2015-10-01 ROwen    Reduced ARCTIC min exposure time from 0.25 sec to 0.1 sec
 2016-04-19 ROwen    Remove GIFS info
+2026-10-18 ROwen    Play the exposureFailed sound cue here (formerly done by ExposeStatusWdg),
+                    so it is played even if no exposure status widget exists for the instrument.
 """
 __all__ = ['getModel', "GuiderActorNameDict"]
 
@@ -102,6 +104,7 @@ import RO.DS9
 import RO.KeyVariable
 import RO.SeqUtil
 import RO.StringUtil
+import TUI.PlaySound
 import TUI.TUIModel
 import FileGetter
 
@@ -356,6 +359,7 @@ class Model(object):
         instActor = self.instInfo.instActor
 
         self.tuiModel = TUI.TUIModel.getModel()
+        self._wasFailed = None # was last exposure state failed or failing? True, False or None if unknown
 
         keyVarFact = RO.KeyVariable.KeyVarFactory(
             actor = self.actor,
@@ -584,13 +588,23 @@ class Model(object):
         return " ".join(outStrList)
 
     def _updExpState(self, expState, isCurrent, keyVar):
-        """Set the durations to None (unknown) if data is from the cache"""
-        if keyVar.isGenuine():
+        """Set the durations to None (unknown) if data is from the cache;
+        otherwise play the exposureFailed sound cue if an exposure has just failed.
+        """
+        if not keyVar.isGenuine():
+            modValues = list(expState)
+            modValues[3] = None
+            modValues[4] = None
+            keyVar._valueList = tuple(modValues)
+            return
+
+        expStateStr = expState[1]
+        if not isCurrent or not expStateStr:
             return
-        modValues = list(expState)
-        modValues[3] = None
-        modValues[4] = None
-        keyVar._valueList = tuple(modValues)
+        isFailed = expStateStr.lower() in ("failing", "failed")
+        if isFailed and (self._wasFailed is not True):
+            TUI.PlaySound.exposureFailed()
+        self._wasFailed = isFailed
 
 
 def formatValList(name, valList, valFmt, numElts=None):
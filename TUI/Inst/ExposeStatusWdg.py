@@ -34,6 +34,7 @@ History:
 2011-01-19 ROwen    Play exposureFailed sound cue if exposure sequence fails.
 2011-07-21 ROwen    Renamed _updFiles to _updNewFiles for clarity.
 2015-11-05 ROwen    Changed ==/!= True/False to is/is not True/False to modernize the code.
+2026-10-18 ROwen    Moved the exposureFailed sound cue to ExposeModel, so it is played even if this widget does not exist.
 """
 __all__ = ["ExposeStatusWdg"]
 
@@ -61,7 +62,6 @@ class ExposeStatusWdg (Tkinter.Frame):
         self.expModel = ExposeModel.getModel(instName)
         self.tuiModel = self.expModel.tuiModel
         self.wasExposing = None # was last exposure state integrating or resume? True, False or None if unknown
-        self.wasFailed = None # was last exposure state failed or failing? True, False or None if unknown
         self.minExposureBeginsSoundTime = 0
         gr = RO.Wdg.Gridder(master=self, sticky="w")
 
@@ -184,16 +184,13 @@ class ExposeStatusWdg (Tkinter.Frame):
         remTime = remTime or 0.0 # change None to 0.0
         netTime = netTime or 0.0 # change None to 0.0
 
-        isFailed = False
         if lowState in ("failing", "failed"):
             errState = RO.Constants.sevError
-            isFailed = True
         elif lowState in ("paused", "aborting", "aborted"):
             errState = RO.Constants.sevWarning
         else:
             errState = RO.Constants.sevNormal
         self.expStateWdg.set(expStateStr, severity = errState)
-        isNewFailure = isFailed and (self.wasFailed is not True)
 
         isExposing = lowState in ("integrating", "resume")
         
@@ -245,11 +242,7 @@ class ExposeStatusWdg (Tkinter.Frame):
                 if self.expModel.instInfo.playExposureEnds:
                     TUI.PlaySound.exposureEnds()
 
-        if isNewFailure:
-            TUI.PlaySound.exposureFailed()
-        
         self.wasExposing = isExposing
-        self.wasFailed = isFailed
         
     def _updSeqState(self, seqState, isCurrent, **kargs):
         """sequence state has changed; seqState is:
@@ -12,12 +12,14 @@ of ExposeStatusWdg there are, to avoid downloading duplicate images.
 2011-07-27 ROwen    Updated for new location of HubModel.
 2012-08-10 ROwen    Updated for RO.Comm 3.0.
 2014-09-17 ROwen    Bug fix: __all__ was mis-set.
+2026-10-18 ROwen    Modified to download using the shared download scheduler owned by the Downloads window,
+                    so a slow download no longer blocks later exposures. "Get every" -1 supersedes
+                    queued downloads for this instrument, and "get every" N counts exposures
+                    instead of skipping queued downloads.
 """
 __all__ = ['FileGetter']
 
-import collections
 import os
-import sys
 import RO.Alg
 import RO.Astro.ImageWindow
 import RO.CnvUtil
@@ -37,32 +39,20 @@ class FileGetter (object):
         self.hubModel = TUI.Models.HubModel.getModel()
         self.tuiModel = TUI.TUIModel.getModel()
         
-        # set of active downloads; each entry is an HTTPGet object
-        self.activeDownloads = set()
-        # queue of pending downloads; each entry is a list of keyword argument dictionaries
-        # for the download widget's getFile method (one dict per camera, e.g. red and blue for DIS)
-        self.pendingDownloadArgs = collections.deque()
-        
+        # number of exposures skipped since the last download (for "get every" N)
         self.nSkipped = 0
 
         downloadTL = self.tuiModel.tlSet.getToplevel("TUI.Downloads")
         self.downloadWdg = downloadTL and downloadTL.getWdg()
+        self.scheduler = self.downloadWdg and self.downloadWdg.scheduler
         
-        if self.downloadWdg:
+        if self.scheduler:
             # set up automatic ftp; we have all the info we need
             self.exposeModel.files.addCallback(self._updFiles)
 
     def _downloadFinished(self, camName, httpGet):
         """Call when an image file has been downloaded"""
 #         print "%s._downloadFinished(camName=%s, httpGet=%s)" % (self.__class__.__name__, camName, httpGet)
-        try:
-            self.activeDownloads.remove(httpGet)
-        except Exception:
-             sys.stderr.write("FileGetter internal error: could not remove completed httpGet from activeDownloads\n")
-
-        # start next download if current set finished
-        self._handlePendingDownloads()
-        
         # display image if display wanted and camera name known and download succeeded
 #         print "viewImageVarCont=%r" % (self.exposeModel.viewImageVarCont.get())
         if self.exposeModel.viewImageVarCont.get() and (camName is not None) and (httpGet.state == httpGet.Done):
@@ -108,7 +98,8 @@ class FileGetter (object):
         getEveryNum = self.exposeModel.getEveryVarCont.get()
         if getEveryNum == 0:
             # no downloads wanted
-            self.pendingDownloadArgs.clear()
+            self.scheduler.cancel(self.instName)
+            self.nSkipped = 0
             return
 
         cmdr, dumHost, dumFromRootDir, progDir, userDir = fileInfo[0:5]
@@ -158,56 +149,14 @@ class FileGetter (object):
                 doneFunc = doneFunc,
             ))
 
-        self.pendingDownloadArgs.append(argList)
-        self._handlePendingDownloads()
-
-    def _handlePendingDownloads(self):
-        """Examine pending downloads and start next download, if appropriate"""
-#         print "%s._handlePendingDownloads(); there are %s active and %s pending downloads" % \
-#             (self.__class__.__name__, len(self.activeDownloads), len(self.pendingDownloadArgs),)
-        getEveryNum = self.exposeModel.getEveryVarCont.get()
-        if getEveryNum == 0:
-            # no downloads wanted
-#             print "No downloads wanted; clearing pending downloads"
-            self.pendingDownloadArgs.clear()
-            return
-        
-        if self.activeDownloads:
-            # make sure these are all truly active; this should never happen,
-            # but the consequences are severe so be paranoid
-            trulyActiveDownloads = [dl for dl in self.activeDownloads if not dl.isDone]
-            if len(trulyActiveDownloads) != len(self.activeDownloads):
-#                 print "warning: purging activeDownloads of %d completed downloads" % \
-#                     (len(self.activeDownloads) - len(trulyActiveDownloads))
-                self.activeDownloads = set(trulyActiveDownloads)
-            if self.activeDownloads:
-#                 print "There are %d active downloads; don't start a new one" % (len(self.activeDownloads),)
-                return
-
-        argList = []
         if getEveryNum > 0:
-            # nToSkip = getEveryNum - 1
-            nPending = len(self.pendingDownloadArgs)
-            if nPending >= getEveryNum:
-#                 print "Purge first %d entries from pendingDownloads and download the next" % (getEveryNum-1,)
-                # deques don't handle slicing, unfortunately
-                for x in range(getEveryNum-1):
-                    del(self.pendingDownloadArgs[0])
-                argList = self.pendingDownloadArgs.popleft()
-#             else:
-#                 print "There are not enough pending downloads yet; waiting"
-        elif getEveryNum < 0:
-            # start most recent images; ditch the rest
-#             print "Download last image in pending downloads and clear the rest"
-            if self.pendingDownloadArgs:
-                argList = self.pendingDownloadArgs.pop()
-                self.pendingDownloadArgs.clear()
-
-        for argDict in argList:
-            httpGet = self.downloadWdg.getFile(**argDict)
-            if not httpGet.isDone:
-                try:
-                    self.activeDownloads.add(httpGet)
-                except Exception:
-#                     print "self.activeDownloads=%r" % (self.activeDownloads,)
-                    raise
+            # download every Nth exposure
+            if self.nSkipped < getEveryNum - 1:
+                self.nSkipped += 1
+                return
+            self.nSkipped = 0
+            self.scheduler.submit(self.instName, argList)
+        else:
+            # download the most recent exposure; ditch any queued older exposures
+            self.nSkipped = 0
+            self.scheduler.submit(self.instName, argList, supersede=True)
@@ -7,6 +7,9 @@ History:
 2008-02-12 ROwen    Misfeature fix: was using instName=Expose for the expose window.
 2011-08-11 ROwen    Modified to save state.
 2014-02-03 ROwen    Updated to use modernized TestData.
+2026-10-18 ROwen    Added LoadEagerly.
+2026-10-18 ROwen    Removed LoadEagerly; images are now downloaded by the exposure model,
+                    which is created at startup by TUI.BackgroundTasks.startDataCollectors.
 """
 import RO.Alg
 import TUI.Inst.ExposeWdg
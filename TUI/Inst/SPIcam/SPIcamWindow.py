@@ -8,6 +8,9 @@ History:
 2008-03-13 ROwen    Simplified the test code (copying that for NICFPS).
 2011-08-11 ROwen    Modified to save state.
 2014-02-03 ROwen    Updated to use modernized TestData.
+2026-10-18 ROwen    Added LoadEagerly.
+2026-10-18 ROwen    Removed LoadEagerly; images are now downloaded by the exposure model,
+                    which is created at startup by TUI.BackgroundTasks.startDataCollectors.
 """
 import RO.Alg
 import TUI.Inst.ExposeWdg
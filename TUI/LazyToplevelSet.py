@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+"""A set of toplevels (windows) whose window modules are loaded when first needed.
+
+Importing a window module and constructing its widgets can be slow
+(many modules import matplotlib, numpy or pyfits and create instrument models),
+so TUI registers its window modules using a manifest: for each window module
+a list of the windows it creates, with default geometry and visibility.
+The module is imported and its addWindow function called the first time one of its windows
+is requested (e.g. is shown from a menu), or at startup if the geometry file
+(or the default) says one of its windows should be visible.
+
+Data that a window shows but that arrives while the window is hidden (such as a guide image history)
+should be collected outside the window, e.g. by a model or by TUI.BackgroundTasks.startDataCollectors.
+If that is not practical, the window module may set module variable LoadEagerly = True;
+such modules are loaded at startup (see loadVisibleModules).
+
+Window modules in TUIAdditions are loaded at startup unless they opt in to lazy loading
+by setting module variable LoadLazily = True; see TUI.WindowModuleUtil.loadWindows.
+
+History:
+2026-10-18 ROwen
+"""
+__all__ = ["LazyToplevelSet"]
+
+import collections
+import sys
+import traceback
+import RO.Constants
+import RO.Wdg
+
+class _UnloadedToplevel(object):
+    """Geometry, visibility and state of a window whose module has not been loaded
+
+    Provides just enough of the RO.Wdg.Toplevel interface for RO.Wdg.ToplevelSet.writeGeomVisFile;
+    the values are those read from the geometry file, else the defaults.
+    """
+    def __init__(self, tlSet, name):
+        self.tlSet = tlSet
+        self.name = name
+
+    def getGeometry(self):
+        return self.tlSet.getDesGeom(self.name)
+
+    def getVisible(self):
+        return self.tlSet.fileVisDict.get(self.name, False)
+
+    def getDoSaveState(self):
+        return bool(self.tlSet.fileState.get(self.name))
+
+    def getStateIsDefault(self):
+        return self.tlSet.fileState.get(self.name, {}), False
+
+
+class LazyToplevelSet(RO.Wdg.ToplevelSet):
+    """A ToplevelSet that supports lazily loaded window modules.
+
+    Inputs are the same as RO.Wdg.ToplevelSet, plus:
+    - logFunc: function for logging messages, or None if no logging wanted;
+        see TUI.WindowModuleUtil.loadWindows for details
+
+    Windows registered with addLazyModule are included in getNames (and thus in TUI's menus)
+    even though they do not yet exist. getToplevel (and thus makeVisible) loads the window's module,
+    if necessary, so the window is created on demand.
+    """
+    def __init__(self,
+        fileName = None,
+        defGeomVisDict = None,
+        createFile = False,
+        logFunc = None,
+    ):
+        RO.Wdg.ToplevelSet.__init__(self,
+            fileName = fileName,
+            defGeomVisDict = defGeomVisDict,
+            createFile = createFile,
+        )
+        self.logFunc = logFunc
+        # dict of window name: name of module that creates the window, for windows not yet loaded;
+        # ordered so modules are loaded in the order in which they were registered
+        self._lazyModuleDict = collections.OrderedDict()
+        # if True then getToplevel returns an _UnloadedToplevel for windows not yet loaded
+        self._isWritingGeom = False
+
+    def addLazyModule(self, moduleName, windowInfoList):
+        """Register a window module to be loaded when one of its windows is first needed
+
+        Inputs:
+        - moduleName: full name of window module, e.g. "TUI.TCC.SkyWindow";
+            it must have a function addWindow(tlSet)
+        - windowInfoList: a list of (window name, default geometry, default visible)
+            for each window the module creates, where:
+            - default geometry is a Tk geometry string, or "" if none
+            - default visible is a bool, or None if none
+
+        Raise RuntimeError if any of the windows already exists or is registered.
+        """
+        for name, defGeom, defVisible in windowInfoList:
+            if name in self._lazyModuleDict or RO.Wdg.ToplevelSet.getToplevel(self, name):
+                raise RuntimeError("toplevel %r already exists" % (name,))
+        for name, defGeom, defVisible in windowInfoList:
+            self._lazyModuleDict[name] = moduleName
+            if defGeom:
+                self.defGeomDict[name] = defGeom
+            if defVisible is not None:
+                self.defVisDict[name] = bool(defVisible)
+
+    def getNames(self, prefix=""):
+        """Return all window names of windows that start with the specified prefix
+        (or all names if prefix omitted), including windows that have not yet been loaded.
+
+        The names are in alphabetical order, ignoring case.
+        The list includes toplevels that have been destroyed.
+        """
+        nameList = self.tlDict.keys() + self._lazyModuleDict.keys()
+        nameList.sort(key=lambda s: s.lower())
+        if not prefix:
+            return nameList
+        return [name for name in nameList if name.startswith(prefix)]
+
+    def getToplevel(self, name):
+        """Return the named Toplevel, or None of it does not exist.
+
+        If the window has not yet been loaded then load its module.
+        """
+        moduleName = self._lazyModuleDict.get(name)
+        if moduleName is not None:
+            if self._isWritingGeom:
+                return _UnloadedToplevel(self, name)
+            self.loadModule(moduleName)
+        return RO.Wdg.ToplevelSet.getToplevel(self, name)
+
+    def isLoaded(self, name):
+        """Return True if the named window is not waiting to be loaded
+        """
+        return name not in self._lazyModuleDict
+
+    def loadModule(self, moduleName):
+        """Import a window module and call its addWindow function.
+
+        Any windows registered for the module by addLazyModule are no longer pending,
+        even if the load fails (so a broken module is not repeatedly reloaded).
+
+        Return a list of (window name, default geometry, default visible) for each window created,
+        in the form required by addLazyModule, or None if the load failed.
+        """
+        for name, lazyModuleName in self._lazyModuleDict.items():
+            if lazyModuleName == moduleName:
+                del self._lazyModuleDict[name]
+
+        oldNameSet = set(self.tlDict.iterkeys())
+        try:
+            module = __import__(moduleName, globals(), locals(), "addWindow")
+            module.addWindow(self)
+        except Exception as e:
+            errMsg = "%s.addWindow failed: %s" % (moduleName, e)
+            if self.logFunc:
+                self.logFunc(errMsg, severity=RO.Constants.sevError)
+            sys.stderr.write(errMsg + "\n")
+            traceback.print_exc(file=sys.stderr)
+            return None
+
+        return [(name, self.defGeomDict.get(name, ""), self.defVisDict.get(name))
+            for name in sorted(set(self.tlDict.iterkeys()) - oldNameSet)]
+
+    def loadVisibleModules(self, eagerModuleNames=()):
+        """Load the modules of all pending windows that should be visible,
+        according to the geometry file or the window's default visibility.
+
+        Inputs:
+        - eagerModuleNames: names of additional modules to load, even if their windows are hidden
+
+        Modules are loaded in the order in which they were registered.
+        """
+        moduleNameList = []
+        for name, moduleName in self._lazyModuleDict.items():
+            if (self.getDesVisible(name) or moduleName in eagerModuleNames) and moduleName not in moduleNameList:
+                moduleNameList.append(moduleName)
+        for moduleName in moduleNameList:
+            self.loadModule(moduleName)
+
+    def writeGeomVisFile(self, fileName=None, readFirst = True):
+        """Writes toplevel geometry and visiblity info to a file
+        that readGeomVisFile can read.
+
+        Windows that have not been loaded are written with the values from the geometry file
+        (if any), else their default values; they are not loaded.
+        """
+        self._isWritingGeom = True
+        try:
+            RO.Wdg.ToplevelSet.writeGeomVisFile(self, fileName=fileName, readFirst=readFirst)
+        finally:
+            self._isWritingGeom = False
+
+
+if __name__ == "__main__":
+    # benchmark cold start: the time for a new process to create the TUI model and load
+    # TUI's standard windows, with and without lazy loading of window modules
+    import subprocess
+
+    startupCode = """
+import time
+startTime = time.time()
+import Tkinter
+root = Tkinter.Tk()
+root.withdraw()
+import TUI.Main
+import TUI.TUIModel
+import TUI.LoadStdModules
+tuiModel = TUI.TUIModel.getModel(True)
+TUI.LoadStdModules.loadAll(lazy=%s)
+root.update_idletasks()
+print time.time() - startTime
+"""
+    nRuns = 3
+    for lazy in (False, True):
+        durationList = []
+        for i in range(nRuns):
+            output = subprocess.check_output([sys.executable, "-c", startupCode % (lazy,)])
+            durationList.append(float(output.strip().split("\n")[-1]))
+        print "lazy=%-5s startup time: median %0.2f sec; all runs %s" % \
+            (lazy, sorted(durationList)[nRuns // 2], ", ".join("%0.2f" % (dur,) for dur in durationList))
@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+"""Persistent, append-only archive of log entries, with fast time-range queries
+
+An archive consists of three append-only files that share a base path:
+- <base>.rec: one fixed-length binary record per log entry, in the order logged;
+  see RecordStruct for the format
+- <base>.msg: message strings (encoded as UTF-8), concatenated; records hold the offset and length
+- <base>.names: actor and commander names, one per line; a name's ID is its line number (starting from 0)
+
+Records and messages are read through mmap, so queries do not load the whole archive into memory.
+A sparse time index (the time of every SparseIndexStep'th record) lets time-range queries
+go straight to the relevant part of the record file.
+
+Archived entries are returned as TUI.LogSource.ArchivedLogEntry objects.
+
+TUI does not archive the log if environment variable TUI_NO_LOG_ARCHIVE is set to a nonempty value
+(e.g. for benchmarks, which should not push real logs out of the archive directory).
+
+History:
+2026-10-18 ROwen
+2026-10-18 ROwen    Added NoArchiveEnvVarName.
+"""
+import bisect
+import glob
+import mmap
+import os
+import struct
+import time
+
+import RO.Constants
+import TUI.LogSource
+import TUI.Version
+
+__all__ = ["NoArchiveEnvVarName", "LogArchive"]
+
+NoArchiveEnvVarName = "TUI_NO_LOG_ARCHIVE"
+
+# record format: TAI (float64 Python seconds), severity (int8), flags (uint8),
+# actor ID (uint32), cmdr ID (uint32), cmd ID (int32), message offset (uint64), message length (uint32)
+RecordStruct = struct.Struct("<dbBIIiQI")
+RecordSize = RecordStruct.size
+# bit flags in the flags field
+IsKeysFlag = 0x01
+
+SparseIndexStep = 512
+# appended data is flushed to disk at least this often (sec), if entries are being appended,
+# so little is lost if TUI crashes
+FlushInterval = 5.0
+# maximum number of distinct actor and commander names
+MaxNames = 2**32
+ArchivePrefix = "%sarchive" % (TUI.Version.ApplicationName.lower(),)
+MaxOldArchives = 10
+
+
+class LogArchive(object):
+    """An append-only archive of log entries
+
+    Use LogArchive.create to start a new archive for a TUI session, or construct one directly
+    to open an existing archive (e.g. to examine a previous night).
+    """
+    def __init__(self, basePath, readOnly=True):
+        """Open an archive
+
+        Inputs:
+        - basePath: path to archive files, without the extension
+        - readOnly: if True, the archive must exist and cannot be appended to;
+            if False, the archive is created if it does not exist
+        """
+        self.basePath = basePath
+        self.readOnly = bool(readOnly)
+        self.firstSeq = None
+
+        mode = "rb" if self.readOnly else "a+b"
+        self._recFile = open(basePath + ".rec", mode)
+        self._msgFile = open(basePath + ".msg", mode)
+        self._namesFile = open(basePath + ".names", mode)
+
+        self._recMap = None
+        self._msgMap = None
+        self._flushTime = time.time()
+
+        # name: ID dict and ID-indexed list of names
+        self._namesFile.seek(0)
+        self._nameList = [line.rstrip("\n") for line in self._namesFile]
+        self._nameIDDict = dict((name, ind) for ind, name in enumerate(self._nameList))
+
+        self._recFile.seek(0, os.SEEK_END)
+        self._numRecs = self._recFile.tell() // RecordSize
+        self._msgFile.seek(0, os.SEEK_END)
+        self._msgLen = self._msgFile.tell()
+
+        # sparse time index: TAI of record 0, SparseIndexStep, 2 * SparseIndexStep...
+        self._sparseTimes = []
+        if self._numRecs > 0:
+            recMap = self._getRecMap()
+            for recNum in xrange(0, self._numRecs, SparseIndexStep):
+                self._sparseTimes.append(RecordStruct.unpack_from(recMap, recNum * RecordSize)[0])
+
+    @classmethod
+    def create(cls, archiveDir, maxOldArchives=MaxOldArchives):
+        """Create a new archive for this session in archiveDir, named by the current UTC date,
+        and delete all but the newest maxOldArchives older archives.
+        """
+        if not os.path.isdir(archiveDir):
+            os.makedirs(archiveDir)
+        dateStr = time.strftime("%Y-%m-%dT%H_%M_%S", time.gmtime())
+        basePath = os.path.join(archiveDir, ArchivePrefix + dateStr)
+
+        oldBasePaths = sorted(path[:-4] for path in glob.glob(os.path.join(archiveDir, ArchivePrefix + "*.rec")))
+        for oldBasePath in oldBasePaths[:max(0, len(oldBasePaths) - maxOldArchives)]:
+            for ext in (".rec", ".msg", ".names"):
+                try:
+                    os.remove(oldBasePath + ext)
+                except OSError:
+                    pass
+
+        return cls(basePath, readOnly=False)
+
+    def append(self, logEntry):
+        """Append a log entry to the archive
+
+        Entries must be appended in order of increasing seqNum, with no gaps.
+        """
+        if self.readOnly:
+            raise RuntimeError("Archive %s is read-only" % (self.basePath,))
+        if self.firstSeq is None:
+            self.firstSeq = (logEntry.seqNum or 0) - self._numRecs
+
+        msgStr = logEntry.msgStr
+        if isinstance(msgStr, unicode):
+            msgStr = msgStr.encode("utf-8")
+        flags = IsKeysFlag if logEntry.isKeys else 0
+        self._recFile.write(RecordStruct.pack(
+            logEntry.taiSec,
+            logEntry.severity,
+            flags,
+            self._getNameID(logEntry.actor),
+            self._getNameID(logEntry.cmdr),
+            logEntry.cmdID,
+            self._msgLen,
+            len(msgStr),
+        ))
+        self._msgFile.write(msgStr)
+        if self._numRecs % SparseIndexStep == 0:
+            self._sparseTimes.append(logEntry.taiSec)
+        self._numRecs += 1
+        self._msgLen += len(msgStr)
+        if time.time() - self._flushTime >= FlushInterval:
+            self.flush()
+
+    def close(self):
+        """Close the archive"""
+        for mapObj in (self._recMap, self._msgMap):
+            if isinstance(mapObj, mmap.mmap):
+                mapObj.close()
+        self._recMap = None
+        self._msgMap = None
+        for fileObj in (self._recFile, self._msgFile, self._namesFile):
+            fileObj.close()
+
+    def flush(self):
+        """Flush appended data to disk"""
+        if not self.readOnly:
+            for fileObj in (self._namesFile, self._msgFile, self._recFile):
+                fileObj.flush()
+            self._flushTime = time.time()
+
+    def getEntriesBefore(self, seqNum, maxEntries, filterFunc=None, maxScan=None):
+        """Return up to maxEntries entries with sequence number < seqNum that pass filterFunc, oldest first
+
+        Inputs:
+        - seqNum: sequence number; only older entries are returned
+        - maxEntries: maximum number of entries to return
+        - filterFunc: a function that takes one ArchivedLogEntry and returns True to accept it;
+            if None then all entries are accepted
+        - maxScan: maximum number of entries to examine; None for no limit
+        """
+        endRec = min(seqNum - (self.firstSeq or 0), self._numRecs)
+        beginRec = 0 if maxScan is None else max(0, endRec - maxScan)
+        entryList = []
+        recNum = endRec - 1
+        while recNum >= beginRec and len(entryList) < maxEntries:
+            logEntry = self._readEntry(recNum)
+            if filterFunc is None or filterFunc(logEntry):
+                entryList.append(logEntry)
+            recNum -= 1
+        entryList.reverse()
+        return entryList
+
+    def getRecRange(self, startTAI=None, endTAI=None):
+        """Return the range of record numbers [beginRec, endRec) for entries with startTAI <= TAI < endTAI
+
+        Inputs:
+        - startTAI: start time (TAI, Python seconds); None for the beginning of the archive
+        - endTAI: end time (TAI, Python seconds); None for the end of the archive
+        """
+        return (self._findRec(startTAI, 0), self._findRec(endTAI, self._numRecs))
+
+    def query(self, startTAI=None, endTAI=None, actors=None, minSeverity=None, filterFunc=None, maxEntries=None):
+        """Return archived entries matching the specified criteria, oldest first
+
+        Inputs:
+        - startTAI: start time (TAI, Python seconds); None for the beginning of the archive
+        - endTAI: end time (TAI, Python seconds); None for the end of the archive
+        - actors: a collection of actors; None for all actors
+        - minSeverity: minimum severity (an RO.Constants.sevX constant); None for all severities
+        - filterFunc: a function that takes one ArchivedLogEntry and returns True to accept it;
+            None to accept all entries that match the other criteria
+        - maxEntries: maximum number of entries to return; None for no limit
+
+        For example, to get all tcc warnings (and worse) between two times:
+            logArchive.query(startTAI, endTAI, actors=["tcc"], minSeverity=RO.Constants.sevWarning)
+        Actor and severity are tested before the message is read, so these tests are fast.
+        """
+        beginRec, endRec = self.getRecRange(startTAI, endTAI)
+        actorIDs = None
+        if actors is not None:
+            actorIDs = set(self._nameIDDict[actor] for actor in actors if actor in self._nameIDDict)
+            if not actorIDs:
+                return []
+        recMap = self._getRecMap()
+        entryList = []
+        for recNum in xrange(beginRec, endRec):
+            if maxEntries is not None and len(entryList) >= maxEntries:
+                break
+            recData = RecordStruct.unpack_from(recMap, recNum * RecordSize)
+            if minSeverity is not None and recData[1] < minSeverity:
+                continue
+            if actorIDs is not None and recData[3] not in actorIDs:
+                continue
+            logEntry = self._entryFromRecData(recNum, recData)
+            if filterFunc is None or filterFunc(logEntry):
+                entryList.append(logEntry)
+        return entryList
+
+    def __len__(self):
+        return self._numRecs
+
+    def _entryFromRecData(self, recNum, recData):
+        """Return an ArchivedLogEntry given its record number and unpacked record data
+        """
+        taiSec, severity, flags, actorID, cmdrID, cmdID, msgOffset, msgLen = recData
+        if msgLen == 0:
+            msgStr = ""
+        else:
+            msgStr = self._getMsgMap()[msgOffset:msgOffset + msgLen]
+        try:
+            msgStr.decode("ascii")
+        except UnicodeDecodeError:
+            msgStr = msgStr.decode("utf-8", "replace")
+        return TUI.LogSource.ArchivedLogEntry(
+            taiSec = taiSec,
+            msgStr = msgStr,
+            severity = severity,
+            actor = self._nameList[actorID],
+            cmdr = self._nameList[cmdrID],
+            cmdID = cmdID,
+            isKeys = bool(flags & IsKeysFlag),
+            seqNum = recNum + (self.firstSeq or 0),
+        )
+
+    def _findRec(self, taiSec, defRec):
+        """Return the number of the first record whose TAI >= taiSec; defRec if taiSec is None
+        """
+        if taiSec is None:
+            return defRec
+        sparseInd = bisect.bisect_left(self._sparseTimes, taiSec)
+        recNum = max(0, (sparseInd - 1) * SparseIndexStep)
+        endRec = min(self._numRecs, (sparseInd + 1) * SparseIndexStep)
+        recMap = self._getRecMap()
+        while recNum < endRec and RecordStruct.unpack_from(recMap, recNum * RecordSize)[0] < taiSec:
+            recNum += 1
+        return recNum
+
+    def _getMap(self, fileObj, currMap, length):
+        """Return a read-only mmap of a file that covers at least length bytes, or None if length is 0
+        """
+        if length == 0:
+            return currMap
+        if currMap is not None and len(currMap) >= length:
+            return currMap
+        self.flush()
+        if currMap is not None:
+            currMap.close()
+        return mmap.mmap(fileObj.fileno(), length, access=mmap.ACCESS_READ)
+
+    def _getMsgMap(self):
+        self._msgMap = self._getMap(self._msgFile, self._msgMap, self._msgLen)
+        return self._msgMap
+
+    def _getNameID(self, name):
+        """Return the ID for an actor or commander name, adding it to the names file if new
+        """
+        if not name:
+            name = ""
+        nameID = self._nameIDDict.get(name)
+        if nameID is None:
+            nameID = len(self._nameList)
+            if nameID >= MaxNames:
+                raise RuntimeError("Archive %s has too many distinct names" % (self.basePath,))
+            self._nameList.append(name)
+            self._nameIDDict[name] = nameID
+            self._namesFile.write(name + "\n")
+        return nameID
+
+    def _getRecMap(self):
+        self._recMap = self._getMap(self._recFile, self._recMap, self._numRecs * RecordSize)
+        return self._recMap
+
+    def _readEntry(self, recNum):
+        """Return the ArchivedLogEntry for a given record number
+        """
+        recData = RecordStruct.unpack_from(self._getRecMap(), recNum * RecordSize)
+        return self._entryFromRecData(recNum, recData)
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    # benchmark: archive a night's worth of entries, then query a 10 minute window
+    nEntries = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    archiveDir = tempfile.mkdtemp()
+    logArchive = LogArchive.create(archiveDir)
+    actors = ("tcc", "gcam", "dis", "tlamps", "hub")
+    severities = (RO.Constants.sevDebug, RO.Constants.sevNormal, RO.Constants.sevWarning)
+    startTime = time.time()
+    logEntry = TUI.LogSource.LogEntry.__new__(TUI.LogSource.LogEntry)
+    baseTAI = 1.0e9
+    for ii in xrange(nEntries):
+        logEntry.taiSec = baseTAI + ii * 0.05
+        logEntry.msgStr = ".tcc %d tcc i AxePos=%0.4f, %0.4f, %0.4f" % (ii, ii * 0.1, ii * 0.2, ii * 0.3)
+        logEntry.actor = actors[ii % len(actors)]
+        logEntry.cmdr = ".tcc"
+        logEntry.cmdID = 0
+        logEntry.severity = severities[ii % len(severities)]
+        logEntry.isKeys = False
+        logEntry.seqNum = ii
+        logArchive.append(logEntry)
+    logArchive.flush()
+    appendTime = time.time() - startTime
+    startTime = time.time()
+    midTAI = baseTAI + nEntries * 0.025
+    resList = logArchive.query(midTAI, midTAI + 600, actors=["tcc"], minSeverity=RO.Constants.sevWarning)
+    queryTime = time.time() - startTime
+    print "archived %d entries in %0.1f sec (%0.1f usec/entry); %0.1f bytes/entry on disk" % \
+        (nEntries, appendTime, appendTime * 1e6 / nEntries,
+        (os.path.getsize(logArchive.basePath + ".rec") + os.path.getsize(logArchive.basePath + ".msg")) / float(nEntries))
+    print "found %d tcc warnings in a 10 minute window in %0.1f msec" % (len(resList), queryTime * 1000)
@@ -17,9 +17,24 @@ History:
 2012-12-07 ROwen    Modified to use RO.Astro.Tm clock correction to show correct time for timestamp
                     even if user's clock is keeping TAI or is drifting.
 2014-08-09 ROwen    Added date to the timestamp string, as YYYY-MM-DD followed by a space.
+2026-10-18 ROwen    Reduced memory use and garbage collection churn for long logs:
+                    - LogEntry uses __slots__, interns actor and cmdr, stores TAI time as a float
+                      and formats taiTimeStr lazily (with a cache, since many entries share a second).
+                    - LogEntry tags are computed on demand instead of stored as a list.
+                    - entryList is now a LogEntryRing: a fixed-size ring buffer of slots.
+                    Added a benchmark (run this module as a script).
+2026-10-18 ROwen    Added LogIndex: incremental secondary indexes of entryList by actor, command actor, cmdr,
+                    severity, command, keys and hub unique command ID; see LogSource.index.
+2026-10-18 ROwen    Added batch callbacks (addBatchCallback), which receive a list of new log entries
+                    at most once per batchInterval; use these for widgets that display many entries.
+2026-10-18 ROwen    Added setArchive: if an archive (e.g. a TUI.LogArchive.LogArchive) is set,
+                    every log entry is also appended to it.
+                    Added ArchivedLogEntry.
 """
-import time
 import collections
+import sys
+import time
+import traceback
 
 import RO.AddCallback
 import RO.Astro.Tm
@@ -28,7 +43,10 @@ from RO.TkUtil import Timer
 import TUI.Models.CmdsModel
 import TUI.Version
 
-__all__ = ["LogEntry", "LogSource"]
+__all__ = ["ArchivedLogEntry", "LogEntry", "LogEntryRing", "LogIndex", "LogSource"]
+
+ActorTagPrefix = "act_"
+CmdrTagPrefix = "cmdr_"
 
 class CmdInfo(object):
     """Data for synthesized command messages
@@ -69,42 +87,92 @@ class CmdInfo(object):
         return "%s %d %s %s" % (self.cmdr, self.cmdID, self.actor, self.cmdStr)
 
 
+def _internStr(val):
+    """Return an interned copy of a str; return other values (e.g. None or unicode) unchanged
+    """
+    if type(val) is str:
+        return intern(val)
+    return val
+
+
+class _TAITimeFormatter(object):
+    """Format TAI time (Python seconds) as YYYY-MM-DD HH:MM:SS
+
+    Caches the most recent result, since log entries arrive in bursts that share the same second.
+    """
+    def __init__(self):
+        self._cachedSec = None
+        self._cachedStr = ""
+
+    def __call__(self, taiSec):
+        intSec = int(taiSec)
+        if intSec != self._cachedSec:
+            self._cachedStr = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(intSec))
+            self._cachedSec = intSec
+        return self._cachedStr
+
+_formatTAITime = _TAITimeFormatter()
+
+
 class LogEntry(object):
     """Data for one log entry
     
     Fields include:
     - unixTime: date (unix seconds) that LogEntry was created
-    - taiTimeStr: TAI time as a string HH:MM:SS at which LogEntry was created
+    - taiSec: TAI time (Python seconds, corrected for clock drift) at which LogEntry was created
+    - taiTimeStr: TAI time as a string YYYY-MM-DD HH:MM:SS at which LogEntry was created
+      (a property, formatted from taiSec on demand)
     - msgStr: the message string
     - actor: actor who sent the reply or to whom the command was sent
     - severity: one of the RO.Constants.sevX constants
     - cmdr: commander ID
     - cmdID: command ID (an integer)
     - tags: a list of strings used as tags in a Tk Text widget; see LogSource for the standard tags
+      (a property, computed from cmdr and actor on demand)
     - cmdInfo: a CmdInfo object; None if not a synthesized command object
     - isKeys: this data is a command to, or output from, the keys actor
+    - seqNum: sequence number assigned by LogEntryRing.append; None until the entry is appended
+
+    Actor and cmdr are interned, since a log contains few distinct values of each.
     """
+    __slots__ = ("unixTime", "taiSec", "msgStr", "actor", "severity", "cmdr", "cmdID",
+        "cmdInfo", "isKeys", "seqNum")
+
     def __init__(self,
         msgStr,
         severity=RO.Constants.sevNormal,
         actor = TUI.Version.ApplicationName,
         cmdr = None,
         cmdID = 0,
-        tags = (),
+        tags = None,
         cmdInfo = None,
     ):
+        """Inputs are as for the fields, except:
+        - tags: ignored; tags are computed from cmdr and actor (accepted for backwards compatibility)
+        """
         self.unixTime = time.time()
-        currPythonSeconds = RO.Astro.Tm.getCurrPySec(self.unixTime)
-        currTAITuple= time.gmtime(currPythonSeconds - RO.Astro.Tm.getUTCMinusTAI())
-        self.taiTimeStr = time.strftime("%Y-%m-%d %H:%M:%S", currTAITuple)
+        self.taiSec = RO.Astro.Tm.getCurrPySec(self.unixTime) - RO.Astro.Tm.getUTCMinusTAI()
         self.msgStr = msgStr
-        self.actor = actor
+        self.actor = _internStr(actor)
         self.severity = severity
-        self.cmdr = cmdr
+        self.cmdr = _internStr(cmdr)
         self.cmdID = int(cmdID)
-        self.tags = tags
         self.cmdInfo = cmdInfo
-        self.isKeys = self.actor.startswith("keys") or (self.cmdInfo and self.cmdInfo.actor.startswith("keys"))
+        self.isKeys = bool(self.actor.startswith("keys") or (self.cmdInfo and self.cmdInfo.actor.startswith("keys")))
+        self.seqNum = None
+
+    @property
+    def taiTimeStr(self):
+        return _formatTAITime(self.taiSec)
+
+    @property
+    def tags(self):
+        tags = []
+        if self.cmdr:
+            tags.append(CmdrTagPrefix + self.cmdr.lower())
+        if self.actor:
+            tags.append(ActorTagPrefix + self.actor.lower())
+        return tags
 
     def getStr(self):
         """Return log entry formatted for log window
@@ -112,29 +180,230 @@ class LogEntry(object):
         return "%s %s\n" % (self.taiTimeStr, self.msgStr)
 
 
+class ArchivedLogEntry(LogEntry):
+    """A LogEntry read from a log archive (e.g. TUI.LogArchive.LogArchive)
+
+    Fields are as for LogEntry, except:
+    - unixTime is None
+    - cmdInfo is always None (so filters that rely on it will not select synthesized command entries)
+    - seqNum is the sequence number the entry had when it was logged
+    """
+    __slots__ = ()
+    def __init__(self, taiSec, msgStr, severity, actor, cmdr, cmdID, isKeys, seqNum):
+        self.unixTime = None
+        self.taiSec = taiSec
+        self.msgStr = msgStr
+        self.severity = severity
+        self.actor = actor
+        self.cmdr = cmdr
+        self.cmdID = cmdID
+        self.cmdInfo = None
+        self.isKeys = isKeys
+        self.seqNum = seqNum
+
+
+class LogEntryRing(object):
+    """A fixed-size ring buffer of LogEntry objects, oldest first
+
+    Once full, each new entry overwrites the oldest one in its slot, so no memory is allocated
+    or freed for the container itself as entries arrive.
+
+    Each appended entry is assigned a sequence number (entry.seqNum) that increases by one per entry;
+    getBySeq looks up an entry by sequence number in O(1) time.
+
+    Supports len, iteration (oldest to newest) and indexing (including negative indices).
+    """
+    __slots__ = ("maxEntries", "_slots", "_nextSeq", "_len")
+
+    def __init__(self, maxEntries):
+        """Inputs:
+        - maxEntries: the maximum number of entries held (older entries are discarded)
+        """
+        self.maxEntries = int(maxEntries)
+        if self.maxEntries < 1:
+            raise ValueError("maxEntries=%r must be positive" % (maxEntries,))
+        self._slots = [None] * self.maxEntries
+        self._nextSeq = 0
+        self._len = 0
+
+    @property
+    def firstSeq(self):
+        """Sequence number of the oldest entry held"""
+        return self._nextSeq - self._len
+
+    @property
+    def nextSeq(self):
+        """Sequence number that will be assigned to the next appended entry"""
+        return self._nextSeq
+
+    def append(self, logEntry):
+        """Append a LogEntry, discarding the oldest entry if full; return the discarded entry, or None
+        """
+        ind = self._nextSeq % self.maxEntries
+        oldEntry = self._slots[ind] if self._len == self.maxEntries else None
+        logEntry.seqNum = self._nextSeq
+        self._slots[ind] = logEntry
+        self._nextSeq += 1
+        if self._len < self.maxEntries:
+            self._len += 1
+        return oldEntry
+
+    def clear(self):
+        """Remove all entries (sequence numbers keep increasing)"""
+        self._slots = [None] * self.maxEntries
+        self._len = 0
+
+    def getBySeq(self, seqNum):
+        """Return the entry with the specified sequence number, or None if not held
+        """
+        if not (self._nextSeq - self._len <= seqNum < self._nextSeq):
+            return None
+        return self._slots[seqNum % self.maxEntries]
+
+    def iterFromSeq(self, seqNum):
+        """Iterate over entries whose sequence number is >= seqNum, oldest first
+        """
+        slots = self._slots
+        maxEntries = self.maxEntries
+        for seq in xrange(max(seqNum, self._nextSeq - self._len), self._nextSeq):
+            yield slots[seq % maxEntries]
+
+    def __getitem__(self, ind):
+        if ind < 0:
+            ind += self._len
+        if not 0 <= ind < self._len:
+            raise IndexError("index out of range")
+        return self._slots[(self._nextSeq - self._len + ind) % self.maxEntries]
+
+    def __iter__(self):
+        return self.iterFromSeq(0)
+
+    def __len__(self):
+        return self._len
+
+
+class LogIndex(object):
+    """Incremental secondary indexes of the entries in a LogEntryRing
+
+    Each index holds sequence numbers (LogEntry.seqNum), in increasing order, in a collections.deque.
+    Use LogEntryRing.getBySeq to retrieve the entries.
+
+    Indexes (dictionaries have one deque of sequence numbers per key):
+    - actorDict: LogEntry.actor
+    - cmdActorDict: LogEntry.cmdInfo.actor (only for synthesized command entries)
+    - cmdrDict: LogEntry.cmdr
+    - sevDict: LogEntry.severity
+    - uniqueCmdIDDict: LogEntry.cmdInfo.uniqueCmdID (only for synthesized command entries)
+    - cmdSeqs: synthesized command entries (those with cmdInfo)
+    - keysSeqs: entries with isKeys true
+
+    Entries must be added in the order they are appended to the ring
+    and removed in the order they are discarded (oldest first).
+    """
+    _DictAttrNames = ("actorDict", "cmdActorDict", "cmdrDict", "sevDict", "uniqueCmdIDDict")
+    def __init__(self):
+        self.clear()
+
+    def add(self, logEntry):
+        """Add a newly appended entry to the indexes"""
+        seqNum = logEntry.seqNum
+        self._addToDict(self.actorDict, logEntry.actor, seqNum)
+        self._addToDict(self.cmdrDict, logEntry.cmdr, seqNum)
+        self._addToDict(self.sevDict, logEntry.severity, seqNum)
+        if logEntry.cmdInfo:
+            self._addToDict(self.cmdActorDict, logEntry.cmdInfo.actor, seqNum)
+            self._addToDict(self.uniqueCmdIDDict, logEntry.cmdInfo.uniqueCmdID, seqNum)
+            self.cmdSeqs.append(seqNum)
+        if logEntry.isKeys:
+            self.keysSeqs.append(seqNum)
+
+    def clear(self):
+        """Remove all entries from the indexes"""
+        self.actorDict = {}
+        self.cmdActorDict = {}
+        self.cmdrDict = {}
+        self.sevDict = {}
+        self.uniqueCmdIDDict = {}
+        self.cmdSeqs = collections.deque()
+        self.keysSeqs = collections.deque()
+
+    def remove(self, logEntry):
+        """Remove a discarded entry from the indexes; it must be the oldest entry indexed"""
+        seqNum = logEntry.seqNum
+        self._removeFromDict(self.actorDict, logEntry.actor, seqNum)
+        self._removeFromDict(self.cmdrDict, logEntry.cmdr, seqNum)
+        self._removeFromDict(self.sevDict, logEntry.severity, seqNum)
+        if logEntry.cmdInfo:
+            self._removeFromDict(self.cmdActorDict, logEntry.cmdInfo.actor, seqNum)
+            self._removeFromDict(self.uniqueCmdIDDict, logEntry.cmdInfo.uniqueCmdID, seqNum)
+            if self.cmdSeqs and self.cmdSeqs[0] == seqNum:
+                self.cmdSeqs.popleft()
+        if logEntry.isKeys and self.keysSeqs and self.keysSeqs[0] == seqNum:
+            self.keysSeqs.popleft()
+
+    def getSeqSet(self, dictName, keys):
+        """Return a set of the sequence numbers of entries matching any of the specified keys of one index
+
+        Inputs:
+        - dictName: name of index dictionary, e.g. "actorDict"
+        - keys: a collection of keys; keys not in the index are ignored
+        """
+        if dictName not in self._DictAttrNames:
+            raise RuntimeError("Unknown index %r" % (dictName,))
+        indexDict = getattr(self, dictName)
+        seqSet = set()
+        for key in keys:
+            seqs = indexDict.get(key)
+            if seqs:
+                seqSet.update(seqs)
+        return seqSet
+
+    def _addToDict(self, indexDict, key, seqNum):
+        seqs = indexDict.get(key)
+        if seqs is None:
+            indexDict[key] = collections.deque((seqNum,))
+        else:
+            seqs.append(seqNum)
+
+    def _removeFromDict(self, indexDict, key, seqNum):
+        seqs = indexDict.get(key)
+        if seqs and seqs[0] == seqNum:
+            seqs.popleft()
+            if not seqs:
+                del indexDict[key]
+
+
 class LogSource(RO.AddCallback.BaseMixin):
     """Repository of messages from the dispatcher, designed for logging. A singleton.
     
     Supports callbacks via the standard interface (RO.AddCallback), including:
     - addCallback(func, callNow): register a callback function;
       whenever a log entry is added the function will be called with this LogSource as the sole argument
+
+    Also supports batch callbacks, which coalesce bursts of log entries:
+    - addBatchCallback(func): register a batch callback function; at most once per batchInterval seconds
+      (and only if new entries were logged) the function is called with two arguments:
+      this LogSource and a list of the LogEntry objects logged since the last batch callback, oldest first
     
     Useful attributes:
-    - entryList: an ordered collection of LogEntry objects
+    - entryList: a LogEntryRing of LogEntry objects (iterate over it to get entries, oldest first)
+    - index: a LogIndex of the entries in entryList (use it to quickly select entries without a full scan)
+    - archive: persistent archive of all log entries (e.g. a TUI.LogArchive.LogArchive); None if not archiving
     - lastEntry: the last entry added; None until the first entry is added
     
     Each LogEntry has the following tags:
     - act_<LogEntry.actor>
     - cmdr_<LogEntry.cmdr>
     """
-    ActorTagPrefix = "act_"
-    CmdrTagPrefix = "cmdr_"
-    def __new__(cls, dispatcher, maxEntries=40000):
+    ActorTagPrefix = ActorTagPrefix
+    CmdrTagPrefix = CmdrTagPrefix
+    def __new__(cls, dispatcher, maxEntries=40000, batchInterval=0.1):
         """Construct the singleton LogSource if not already constructed
         
         Inputs:
         - dispatcher: message dispatcher; an instance of RO.KeyDispatcher.KeyDispatcher
         - maxEntries: the maximum number of entries saved (older entries are removed)
+        - batchInterval: minimum interval between calls to batch callbacks (sec)
         """
         if hasattr(cls, 'self'):
             return cls.self
@@ -143,15 +412,21 @@ class LogSource(RO.AddCallback.BaseMixin):
         self = cls.self
 
         RO.AddCallback.BaseMixin.__init__(self)
-        self.entryList = collections.deque()
+        self.entryList = LogEntryRing(maxEntries)
+        self.index = LogIndex()
+        self.archive = None
         # dictionary of hub unique command ID: CmdInfo
         # used to keep track of running commands so I can turn cmds.CmdDone into real information
         self.cmdDict = {}
         self.lastEntry = None
-        self.maxEntries = int(maxEntries)
+        self.maxEntries = self.entryList.maxEntries
         self.dispatcher = dispatcher
         self.dispatcher.setLogFunc(self.logMsg)
         self.cmdsModel = None
+        self.batchInterval = float(batchInterval)
+        self._batchCallbacks = []
+        self._batchEntryList = []
+        self._batchTimer = Timer()
         return self
         
     def __init__(self, *args, **kargs):
@@ -159,6 +434,50 @@ class LogSource(RO.AddCallback.BaseMixin):
         # if I set the model here immediately I get infinite recursion
         Timer(0.001, self._doRegister)
     
+    def addBatchCallback(self, func):
+        """Add a batch callback function; see class doc string for details
+
+        Adding a function that is already registered has no effect.
+        """
+        if func not in self._batchCallbacks:
+            self._batchCallbacks.append(func)
+
+    def setArchive(self, archive):
+        """Set the archive: an object with an append(logEntry) method, or None for no archive
+        """
+        self.archive = archive
+
+    def removeBatchCallback(self, func, doRaise=True):
+        """Remove a batch callback function
+
+        Inputs:
+        - func: callback function to remove
+        - doRaise: raise ValueError if func is not registered?
+
+        Return True if removed, False if not found (and doRaise False).
+        """
+        if func in self._batchCallbacks:
+            self._batchCallbacks.remove(func)
+            return True
+        if doRaise:
+            raise ValueError("Batch callback %r not found" % (func,))
+        return False
+
+    def _doBatchCallbacks(self):
+        """Call all batch callbacks with the entries logged since the last call
+        """
+        batchEntryList = self._batchEntryList
+        self._batchEntryList = []
+        if not batchEntryList:
+            return
+        for func in self._batchCallbacks[:]:
+            # don't use RO.AddCallback.safeCall: on failure it prints all arguments
+            try:
+                func(self, batchEntryList)
+            except Exception:
+                sys.stderr.write("Log batch callback %s failed\n" % (func,))
+                traceback.print_exc(file=sys.stderr)
+
     def _doRegister(self):
         if not self.cmdsModel:
             self.cmdsModel = TUI.Models.CmdsModel.getModel()
@@ -240,18 +559,12 @@ class LogSource(RO.AddCallback.BaseMixin):
         if cmdr is None:
             cmdr = self.dispatcher.connection.getCmdr()
 
-        tags = []
-        if cmdr:
-            tags.append(self.CmdrTagPrefix + cmdr.lower())
-        if actor:
-            tags.append(self.ActorTagPrefix + actor.lower())
         return LogEntry(
             msgStr = msgStr,
             severity = severity,
             actor = actor,
             cmdr = cmdr,
             cmdID = cmdID,
-            tags = tags,
             cmdInfo = cmdInfo,
         )
 
@@ -284,7 +597,55 @@ class LogSource(RO.AddCallback.BaseMixin):
             cmdID = cmdID,
             cmdInfo = cmdInfo,
         )
-        self.entryList.append(self.lastEntry)
-        if len(self.entryList) > self.maxEntries:
-            self.entryList.popleft()
+        discardedEntry = self.entryList.append(self.lastEntry)
+        if discardedEntry:
+            self.index.remove(discardedEntry)
+        self.index.add(self.lastEntry)
+        if self.archive is not None:
+            try:
+                self.archive.append(self.lastEntry)
+            except Exception:
+                sys.stderr.write("Could not archive log entry; archiving disabled\n")
+                traceback.print_exc(file=sys.stderr)
+                self.archive = None
         self._doCallbacks()
+        if self._batchCallbacks:
+            self._batchEntryList.append(self.lastEntry)
+            if not self._batchTimer.isActive:
+                self._batchTimer.start(self.batchInterval, self._doBatchCallbacks)
+
+
+if __name__ == "__main__":
+    # benchmark memory use and append cost of LogEntryRing
+    import gc
+    import random
+
+    def entrySize(logEntry):
+        """Return approximate bytes used by one log entry (interned strings are shared and not counted)
+        """
+        return sys.getsizeof(logEntry) + sys.getsizeof(logEntry.msgStr) + sys.getsizeof(logEntry.taiSec) \
+            + sys.getsizeof(logEntry.unixTime)
+
+    actors = ("tcc", "gcam", "dis", "disExpose", "tlamps", "keys.tcc", "hub")
+    cmdrs = (".tcc", "TU01.me", "UW02.other", ".hub")
+    severities = (RO.Constants.sevDebug, RO.Constants.sevNormal, RO.Constants.sevWarning)
+    msgStrs = ["%s 0 tcc AxePos=%0.4f, %0.4f, %0.4f" % (ii, ii * 0.1, ii * 0.2, ii * 0.3) for ii in range(1000)]
+
+    for maxEntries in (40000, 400000):
+        ring = LogEntryRing(maxEntries)
+        nToAdd = maxEntries * 2
+        gc.collect()
+        startTime = time.time()
+        for ii in xrange(nToAdd):
+            ring.append(LogEntry(
+                msgStr = msgStrs[ii % len(msgStrs)] + " ",
+                severity = random.choice(severities),
+                actor = random.choice(actors),
+                cmdr = random.choice(cmdrs),
+                cmdID = ii,
+            ))
+        appendSec = (time.time() - startTime) / float(nToAdd)
+        entryBytes = sum(entrySize(logEntry) for logEntry in ring) / float(len(ring))
+        ringBytes = sys.getsizeof(ring._slots) / float(maxEntries)
+        print "%7d entries: %5.1f bytes/entry (+ %0.1f bytes/slot); %0.2f usec/append" % \
+            (maxEntries, entryBytes, ringBytes, appendSec * 1.0e6)
@@ -58,23 +58,34 @@ This is the main routine that calls everything else.
 2013-07-19 ROwen    Modified to print some info to stdout (e.g. the log) on startup.
                     Modified to only show the version name, not version date, in the log at startup.
 2014-02-12 ROwen    Added a call to reopen script windows.
+2026-10-18 ROwen    Enable keyword callback profiling if environment variable TUI_PROFILE_CALLBACKS is set.
+2026-10-18 ROwen    Load window modules lazily: only windows that are visible at startup are created;
+                    other windows are created when first shown.
+2026-10-18 ROwen    Added startup tracing (see TUI.StartupTrace) and the doMainLoop argument to runTUI.
+2026-10-18 ROwen    Start collecting data for lazily loaded windows (see TUI.BackgroundTasks.startDataCollectors).
 """
 import os
 import sys
 import time
 import Tkinter
 
+# start tracing startup, if requested; do this first so all imports are traced
+import TUI.StartupTrace
+TUI.StartupTrace.startFromEnv()
+
 # make sure matplotlib is configured correctly (if it is available)
-try:
-    import matplotlib
-    matplotlib.use("TkAgg")
-    # controls the background of the axis label regions (which default to gray)
-    matplotlib.rc("figure", facecolor="white")
-    matplotlib.rc("axes", titlesize="medium") # default is large, which is too big
-    matplotlib.rc("legend", fontsize="medium") # default is large, which is too big
-except ImportError:
-    pass
+with TUI.StartupTrace.phase("configure matplotlib"):
+    try:
+        import matplotlib
+        matplotlib.use("TkAgg")
+        # controls the background of the axis label regions (which default to gray)
+        matplotlib.rc("figure", facecolor="white")
+        matplotlib.rc("axes", titlesize="medium") # default is large, which is too big
+        matplotlib.rc("legend", fontsize="medium") # default is large, which is too big
+    except ImportError:
+        pass
 
+import RO.Alg
 import RO.Comm.Generic
 
 UseTwisted = False
@@ -83,28 +94,35 @@ if UseTwisted:
 else:
     RO.Comm.Generic.setFramework("tk")
 
-import TUI.BackgroundTasks
-import TUI.LoadStdModules
-import TUI.MenuBar
-import TUI.TUIPaths
-import TUI.TUIModel
-import TUI.WindowModuleUtil
-import TUI.Version
+with TUI.StartupTrace.phase("import TUI.Main dependencies"):
+    import TUI.Base.CallbackProfiler
+    import TUI.BackgroundTasks
+    import TUI.LoadStdModules
+    import TUI.MenuBar
+    import TUI.TUIPaths
+    import TUI.TUIModel
+    import TUI.WindowModuleUtil
+    import TUI.Version
 
 # hack for pyinstaller 1.3
 sys.executable = os.path.abspath(sys.executable)
 
-def runTUI():
+def runTUI(doMainLoop=True):
     """Run TUI.
+
+    Inputs:
+    - doMainLoop: if True, run the event loop; if False, return as soon as TUI is ready to connect
+        (e.g. to benchmark startup)
     """
     # must do this before setting up preferences
-    root = Tkinter.Tk()
-    root.withdraw()
-    # if console exists, hide it
-    try:
-        root.tk.call("console", "hide")
-    except Tkinter.TclError:
-        pass
+    with TUI.StartupTrace.phase("create Tk root"):
+        root = Tkinter.Tk()
+        root.withdraw()
+        # if console exists, hide it
+        try:
+            root.tk.call("console", "hide")
+        except Tkinter.TclError:
+            pass
 
     if UseTwisted:
         import twisted.internet.tksupport
@@ -113,13 +131,19 @@ def runTUI():
         reactor = twisted.internet.reactor
     
     # create and obtain the TUI model
-    tuiModel = TUI.TUIModel.getModel()
+    with TUI.StartupTrace.phase("create TUI model"):
+        tuiModel = TUI.TUIModel.getModel()
     
     if UseTwisted:
         tuiModel.reactor = reactor
     
+    # optionally profile keyword dispatching and callbacks (see TUI.Callback Profile window)
+    if TUI.Base.CallbackProfiler.installFromEnv():
+        tuiModel.logMsg("Keyword callback profiling enabled")
+
     # set up background tasks
-    backgroundHandler = TUI.BackgroundTasks.BackgroundKwds()
+    with TUI.StartupTrace.phase("BackgroundTasks"):
+        backgroundHandler = TUI.BackgroundTasks.BackgroundKwds()
 
     # get locations to look for windows
     addPathList = TUI.TUIPaths.getAddPaths()
@@ -127,21 +151,36 @@ def runTUI():
     # add additional paths to sys.path
     sys.path += addPathList
     
-    TUI.LoadStdModules.loadAll()
+    with TUI.StartupTrace.phase("LoadStdModules"):
+        TUI.LoadStdModules.loadAll()
+    
+    # collect data for windows that are not yet created; needs the Downloads window
+    with TUI.StartupTrace.phase("start data collectors"):
+        TUI.BackgroundTasks.startDataCollectors()
     
-    # load additional windows modules
-    for winPath in addPathList:
-        TUI.WindowModuleUtil.loadWindows(
-            path = winPath,
-            tlSet = tuiModel.tlSet,
-            logFunc = tuiModel.logMsg,
-        )
+    # load additional windows modules; those that set LoadLazily are loaded lazily once the windows they create are known
+    with TUI.StartupTrace.phase("load additions"):
+        try:
+            addManifestDict = RO.Alg.SavedDict(TUI.TUIPaths.getAddManifestFile())
+        except Exception as e:
+            sys.stderr.write("Could not read additions manifest file; loading all additions: %s\n" % (e,))
+            addManifestDict = None
+        for winPath in addPathList:
+            TUI.WindowModuleUtil.loadWindows(
+                path = winPath,
+                tlSet = tuiModel.tlSet,
+                logFunc = tuiModel.logMsg,
+                manifestDict = addManifestDict,
+            )
+        tuiModel.tlSet.loadVisibleModules()
 
     # load scripts
-    TUI.Base.ScriptLoader.reopenScriptWindows()
+    with TUI.StartupTrace.phase("reopen script windows"):
+        TUI.Base.ScriptLoader.reopenScriptWindows()
     
     # add the main menu
-    TUI.MenuBar.MenuBar()
+    with TUI.StartupTrace.phase("MenuBar"):
+        TUI.MenuBar.MenuBar()
     
     tuiModel.logMsg(
         "TUI Version %s: ready to connect" % (TUI.Version.VersionName,)
@@ -149,7 +188,10 @@ def runTUI():
     startTimeStr = time.strftime("%Y-%m-%dT%H:%M:%S")
     platformStr = TUI.TUIModel.getPlatform()
     sys.stdout.write("TUI %s running on %s started %s\n" % (TUI.Version.VersionName, platformStr, startTimeStr))
+    TUI.StartupTrace.finish(logFunc=tuiModel.logMsg)
 
+    if not doMainLoop:
+        return
     if UseTwisted:
         reactor.run()
     else:
@@ -30,6 +30,7 @@ History:
 2014-06-07 ROwen    Made _fixFocus more robust; it supports navigation keys in the upper pane,
                     blocks more characters from event_generate when switching to the lower pane,
                     and prints more useful information if event_generate fails.
+2026-10-18 ROwen    Added LoadEagerly.
 """
 import sys
 
@@ -42,6 +43,10 @@ import TUI.PlaySound
 
 WindowName = "Misc.Message"
 
+# load at startup even if hidden, so messages are collected (and the message sound played)
+# while the window is hidden
+LoadEagerly = True
+
 def addWindow(tlSet):
     # about window
     tlSet.createToplevel(
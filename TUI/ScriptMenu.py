@@ -24,11 +24,15 @@ History:
 2012-07-18 ROwen    Removed use of update_idletasks and an ugly Mac workaround that is no longer required.
 2014-02-12 ROwen    Moved some code to TUI.Base.ScriptLoader so other users could get to it more easily.
 2015-03-18 ROwen    Removed _RootNode.isAqua because it was not being used.
+2026-10-18 ROwen    Modified to get directory contents from TUI.Base.ScriptCache instead of listing directories,
+                    and to only check the menu when the cached directory tree has changed;
+                    posting the root menu asks the cache to rescan the script directories in the background.
 """
 import os
 import Tkinter
 import tkFileDialog
 import RO.Alg
+from TUI.Base.ScriptCache import getScriptCache
 from TUI.Base.ScriptLoader import getScriptDirs, ScriptLoader
 
 __all__ = ["getScriptMenu"]
@@ -91,26 +95,12 @@ class _MenuNode:
         newSubDict = RO.Alg.ListDict()
         didRebuild = False
         
+        scriptCache = getScriptCache()
         for path in self.pathList:
-            for baseName in os.listdir(path):
-                # reject files that would be invisible on unix
-                if baseName.startswith("."):
-                    continue
-        
-                baseBody, baseExt = os.path.splitext(baseName)
-        
-                fullPath = os.path.normpath(os.path.join(path, baseName))
-                
-                if os.path.isfile(fullPath) and baseExt.lower() == ".py":
-#                   print "checkMenu newItem[%r] = %r" % (baseBody, fullPath)
-                    newItemDict[baseBody] = fullPath
-                
-                elif os.path.isdir(fullPath) and baseExt.lower() != ".py":
-#                   print "checkMenu newSubDir[%r] = %r" % (baseBody, fullPath)
-                    newSubDict[baseName] = fullPath
-                
-#               else:
-#                   print "checkMenu ignoring %r = %r" % (baseName, fullPath)
+            dirInfo = scriptCache.getDirInfo(path)
+            newItemDict.update(dirInfo.scriptDict)
+            for baseName, fullPath in dirInfo.subDirDict.iteritems():
+                newSubDict[baseName] = fullPath
         
         if (self.itemDict != newItemDict) or (self.subDict != newSubDict):
             didRebuild = True
@@ -180,14 +170,38 @@ class _RootNode(_MenuNode):
         - pathList: list of paths to scripts, as returned by TUI.Base.ScriptLoader.getScriptDirs()
         """
         self.master = master
+        self._checkedChangeCount = None # script cache changeCount as of the last check
         _MenuNode.__init__(self, None, label, pathList)
         
     def _setMenu(self):
         self.menu = Tkinter.Menu(
             self.master,
             tearoff = False,
-            postcommand = self.checkMenu,
+            postcommand = self._doPost,
         )
+
+    def checkMenu(self, recurse=True):
+        """Check contents of menu and rebuild if anything has changed.
+        Return True if anything rebuilt.
+
+        Does nothing if the script cache has not changed since the last check.
+        """
+        scriptCache = getScriptCache()
+        changeCount = scriptCache.changeCount
+        if recurse and changeCount == self._checkedChangeCount:
+            return False
+        self.pathList = scriptCache.getScriptDirs()
+        didRebuild = _MenuNode.checkMenu(self, recurse=recurse)
+        if recurse:
+            self._checkedChangeCount = changeCount
+        return didRebuild
+
+    def _doPost(self):
+        """Called when the menu is posted: update the menu from the script cache
+        and ask the cache to rescan the script directories, so changes show up next time.
+        """
+        self.checkMenu()
+        getScriptCache().requestRefresh()
     
     def _fillMenu(self):
         """Fill the menu.
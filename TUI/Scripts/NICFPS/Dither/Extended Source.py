@@ -22,6 +22,7 @@ History:
                     Bug fix: needMove was comparing to begOffset, not currOffset.
 2008-09-23 ROwen    Fix PR 859: never finished by restoring the initial offset because end and run
                     both called needMove with self.currOffset instead of self.begOffset.
+2026-10-18 ROwen    Offset the telescope while the detector is read out (see TUI.Base.DitherSequencer).
 """
 import itertools
 import numpy
@@ -29,6 +30,7 @@ import Tkinter
 import RO.Wdg
 import TUI.TCC.TCCModel
 import TUI.Inst.ExposeModel
+from TUI.Base.DitherSequencer import DitherSequencer
 from TUI.Inst.ExposeStatusWdg import ExposeStatusWdg
 from TUI.Inst.ExposeInputWdg import ExposeInputWdg
 
@@ -50,11 +52,14 @@ class ScriptClass(object):
         sr.debug = False
         self.sr = sr
 
-        self.begOffset = numpy.array((numpy.nan, numpy.nan))
-        self.currOffset = self.begOffset[:]
-        
         self.tccModel = TUI.TCC.TCCModel.getModel()
         self.expModel = TUI.Inst.ExposeModel.getModel(InstName)
+        self.ditherSeq = DitherSequencer(
+            sr = sr,
+            expModel = self.expModel,
+            offsetCmdFmt = "offset arc %.7f, %.7f/pabs/vabs/computed",
+            seqName = "%s Dither Extended Source" % (InstName,),
+        )
     
         row=0
         
@@ -181,24 +186,14 @@ class ScriptClass(object):
         self.updOrder()
             
     def end(self, sr):
-        """If telescope offset, restore original position.
+        """Abort the exposure, if running. If telescope offset, restore original position.
         """
         self.updOrder(doForce=True)
         
-        # restore original boresight position, if changed
-        if self.needMove(self.begOffset):
-            tccCmdStr = "offset arc %.7f, %.7f/pabs/vabs/computed" % tuple(self.begOffset)
-            #print "sending tcc command %r" % tccCmdStr
-            sr.startCmd(
-                actor = "tcc",
-                cmdStr = tccCmdStr,
-            )
-
-    def needMove(self, desOffset):
-        """Return True if telescope not at desired offset"""
-        if numpy.any(numpy.isnan(self.currOffset)):
-            return False
-        return not numpy.allclose(self.currOffset, desOffset)         
+        self.ditherSeq.abort()
+        
+        # restore original object offset, if changed
+        self.ditherSeq.startRestoreOffset()
      
     def run(self, sr):
         """Take an exposure sequence.
@@ -220,11 +215,10 @@ class ScriptClass(object):
             begOffset = [pvt.getPos() for pvt in begArcPVTs]
             if None in begOffset:
                 raise sr.ScriptError("Current arc offset unknown")
-            self.begOffset = numpy.array(begOffset, dtype=float)
         else:
-            self.begOffset = numpy.zeros(2, dtype=float)
-        self.currOffset = self.begOffset[:]
-        #print "self.begOffset=%r" % self.begOffset
+            begOffset = numpy.zeros(2, dtype=float)
+        self.ditherSeq.start(begOffset)
+        #print "begOffset=%r" % begOffset
 
         ditherSize = self.boxSizeWdg.getNum() / 2.0
         doRandom = self.doRandomWdg.getBool()
@@ -282,7 +276,7 @@ class ScriptClass(object):
                 
                 srcNodeName = "%s %s" % (srcName, nodeName)
 
-                desOffset = self.begOffset + (skyOffsetDeg * onSky) + (boolWdg.offMult * ditherSizeDeg)
+                desOffset = self.ditherSeq.begOffset + (skyOffsetDeg * onSky) + (boolWdg.offMult * ditherSizeDeg)
                 if doRandom:
                     # apply random offset before each exposure at this position
                     for expInd in range(numExp):
@@ -297,11 +291,11 @@ class ScriptClass(object):
                                 (srcNodeName, randomScatterArcSec[0], randomScatterArcSec[1])
                         #print "Adding randomScatter", randomScatter
                         randomizedOffset = desOffset + randomScatter
-                        if self.needMove(randomizedOffset):
+                        if self.ditherSeq.needMove(randomizedOffset):
                             # slew telescope
                             randomScatterArcSec = randomScatter * 3600.0
                             sr.showMsg("Offset to %s" % (fullNodeName,))
-                            yield self.waitOffset(randomizedOffset)
+                            yield self.ditherSeq.waitOffset(randomizedOffset)
                             
                         
                         # format exposure command
@@ -310,11 +304,7 @@ class ScriptClass(object):
                         
                         # take exposure sequence
                         sr.showMsg("Expose at %s" % (fullNodeName,))
-                        yield sr.waitCmd(
-                            actor = self.expModel.actor,
-                            cmdStr = expCmdStr,
-                            abortCmdStr = "abort",
-                        )
+                        yield self.ditherSeq.waitExpose(expCmdStr, numExp=1)
                         numExpTaken += 1
                 else:
                     # compute # of exposures & format expose command
@@ -323,26 +313,23 @@ class ScriptClass(object):
                     expCmdStr = "%s startNum=%d" % (expCmdPrefix, startNum)
                 
                     # offset telescope
-                    if self.needMove(desOffset):
+                    if self.ditherSeq.needMove(desOffset):
                         sr.showMsg("Offset to %s position" % (srcNodeName,))
-                        yield self.waitOffset(desOffset)
+                        yield self.ditherSeq.waitOffset(desOffset)
                 
                     # take exposure sequence
                     sr.showMsg("Expose on %s position" % (srcNodeName,))
-                    yield sr.waitCmd(
-                        actor = self.expModel.actor,
-                        cmdStr = expCmdStr,
-                        abortCmdStr = "abort",
-                    )
+                    yield self.ditherSeq.waitExpose(expCmdStr, numExp=numExp)
                     
                     numExpTaken += numExp
             
             stateWdg.set("Done")
         
         # slew back to starting position
-        if self.needMove(self.begOffset):
+        if self.ditherSeq.needMove(self.ditherSeq.begOffset):
             sr.showMsg("Finishing up: slewing to initial position")
-            yield self.waitOffset(self.begOffset)
+            yield self.ditherSeq.waitOffset(self.ditherSeq.begOffset)
+        yield self.ditherSeq.waitFinish()
 
     def updOrder(self, wdg=None, doForce=False):
         """Update the order widgets
@@ -360,12 +347,3 @@ class ScriptClass(object):
                 orderNum += 1
             else:
                 orderWdg.set(None)
-    
-    def waitOffset(self, desOffset):
-        """Offset the telescope"""
-        tccCmdStr = "offset arc %.7f, %.7f/pabs/vabs/computed" % tuple(desOffset)
-        self.currOffset = desOffset[:]
-        yield self.sr.waitCmd(
-            actor = "tcc",
-            cmdStr = tccCmdStr,
-        )
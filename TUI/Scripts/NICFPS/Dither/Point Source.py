@@ -30,12 +30,14 @@ History:
 2008-09-23 ROwen    Fix PR 859: never finished by restoring the initial offset because end and run
                     both called needMove with self.currOffset instead of self.begOffset.
 2015-11-02 ROwen    Remove unused import
+2026-10-18 ROwen    Offset the telescope while the detector is read out (see TUI.Base.DitherSequencer).
 """
 import numpy
 import Tkinter
 import RO.Wdg
 import TUI.TCC.TCCModel
 import TUI.Inst.ExposeModel
+from TUI.Base.DitherSequencer import DitherSequencer
 from TUI.Inst.ExposeStatusWdg import ExposeStatusWdg
 from TUI.Inst.ExposeInputWdg import ExposeInputWdg
 
@@ -55,11 +57,14 @@ class ScriptClass(object):
         sr.debug = False
         self.sr = sr
 
-        self.begOffset = numpy.array((numpy.nan, numpy.nan))
-        self.currOffset = self.begOffset[:]
-
         self.tccModel = TUI.TCC.TCCModel.getModel()
         self.expModel = TUI.Inst.ExposeModel.getModel(InstName)
+        self.ditherSeq = DitherSequencer(
+            sr = sr,
+            expModel = self.expModel,
+            offsetCmdFmt = "offset boresight %.7f, %.7f/pabs/vabs/computed",
+            seqName = "%s Dither Point Source" % (InstName,),
+        )
     
         row=0
         
@@ -171,24 +176,14 @@ class ScriptClass(object):
         self.updOrder()
     
     def end(self, sr):
-        """If telescope offset, restore original position.
+        """Abort the exposure, if running. If telescope offset, restore original position.
         """
         self.updOrder(doForce=True)
         
+        self.ditherSeq.abort()
+        
         # restore original boresight position, if changed
-        if self.needMove(self.begOffset):
-            tccCmdStr = "offset boresight %.7f, %.7f/pabs/vabs/computed" % tuple(self.begOffset)
-            #print "sending tcc command %r" % tccCmdStr
-            sr.startCmd(
-                actor = "tcc",
-                cmdStr = tccCmdStr,
-            )
-
-    def needMove(self, desOffset):
-        """Return True if telescope not at desired offset"""
-        if numpy.any(numpy.isnan(self.currOffset)):
-            return False
-        return not numpy.allclose(self.currOffset, desOffset)         
+        self.ditherSeq.startRestoreOffset()
     
     def run(self, sr):
         """Take an exposure sequence.
@@ -210,11 +205,10 @@ class ScriptClass(object):
             begOffset = [pvt.getPos() for pvt in begBorePVTs]
             if None in begOffset:
                 raise sr.ScriptError("Current boresight position unknown")
-            self.begOffset = numpy.array(begOffset, dtype=float)
         else:
-            self.begOffset = numpy.zeros(2, dtype=float)
-        self.currOffset = self.begOffset[:]
-        #print "self.begOffset=%r" % self.begOffset
+            begOffset = numpy.zeros(2, dtype=float)
+        self.ditherSeq.start(begOffset)
+        #print "begOffset=%r" % begOffset
         
         ditherSize = self.boxSizeWdg.getNum() / 2.0
         doRandom = self.doRandomWdg.getBool()
@@ -256,7 +250,7 @@ class ScriptClass(object):
             stateWdg.set("Running")
             nodeName = str(boolWdg["text"])
             
-            desOffset = self.begOffset + (boolWdg.offMult * ditherSizeDeg)
+            desOffset = self.ditherSeq.begOffset + (boolWdg.offMult * ditherSizeDeg)
             if doRandom:
                 # apply random offset before each exposure at this position
                 for expInd in range(numExp):
@@ -271,11 +265,11 @@ class ScriptClass(object):
                             (nodeName, randomScatterArcSec[0], randomScatterArcSec[1])
                     #print "Adding randomScatter", randomScatter
                     randomizedOffset = desOffset + randomScatter
-                    if self.needMove(randomizedOffset):
+                    if self.ditherSeq.needMove(randomizedOffset):
                         # slew telescope
                         randomScatterArcSec = randomScatter * 3600.0
                         sr.showMsg("Offset to %s" % (fullNodeName,))
-                        yield self.waitOffset(randomizedOffset)
+                        yield self.ditherSeq.waitOffset(randomizedOffset)
                         
                     
                     # format exposure command
@@ -284,18 +278,14 @@ class ScriptClass(object):
                     
                     # take exposure sequence
                     sr.showMsg("Expose at %s" % (fullNodeName,))
-                    yield sr.waitCmd(
-                        actor = self.expModel.actor,
-                        cmdStr = expCmdStr,
-                        abortCmdStr = "abort",
-                    )
+                    yield self.ditherSeq.waitExpose(expCmdStr, numExp=1)
                     numExpTaken += 1
             else:
                 # no randomization; take all numExp exposures at this point
-                if self.needMove(desOffset):
+                if self.ditherSeq.needMove(desOffset):
                     # slew telescope
                     sr.showMsg("Offset to %s position" % nodeName)
-                    yield self.waitOffset(desOffset)
+                    yield self.ditherSeq.waitOffset(desOffset)
                     
                 # format exposure command
                 startNum = numExpTaken + 1
@@ -303,20 +293,17 @@ class ScriptClass(object):
                 
                 # take exposure sequence
                 sr.showMsg("Expose at %s position" % nodeName)
-                yield sr.waitCmd(
-                    actor = self.expModel.actor,
-                    cmdStr = expCmdStr,
-                    abortCmdStr = "abort",
-                )
+                yield self.ditherSeq.waitExpose(expCmdStr, numExp=numExp)
         
                 numExpTaken += numExp
 
             stateWdg.set("Done")
         
         # slew back to starting position
-        if self.needMove(self.begOffset):
+        if self.ditherSeq.needMove(self.ditherSeq.begOffset):
             sr.showMsg("Finishing up: slewing to initial position")
-            yield self.waitOffset(self.begOffset)
+            yield self.ditherSeq.waitOffset(self.ditherSeq.begOffset)
+        yield self.ditherSeq.waitFinish()
     
     def updOrder(self, wdg=None, doForce=False):
         """Update the order widgets
@@ -334,12 +321,3 @@ class ScriptClass(object):
                 orderNum += 1
             else:
                 orderWdg.set(None)
-    
-    def waitOffset(self, desOffset):
-        """Offset the telescope"""
-        tccCmdStr = "offset boresight %.7f, %.7f/pabs/vabs/computed" % tuple(desOffset)
-        self.currOffset = desOffset[:]
-        yield self.sr.waitCmd(
-            actor = "tcc",
-            cmdStr = tccCmdStr,
-        )
@@ -5,6 +5,7 @@ History:
 2008-07-24 ROwen    Fixed PR 852: end did not always restore the original boresight.
 2011-08-02 ROwen    Added variable offset and test for minimum offset.
 2012-11-13 ROwen    Stop using Checkbutton indicatoron=False because it is no longer supported on MacOS X.
+2026-10-18 ROwen    Offset the telescope while the detector is read out (see TUI.Base.DitherSequencer).
 """
 import math
 import numpy
@@ -13,6 +14,7 @@ import RO.Wdg
 import RO.PhysConst
 import TUI.TCC.TCCModel
 import TUI.Inst.ExposeModel
+import TUI.Base.DitherSequencer
 import TUI.Inst.ExposeStatusWdg
 import TUI.Inst.ExposeInputWdg
 
@@ -38,11 +40,14 @@ class ScriptClass(object):
         sr.debug = False
         self.sr = sr
 
-        self.begOffset = numpy.array((numpy.nan, numpy.nan))
-        self.currOffset = self.begOffset[:]
-
         self.tccModel = TUI.TCC.TCCModel.getModel()
         self.expModel = TUI.Inst.ExposeModel.getModel(InstName)
+        self.ditherSeq = TUI.Base.DitherSequencer.DitherSequencer(
+            sr = sr,
+            expModel = self.expModel,
+            offsetCmdFmt = "offset boresight %.7f, %.7f/pabs/vabs/computed",
+            seqName = "%s Nod" % (InstName,),
+        )
     
         row=0
         
@@ -157,22 +162,12 @@ class ScriptClass(object):
         return math.hypot(*self.getOffsetArcSec()) >= MinOffsetArcSec
 
     def end(self, sr):
-        """If telescope offset, restore original position.
+        """Abort the exposure, if running. If telescope offset, restore original position.
         """
-        # restore original boresight position, if changed
-        if self.needMove(self.begOffset):
-            tccCmdStr = "offset boresight %.7f, %.7f/pabs/vabs/computed" % tuple(self.begOffset)
-            #print "sending tcc command %r" % tccCmdStr
-            sr.startCmd(
-                actor = "tcc",
-                cmdStr = tccCmdStr,
-            )
+        self.ditherSeq.abort()
 
-    def needMove(self, desOffset):
-        """Return True if telescope not at desired offset"""
-        if numpy.any(numpy.isnan(self.currOffset)):
-            return False
-        return not numpy.allclose(self.currOffset, desOffset)         
+        # restore original boresight position, if changed
+        self.ditherSeq.startRestoreOffset()
 
     def run(self, sr):
         """Take one or more exposures while moving the object
@@ -190,11 +185,10 @@ class ScriptClass(object):
             begOffset = [pvt.getPos() for pvt in begBorePVTs]
             if None in begOffset:
                 raise sr.ScriptError("Current boresight position unknown")
-            self.begOffset = numpy.array(begOffset, dtype=float)
         else:
-            self.begOffset = numpy.zeros(2, dtype=float)
-        self.currOffset = self.begOffset[:]
-        #print "self.begOffset=%r" % self.begOffset
+            begOffset = numpy.zeros(2, dtype=float)
+        self.ditherSeq.start(begOffset)
+        #print "begOffset=%r" % begOffset
             
         numCycles = self.numCyclesWdg.getNum()
         if not numCycles:
@@ -227,28 +221,21 @@ class ScriptClass(object):
             for nodeName in nodeNames:
                 iterName = "Cycle %s of %s, Pos %s" % (cycle + 1, numCycles, nodeName)
                 nodeOffset = NodeOffsetDict[nodeName[0]]                
-                desOffset = self.begOffset + nodeOffset
-                if self.needMove(desOffset):
+                desOffset = self.ditherSeq.begOffset + nodeOffset
+                if self.ditherSeq.needMove(desOffset):
                     sr.showMsg("%s: Offsetting" % (iterName,))
-                    yield self.waitOffset(desOffset)
+                    yield self.ditherSeq.waitOffset(desOffset)
         
                 # expose
                 sr.showMsg("%s: Exposing" % (iterName,))
                 startNum = numExpTaken + 1
                 expCmdStr = "%s startNum=%s" % (expCmdPrefix, startNum)
                 #print "sending %s command %r" % (InstName, expCmdStr)
-                yield sr.waitCmd(
-                    actor = self.expModel.actor,
-                    cmdStr = expCmdStr,
-                    abortCmdStr = "abort",
-                )
+                yield self.ditherSeq.waitExpose(expCmdStr, numExp=numExpPerNode)
                 numExpTaken += numExpPerNode
-    
-    def waitOffset(self, desOffset):
-        """Offset the telescope"""
-        tccCmdStr = "offset boresight %.7f, %.7f/pabs/vabs/computed" % tuple(desOffset)
-        self.currOffset = desOffset[:]
-        yield self.sr.waitCmd(
-            actor = "tcc",
-            cmdStr = tccCmdStr,
-        )
+        
+        # slew back to starting position
+        if self.ditherSeq.needMove(self.ditherSeq.begOffset):
+            sr.showMsg("Finishing up: slewing to initial position")
+            yield self.ditherSeq.waitOffset(self.ditherSeq.begOffset)
+        yield self.ditherSeq.waitFinish()
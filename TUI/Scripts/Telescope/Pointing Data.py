@@ -44,6 +44,9 @@ History:
 2014-10-16 ROwen    Always specify window argument to work around a guider bug that caused too-small images.
                     Show info about each entry in the data file, and append the same info to that entry as a comment.
 2015-11-02 ROwen    Make sure to match types when using numpy, for numpy 1.10.
+2026-10-18 ROwen    Added Optimize Order: visit stars in the order that minimizes predicted slew time
+                    (see TUI.TCC.SlewOrder), replanning as stars are skipped or retried.
+                    Report predicted slew time for file order and optimized order, and graph the order.
 """
 import collections
 import glob
@@ -66,6 +69,7 @@ import RO.StringUtil
 import RO.Wdg
 import TUI.TUIModel
 import TUI.TCC.TCCModel
+import TUI.TCC.SlewOrder
 import TUI.TCC.UserModel
 import TUI.Inst.ExposeModel
 import TUI.Guide.GuideModel
@@ -186,6 +190,7 @@ class ScriptClass(object):
         sr.master.winfo_toplevel().resizable(True, True)
         sr.debug = Debug
         self.azAltList = None
+        self.starOrder = None # order in which stars are visited, as grid indices; None for grid order
         self._nextPointTimer = Timer()
         self._gridDirs = getGridDirs()
         self.tccModel = TUI.TCC.TCCModel.getModel()
@@ -369,7 +374,16 @@ class ScriptClass(object):
             helpURL = self.helpURL,
         )
         self.retryMissingWdg.grid(row=0, column=2, sticky="")
-        for i in range(3):
+
+        self.optimizeOrderWdg = RO.Wdg.Checkbutton(
+            master = btnFrame,
+            text = "Optimize Order",
+            defValue = True,
+            helpText = "visit stars in the order that minimizes slew time?",
+            helpURL = self.helpURL,
+        )
+        self.optimizeOrderWdg.grid(row=0, column=3, sticky="")
+        for i in range(4):
             btnFrame.grid_columnconfigure(i, weight=1)
 
         ctrlGr.gridWdg(False, btnFrame, colSpan=8, sticky="ew")
@@ -782,8 +796,9 @@ class ScriptClass(object):
         self.azAltList = numpy.zeros([numPoints], dtype=self.azAltGraph.DType)
         self.azAltList["az"] = azList
         self.azAltList["alt"] = altList
+        self.starOrder = None
         self.numStarsWdg.set(" %s stars" % (numPoints,))
-        self.azAltGraph.plotAzAltPoints(self.azAltList)
+        self.azAltGraph.plotAzAltPoints(self.azAltList, order=self.starOrder)
         for wdg in (self.missingStarsWdg, self.starsToSkipWdg, self.starsToRetryWdg):
             wdg.set("")
             wdg.setMaxVal(numPoints)
@@ -791,32 +806,111 @@ class ScriptClass(object):
     def starNumIter(self):
         """Return number of next star to measure (starNum = grid index + 1)
 
-        If there are any stars in starsToRetryWdg that are not in starsToSkipWdg
-        then return the smallest of those, else return next star in grid
+        Stars to measure are the unmeasured stars in the grid plus the stars in starsToRetryWdg,
+        except the stars in starsToSkipWdg.
+        If optimizeOrderWdg is checked then measure these in the order that minimizes predicted slew time,
+        starting from the current telescope position; the order is replanned whenever the set changes.
+        Otherwise if there are any stars in starsToRetryWdg that are not in starsToSkipWdg
+        then return the smallest of those, else return next star in grid.
         """
-        indIter = iter(range(len(self.azAltList)))
+        slewTimeModel = TUI.TCC.SlewOrder.SlewTimeModel.fromTCCModel(self.tccModel)
+        if self.rotTypeWdg.getString() == "Object":
+            rotArr = TUI.TCC.SlewOrder.getParallacticAngle(self.azAltList["az"], self.azAltList["alt"])
+        else:
+            # the rotator does not move significantly between stars
+            rotArr = None
+        currPos = self.getCurrAxisPos()
+        if self.optimizeOrderWdg.getBool():
+            self.reportSlewTime(slewTimeModel, rotArr, currPos)
+
+        unmeasuredStarSet = set(range(1, len(self.azAltList) + 1))
+        visitedStarList = [] # star numbers, in the order visited
+        plannedStarList = [] # star numbers, in the order planned
         while True:
-            try:
-                retryStarSet = self.starsToRetryWdg.intSet - self.starsToSkipWdg.intSet
-                if retryStarSet:
-                    retryStarList = sorted(retryStarSet)
-                    nextStarNum = retryStarList.pop(0)
-                    self.starsToRetryWdg.removeInt(nextStarNum)
-                    yield nextStarNum
-                else:
-                    nextStarNum = next(indIter) + 1
-                    if nextStarNum in self.starsToSkipWdg.intSet:
-                        self.sr.showMsg("Skipping star %d" % (nextStarNum,))
-                        self.missingStarsWdg.addInt(nextStarNum)
-                        continue
-                    yield nextStarNum
-            except StopIteration:
+            for starNum in sorted(unmeasuredStarSet & self.starsToSkipWdg.intSet):
+                self.sr.showMsg("Skipping star %d" % (starNum,))
+                self.missingStarsWdg.addInt(starNum)
+                unmeasuredStarSet.remove(starNum)
+            retryStarSet = self.starsToRetryWdg.intSet - self.starsToSkipWdg.intSet
+            starsToMeasureSet = unmeasuredStarSet | retryStarSet
+            if not starsToMeasureSet:
                 hasMissingStars = bool(self.missingStarsWdg.intSet - self.starsToSkipWdg.intSet)
                 if not self.attendedModeWdg.getBool() and hasMissingStars:
                     yield self.sr.waitPause("Some stars missing; paused to allow retry",
                         severity=RO.Constants.sevWarning)
+                    continue
+                return
+
+            if self.optimizeOrderWdg.getBool():
+                if set(plannedStarList) != starsToMeasureSet:
+                    plannedStarList = self.planStarOrder(sorted(starsToMeasureSet), slewTimeModel, rotArr, currPos)
+                    self.starOrder = [starNum - 1 for starNum in visitedStarList + plannedStarList]
+                nextStarNum = plannedStarList.pop(0)
+            else:
+                plannedStarList = []
+                self.starOrder = None
+                if retryStarSet:
+                    nextStarNum = min(retryStarSet)
                 else:
-                    raise
+                    nextStarNum = min(unmeasuredStarSet)
+
+            unmeasuredStarSet.discard(nextStarNum)
+            self.starsToRetryWdg.removeInt(nextStarNum)
+            visitedStarList.append(nextStarNum)
+            i = nextStarNum - 1
+            toPos = (self.azAltList["az"][i], self.azAltList["alt"][i], None if rotArr is None else rotArr[i])
+            if currPos is None:
+                currPos = (slewTimeModel.getMountAz(toPos[0]), toPos[1], toPos[2])
+            else:
+                currPos = (slewTimeModel.getSlewTime(currPos, toPos)[1], toPos[1], toPos[2])
+            yield nextStarNum
+
+    def getCurrAxisPos(self):
+        """Return the current mount az, alt, rot (deg) for slew time predictions, or None if unknown
+
+        Rot is None, because the relationship between rotator angle and parallactic angle is not known.
+        """
+        axePos, isCurrent = self.tccModel.axePos.get()
+        if not isCurrent or None in axePos[0:2]:
+            return None
+        return (axePos[0], axePos[1], None)
+
+    def planStarOrder(self, starNumList, slewTimeModel, rotArr, currPos):
+        """Return a list of star numbers in the order that minimizes predicted slew time
+
+        Inputs:
+        - starNumList: star numbers to visit
+        - slewTimeModel: slew time model (a TUI.TCC.SlewOrder.SlewTimeModel)
+        - rotArr: rotator angle of each star in the grid, or None if the rotator does not move
+        - currPos: current mount az, alt, rot (deg), or None if unknown
+        """
+        indArr = numpy.array(starNumList, dtype=int) - 1
+        azArr = self.azAltList["az"][indArr]
+        altArr = self.azAltList["alt"][indArr]
+        subRotArr = None if rotArr is None else rotArr[indArr]
+        timeMat = slewTimeModel.getTimeMatrix(azArr, altArr, subRotArr)
+        if currPos is None:
+            startTimeArr = None
+        else:
+            startTimeArr = slewTimeModel.getStartTimeArr(currPos, azArr, altArr, subRotArr)
+        return [starNumList[ind] for ind in TUI.TCC.SlewOrder.planTour(timeMat, startTimeArr)]
+
+    def reportSlewTime(self, slewTimeModel, rotArr, currPos):
+        """Report the predicted total slew time for grid order and optimized order
+
+        Inputs: see planStarOrder
+        """
+        starNumList = [starNum for starNum in range(1, len(self.azAltList) + 1)
+            if starNum not in self.starsToSkipWdg.intSet]
+        if not starNumList:
+            return
+        optStarNumList = self.planStarOrder(starNumList, slewTimeModel, rotArr, currPos)
+        azArr = self.azAltList["az"]
+        altArr = self.azAltList["alt"]
+        gridTime, optTime = [slewTimeModel.getTourTime(numpy.subtract(starNums, 1), azArr, altArr, rotArr, startPos=currPos)
+            for starNums in (starNumList, optStarNumList)]
+        self.sr.showMsg("Predicted slew time: %0.0f sec in grid order; %0.0f sec in optimized order" % \
+            (gridTime, optTime))
 
     def updBinFactor(self, *args, **kargs):
         """Called when the user changes the bin factor"""
@@ -1004,7 +1098,7 @@ class ScriptClass(object):
             az = rec["az"]
             alt = rec["alt"]
             self.azAltList["state"][i] = self.azAltGraph.Measuring
-            self.azAltGraph.plotAzAltPoints(self.azAltList)
+            self.azAltGraph.plotAzAltPoints(self.azAltList, order=self.starOrder)
 
             minMag = self.getEntryNum(self.minMagWdg)
             maxMag = self.getEntryNum(self.maxMagWdg)
@@ -1086,7 +1180,7 @@ class ScriptClass(object):
             self.sr.showMsg(str(e), severity=RO.Constants.sevWarning)
             self.missingStarsWdg.addInt(starNum)
             self.azAltList["state"][i] = self.azAltGraph.Failed
-            self.azAltGraph.plotAzAltPoints(self.azAltList)
+            self.azAltGraph.plotAzAltPoints(self.azAltList, order=self.starOrder)
             if self.attendedModeWdg.getBool():
                 self.starsToRetryWdg.addInt(starNum)
                 yield self.sr.waitPause("Star %s failed; paused so you can retry" % (starNum,),
@@ -1106,7 +1200,7 @@ class ScriptClass(object):
         self.missingStarsWdg.removeInt(starNum)
         self.starsToRetryWdg.removeInt(starNum)
         self.azAltList["state"][i] = self.azAltGraph.Measured
-        self.azAltGraph.plotAzAltPoints(self.azAltList)
+        self.azAltGraph.plotAzAltPoints(self.azAltList, order=self.starOrder)
 
 
 class AzAltGraph(Tkinter.Frame):
@@ -1140,13 +1234,15 @@ class AzAltGraph(Tkinter.Frame):
         self.axis.set_yticks((0, 15, 30, 45, 60, 75, 90))
         self.axis.set_yticklabels([]) # ['75', '60', '45', '15', '0'])
 
-    def plotAzAltPoints(self, azAltPoints):
+    def plotAzAltPoints(self, azAltPoints, order=None):
         """Plot az/alt points
 
         Inputs:
         - azAltPoints: data in the form of a numpy array with named columns for az, alt and state,
             where state is one of Unmeasured, Measuring, Measured or Failed
             (use self.DType to construct the array)
+        - order: indices of the points in the order they are visited (used to draw connecting lines);
+            None if the points are visited in array order
         """
         self.axis.clear()
 
@@ -1169,8 +1265,10 @@ class AzAltGraph(Tkinter.Frame):
 
 
         # plot connecting lines
-        az = azAltPoints["az"]
-        alt = azAltPoints["alt"]
+        if order is None:
+            order = numpy.arange(len(azAltPoints))
+        az = azAltPoints["az"][order]
+        alt = azAltPoints["alt"][order]
 
         r = numpy.subtract(90.0, alt)
         theta = numpy.deg2rad(numpy.subtract(270.0, az))
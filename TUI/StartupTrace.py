@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+"""Trace where the time (and memory) goes while TUI starts up.
+
+Tracing is enabled by the command-line flag --trace-startup[=reportPath] (see runtui.py)
+or by setting environment variable TUI_TRACE_STARTUP to "1" or to the desired report path.
+
+While tracing, the wall time and resident memory of each startup phase
+(marked in the code with "with phase(name):") and of each module import are recorded.
+When startup is finished TUI.Main.runTUI calls finish, which writes a JSON report
+(by default to tuiStartupTrace.json in the temporary directory) and prints a summary.
+
+This module deliberately imports nothing from TUI, so it can be started before TUI is imported.
+
+To check for startup time regressions run this module as a script:
+    python StartupTrace.py [maxStartupSec [nRuns]]
+It starts TUI (up to "ready to connect") nRuns times in new processes, prints a summary,
+and exits with status 1 if the median startup time exceeds maxStartupSec.
+The log is not archived during these runs.
+
+History:
+2026-10-18 ROwen
+2026-10-18 ROwen    The startup benchmark no longer archives the log.
+"""
+__all__ = ["EnvVarName", "FlagName", "start", "startFromEnv", "isTracing", "phase", "finish"]
+
+import __builtin__
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+try:
+    import resource
+except ImportError:
+    resource = None
+
+EnvVarName = "TUI_TRACE_STARTUP"
+FlagName = "--trace-startup"
+
+DefReportName = "tuiStartupTrace.json"
+
+# default maximum median startup time for the regression benchmark (sec)
+DefMaxStartupSec = 10.0
+
+# number of slowest imports to print in the summary
+_NumSummaryItems = 10
+
+try:
+    _PageSize = os.sysconf("SC_PAGE_SIZE")
+except Exception:
+    _PageSize = 4096
+
+def _getMemMB():
+    """Return resident memory (MB), or peak resident memory if current is unavailable, or None if unknown
+    """
+    try:
+        with open("/proc/self/statm") as statmFile:
+            rssPages = int(statmFile.read().split()[1])
+        return rssPages * _PageSize / 1.0e6
+    except Exception:
+        pass
+    if resource is None:
+        return None
+    maxRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return maxRSS / 1.0e6 # bytes
+    return maxRSS / 1.0e3 # kbytes
+
+def _memDiff(memBeg, memEnd):
+    if memBeg is None or memEnd is None:
+        return None
+    return memEnd - memBeg
+
+
+class _StartupTracer(object):
+    """Record startup phases and module imports
+
+    Inputs:
+    - reportPath: path of JSON report file
+    """
+    def __init__(self, reportPath):
+        self.reportPath = reportPath
+        self.startTime = time.time()
+        self.startMem = _getMemMB()
+        self.phaseList = []     # list of phase dicts, in order begun
+        self.importList = []    # list of import dicts, in order completed
+        self._phaseStack = []   # stack of phase dicts
+        self._importStack = []  # stack of [child time] for imports in progress
+        self._origImport = __builtin__.__import__
+        __builtin__.__import__ = self._tracedImport
+
+    def stop(self):
+        """Stop tracing imports"""
+        if __builtin__.__import__ == self._tracedImport:
+            __builtin__.__import__ = self._origImport
+
+    def beginPhase(self, name):
+        phaseDict = dict(
+            name = name,
+            depth = len(self._phaseStack),
+            begSec = time.time() - self.startTime,
+            memBegMB = _getMemMB(),
+        )
+        self.phaseList.append(phaseDict)
+        self._phaseStack.append(phaseDict)
+
+    def endPhase(self):
+        phaseDict = self._phaseStack.pop()
+        phaseDict["durationSec"] = time.time() - self.startTime - phaseDict["begSec"]
+        phaseDict["memEndMB"] = _getMemMB()
+        phaseDict["memDeltaMB"] = _memDiff(phaseDict["memBegMB"], phaseDict["memEndMB"])
+
+    def getReport(self):
+        """Return the report as a dict
+        """
+        totalSec = time.time() - self.startTime
+        endMem = _getMemMB()
+        return dict(
+            startTime = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.startTime)),
+            argv = sys.argv,
+            platform = sys.platform,
+            pythonVersion = sys.version.split()[0],
+            totalSec = totalSec,
+            memBegMB = self.startMem,
+            memEndMB = endMem,
+            phases = self.phaseList,
+            imports = sorted(self.importList, key=lambda imp: -imp["inclSec"]),
+        )
+
+    def _tracedImport(self, name, globals=None, locals=None, fromlist=None, level=-1):
+        """A replacement for __import__ that times imports that load new modules
+        """
+        if name in sys.modules and not fromlist:
+            # already imported; skip the overhead of tracing
+            return self._origImport(name, globals, locals, fromlist, level)
+
+        nMods = len(sys.modules)
+        memBeg = _getMemMB()
+        begTime = time.time()
+        self._importStack.append([0.0])
+        try:
+            return self._origImport(name, globals, locals, fromlist, level)
+        finally:
+            inclSec = time.time() - begTime
+            childSec = self._importStack.pop()[0]
+            if self._importStack:
+                self._importStack[-1][0] += inclSec
+            nNewMods = len(sys.modules) - nMods
+            if nNewMods > 0:
+                self.importList.append(dict(
+                    name = self._getModuleName(name, globals, fromlist, level),
+                    importer = (globals or {}).get("__name__"),
+                    inclSec = inclSec,
+                    selfSec = inclSec - childSec,
+                    memDeltaMB = _memDiff(memBeg, _getMemMB()),
+                    nNewModules = nNewMods,
+                ))
+
+    def _getModuleName(self, name, globals, fromlist, level):
+        """Return the full name of an imported module, resolving relative imports if possible
+        """
+        importerName = (globals or {}).get("__name__") or ""
+        if globals and "__path__" in globals:
+            pkgName = importerName
+        else:
+            pkgName = importerName.rpartition(".")[0]
+        if level > 0:
+            # explicit relative import
+            for i in range(level - 1):
+                pkgName = pkgName.rpartition(".")[0]
+            name = ".".join(namePart for namePart in (pkgName, name) if namePart)
+        elif name not in sys.modules and pkgName and sys.modules.get("%s.%s" % (pkgName, name)) is not None:
+            # implicit relative import
+            name = "%s.%s" % (pkgName, name)
+        if fromlist:
+            # from <name> import <submodule>
+            subNameList = ["%s.%s" % (name, subName) for subName in fromlist
+                if sys.modules.get("%s.%s" % (name, subName)) is not None]
+            if len(subNameList) == 1:
+                return subNameList[0]
+        return name
+
+
+_Tracer = None
+
+def start(reportPath=None):
+    """Start tracing, if not already tracing
+
+    Inputs:
+    - reportPath: path of JSON report; if None then use tuiStartupTrace.json in the temporary directory
+    """
+    global _Tracer
+    if _Tracer is not None:
+        return
+    if not reportPath:
+        reportPath = os.path.join(tempfile.gettempdir(), DefReportName)
+    _Tracer = _StartupTracer(reportPath)
+
+def startFromEnv(argv=None):
+    """Start tracing if requested by a command-line flag or the environment variable
+
+    Inputs:
+    - argv: command-line arguments to check for --trace-startup[=reportPath]; None for sys.argv.
+        The flag is removed from argv.
+
+    Return True if tracing.
+    """
+    if argv is None:
+        argv = sys.argv
+    for ind, arg in enumerate(argv[1:]):
+        if arg == FlagName or arg.startswith(FlagName + "="):
+            del argv[ind + 1]
+            start(arg.partition("=")[2])
+            return True
+
+    envValue = os.environ.get(EnvVarName)
+    if envValue:
+        start(None if envValue == "1" else envValue)
+    return isTracing()
+
+def isTracing():
+    """Return True if tracing startup"""
+    return _Tracer is not None
+
+@contextlib.contextmanager
+def phase(name):
+    """A context manager that records a startup phase (a no-op if not tracing)
+    """
+    tracer = _Tracer
+    if tracer is None:
+        yield
+        return
+    tracer.beginPhase(name)
+    try:
+        yield
+    finally:
+        tracer.endPhase()
+
+def finish(logFunc=None):
+    """Stop tracing, write the report and print a summary to stdout; a no-op if not tracing
+
+    Inputs:
+    - logFunc: a function to call with a one-line message describing the report, or None
+
+    Return the path of the report, or None if not tracing.
+    """
+    global _Tracer
+    tracer = _Tracer
+    if tracer is None:
+        return None
+    _Tracer = None
+    tracer.stop()
+
+    report = tracer.getReport()
+    try:
+        with open(tracer.reportPath, "w") as reportFile:
+            json.dump(report, reportFile, indent=1, sort_keys=True)
+    except Exception as e:
+        sys.stderr.write("Could not write startup trace to %r: %s\n" % (tracer.reportPath, e))
+    sys.stdout.write(formatSummary(report))
+    if logFunc:
+        logFunc("Startup took %0.2f sec; trace written to %s" % (report["totalSec"], tracer.reportPath))
+    return tracer.reportPath
+
+def formatSummary(report):
+    """Return a multi-line summary of a startup trace report (as returned by getReport)
+    """
+    def fmtMem(memMB):
+        return "?" if memMB is None else "%0.1f" % (memMB,)
+
+    lineList = ["Startup took %0.2f sec; memory %s MB -> %s MB" % \
+        (report["totalSec"], fmtMem(report["memBegMB"]), fmtMem(report["memEndMB"]))]
+    lineList.append("Phases:    sec   dMB")
+    for phaseDict in report["phases"]:
+        lineList.append("  %s%-*s %6.2f %6s" % ("  " * phaseDict["depth"], 30 - 2 * phaseDict["depth"],
+            phaseDict["name"], phaseDict.get("durationSec", 0), fmtMem(phaseDict.get("memDeltaMB"))))
+    lineList.append("Slowest imports (inclusive sec, self sec, dMB):")
+    for importDict in report["imports"][0:_NumSummaryItems]:
+        lineList.append("  %-40s %6.2f %6.2f %6s" % (importDict["name"], importDict["inclSec"],
+            importDict["selfSec"], fmtMem(importDict["memDeltaMB"])))
+    return "\n".join(lineList) + "\n"
+
+
+if __name__ == "__main__":
+    # startup time regression benchmark
+    import subprocess
+
+    maxStartupSec = float(sys.argv[1]) if len(sys.argv) > 1 else DefMaxStartupSec
+    nRuns = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    tuiRoot = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    reportPath = os.path.join(tempfile.gettempdir(), "tuiStartupBenchmark.json")
+    startupCode = """
+import TUI.StartupTrace
+TUI.StartupTrace.start(%r)
+import TUI.Main
+TUI.Main.runTUI(doMainLoop=False)
+""" % (reportPath,)
+
+    # do not archive the log (see TUI.LogArchive.NoArchiveEnvVarName): each new archive
+    # deletes the oldest one, so benchmark runs would push the user's real logs out
+    benchEnv = dict(os.environ)
+    benchEnv["TUI_NO_LOG_ARCHIVE"] = "1"
+
+    reportList = []
+    for i in range(nRuns):
+        subprocess.check_call([sys.executable, "-c", startupCode], cwd=tuiRoot, env=benchEnv,
+            stdout=open(os.devnull, "w"))
+        with open(reportPath, "r") as reportFile:
+            reportList.append(json.load(reportFile))
+    reportList.sort(key=lambda rep: rep["totalSec"])
+    medianReport = reportList[nRuns // 2]
+
+    sys.stdout.write(formatSummary(medianReport))
+    print "Startup times: %s sec; median %0.2f sec; limit %0.2f sec" % \
+        (", ".join("%0.2f" % (rep["totalSec"],) for rep in reportList), medianReport["totalSec"], maxStartupSec)
+    if medianReport["totalSec"] > maxStartupSec:
+        print "FAILED: startup is too slow"
+        sys.exit(1)
+    print "OK"
@@ -24,23 +24,37 @@ History:
 2005-01-05 ROwen    Changed level to severity.
 2011-06-16 ROwen    Ditched obsolete "except (SystemExit, KeyboardInterrupt): raise" code
 2012-07-10 ROwen    Removed use of update_idletasks.
+2026-10-18 ROwen    Load catalogs in a worker thread (see ParseCat.BackgroundCatalogParser),
+                    showing progress in the status bar.
+2026-10-18 ROwen    Build catalog submenus lazily (when first posted), in nested chunks for large catalogs,
+                    and only rebuild the menus of catalogs that changed.
+                    Added Find...: incremental search of object names (see CatalogIndex),
+                    with results sortable by name, current altitude or slew time.
 """
 import os
 import sys
+import time
 import Tkinter
 import tkFileDialog
+import numpy
 import RO.Constants
 import RO.CnvUtil
 import RO.StringUtil
 import RO.Alg
 import RO.TkUtil
 import RO.Wdg
+import TUI.TCC.TCCModel
 import TUI.TCC.UserModel
+import TUI.TCC.SlewOrder
+import CatalogIndex
 import ParseCat
 
 _NItems = 20    # number of items in partial menu
 _MaxItems = 25  # max # of items in a menu
 
+_MaxResults = 200   # max # of search results to display
+_AzAltMaxAge = 60.0 # max age of cached az/alt of catalog objects (sec)
+
 class CatalogMenuWdg(Tkinter.Frame):
     """Display a catalog pop-up menu.
     
@@ -61,10 +75,13 @@ class CatalogMenuWdg(Tkinter.Frame):
     ):
         Tkinter.Frame.__init__(self, master)
         self.callFunc = callFunc
-        self._catParser = ParseCat.CatalogParser()
+        self._bgCatParser = ParseCat.BackgroundCatalogParser()
+        self.tccModel = TUI.TCC.TCCModel.getModel()
         userModel = TUI.TCC.UserModel.getModel()
         self.userCatDict = userModel.userCatDict
         self.statusBar = statusBar
+        self._catMenuDict = {} # dict of catalog name: (catalog, catalog menu)
+        self._searchBox = None
         
         # create file dialog (reusing the same one
         # means the directory is the same each time)
@@ -138,23 +155,40 @@ class CatalogMenuWdg(Tkinter.Frame):
         # in case a Tcl object was returned...
         catFile = RO.CnvUtil.asStr(catFile)
         
-        # parse the catalog file
+        # parse the catalog file in the background
         # print "loading catalog %r" % (catFile,)
         self.showMsg("Loading file %s" % (catFile,))
-        try:
-            objCat, errList = self._catParser.parseCat(catFile)
-        except Exception as e:
+        catParser = ParseCat.CatalogParser(
+            azLim = self.tccModel.azLim.get()[0][0:2],
+            altLim = self.tccModel.altLim.get()[0][0:2],
+        )
+        self._bgCatParser.parseCat(
+            filePath = catFile,
+            callFunc = RO.Alg.GenericCallback(self._catLoaded, catFile),
+            progressFunc = RO.Alg.GenericCallback(self._catProgress, catFile),
+            catParser = catParser,
+        )
+
+    def _catProgress(self, catFile, fracDone):
+        """Report progress loading a catalog file.
+        """
+        self.showMsg("Loading file %s: %d%% done" % (catFile, int(fracDone * 100)))
+
+    def _catLoaded(self, catFile, catData, errMsg):
+        """A catalog file has been parsed (or parsing failed).
+        """
+        if catData is None:
             self.showMsg(
-                msgStr = "Could not load %s: %s" % (catFile, e),
+                msgStr = "Could not load %s: %s" % (catFile, errMsg),
                 severity = RO.Constants.sevError,
             )
             return
-        
+        objCat = catData.makeCatalog()
         catName = objCat.name
         
         # report errors, if any
-        if errList:
-            _CatalogErrBox(self, catFile, errList)
+        if catData.errList:
+            _CatalogErrBox(self, catFile, catData.errList)
         
         # update userCatDict in userModel
         # (automatically triggers menu rebuild)
@@ -165,59 +199,82 @@ class CatalogMenuWdg(Tkinter.Frame):
         # indicate completion
         self.showMsg("Catalog %s loaded" % (catName,))
 
-    def _addCatMenu(self, objCat):
-        """Add the menu(s) for a given catalog to the main menu.
+    def _doFind(self):
+        """Show the catalog search window.
         """
+        if self._searchBox is None:
+            self._searchBox = _CatalogSearchBox(self)
+        else:
+            self._searchBox.deiconify()
+            self._searchBox.lift()
+            self._searchBox.doSearch()
+        self._searchBox.queryWdg.focus_set()
+
+    def _makeObjMenu(self, master, objCat, begInd, endInd, isCatMenu):
+        """Create an empty menu for objects begInd:endInd of a catalog;
+        the menu is filled in when it is first posted.
+        
+        Inputs:
+        - master: master widget
+        - objCat: catalog
+        - begInd, endInd: range of objects to show
+        - isCatMenu: if True this is the main menu for the catalog,
+            so it also gets a Close item
+        """
+        menu = Tkinter.Menu(
+            master = master,
+            tearoff = False,
+        )
+        menu["postcommand"] = RO.Alg.GenericCallback(self._fillObjMenu, menu, objCat, begInd, endInd, isCatMenu)
+        return menu
+
+    def _fillObjMenu(self, menu, objCat, begInd, endInd, isCatMenu):
+        """Fill in a menu created by _makeObjMenu, if not already done.
+        
+        If there are too many objects for one menu then the objects are split into
+        chunks of _NItems, _NItems^2... objects, each shown in a submenu.
+        """
+        if menu.index("end") is not None:
+            return
         catName = objCat.name
         objList = objCat.objList
-        
-        # create new menu(s)
-        begInd = 0
-        nRemain = len(objList)
-        justOneMenu = True
-        while begInd < len(objList):
-            nRemain = len(objList) - begInd
-            if nRemain > _MaxItems:
-                nPick = _NItems
-                justOneMenu = False
-            else:
-                nPick = nRemain
-            endInd = begInd + nPick
 
-            # create submenu for items begInd:endInd
-            menu = Tkinter.Menu(
-                master = self.menu,
-                tearoff = False,
-            )
+        nObj = endInd - begInd
+        if nObj <= _MaxItems:
             for obj in objList[begInd:endInd]:
                 item = str(obj)
                 menu.add_command(
                     label = item,
                     command = RO.Alg.GenericCallback(self._doMenu, obj),
                 )
-                
+        else:
+            chunkSize = _NItems
+            while nObj > chunkSize * _MaxItems:
+                chunkSize *= _NItems
+            chunkBegInd = begInd
+            while chunkBegInd < endInd:
+                if endInd - chunkBegInd > (chunkSize * _MaxItems) // _NItems:
+                    chunkEndInd = chunkBegInd + chunkSize
+                else:
+                    chunkEndInd = endInd
+                subMenu = self._makeObjMenu(menu, objCat, chunkBegInd, chunkEndInd, isCatMenu=False)
+                menu.add_cascade(
+                    label = "%s (%s-%s)" % (catName, chunkBegInd+1, chunkEndInd),
+                    menu = subMenu,
+                )
+                chunkBegInd = chunkEndInd
+        
+        if isCatMenu:
             menu.add_separator()
-            
             menu.add_command(
                 label = "Close",
                 command = RO.Alg.GenericCallback(self._doClose, catName),
             )
-            
-            # add entry to main menu
-            if justOneMenu:
-                entryName = catName
-            else:
-                entryName = "%s (%s-%s)" % (catName, begInd+1, endInd)
-            
-            self.menu.add_cascade(
-                label = entryName,
-                menu = menu,
-            )
-            
-            begInd = endInd
     
     def _buildMenu(self):
-        """Build or rebuild the entire menu.
+        """Build or rebuild the main menu.
+        
+        Catalog menus are reused unless the catalog has changed.
         """
         # empty the current menu
         self.menu.delete(0, "end")      
@@ -228,19 +285,40 @@ class CatalogMenuWdg(Tkinter.Frame):
             command = self._doOpen,
         )
         
+        # discard menus for catalogs that have been closed or replaced
         catDict = self.userCatDict.get()
+        for catName, (objCat, catMenu) in self._catMenuDict.items():
+            if catDict.get(catName) is not objCat:
+                catMenu.destroy()
+                del self._catMenuDict[catName]
+
         if not catDict:
             return
         
+        self.menu.add_command(
+            label = "Find...",
+            command = self._doFind,
+        )
+        self.menu.add_separator()
+
         catNames = catDict.keys()
         catNames.sort()
         for catName in catNames:
-            self._addCatMenu(catDict[catName])
+            objCat = catDict[catName]
+            if catName not in self._catMenuDict:
+                catMenu = self._makeObjMenu(self.menu, objCat, 0, len(objCat.objList), isCatMenu=True)
+                self._catMenuDict[catName] = (objCat, catMenu)
+            self.menu.add_cascade(
+                label = catName,
+                menu = self._catMenuDict[catName][1],
+            )
     
     def _updUserCatDict(self, userCatDict=None):
         """UserCatDict updated; update the menu accordingly.
         """
         self._buildMenu()
+        if self._searchBox is not None:
+            self._searchBox.doSearch()
     
     def showMsg(self, msgStr, severity=RO.Constants.sevNormal):
         if self.statusBar:
@@ -308,6 +386,183 @@ class _CatalogErrBox(Tkinter.Toplevel):
     def ok(self, *args):
         self.destroy()
 
+class _CatalogSearchBox(Tkinter.Toplevel):
+    """Search the object names of all open catalogs, updating the results as the user types.
+    
+    Inputs:
+    - catMenuWdg: the CatalogMenuWdg; its userCatDict supplies the catalogs
+        and its _doMenu is called with the chosen object
+    """
+    def __init__(self, catMenuWdg):
+        Tkinter.Toplevel.__init__(self, catMenuWdg)
+        self.catMenuWdg = catMenuWdg
+        self.title("Find Catalog Object")
+        self.geometry("+%d+%d" % (catMenuWdg.winfo_rootx()+50,
+            catMenuWdg.winfo_rooty()+50))
+        self.protocol("WM_DELETE_WINDOW", self.withdraw)
+
+        self._indexDict = {}    # dict of catalog name: (catalog, CatalogIndex)
+        self._azAltDict = {}    # dict of catalog name: (catalog, time computed, az array, alt array)
+        self._prevQuery = None
+        self._prevMatchDict = {} # dict of catalog name: (catalog, indices of matches of _prevQuery)
+        self._resultList = []   # displayed results: list of (catalog, object index)
+
+        self.queryWdg = RO.Wdg.StrEntry(
+            master = self,
+            width = 20,
+            callFunc = self.doSearch,
+            helpText = "name (or part of name) of object to find",
+        )
+        self.queryWdg.grid(row=0, column=0, sticky="ew")
+        self.sortWdg = RO.Wdg.OptionMenu(
+            master = self,
+            items = CatalogIndex.SortList,
+            defValue = CatalogIndex.SortName,
+            callFunc = self.doSearch,
+            helpText = "sort order of matching objects",
+        )
+        self.sortWdg.grid(row=0, column=1, columnspan=2, sticky="e")
+
+        self.yscroll = Tkinter.Scrollbar(
+            master = self,
+            orient = "vertical",
+        )
+        self.listWdg = Tkinter.Listbox(
+            master = self,
+            yscrollcommand = self.yscroll.set,
+            selectmode = "browse",
+            font = "TkFixedFont",
+            width = 50,
+            height = 15,
+        )
+        self.yscroll.configure(command=self.listWdg.yview)
+        self.listWdg.grid(row=1, column=0, columnspan=2, sticky="nsew")
+        self.yscroll.grid(row=1, column=2, sticky="ns")
+
+        self.statusWdg = Tkinter.Label(
+            master = self,
+            anchor = "w",
+        )
+        self.statusWdg.grid(row=2, column=0, sticky="ew")
+        self.chooseBut = Tkinter.Button(self,
+            text = "Choose",
+            command = self.choose,
+            default = "active",
+        )
+        self.chooseBut.grid(row=2, column=1, columnspan=2, sticky="e")
+
+        self.rowconfigure(1, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.bind("<KeyPress-Return>", self.choose)
+        self.bind("<KeyPress-Escape>", self._withdraw)
+        self.listWdg.bind("<Double-Button-1>", self.choose)
+
+        self.doSearch()
+
+    def choose(self, *args):
+        """Choose the selected object (or the first, if none selected) and hide this window.
+        """
+        selInds = self.listWdg.curselection()
+        resInd = int(selInds[0]) if selInds else 0
+        if resInd >= len(self._resultList):
+            return
+        objCat, ind = self._resultList[resInd]
+        self.withdraw()
+        self.catMenuWdg._doMenu(objCat.objList[ind])
+
+    def doSearch(self, *args):
+        """Search for the current query and display the results.
+        """
+        queryStr = self.queryWdg.getString().strip()
+        sortBy = self.sortWdg.getString()
+        catDict = self.catMenuWdg.userCatDict.get()
+        
+        currPos = None
+        if sortBy == CatalogIndex.SortSlew:
+            axePos, isCurrent = self.catMenuWdg.tccModel.axePos.get()
+            if isCurrent and None not in axePos[0:2]:
+                currPos = axePos[0:2]
+            else:
+                sortBy = CatalogIndex.SortName
+        slewTimeModel = TUI.TCC.SlewOrder.SlewTimeModel.fromTCCModel(self.catMenuWdg.tccModel)
+
+        # when the user types more, only the previous matches need be searched
+        canNarrow = self._prevQuery is not None and queryStr.lower().startswith(self._prevQuery.lower())
+
+        # find matches in each catalog, then sort all matches together
+        catNameList = sorted(catDict.keys())
+        matchDict = {}
+        catNumList = []
+        indList = []
+        sortKeyList = []
+        for catNum, catName in enumerate(catNameList):
+            objCat = catDict[catName]
+            catIndex = self._getIndex(catName, objCat)
+            prevObjCat, candIndArr = self._prevMatchDict.get(catName, (None, None))
+            if not canNarrow or prevObjCat is not objCat:
+                candIndArr = None
+            indArr = catIndex.search(queryStr, candIndArr)
+            matchDict[catName] = (objCat, indArr)
+
+            catNumList.append(numpy.zeros(len(indArr), dtype=int) + catNum)
+            indList.append(indArr)
+            if sortBy != CatalogIndex.SortName:
+                azArr, altArr = self._getAzAlt(catName, objCat)
+                sortKeyList.append(CatalogIndex.getSortKeys(indArr, sortBy, azArr, altArr, currPos, slewTimeModel))
+        self._prevQuery = queryStr
+        self._prevMatchDict = matchDict
+
+        if catNameList:
+            catNumArr = numpy.concatenate(catNumList)
+            indArr = numpy.concatenate(indList)
+        else:
+            catNumArr = indArr = numpy.zeros(0, dtype=int)
+        nMatches = len(indArr)
+        if sortBy == CatalogIndex.SortName:
+            resultOrder = numpy.arange(min(nMatches, _MaxResults))
+        else:
+            resultOrder = numpy.argsort(numpy.concatenate(sortKeyList), kind="mergesort")[0:_MaxResults]
+
+        self._resultList = [(catDict[catNameList[catNumArr[resInd]]], indArr[resInd]) for resInd in resultOrder]
+        self.listWdg.delete(0, "end")
+        for objCat, ind in self._resultList:
+            alt = self._getAzAlt(objCat.name, objCat)[1][ind]
+            if numpy.isfinite(alt):
+                altStr = "%5.1f" % (alt,)
+            else:
+                altStr = "    ?"
+            self.listWdg.insert("end", "%-28s %s  %s" % (objCat.objList[ind].name, altStr, objCat.name))
+        if nMatches > _MaxResults:
+            statusStr = "%d matches; showing %d" % (nMatches, _MaxResults)
+        else:
+            statusStr = "%d %s" % (nMatches, RO.StringUtil.plural(nMatches, "match", "matches"))
+        if sortBy != self.sortWdg.getString():
+            statusStr += "; position unknown"
+        self.statusWdg["text"] = statusStr
+
+    def _getIndex(self, catName, objCat):
+        """Return the CatalogIndex for a catalog, creating it if necessary.
+        """
+        cachedObjCat, catIndex = self._indexDict.get(catName, (None, None))
+        if cachedObjCat is not objCat:
+            catIndex = CatalogIndex.CatalogIndex(objCat.objList)
+            self._indexDict[catName] = (objCat, catIndex)
+        return catIndex
+
+    def _getAzAlt(self, catName, objCat):
+        """Return the current az, alt arrays for a catalog, computing them if necessary.
+        """
+        cachedObjCat, computeTime, azArr, altArr = self._azAltDict.get(catName, (None, None, None, None))
+        if cachedObjCat is not objCat or time.time() - computeTime > _AzAltMaxAge:
+            azArr, altArr = objCat.getAzAltArr()
+            self._azAltDict[catName] = (objCat, time.time(), azArr, altArr)
+        return azArr, altArr
+
+    def _withdraw(self, *args):
+        self.withdraw()
+
+
 if __name__ == "__main__":
     import TUI.TUIModel
 
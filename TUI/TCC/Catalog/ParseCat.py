@@ -20,20 +20,29 @@ History:
 2008-04-29 ROwen    Fixed reporting of exceptions that contain unicode arguments.
 2011-06-16 ROwen    Ditched obsolete "except (SystemExit, KeyboardInterrupt): raise" code
 2012-08-29 ROwen    Removed use of deprecated dict.has_key method.
+2026-10-18 ROwen    Check values without Tk (instead of using a hidden slew input widget),
+                    so catalogs can be parsed in a worker thread (see BackgroundCatalogParser).
+                    Read catalogs one line at a time, with optional progress reports.
+                    Cache parsed catalogs in a binary file next to the catalog file
+                    (used if the catalog's modification time and size are unchanged).
+                    Bug fix: catalog options (doDisplay, dispColor) leaked from one catalog to the next.
+2026-10-18 ROwen    Modified BackgroundCatalogParser to use TUI.Base.BackgroundJobRunner.
 """
-import os.path
+import marshal
+import os
+import tempfile
 import re
-import Tkinter
 import GetString
 import RO.Alg
 import RO.CnvUtil
+import RO.CoordSys
+import RO.MathUtil
 import RO.OS
 import RO.SeqUtil
 import RO.StringUtil
 import RO.ParseMsg.ParseData as ParseData
-import TUI.TCC.UserModel
+import TUI.Base.BackgroundJobRunner
 import TUI.TCC.TelTarget
-import TUI.TCC.SlewWdg.InputWdg
 
 def listGet(aList, ind, defValue=None):
     try:
@@ -52,38 +61,190 @@ _CatOptionDict = {
     "dispColor": "black",
 }
 
+# allowed values of keywords that are set with a menu in the slew input widget
+# (see TUI.TCC.SlewWdg.CoordSysWdg, RotWdg, AxisWrapWdg and KeepOffsetWdg)
+_CSysItems = (
+    RO.CoordSys.ICRS,
+    RO.CoordSys.FK5,
+    RO.CoordSys.FK4,
+    RO.CoordSys.Galactic,
+    RO.CoordSys.Geocentric,
+    RO.CoordSys.Topocentric,
+    RO.CoordSys.Observed,
+    RO.CoordSys.Mount,
+)
+_RotTypeItems = ("Object", "Horizon", "Mount", "None")
+_WrapItems = ("Nearest", "Negative", "Middle", "Positive")
+_KeepItems = ("Arc", "Boresight", "GCorr", "Calib")
+_KeepNegStr = "No"
+
+# version of the cache file format; increment whenever the format or the parsing rules change
+_CacheVersion = 1
+
+# number of lines between progress reports
+_ProgressInterval = 500
+
+# interval at which BackgroundCatalogParser checks for progress and finished jobs (sec)
+_PollInterval = 0.05
+
+def getCachePath(filePath):
+    """Return the path of the cache file for a catalog file
+
+    The cache file is an invisible file in the same directory as the catalog file.
+    """
+    dirPath, fileName = os.path.split(filePath)
+    return os.path.join(dirPath, ".%s.tuicache" % (fileName,))
+
+def _makeMatcher(valueList):
+    return RO.Alg.MatchList(
+        valueList = valueList,
+        abbrevOK = True,
+        ignoreCase = True,
+    )
+
+
+class _ValueChecker(object):
+    """Check catalog values the way the slew input widget (TUI.TCC.SlewWdg.InputWdg) does, but without Tk
+
+    Inputs:
+    - azLim, altLim: (min, max) azimuth and altitude (deg) for positions in Mount coordinates;
+        None (or None for either limit) means no limit
+    """
+    def __init__(self, azLim=None, altLim=None):
+        self.azLim = tuple(azLim[0:2]) if azLim else (None, None)
+        self.altLim = tuple(altLim[0:2]) if altLim else (None, None)
+        self._csysMatcher = _makeMatcher(_CSysItems)
+        self._rotTypeMatcher = _makeMatcher(_RotTypeItems)
+        self._wrapMatcher = _makeMatcher(_WrapItems)
+        self._keepMatcher = _makeMatcher(_KeepItems)
+
+        # list of (keyword, number of values (None if any number), check function), in order checked;
+        # check functions receive three arguments: the keyword, the list of values and the value dictionary
+        self._checkList = (
+            ("CSys",        1,      self._makeMenuCheck(self._csysMatcher)),
+            ("Date",        1,      self._makeFloatCheck(0.0, 3000.0)),
+            ("ObjPos",      2,      self._checkObjPos),
+            ("Name",        1,      None),
+            ("RotAngle",    1,      self._makeFloatCheck(-360.0, 360.0)),
+            ("RotType",     1,      self._makeMenuCheck(self._rotTypeMatcher)),
+            ("Magnitude",   1,      self._makeFloatCheck(-999.0, 999.0)),
+            ("PM",          2,      self._makeFloatCheck(None, None)),
+            ("Px",          1,      self._makeFloatCheck(0.0, None)),
+            ("Distance",    1,      self._makeFloatCheck(0.0, None)),
+            ("Rv",          1,      self._makeFloatCheck(None, None)),
+            ("ScanVelocity", 2,     self._makeFloatCheck(None, None)),
+            ("Keep",        None,   self._checkKeep),
+            ("AzWrap",      1,      self._makeMenuCheck(self._wrapMatcher)),
+            ("RotWrap",     1,      self._makeMenuCheck(self._wrapMatcher)),
+        )
+        self.keyList = [key for key, numVal, checkFunc in self._checkList]
+
+    def checkValueDict(self, valueDict):
+        """Raise ValueError if valueDict has an invalid or out of range value
+
+        valueDict must already have been key-matched (expanding abbreviations and correcting case);
+        keywords that are not checked (such as catalog options) are ignored.
+        """
+        for key, numVal, checkFunc in self._checkList:
+            val = valueDict.get(key)
+            if val is None:
+                continue
+            valList = RO.SeqUtil.asSequence(val)
+            if numVal is not None and len(valList) != numVal:
+                raise ValueError("%s has %d values; %d needed" % (key, len(valList), numVal))
+            if checkFunc:
+                checkFunc(key, valList, valueDict)
+
+    def _checkFloat(self, descr, val, minVal, maxVal):
+        """Check one floating point value, as RO.Wdg.FloatEntry does"""
+        if val in (None, ""):
+            return
+        if minVal is not None and minVal >= 0 and "-" in val:
+            raise ValueError("%s: - forbidden; min val = %s" % (descr, minVal))
+        RO.MathUtil.checkRange(RO.StringUtil.floatFromStr(val, allowExp=False), minVal, maxVal, descr)
+
+    def _makeFloatCheck(self, minVal, maxVal):
+        def checkFunc(key, valList, valueDict):
+            for val in valList:
+                self._checkFloat(key, val, minVal, maxVal)
+        return checkFunc
+
+    def _makeMenuCheck(self, matcher):
+        def checkFunc(key, valList, valueDict):
+            for val in valList:
+                matcher.getUniqueMatch(val)
+        return checkFunc
+
+    def _checkObjPos(self, key, valList, valueDict):
+        """Check object position, whose range depends on the coordinate system (see TUI.TCC.SlewWdg.ObjPosWdg)"""
+        csys = self._csysMatcher.getUniqueMatch(RO.SeqUtil.asSequence(valueDict.get("CSys", "FK5"))[0])
+        if csys == RO.CoordSys.Mount:
+            rangeList = (self.azLim, self.altLim)
+        elif csys in RO.CoordSys.AzAlt:
+            rangeList = ((0.0, 360.0), (0.0, 90.0))
+        else:
+            rangeList = ((0.0, 24.0), (-90.0, 90.0))
+        for descr, val, (minVal, maxVal) in zip(("position 1", "position 2"), valList, rangeList):
+            if val in (None, ""):
+                continue
+            if minVal is not None and minVal >= 0 and "-" in val:
+                raise ValueError("%s: - forbidden; min val = %s" % (descr, minVal))
+            RO.MathUtil.checkRange(RO.StringUtil.degFromDMSStr(val), minVal, maxVal, descr)
+
+    def _checkKeep(self, key, valList, valueDict):
+        """Check Keep values: offset names, optionally prefixed with No (see TUI.TCC.SlewWdg.KeepOffsetWdg)"""
+        lenNegStr = len(_KeepNegStr)
+        for val in valList:
+            if val.lower().startswith(_KeepNegStr.lower()):
+                val = val[lenNegStr:]
+            self._keepMatcher.getUniqueMatch(val)
+
+
+class CatalogData(object):
+    """Data for a parsed catalog
+
+    Attributes:
+    - name: catalog name: the file name without any path information
+    - objList: a list of TUI.TCC.TelTarget.TelTarget objects
+    - catOptions: a dict of catalog options (see _CatOptionDict)
+    - errList: a list of (line, errMsg) tuples, one per rejected line of object data
+    - fromCache: True if the data was read from the cache file
+    """
+    def __init__(self, name, objList, catOptions, errList, fromCache=False):
+        self.name = name
+        self.objList = objList
+        self.catOptions = catOptions
+        self.errList = errList
+        self.fromCache = fromCache
+
+    def makeCatalog(self):
+        """Return the catalog as a TUI.TCC.TelTarget.Catalog
+
+        Call from the Tk thread, because the catalog checks its display color using Tk.
+        """
+        return TUI.TCC.TelTarget.Catalog(
+            name = self.name,
+            objList = self.objList,
+        **self.catOptions)
+
+
 class CatalogParser(object):
     """Object that will read in object catalogs, expand abbreviations,
     correct case and check limits.
+
+    Values are checked without Tk, so parseCatData may be called from a background thread.
     
-    Warning: uses a (hidden) Tkinter widget to perform value checking
-    and abbreviation expansion. Thus:
-    - Do not call from a background thread.
-    - Before calling you should already have created a root widget.
+    Inputs:
+    - azLim, altLim: (min, max) azimuth and altitude (deg) for objects in Mount coordinates,
+        e.g. the first two values of the TCC's AzLim and AltLim keywords; None means no limit
+    - useCache: if True, read parsed catalogs from cache files (if current) and write cache files
     """
-    def __init__(self):
-        # get a local tcc user model and use to create a slew input widget
-        # that I can safely set without affecting other widgets
-        userModel = TUI.TCC.UserModel._Model()
-        tl = Tkinter.Toplevel()
-        tl.withdraw()
-        self._slewInputWdg = TUI.TCC.SlewWdg.InputWdg.InputWdg(
-            master = tl,
-            userModel = userModel,
-        )
-        self._slewInputWdg.pack()
-
-        defValueDict = self._slewInputWdg.getDefValueDict()
-        defValueDict.update(_CatOptionDict)
-        #print defValueDict
-        self._keyMatcher = RO.Alg.MatchList(
-            valueList = defValueDict.keys(),
-            abbrevOK = True,
-            ignoreCase = True,
-        )
-        self._catOptions = _CatOptionDict
+    def __init__(self, azLim=None, altLim=None, useCache=True):
+        self._checker = _ValueChecker(azLim=azLim, altLim=altLim)
+        self._keyMatcher = _makeMatcher(self._checker.keyList + _CatOptionDict.keys())
+        self.useCache = bool(useCache)
     
-    def parseCat(self, filePath):
+    def parseCat(self, filePath, progressFunc=None):
         """Parse a catalog given its full file path.
         
         Returns two items:
@@ -92,9 +253,46 @@ class CatalogParser(object):
         
         Raises RuntimeError if the file cannot be read or a default is invalid.
         
-        Uses universal newline support (new in Python 2.3) if possible.
+        Call from the Tk thread; to parse a catalog in the background use parseCatData.
+        """
+        catData = self.parseCatData(filePath, progressFunc=progressFunc)
+        return catData.makeCatalog(), catData.errList
+
+    def parseCatData(self, filePath, progressFunc=None):
+        """Parse a catalog given its full file path, using the cache file if it is current.
+        
+        Inputs:
+        - filePath: full path to catalog file
+        - progressFunc: a function to call periodically while the file is parsed,
+            with one argument: the fraction of the file parsed; None if not wanted
+
+        Returns a CatalogData.
+        
+        Raises RuntimeError if the file cannot be read or a default is invalid.
+
+        Does not use Tk, so it is safe to call from a background thread.
+        """
+        fileStat = os.stat(filePath)
+        cacheKey = (_CacheVersion, fileStat.st_mtime, fileStat.st_size, self._checker.azLim, self._checker.altLim)
+        if self.useCache:
+            catData = self._readCache(filePath, cacheKey)
+            if catData is not None:
+                return catData
+
+        catData = self._parseFile(filePath, fileStat.st_size, progressFunc)
+
+        if self.useCache:
+            newFileStat = os.stat(filePath)
+            if (newFileStat.st_mtime, newFileStat.st_size) == (fileStat.st_mtime, fileStat.st_size):
+                self._writeCache(filePath, cacheKey, catData)
+        return catData
+
+    def _parseFile(self, filePath, fileSize, progressFunc):
+        """Parse a catalog file and return a CatalogData
+
+        Raises RuntimeError if the file cannot be read or a default is invalid.
         """
-#       print "parseCat(%r)" % (filePath,)
+#       print "_parseFile(%r)" % (filePath,)
         fp = RO.OS.openUniv(filePath)
         catName = os.path.basename(filePath)
 
@@ -102,85 +300,139 @@ class CatalogParser(object):
             "CSys": "FK5",
             "RotType": "Object",
         })
+        catOptions = _CatOptionDict.copy()
         errList = []
         objList = []
         
-        # save checkWdg data, then use try/finally to restore no matter what
-        ii = 0
-        for line in fp:
-            ii += 1
-#           print "Parsing object %d" % ii
-            isDefault = False
-            line = line.strip()
-            try:
-                if not line:
-                    # blank line
-                    continue
-                elif line[0] in ("#", "!"):
-                    # comment
-                    continue
-                elif line[0] in ('"', "'"):
-                    # data with quoted object name
-                    (objName, nextInd) = GetString.getString(line)
-                    pos1, pos2, optionStr = posOptionRE.match(line[nextInd:]).groups()
-                else:
-                    # data with unquoted object name or default option
-                    match = namePosOptionRE.match(line)
-                    if match:
-                        # data with unquoted object name
-                        objName, pos1, pos2, optionStr = match.groups()
-                    elif line[0].isdigit():
-                        raise ValueError("could not parse; is object name missing?")
+        try:
+            ii = 0
+            # use readline instead of iterating over the file, so tell reports progress correctly
+            for line in iter(fp.readline, ""):
+                ii += 1
+                if progressFunc and ii % _ProgressInterval == 0 and fileSize > 0:
+                    progressFunc(fp.tell() / float(fileSize))
+                isDefault = False
+                line = line.strip()
+                try:
+                    if not line:
+                        # blank line
+                        continue
+                    elif line[0] in ("#", "!"):
+                        # comment
+                        continue
+                    elif line[0] in ('"', "'"):
+                        # data with quoted object name
+                        (objName, nextInd) = GetString.getString(line)
+                        pos1, pos2, optionStr = posOptionRE.match(line[nextInd:]).groups()
                     else:
-                        isDefault = True
-                        optionStr = line
-        
-                if optionStr:
-                    optDict = ParseData.parseKeyValueData(optionStr)
-                else:
-                    optDict = {}
-                
-                if isDefault:
-                    # update existing defaults
-                    
-                    # merge new defaults into existing defaults
-                    # and check the result
-                    self._combineDicts(defOptionDict, optDict)
-                else:
-                    # a line of data
-                    # the data dictionary starts with the current defaults
-                    dataDict = defOptionDict.copy()
-                    
-                    # add object name and position (non-dictionary items)
-                    dataDict.update({
-                        "Name": objName,
-                        "ObjPos": (pos1, pos2),
-                    })
-
-                    # merge new data with a copy of the defaults
-                    # and check the result
-                    self._combineDicts(dataDict, optDict)
+                        # data with unquoted object name or default option
+                        match = namePosOptionRE.match(line)
+                        if match:
+                            # data with unquoted object name
+                            objName, pos1, pos2, optionStr = match.groups()
+                        elif line[0].isdigit():
+                            raise ValueError("could not parse; is object name missing?")
+                        else:
+                            isDefault = True
+                            optionStr = line
+            
+                    if optionStr:
+                        optDict = ParseData.parseKeyValueData(optionStr)
+                    else:
+                        optDict = {}
                     
-                    objList.append(TUI.TCC.TelTarget.TelTarget(dataDict))
-            except Exception as e:
-                if isDefault:
-                    raise RuntimeError(RO.StringUtil.strFromException(e))
-                else:
-                    errList.append((line, RO.StringUtil.strFromException(e)))
+                    if isDefault:
+                        # update existing defaults
+                        
+                        # merge new defaults into existing defaults
+                        # and check the result
+                        self._combineDicts(defOptionDict, optDict, catOptions)
+                    else:
+                        # a line of data
+                        # the data dictionary starts with the current defaults
+                        dataDict = defOptionDict.copy()
+                        
+                        # add object name and position (non-dictionary items)
+                        dataDict.update({
+                            "Name": objName,
+                            "ObjPos": (pos1, pos2),
+                        })
+
+                        # merge new data with a copy of the defaults
+                        # and check the result
+                        self._combineDicts(dataDict, optDict, catOptions)
+                        
+                        objList.append(TUI.TCC.TelTarget.TelTarget(dataDict))
+                except Exception as e:
+                    if isDefault:
+                        raise RuntimeError(RO.StringUtil.strFromException(e))
+                    else:
+                        errList.append((line, RO.StringUtil.strFromException(e)))
+        finally:
+            fp.close()
+        if progressFunc:
+            progressFunc(1.0)
         
         # convert catalog options as appropriate
-        self._catOptions["doDisplay"] = RO.CnvUtil.asBool(self._catOptions["doDisplay"])
+        catOptions["doDisplay"] = RO.CnvUtil.asBool(catOptions["doDisplay"])
 
-        # create catalog
-#       print "parseCat: catOptions =", self._catOptions
-        objCat = TUI.TCC.TelTarget.Catalog (
+        return CatalogData(
             name = catName,
             objList = objList,
-        **self._catOptions)
-#       print "parseCat returning (%r, %r)" % (objCat, errList)
-        return objCat, errList
+            catOptions = catOptions,
+            errList = errList,
+        )
+
+    def _readCache(self, filePath, cacheKey):
+        """Return CatalogData from the cache file for filePath, or None if the file is missing, invalid or out of date
+        """
+        try:
+            with open(getCachePath(filePath), "rb") as cacheFile:
+                cachedKey, catOptions, errList, valueDictList = marshal.load(cacheFile)
+            if cachedKey != cacheKey:
+                return None
+            objList = [TUI.TCC.TelTarget.TelTarget(valueDict) for valueDict in valueDictList]
+        except Exception:
+            return None
+        return CatalogData(
+            name = os.path.basename(filePath),
+            objList = objList,
+            catOptions = catOptions,
+            errList = errList,
+            fromCache = True,
+        )
+
+    def _writeCache(self, filePath, cacheKey, catData):
+        """Write the cache file for filePath; fail silently (e.g. if the directory is read-only)
+        """
+        cachePath = getCachePath(filePath)
+        cacheData = (
+            cacheKey,
+            catData.catOptions,
+            catData.errList,
+            [dict(obj.getValueDict()) for obj in catData.objList],
+        )
+        tempPath = None
+        try:
+            # write a temporary file and rename it, so a partial cache file is never seen
+            fd, tempPath = tempfile.mkstemp(dir=os.path.dirname(cachePath), prefix=os.path.basename(cachePath))
+            with os.fdopen(fd, "wb") as cacheFile:
+                marshal.dump(cacheData, cacheFile)
+            if os.path.exists(cachePath):
+                # needed on Windows, where rename will not replace an existing file
+                os.remove(cachePath)
+            os.rename(tempPath, cachePath)
+            tempPath = None
+        except Exception:
+            pass
+        finally:
+            if tempPath:
+                try:
+                    os.remove(tempPath)
+                except Exception:
+                    pass
     
-    def _combineDicts(self, defDict, newDict):
+    def _combineDicts(self, defDict, newDict, catOptions):
         """Combine a new dictionary into an existing default dictionary.
         The default dictionary is modified; newDict is not.
         
@@ -192,6 +444,7 @@ class CatalogParser(object):
         - if the new dictionary has certain items (e.g. CSys, RotType)
           then corresponding items are removed from the default dict (e.g. data, rotang).
         - newDict is added to defDict (overriding matching items)
+        - catalog options are moved from defDict to catOptions
     
         Raises ValueError if newDict cannot be key-matched
         or the resulting defDict has invalid values.
@@ -207,7 +460,7 @@ class CatalogParser(object):
                     pass
         
         # convert scalar data to scalars
-        for key in ("CSys", "Date", "RotAngle", "RotType", "Mag", "Px", "Rv", "Distance"):
+        for key in ("CSys", "Date", "RotAngle", "RotType", "Magnitude", "Px", "Rv", "Distance"):
             try:
                 val = newDict[key]
                 if RO.SeqUtil.isSequence(val):
@@ -221,43 +474,120 @@ class CatalogParser(object):
         # extract catalog options, if present
         for key in _CatOptionDict:
             if key in defDict:
-                self._catOptions[key] = defDict.pop(key)[0]
+                catOptions[key] = defDict.pop(key)[0]
         
         # check the new dictionary
-        self._checkValueDict(defDict)
-    
-    def _checkValueDict(self, valueDict):
-        """Check valudDict.
+        self._checker.checkValueDict(defDict)
+
+
+class BackgroundCatalogParser(object):
+    """Parse catalogs in a worker thread, so that loading a large catalog does not freeze the user interface
 
-        Raise ValueError if valueDict has unknown keys
-        or a value would be out of bounds.
+    The worker thread (see TUI.Base.BackgroundJobRunner) never touches Tk; progress and results
+    are passed back through a queue that is polled by a Tk timer while jobs are pending.
+    """
+    def __init__(self):
+        self._jobRunner = TUI.Base.BackgroundJobRunner.BackgroundJobRunner(
+            name = "CatalogParser",
+            jobFunc = _parseCatData,
+            pollInterval = _PollInterval,
+            errFunc = _parseCatFailed,
+        )
+
+    def parseCat(self, filePath, callFunc, progressFunc=None, catParser=None):
+        """Parse a catalog in the background
+
+        Inputs:
+        - filePath: full path to catalog file
+        - callFunc: function to call (on the Tk thread) when parsing is finished; it receives two arguments:
+            - catData: a CatalogData, or None if the catalog could not be parsed
+            - errMsg: the reason the catalog could not be parsed, or None if successful
+        - progressFunc: function to call (on the Tk thread) as parsing progresses,
+            with one argument: the fraction of the file parsed; None if not wanted
+        - catParser: the CatalogParser to use; if None then a default CatalogParser is used
+
+        Returns a job ID that may be used to cancel the callbacks.
         """
-        self._entryErrMsg = None
-        self._slewInputWdg.setValueDict(valueDict)
-        if self._entryErrMsg:
-            raise ValueError(self._entryErrMsg)
-    
-    def _handleEntryError(self, evt):
-        """Handle entry errors by recording the message."""
-        msgStr = evt.widget.getEntryError()
-        if msgStr:
-            self._entryErrMsg = msgStr
+        if catParser is None:
+            catParser = CatalogParser()
+        return self._jobRunner.submitWithProgress(
+            RO.Alg.GenericCallback(_callWithResult, callFunc),
+            progressFunc,
+            catParser,
+            filePath,
+        )
+
+    def cancel(self, jobID):
+        """Cancel the callbacks for a job; the catalog may still be parsed (and cached)
+        """
+        self._jobRunner.cancel(jobID)
+
+def _parseCatData(catParser, filePath, progressFunc=None):
+    """Parse a catalog; runs in a worker thread
+
+    Returns (catData, None) if successful, else (None, error message).
+    """
+    try:
+        return catParser.parseCatData(filePath, progressFunc=progressFunc), None
+    except Exception as e:
+        return None, RO.StringUtil.strFromException(e)
+
+def _parseCatFailed(errMsg):
+    """Return the result of a failed _parseCatData"""
+    return None, errMsg
+
+def _callWithResult(callFunc, result):
+    """Call a BackgroundCatalogParser.parseCat callback function with the (catData, errMsg) result"""
+    callFunc(*result)
+
 
 if __name__ == "__main__":
-    root = Tkinter.Tk()
-    tuiModel = TUI.TUIModel.getModel(True)
-    catParser = CatalogParser()
+    import time
+
+    catParser = CatalogParser(useCache=False)
     
     fileName = 'testCat.txt'
     print "Reading file %r" % (fileName,)
-    objCat, errList = catParser.parseCat(fileName)
+    catData = catParser.parseCatData(fileName)
     print "Catalog name = %r, doDisplay = %r, dispColor = %r" % \
-        (objCat.name, objCat.getDoDisplay(), objCat.getDispColor())
+        (catData.name, catData.catOptions["doDisplay"], catData.catOptions["dispColor"])
     print "The catalog contains the following objects:"
-    for item in objCat.objList:
+    for item in catData.objList:
         print item
     
-    if errList:
+    if catData.errList:
         print "The following items could not be parsed:"
-        for item in errList:
+        for item in catData.errList:
             print item
+
+    # benchmark parsing a large catalog, and reading it from the cache
+    nObj = 5000
+    with open("bigCat.txt", "rU") as bigCatFile:
+        objLineList = [line for line in bigCatFile if line.strip()]
+    tempDir = tempfile.mkdtemp()
+    try:
+        catPath = os.path.join(tempDir, "benchCat.txt")
+        with open(catPath, "w") as catFile:
+            catFile.write("csys = ICRS\n")
+            for ind in range(nObj):
+                catFile.write(objLineList[ind % len(objLineList)])
+        catParser = CatalogParser()
+
+        startTime = time.time()
+        catData = catParser.parseCatData(catPath)
+        parseTime = time.time() - startTime
+
+        startTime = time.time()
+        cachedCatData = catParser.parseCatData(catPath)
+        cacheTime = time.time() - startTime
+
+        if not cachedCatData.fromCache:
+            print "Bug: cache not used"
+        if [str(obj) for obj in cachedCatData.objList] != [str(obj) for obj in catData.objList]:
+            print "Bug: cached catalog does not match"
+        print "%d objects: parse %0.3f sec; read from cache %0.3f sec; cache file size %d bytes" % \
+            (len(catData.objList), parseTime, cacheTime, os.path.getsize(getCachePath(catPath)))
+    finally:
+        for fileName in os.listdir(tempDir):
+            os.remove(os.path.join(tempDir, fileName))
+        os.rmdir(tempDir)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""A spatial index of objects at pixel positions, for fast nearest-object lookup.
+
+Used by the Sky window to find the catalog object under the mouse pointer.
+Objects are sorted into square grid cells, so finding the nearest object
+within a given distance only examines the few cells near the point.
+
+History:
+2026-10-18 ROwen
+"""
+__all__ = ["PixPosIndex"]
+
+import numpy
+
+# default width of a grid cell (pixels)
+_DefCellSize = 8.0
+
+# if a search spans more than this many rows of cells then whole rows are examined
+_MaxRowSlices = 32
+
+class PixPosIndex(object):
+    """A grid-bucket spatial index of objects at pixel positions.
+
+    Inputs:
+    - xArr      x pixel positions (sequence or numpy array)
+    - yArr      y pixel positions
+    - objList   objects, one per position
+    - cellSize  width of a grid cell (pixels); for best performance
+                this should be similar to the usual search radius
+
+    Building the index is O(n log n) and may be done in a background thread;
+    the index is never modified after it is built.
+    """
+    def __init__(self, xArr=(), yArr=(), objList=(), cellSize=_DefCellSize):
+        self.xArr = numpy.array(xArr, dtype=float)
+        self.yArr = numpy.array(yArr, dtype=float)
+        if not (len(self.xArr) == len(self.yArr) == len(objList)):
+            raise ValueError("xArr, yArr and objList must have the same length")
+        self.objList = objList
+        self.cellSize = float(cellSize)
+
+        cellXArr = numpy.floor(self.xArr / self.cellSize).astype(int)
+        cellYArr = numpy.floor(self.yArr / self.cellSize).astype(int)
+        if len(self.xArr) == 0:
+            self.minCell = numpy.zeros(2, dtype=int)
+            self.nCells = numpy.ones(2, dtype=int)
+        else:
+            self.minCell = numpy.array((cellXArr.min(), cellYArr.min()))
+            self.nCells = numpy.array((cellXArr.max(), cellYArr.max())) + 1 - self.minCell
+        cellIndArr = (cellYArr - self.minCell[1]) * self.nCells[0] + (cellXArr - self.minCell[0])
+
+        # sort objects by cell; the objects in cell i are
+        # self.sortInds[self.cellBegInds[i]:self.cellBegInds[i+1]]
+        self.sortInds = numpy.argsort(cellIndArr, kind="mergesort")
+        self.sortedXArr = self.xArr[self.sortInds]
+        self.sortedYArr = self.yArr[self.sortInds]
+        self.cellBegInds = numpy.searchsorted(
+            cellIndArr[self.sortInds],
+            numpy.arange(self.nCells[0] * self.nCells[1] + 1),
+        )
+
+    def findNearest(self, xyPix, maxDistSq=9.0e99):
+        """Return the object nearest to xyPix, or None if no object is within maxDistSq pix^2
+
+        The search only examines grid cells within sqrt(maxDistSq) of xyPix,
+        so small search radii are very fast.
+        """
+        ind, distSq = self.findNearestInd(xyPix, maxDistSq)
+        if ind is None:
+            return None
+        return self.objList[ind]
+
+    def findNearestInd(self, xyPix, maxDistSq=9.0e99):
+        """Return (index, distance^2) of the object nearest to xyPix,
+        or (None, None) if no object is within maxDistSq pix^2
+        """
+        if len(self.xArr) == 0:
+            return (None, None)
+        maxDist = numpy.sqrt(maxDistSq)
+        xyPixArr = numpy.array(xyPix, dtype=float)
+        # clip before converting to int, to avoid overflow for very large maxDistSq
+        cellBeg = numpy.clip(numpy.floor((xyPixArr - maxDist) / self.cellSize) - self.minCell,
+            0, self.nCells).astype(int)
+        cellEnd = numpy.clip(numpy.floor((xyPixArr + maxDist) / self.cellSize) - self.minCell,
+            -1, self.nCells - 1).astype(int)
+        if numpy.any(cellEnd < cellBeg):
+            return (None, None)
+
+        # the cells in one row of the grid are contiguous, so each row is one slice;
+        # for large search areas simply examine whole rows
+        if cellEnd[1] - cellBeg[1] >= _MaxRowSlices:
+            candInds = numpy.arange(
+                self.cellBegInds[cellBeg[1] * self.nCells[0]],
+                self.cellBegInds[(cellEnd[1] + 1) * self.nCells[0]],
+            )
+        else:
+            sliceList = []
+            for cellY in range(cellBeg[1], cellEnd[1] + 1):
+                rowInd = cellY * self.nCells[0]
+                sliceList.append(numpy.arange(
+                    self.cellBegInds[rowInd + cellBeg[0]],
+                    self.cellBegInds[rowInd + cellEnd[0] + 1],
+                ))
+            candInds = numpy.concatenate(sliceList)
+        if len(candInds) == 0:
+            return (None, None)
+
+        distSqArr = (self.sortedXArr[candInds] - xyPix[0])**2 + (self.sortedYArr[candInds] - xyPix[1])**2
+        minInd = numpy.argmin(distSqArr)
+        minDistSq = distSqArr[minInd]
+        if minDistSq >= maxDistSq:
+            return (None, None)
+        return (self.sortInds[candInds[minInd]], minDistSq)
+
+    def iterPixPosObj(self):
+        """Return an iterator over ((x, y), obj) for all objects in the index, in objList order
+        """
+        return iter(zip(zip(self.xArr.tolist(), self.yArr.tolist()), self.objList))
+
+    def __len__(self):
+        return len(self.objList)
+
+
+if __name__ == "__main__":
+    # measure the latency of nearest-object lookup (as used for each <Motion> event in the Sky window)
+    # and compare to a linear search over a list of (pixPos, obj)
+    import random
+    import time
+
+    def linearFindNearest(pixPosObjList, xyPix, maxDistSq):
+        minObj = None
+        minDistSq = maxDistSq
+        for objPixPos, obj in pixPosObjList:
+            distSq = (objPixPos[0] - xyPix[0])**2 + (objPixPos[1] - xyPix[1])**2
+            if distSq < minDistSq:
+                minObj = obj
+                minDistSq = distSq
+        return minObj
+
+    canvasSize = 600
+    nLookups = 200
+    for nObj in (1000, 10000, 100000):
+        xList = [random.uniform(0, canvasSize) for i in xrange(nObj)]
+        yList = [random.uniform(0, canvasSize) for i in xrange(nObj)]
+        objList = range(nObj)
+        pixPosObjList = zip(zip(xList, yList), objList)
+
+        startTime = time.time()
+        pixPosIndex = PixPosIndex(xList, yList, objList)
+        buildTime = time.time() - startTime
+
+        xyPixList = [(random.uniform(0, canvasSize), random.uniform(0, canvasSize)) for i in range(nLookups)]
+
+        startTime = time.time()
+        indexResults = [pixPosIndex.findNearest(xyPix, maxDistSq=25.0) for xyPix in xyPixList]
+        indexTime = (time.time() - startTime) / nLookups
+
+        nLinear = max(5, nLookups * 1000 // nObj)
+        startTime = time.time()
+        linearResults = [linearFindNearest(pixPosObjList, xyPix, 25.0) for xyPix in xyPixList[0:nLinear]]
+        linearTime = (time.time() - startTime) / nLinear
+
+        if indexResults[0:nLinear] != linearResults:
+            raise RuntimeError("index and linear search results differ")
+        print "%6d objects: build %7.4f sec; lookup: index %6.1f usec, linear search %8.1f usec" % \
+            (nObj, buildTime, indexTime * 1.0e6, linearTime * 1.0e6)
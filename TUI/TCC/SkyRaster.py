@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""Render catalog objects into an RGBA image, for display as a single canvas image item.
+
+Used by the Sky window to display large catalogs: one PhotoImage is much faster
+for Tk to create and redraw than thousands of canvas oval items.
+Rasterizing does not use Tk, so it can be done in a background thread.
+
+History:
+2026-10-18 ROwen
+"""
+__all__ = ["rasterizePoints", "imageFromRGBA"]
+
+import numpy
+
+# maximum number of points processed at once (limits temporary memory use)
+_MaxChunk = 100000
+
+def _getStampOffsets(rad):
+    """Return x and y offsets (pixels) of the pixels in a filled disk of the given radius
+
+    The disk approximately matches a Tk canvas oval with bounding box
+    (x - rad, y - rad, x + rad + 1, y + rad + 1).
+    """
+    dxArr, dyArr = numpy.mgrid[-rad:rad+1, -rad:rad+1]
+    inDisk = (dxArr**2 + dyArr**2) <= rad * (rad + 1)
+    return dxArr[inDisk], dyArr[inDisk]
+
+def rasterizePoints(xArr, yArr, size, rgb, rad=2):
+    """Draw a filled disk at each point into a new RGBA image array.
+
+    Inputs:
+    - xArr, yArr    x and y pixel positions (sequences or numpy arrays);
+                    points may lie partly or entirely outside the image
+    - size          image size (x, y) (pixels)
+    - rgb           color of the disks: (red, green, blue), each 0-255
+    - rad           radius of the disks (pixels)
+
+    Returns a numpy uint8 array of shape (size[1], size[0], 4);
+    pixels with no disk are fully transparent.
+    """
+    width, height = [int(val) for val in size]
+    xIntArr = numpy.round(numpy.asarray(xArr, dtype=float)).astype(int)
+    yIntArr = numpy.round(numpy.asarray(yArr, dtype=float)).astype(int)
+    dxArr, dyArr = _getStampOffsets(rad)
+
+    isSetArr = numpy.zeros((height, width), dtype=bool)
+    for begInd in range(0, len(xIntArr), _MaxChunk):
+        xPixArr = (xIntArr[begInd:begInd + _MaxChunk, numpy.newaxis] + dxArr).ravel()
+        yPixArr = (yIntArr[begInd:begInd + _MaxChunk, numpy.newaxis] + dyArr).ravel()
+        inImage = (xPixArr >= 0) & (xPixArr < width) & (yPixArr >= 0) & (yPixArr < height)
+        isSetArr[yPixArr[inImage], xPixArr[inImage]] = True
+
+    rgbaArr = numpy.zeros((height, width, 4), dtype=numpy.uint8)
+    rgbaArr[isSetArr] = tuple(rgb) + (255,)
+    return rgbaArr
+
+def imageFromRGBA(rgbaArr):
+    """Return a PIL Image from an RGBA image array (as returned by rasterizePoints)
+    """
+    from PIL import Image
+    return Image.fromarray(rgbaArr, "RGBA")
+
+
+if __name__ == "__main__":
+    # benchmark rasterizing random points into a 600x600 image
+    import random
+    import time
+
+    size = (600, 600)
+    for nObj in (1000, 10000, 50000, 200000):
+        xList = [random.uniform(0, size[0]) for i in xrange(nObj)]
+        yList = [random.uniform(0, size[1]) for i in xrange(nObj)]
+
+        startTime = time.time()
+        rgbaArr = rasterizePoints(xList, yList, size, (255, 0, 0))
+        rasterTime = time.time() - startTime
+
+        startTime = time.time()
+        imageFromRGBA(rgbaArr)
+        imageTime = time.time() - startTime
+        print "%6d objects: rasterize %6.3f sec; make PIL image %6.3f sec" % (nObj, rasterTime, imageTime)
@@ -42,9 +42,18 @@ History:
 2011-06-17 ROwen    Changed "type" to "msgType" in parsed message dictionaries (in test code only).
                     Added constant WindowName.
 2012-07-09 ROwen    Modified to use RO.TkUtil.Timer.
+2026-10-18 ROwen    Compute catalog object positions all at once using TelTarget.Catalog.getAzAltArr
+                    instead of converting one object at a time.
+2026-10-18 ROwen    Find the catalog object nearest the mouse using a spatial index
+                    (TUI.TCC.PixPosIndex) for each catalog, rebuilt when the catalog is updated,
+                    instead of searching every object on every mouse motion event.
+2026-10-18 ROwen    Display large catalogs as a single image (rendered by TUI.TCC.SkyRaster
+                    in the background thread) instead of one canvas oval per object.
 """
 import math
 import Tkinter
+import numpy
+from PIL import ImageTk
 import RO.CanvasUtil
 import RO.CnvUtil
 import RO.MathUtil
@@ -52,6 +61,8 @@ import RO.ScriptRunner
 from RO.TkUtil import Timer
 import RO.Wdg
 import TUI.TUIModel
+import TUI.TCC.PixPosIndex
+import TUI.TCC.SkyRaster
 import TUI.TCC.TCCModel
 import TUI.TCC.UserModel
 
@@ -71,6 +82,11 @@ _HelpURL = "Telescope/SkyWin.html"
 
 # constants regarding redraw of catalog objects
 _CatRedrawDelay = 5.0
+_CatObjRad = 2 # radius of catalog objects (pixels)
+
+# catalogs with at least this many visible objects are displayed as a single image;
+# smaller catalogs are displayed as one canvas oval per object
+_MinRasterObjects = 500
 
 def xyDegFromAzAlt (azAlt):
     """converts a point from az,alt degrees (0 south, 90 east)
@@ -176,12 +192,13 @@ class SkyWdg (Tkinter.Frame):
         
         # various dictionaries whose keys are catalog name
         # note: if a catalog is deleted, it is removed from catDict
-        # and catPixPosObjDict, but not necessarily the others
+        # and catPixPosIndexDict, but not necessarily the others
         self.catDict = {}   # key=catalog name, value = catalog
         self.catRedrawTimerDict = {}    # key=catalog name, value = tk after id
         self.catColorDict = {}  # key=catalog name, value = color
-        self.catPixPosObjDict = {}  # key=catalog name, value = list of (pix pos, obj) pairs
+        self.catPixPosIndexDict = {}  # key=catalog name, value = PixPosIndex of catalog objects
         self.catSRDict = {} # key=catalog name, value = scriptrunner script to redisplay catalog
+        self.catPhotoImageDict = {} # key=catalog name, value = PhotoImage of catalog objects, if displayed as an image
 
         self.telCurrent = None
         self.telTarget = None
@@ -349,7 +366,7 @@ class SkyWdg (Tkinter.Frame):
             self.removeCatalogByName(catName)
         
         self.catDict[catName] = catalog
-        self.catPixPosObjDict[catName] = []
+        self.catPixPosIndexDict[catName] = TUI.TCC.PixPosIndex.PixPosIndex()
         self.catRedrawTimerDict[catName] = Timer()
         self.catColorDict[catName] = catalog.getDispColor()
         
@@ -357,41 +374,59 @@ class SkyWdg (Tkinter.Frame):
             catName = catalog.name
             
             catTag = "cat_%s" % (catName,)
+            ovalTag = "catOval_%s" % (catName,)
             
             if not catalog.getDoDisplay():
-                self.catPixPosObjDict[catName] = []
+                self.catPixPosIndexDict[catName] = TUI.TCC.PixPosIndex.PixPosIndex()
                 self.cnv.delete(catTag)
+                self.catPhotoImageDict.pop(catName, None)
                 return
     
             # if color has changed, update it
+            # (an image is redrawn in the new color when the update finishes)
             color = catalog.getDispColor()
             oldColor = self.catColorDict.get(catName)
             if color != oldColor:
-                self.cnv.itemconfigure(catTag, fill = color, outline = color)
+                self.cnv.itemconfigure(ovalTag, fill = color, outline = color)
                 self.catColorDict[catName] = color
+            rasterSize = (self.cnv.winfo_width(), self.cnv.winfo_height())
+            rasterRGB = [val // 256 for val in self.cnv.winfo_rgb(color)]
                 
 #           print "compute %s thread starting" % catName
-            yield sr.waitThread(_UpdateCatalog, catalog.objList, self.center, self.azAltScale)
-            pixPosObjList = sr.value
+            yield sr.waitThread(_UpdateCatalog, catalog, self.center, self.azAltScale, rasterSize, rasterRGB)
+            pixPosIndex, rgbaArr = sr.value
 #           print "compute %s thread done" % catName
 
             catName = catalog.name
             catTag = "cat_%s" % (catName,)
     
-            self.catPixPosObjDict[catName] = []
+            self.catPixPosIndexDict[catName] = TUI.TCC.PixPosIndex.PixPosIndex()
             self.cnv.delete(catTag)
+            self.catPhotoImageDict.pop(catName, None)
     
-            color = catalog.getDispColor()      
-            rad = 2 # for now, eventually may wish to vary by magnitude or window size or...?
-            for pixPos, obj in pixPosObjList:
-                self.cnv.create_oval(
-                    pixPos[0] - rad,     pixPos[1] - rad,
-                    pixPos[0] + rad + 1, pixPos[1] + rad + 1,
+            if rgbaArr is not None:
+                # display the catalog as one image, below the telescope position markers;
+                # keep a reference to the PhotoImage, else Tk will not display it
+                photoImage = ImageTk.PhotoImage(TUI.TCC.SkyRaster.imageFromRGBA(rgbaArr))
+                self.catPhotoImageDict[catName] = photoImage
+                self.cnv.create_image(0, 0,
+                    anchor = "nw",
+                    image = photoImage,
                     tag = (SkyWdg.CATOBJECT, catTag),
-                    fill = color,
-                    outline = color,
                 )
-            self.catPixPosObjDict[catName] = pixPosObjList
+                self.cnv.tag_lower(catTag)
+            else:
+                color = catalog.getDispColor()      
+                rad = _CatObjRad
+                for pixPos, obj in pixPosIndex.iterPixPosObj():
+                    self.cnv.create_oval(
+                        pixPos[0] - rad,     pixPos[1] - rad,
+                        pixPos[0] + rad + 1, pixPos[1] + rad + 1,
+                        tag = (SkyWdg.CATOBJECT, catTag, ovalTag),
+                        fill = color,
+                        outline = color,
+                    )
+            self.catPixPosIndexDict[catName] = pixPosIndex
             
             self.catRedrawTimerDict[catName].start(_CatRedrawDelay, self._drawCatalog, catalog)
         
@@ -432,7 +467,7 @@ class SkyWdg (Tkinter.Frame):
         timer.cancel()
         
         # delete entry in other catalog dictionaries
-        for catDict in self.catPixPosObjDict, self.catColorDict:
+        for catDict in self.catPixPosIndexDict, self.catColorDict, self.catPhotoImageDict:
             try:
                 del catDict[catName]
             except KeyError:
@@ -440,16 +475,15 @@ class SkyWdg (Tkinter.Frame):
 
     def findNearestStar(self, xyPix, maxDistSq=9.0e99):
         """Finds the catalog object nearest to xyPix, but only if
-        the squared distance is within maxDistSq deg^2
+        the squared distance is within maxDistSq pix^2
         Returns the catalog object, or None if none found"""
         minStar = None
         minDistSq = maxDistSq
-        for pixPosCatObjList in self.catPixPosObjDict.itervalues():
-            for objPixPos, catObj in pixPosCatObjList:
-                distSq = (objPixPos[0] - xyPix[0])**2 + (objPixPos[1] - xyPix[1])**2
-                if distSq < minDistSq:
-                    minStar = catObj
-                    minDistSq = distSq
+        for pixPosIndex in self.catPixPosIndexDict.itervalues():
+            ind, distSq = pixPosIndex.findNearestInd(xyPix, minDistSq)
+            if ind is not None:
+                minStar = pixPosIndex.objList[ind]
+                minDistSq = distSq
         return minStar
     
     def pixFromAzAlt(self, azAlt):
@@ -523,7 +557,8 @@ class SkyWdg (Tkinter.Frame):
     def _drawAllCatalogs(self):
         """Draw all objects in all catalogs, erasing all stars first.
         """
-        self.catPixPosObjDict = {}
+        self.catPixPosIndexDict = {}
+        self.catPhotoImageDict = {}
         self.cnv.delete(SkyWdg.CATOBJECT)
         for catalog in self.catDict.itervalues():
             self._drawCatalog(catalog)
@@ -644,25 +679,41 @@ class SkyWdg (Tkinter.Frame):
         self._telPotentialAnimTimer.start(_CatRedrawDelay, self._drawTelPotential)
 
 
-def _UpdateCatalog(objList, center, azAltScale):
-    """Returns a list of [pixPos, obj] for the specified catalog.
+def _UpdateCatalog(catalog, center, azAltScale, rasterSize, rasterRGB):
+    """Compute the display of the visible objects in the specified catalog.
     Can be run as a background thread.
-    """
-    pixPosObjList = []
-    for catObj in objList:
-        azAlt = catObj.getAzAlt()
-        if azAlt[1] < 0:
-            continue
-        
-        xyDeg = xyDegFromAzAlt(azAlt)
-        pixPos = (
-            center[0] - (xyDeg[0] * azAltScale),
-            center[1] - (xyDeg[1] * azAltScale),
-        )
 
-        pixPosObjList.append((pixPos, catObj))
-
-    return pixPosObjList
+    Inputs:
+    - catalog       the catalog (a TUI.TCC.TelTarget.Catalog)
+    - center        center of the az/alt display (x, y pixels)
+    - azAltScale    scale of the az/alt display (pixels/deg)
+    - rasterSize    size of the canvas (x, y pixels)
+    - rasterRGB     color of catalog objects: (red, green, blue), each 0-255
+    
+    Returns:
+    - pixPosIndex   a TUI.TCC.PixPosIndex.PixPosIndex of the visible objects
+    - rgbaArr       an RGBA image array of the visible objects (see TUI.TCC.SkyRaster.rasterizePoints)
+                    if there are at least _MinRasterObjects visible objects, else None
+    """
+    azArr, altArr = catalog.getAzAltArr()
+    with numpy.errstate(invalid="ignore"):
+        visInds = numpy.nonzero(altArr >= 0)[0]
+
+    # compute pixel positions; see xyDegFromAzAlt and SkyWdg.pixFromDeg
+    thetaRad = numpy.radians(azArr[visInds] - 90.0)
+    r = 90.0 - altArr[visInds]
+    xPixArr = center[0] - (r * numpy.cos(thetaRad) * azAltScale)
+    yPixArr = center[1] - (r * numpy.sin(thetaRad) * azAltScale)
+
+    objList = catalog.objList
+    visObjList = [objList[ind] for ind in visInds.tolist()]
+    pixPosIndex = TUI.TCC.PixPosIndex.PixPosIndex(xPixArr, yPixArr, visObjList)
+    
+    if len(visObjList) < _MinRasterObjects:
+        return pixPosIndex, None
+    # offset by 0.5 pixel to match the ovals, whose bounding box is (pos - rad, pos + rad + 1)
+    rgbaArr = TUI.TCC.SkyRaster.rasterizePoints(xPixArr + 0.5, yPixArr + 0.5, rasterSize, rasterRGB, _CatObjRad)
+    return pixPosIndex, rgbaArr
 
 if __name__ == '__main__':
     import random
@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+"""Order a list of az/alt positions to minimize total slew time.
+
+Used by the Pointing Data script to visit grid stars in a slew-efficient order.
+
+The slew time between two positions is estimated as the longest of the az, alt and rot move times,
+where each axis accelerates at a constant rate to its maximum velocity, coasts, then decelerates
+(jerk is ignored). Axis limits, velocities and accelerations are normally taken from the TCC's
+AzLim, AltLim and RotLim keywords. Azimuth wrap is handled by choosing, for each position,
+the mount azimuth within the azimuth limits that is closest to the previous mount azimuth
+(like the TCC's /Wrap=Nearest).
+
+The tour is planned with a nearest neighbor tour followed by 2-opt improvement
+(both vectorized with numpy), using slew times computed with the shorter way around in azimuth;
+the predicted time of a tour is then computed with azimuth wrap limits enforced.
+
+History:
+2026-10-18 ROwen
+"""
+__all__ = ["AxisModel", "SlewTimeModel", "planTour", "getParallacticAngle"]
+
+import numpy
+import RO.MathUtil
+import TUI.TCC.TelConst
+
+# default axis limits: min pos (deg), max pos (deg), max vel (deg/sec), max accel (deg/sec^2);
+# only used if the TCC has not reported the limits
+_DefAzLim = (-180.0, 540.0, 1.5, 0.5)
+_DefAltLim = (6.0, 90.0, 1.5, 0.5)
+_DefRotLim = (-360.0, 360.0, 2.0, 1.0)
+
+# maximum number of 2-opt passes
+_Max2OptPasses = 100
+
+class AxisModel(object):
+    """Motion model for one axis
+
+    Inputs:
+    - minPos, maxPos: minimum and maximum position (deg)
+    - vel: maximum velocity (deg/sec)
+    - accel: maximum acceleration (deg/sec^2)
+    """
+    def __init__(self, minPos, maxPos, vel, accel):
+        self.minPos = float(minPos)
+        self.maxPos = float(maxPos)
+        self.vel = float(vel)
+        self.accel = float(accel)
+
+    def getMoveTime(self, dist):
+        """Return the time to move a given distance (or array of distances), starting and ending at rest
+        """
+        dist = numpy.abs(dist)
+        # distance needed to reach full velocity and stop again
+        accelDist = self.vel**2 / self.accel
+        return numpy.where(
+            dist <= accelDist,
+            2.0 * numpy.sqrt(dist / self.accel),
+            (dist / self.vel) + (self.vel / self.accel),
+        )
+
+
+class SlewTimeModel(object):
+    """Estimate slew times between az/alt/rot positions
+
+    Inputs:
+    - azLim, altLim, rotLim: limits for each axis, in the form reported by the TCC's AzLim, AltLim
+        and RotLim keywords: min pos, max pos, vel, accel, jerk (jerk is ignored and may be omitted);
+        None (or any None value) means use the default
+    """
+    def __init__(self, azLim=None, altLim=None, rotLim=None):
+        self.azModel = self._makeAxisModel(azLim, _DefAzLim)
+        self.altModel = self._makeAxisModel(altLim, _DefAltLim)
+        self.rotModel = self._makeAxisModel(rotLim, _DefRotLim)
+
+    @classmethod
+    def fromTCCModel(cls, tccModel):
+        """Create a SlewTimeModel from the limits reported by the TCC
+
+        Inputs:
+        - tccModel: the TCC model (TUI.TCC.TCCModel.getModel())
+        """
+        return cls(
+            azLim = tccModel.azLim.get()[0],
+            altLim = tccModel.altLim.get()[0],
+            rotLim = tccModel.rotLim.get()[0],
+        )
+
+    def getMountAz(self, az, currMountAz=None):
+        """Return the mount azimuth of an azimuth: the wrap within the azimuth limits nearest currMountAz
+
+        Inputs:
+        - az: azimuth (deg)
+        - currMountAz: current mount azimuth (deg); if None then the wrap nearest the middle of the limits is used
+        """
+        if currMountAz is None:
+            currMountAz = (self.azModel.minPos + self.azModel.maxPos) / 2.0
+        # nearest wrap to currMountAz, then move into the limits if necessary
+        mountAz = currMountAz + RO.MathUtil.wrapCtr(az - currMountAz)
+        while mountAz < self.azModel.minPos and mountAz + 360.0 <= self.azModel.maxPos:
+            mountAz += 360.0
+        while mountAz > self.azModel.maxPos and mountAz - 360.0 >= self.azModel.minPos:
+            mountAz -= 360.0
+        return mountAz
+
+    def getSlewTime(self, fromPos, toPos):
+        """Return the time to slew between two positions and the new mount azimuth
+
+        Inputs:
+        - fromPos: mount az, alt, rot of the starting position (deg); rot may be None if unknown
+        - toPos: az, alt, rot of the destination (deg); rot may be None if the rotator does not move
+
+        Returns:
+        - slew time (sec)
+        - mount azimuth at toPos (deg)
+        """
+        fromMountAz, fromAlt, fromRot = fromPos
+        toAz, toAlt, toRot = toPos
+        toMountAz = self.getMountAz(toAz, fromMountAz)
+        moveTimeList = [
+            self.azModel.getMoveTime(toMountAz - fromMountAz),
+            self.altModel.getMoveTime(toAlt - fromAlt),
+        ]
+        if None not in (fromRot, toRot):
+            moveTimeList.append(self.rotModel.getMoveTime(toRot - fromRot))
+        return float(max(moveTimeList)), toMountAz
+
+    def getTimeMatrix(self, azArr, altArr, rotArr=None):
+        """Return a matrix of slew times between every pair of positions
+
+        Azimuth moves are taken the short way around (azimuth limits are ignored),
+        so the matrix is symmetric.
+
+        Inputs:
+        - azArr, altArr: azimuth and altitude of each position (deg)
+        - rotArr: rotator angle of each position (deg), or None if the rotator does not move
+        """
+        azArr = numpy.asarray(azArr, dtype=float)
+        altArr = numpy.asarray(altArr, dtype=float)
+        dAzArr = numpy.abs(numpy.subtract.outer(azArr, azArr)) % 360.0
+        dAzArr = numpy.minimum(dAzArr, 360.0 - dAzArr)
+        timeMat = numpy.maximum(
+            self.azModel.getMoveTime(dAzArr),
+            self.altModel.getMoveTime(numpy.subtract.outer(altArr, altArr)),
+        )
+        if rotArr is not None:
+            rotArr = numpy.asarray(rotArr, dtype=float)
+            timeMat = numpy.maximum(timeMat, self.rotModel.getMoveTime(numpy.subtract.outer(rotArr, rotArr)))
+        return timeMat
+
+    def getStartTimeArr(self, startPos, azArr, altArr, rotArr=None):
+        """Return an array of slew times from startPos to each position
+
+        Inputs:
+        - startPos: mount az, alt, rot of the starting position (deg); rot may be None if unknown
+        - azArr, altArr, rotArr: see getTimeMatrix
+        """
+        if rotArr is None:
+            rotArr = [None] * len(azArr)
+        return numpy.array([self.getSlewTime(startPos, toPos)[0] for toPos in zip(azArr, altArr, rotArr)])
+
+    def getTourTime(self, order, azArr, altArr, rotArr=None, startPos=None):
+        """Return the predicted total slew time of a tour, with azimuth limits enforced
+
+        Inputs:
+        - order: indices of the positions, in the order visited
+        - azArr, altArr, rotArr: see getTimeMatrix
+        - startPos: mount az, alt, rot of the starting position (deg); rot may be None if unknown;
+            if None then the time to slew to the first position is not included
+        """
+        if rotArr is None:
+            rotArr = [None] * len(azArr)
+        totTime = 0.0
+        currPos = startPos
+        for ind in order:
+            toPos = (azArr[ind], altArr[ind], rotArr[ind])
+            if currPos is None:
+                currPos = (self.getMountAz(toPos[0]), toPos[1], toPos[2])
+                continue
+            slewTime, mountAz = self.getSlewTime(currPos, toPos)
+            totTime += slewTime
+            currPos = (mountAz, toPos[1], toPos[2])
+        return totTime
+
+    def _makeAxisModel(self, lim, defLim):
+        if lim is None:
+            lim = defLim
+        limList = [defVal if val is None else val for val, defVal in zip(lim[0:4], defLim)]
+        return AxisModel(*limList)
+
+
+def planTour(timeMat, startTimeArr=None):
+    """Plan a tour (an open path) that visits every position once, minimizing total slew time
+
+    Uses a nearest neighbor tour improved by 2-opt moves (reversing a section of the tour).
+
+    Inputs:
+    - timeMat: symmetric matrix of slew times between positions, e.g. from SlewTimeModel.getTimeMatrix
+    - startTimeArr: slew time from the current position to each position, or None if the tour may start anywhere
+
+    Returns a list of position indices, in the order to visit them.
+    """
+    numPos = len(timeMat)
+    if numPos == 0:
+        return []
+
+    # add a start node (index numPos); if the start is unknown then its slew times are all 0
+    if startTimeArr is None:
+        startTimeArr = numpy.zeros(numPos, dtype=float)
+    augMat = numpy.zeros((numPos + 1, numPos + 1), dtype=float)
+    augMat[0:numPos, 0:numPos] = timeMat
+    augMat[numPos, 0:numPos] = startTimeArr
+    augMat[0:numPos, numPos] = startTimeArr
+
+    # nearest neighbor tour from the start node
+    path = [numPos]
+    isVisited = numpy.zeros(numPos + 1, dtype=bool)
+    isVisited[numPos] = True
+    for i in range(numPos):
+        nextInd = int(numpy.argmin(numpy.where(isVisited, numpy.inf, augMat[path[-1]])))
+        path.append(nextInd)
+        isVisited[nextInd] = True
+    path = numpy.array(path)
+
+    # 2-opt: reverse path[i:j+1] if that shortens the path; the start node (path[0]) is fixed
+    # and the end is free, which is modeled as a final edge of zero length
+    for passInd in range(_Max2OptPasses):
+        didImprove = False
+        for i in range(1, numPos):
+            jArr = numpy.arange(i + 1, numPos + 1)
+            prevNode = path[i - 1]
+            nextNodeArr = path[jArr[:-1] + 1]
+            oldTimeArr = augMat[prevNode, path[i]] + augMat[path[jArr], numpy.append(nextNodeArr, path[jArr[-1]])]
+            newTimeArr = augMat[prevNode, path[jArr]] + augMat[path[i], numpy.append(nextNodeArr, path[i])]
+            # the final edge (from the end of the path) has zero length
+            oldTimeArr[-1] = augMat[prevNode, path[i]]
+            newTimeArr[-1] = augMat[prevNode, path[-1]]
+            deltaArr = newTimeArr - oldTimeArr
+            bestInd = int(numpy.argmin(deltaArr))
+            if deltaArr[bestInd] < -1.0e-9:
+                j = jArr[bestInd]
+                path[i:j+1] = path[i:j+1][::-1].copy()
+                didImprove = True
+        if not didImprove:
+            break
+    return [int(ind) for ind in path[1:]]
+
+def getParallacticAngle(az, alt, latitude=TUI.TCC.TelConst.Latitude):
+    """Return the parallactic angle (deg) of a position
+
+    Inputs:
+    - az: azimuth (deg; TCC convention: 0 = south, 90 = east)
+    - alt: altitude (deg)
+    - latitude: latitude of the observer (deg)
+    """
+    azFromNorth = numpy.radians(numpy.add(az, 180.0))
+    alt = numpy.radians(alt)
+    lat = numpy.radians(latitude)
+    return numpy.degrees(numpy.arctan2(
+        -numpy.sin(azFromNorth) * numpy.cos(lat),
+        numpy.cos(alt) * numpy.sin(lat) - numpy.sin(alt) * numpy.cos(lat) * numpy.cos(azFromNorth),
+    ))
+
+
+if __name__ == "__main__":
+    # compare predicted slew time of TUI's standard pointing grids in file order and in optimized order
+    import glob
+    import os
+    import time
+    import TUI.TUIPaths
+
+    slewTimeModel = SlewTimeModel()
+    startPos = (slewTimeModel.getMountAz(0.0), 60.0, 0.0)
+    for gridPath in sorted(glob.glob(os.path.join(TUI.TUIPaths.getResourceDir("Grids"), "*.dat"))):
+        azAltList = []
+        with open(gridPath, "rU") as gridFile:
+            for line in gridFile:
+                line = line.strip()
+                if not line or line[0] in ("#", "!"):
+                    continue
+                azAltList.append([float(val) for val in line.split()])
+        azArr, altArr = numpy.array(azAltList).T
+        rotArr = getParallacticAngle(azArr, altArr)
+
+        for rotName, rotArg in (("Mount", None), ("Object", rotArr)):
+            fileOrder = range(len(azArr))
+            fileTime = slewTimeModel.getTourTime(fileOrder, azArr, altArr, rotArg, startPos=startPos)
+            startTime = time.time()
+            timeMat = slewTimeModel.getTimeMatrix(azArr, altArr, rotArg)
+            startTimeArr = slewTimeModel.getStartTimeArr(startPos, azArr, altArr, rotArg)
+            tourOrder = planTour(timeMat, startTimeArr)
+            planTime = time.time() - startTime
+            tourTime = slewTimeModel.getTourTime(tourOrder, azArr, altArr, rotArg, startPos=startPos)
+            print "%-24s rot=%-6s predicted slew time: file order %5.0f sec; optimized %5.0f sec (%0.0f%% less); planned in %0.3f sec" % \
+                (os.path.basename(gridPath), rotName, fileTime, tourTime, 100.0 * (1.0 - tourTime / fileTime), planTime)
@@ -16,6 +16,7 @@ History:
                     Modified for changes in the TestData module.
                     Added constant WindowName.
 2011-02-16 ROwen    Added AxisOffsetWdg and moved MiscWdg above the offsets.
+2026-10-18 ROwen    Added LoadEagerly.
 """
 import Tkinter
 import AxisStatus
@@ -28,6 +29,9 @@ import SlewStatus
 
 WindowName = "TCC.Status"
 
+# load at startup even if hidden, so axis and slew sounds are played while the window is hidden
+LoadEagerly = True
+
 def addWindow(tlSet):
     """Set up the main status window
     """
@@ -14,10 +14,16 @@ History:
 2004-08-10 ROwen    Modified to use RO.Wdg.colorOK.
 2005-06-08 ROwen    Changed TelTarget to a new-style class.
 2005-07-07 ROwen    Modified for moved RO.TkUtil.
+2026-10-18 ROwen    Added TargetArray and Catalog.getAzAltArr to compute the az/alt
+                    of all objects in a catalog at once using numpy.
 """
 import sys
 import time
+import numpy
 import RO.AddCallback
+import RO.Astro.llv
+import RO.Astro.Tm
+import RO.PhysConst
 import RO.SeqUtil
 import RO.StringUtil
 import RO.Astro.Cnv
@@ -30,6 +36,16 @@ import TelConst
 # default color for displaying catalog objects
 _DefColor = 'black'
 
+# constants for TargetArray; these match those used by RO.Astro.Sph.ccFromSCPV
+_MinParallax = 1.0e-7  # arcsec
+_RadPerYear_per_ASPerCy = RO.PhysConst.RadPerDeg / (RO.PhysConst.ArcSecPerDeg * 100.0)
+_AUPerYear_per_KMPerSec = RO.PhysConst.SecPerDay * RO.PhysConst.DayPerYear / RO.PhysConst.KmPerAU
+
+# interval (days) over which star-independent apparent geocentric data
+# (precession/nutation matrix, earth position and velocity) is reused;
+# 0.01 days changes annual aberration by less than 0.01"
+_AppGeoDataInterval = 0.01
+
 class TelTarget(object):
     """A potential target position for the telescope.
     It is primarily used to display that position on an az/alt display.
@@ -158,6 +174,213 @@ class TelTarget(object):
             csysStr = "=".join((csysStr, self.dateStr))
         return "%r %s, %s %s" % (self.name, self.posStr[0], self.posStr[1], csysStr)
 
+class TargetArray(object):
+    """Positions of a collection of TelTarget objects, stored in numpy arrays,
+    for computing the current az/alt of all the objects at once.
+
+    Inputs:
+    - objList   a sequence of TelTarget objects; other objects with a getAzAlt method
+                (e.g. TUI.TCC.SkyWindow.AzAltTarget) are also accepted, but their
+                getAzAlt method is called for every update
+
+    ICRS and FK5 positions (including proper motion, parallax and radial velocity)
+    are converted to ICRS J2000 cartesian position and velocity once, all at once.
+    Positions in other coordinate systems are converted to ICRS J2000 once, one at a time.
+    Topocentric positions with no date are fixed in az/alt.
+    
+    getAzAlt then performs the conversion ICRS J2000 -> apparent geocentric -> topocentric
+    for all objects using a few numpy operations. This matches TelTarget.getAzAlt
+    to much better than an arcsecond (the star-independent apparent geocentric data
+    is cached for _AppGeoDataInterval days).
+    """
+    ObsData = TelTarget.ObsData
+
+    def __init__(self, objList):
+        self.nObj = len(objList)
+
+        icrsIndList = []
+        icrsPosList = []
+        icrsPMList = []
+        icrsParlaxList = []
+        icrsRadVelList = []
+        icrsDateList = []
+        fk5Set = set() # indices of icrsIndList that are FK5 (and so need precessing)
+        slowIndList = []
+        slowPList = []
+        slowVList = []
+        fixedIndList = []
+        fixedAzAltList = []
+        self.otherIndObjList = [] # list of (index, obj) for objects that are not TelTargets
+        for ind, obj in enumerate(objList):
+            csysConst = getattr(obj, "csysConst", False)
+            if csysConst is False:
+                self.otherIndObjList.append((ind, obj))
+                continue
+            if csysConst is None:
+                continue
+            csysName = csysConst.name()
+            if csysName == RO.CoordSys.Topocentric and obj.dateFloat is None:
+                fixedIndList.append(ind)
+                fixedAzAltList.append(obj.posDeg)
+                continue
+            if obj.dateFloat is None:
+                date = csysConst.currDefaultDate()
+            else:
+                date = obj.dateFloat
+            if csysName in (RO.CoordSys.ICRS, RO.CoordSys.FK5):
+                if csysName == RO.CoordSys.FK5:
+                    fk5Set.add(len(icrsIndList))
+                icrsIndList.append(ind)
+                icrsPosList.append(obj.posDeg)
+                icrsPMList.append(obj.pm)
+                icrsParlaxList.append(obj.parlax)
+                icrsRadVelList.append(obj.radVel)
+                icrsDateList.append(date)
+            else:
+                fromP, fromV, atInf = RO.Astro.Sph.ccFromSCPV(obj.posDeg, obj.pm, obj.parlax, obj.radVel)
+                icrsP, icrsV = RO.Astro.Cnv.coordConv(
+                    fromP, fromV, csysName, date, RO.CoordSys.ICRS, 2000.0, self.ObsData,
+                )
+                slowIndList.append(ind)
+                slowPList.append(icrsP)
+                slowVList.append(icrsV)
+
+        self.fixedIndArr = numpy.array(fixedIndList, dtype=int)
+        self.fixedAzAltArr = numpy.array(fixedAzAltList, dtype=float).reshape(-1, 2)
+
+        # convert ICRS and FK5 positions to ICRS J2000 cartesian position and velocity
+        p, v = _ccFromSCPVArr(
+            posArr = numpy.array(icrsPosList, dtype=float).reshape(-1, 2),
+            pmArr = numpy.array(icrsPMList, dtype=float).reshape(-1, 2),
+            parlaxArr = numpy.array(icrsParlaxList, dtype=float),
+            radVelArr = numpy.array(icrsRadVelList, dtype=float),
+        )
+        dateArr = numpy.array(icrsDateList, dtype=float)
+        p += v * (2000.0 - dateArr)[:, numpy.newaxis]
+        if fk5Set:
+            fk5IndArr = numpy.array(sorted(fk5Set), dtype=int)
+            fk5DateArr = dateArr[fk5IndArr]
+            for date in numpy.unique(fk5DateArr):
+                dateInds = fk5IndArr[fk5DateArr == date]
+                rotMat = RO.Astro.llv.prec(date, 2000.0)
+                p[dateInds] = numpy.dot(p[dateInds], rotMat.T)
+                v[dateInds] = numpy.dot(v[dateInds], rotMat.T)
+
+        self.icrsIndArr = numpy.array(icrsIndList + slowIndList, dtype=int)
+        self.icrsPArr = numpy.concatenate((p, numpy.array(slowPList, dtype=float).reshape(-1, 3)))
+        self.icrsVArr = numpy.concatenate((v, numpy.array(slowVList, dtype=float).reshape(-1, 3)))
+
+        self._agDataKey = None
+        self._agData = None
+
+    def getAzAlt(self, mjd=None):
+        """Return the az/alt of all objects at the specified date.
+        
+        Inputs:
+        - mjd   UTC date (MJD); if None, uses the current date
+        
+        Returns two numpy arrays: az, alt (deg), in objList order;
+        both are NaN for objects with no position (csysConst is None).
+        """
+        if mjd is None:
+            mjd = RO.Astro.Tm.utcFromPySec()
+        azArr = numpy.empty(self.nObj, dtype=float)
+        azArr.fill(numpy.nan)
+        altArr = azArr.copy()
+
+        if len(self.icrsIndArr) > 0:
+            # ICRS J2000 -> apparent geocentric (see RO.Astro.Cnv.geoFromICRS)
+            agData = self._getAppGeoData(mjd)
+            p2 = self.icrsPArr + self.icrsVArr * agData.dtPM - agData.bPos
+            p2Mag = numpy.sqrt(numpy.sum(p2 * p2, axis=1))
+            dot2 = numpy.dot(p2, agData.bVelC) / p2Mag
+            vfac = p2Mag * (1.0 + dot2 / (1.0 + agData.bGamma))
+            p3 = ((p2 * agData.bGamma) + (vfac[:, numpy.newaxis] * agData.bVelC)) \
+                / (1.0 + dot2)[:, numpy.newaxis]
+            geoP = numpy.dot(p3, agData.pnMat.T)
+
+            # apparent geocentric -> topocentric (see RO.Astro.Cnv.topoFromGeo)
+            last = RO.Astro.Tm.lastFromUT1(mjd, self.ObsData.longitude)
+            sinLAST = RO.MathUtil.sind(last)
+            cosLAST = RO.MathUtil.cosd(last)
+            posB = numpy.column_stack((
+                 cosLAST * geoP[:, 0] + sinLAST * geoP[:, 1],
+                -sinLAST * geoP[:, 0] + cosLAST * geoP[:, 1],
+                 geoP[:, 2],
+            )) - self.ObsData.p
+            bMag = numpy.sqrt(numpy.sum(posB * posB, axis=1))
+            diurAbVecMag = self.ObsData.diurAbVecMag
+            diurAbScaleCorr = 1.0 - (diurAbVecMag * posB[:, 1] / bMag)
+            posCx = posB[:, 0] * diurAbScaleCorr
+            posCy = (posB[:, 1] + (diurAbVecMag * bMag)) * diurAbScaleCorr
+            posCz = posB[:, 2] * diurAbScaleCorr
+
+            # -HA/Dec -> az/alt (see RO.Astro.Cnv.azAltFromHADec and RO.Astro.Sph.scFromCC)
+            sinLat = RO.MathUtil.sind(self.ObsData.latitude)
+            cosLat = RO.MathUtil.cosd(self.ObsData.latitude)
+            x = sinLat * posCx - cosLat * posCz
+            z = cosLat * posCx + sinLat * posCz
+            azArr[self.icrsIndArr] = numpy.degrees(numpy.arctan2(posCy, x)) % 360.0
+            altArr[self.icrsIndArr] = numpy.degrees(numpy.arctan2(z, numpy.hypot(x, posCy)))
+
+        if len(self.fixedIndArr) > 0:
+            azArr[self.fixedIndArr] = self.fixedAzAltArr[:, 0]
+            altArr[self.fixedIndArr] = self.fixedAzAltArr[:, 1]
+
+        for ind, obj in self.otherIndObjList:
+            azAlt = obj.getAzAlt()
+            if azAlt is not None:
+                azArr[ind], altArr[ind] = azAlt[0:2]
+
+        return azArr, altArr
+
+    def _getAppGeoData(self, mjd):
+        """Return star-independent apparent geocentric data for the specified UTC date (MJD),
+        recomputing it only if the cached data is more than _AppGeoDataInterval old.
+        """
+        agDataKey = int(mjd / _AppGeoDataInterval)
+        if agDataKey != self._agDataKey:
+            self._agData = RO.Astro.Cnv.AppGeoData(RO.Astro.Tm.epJFromMJD(mjd))
+            self._agDataKey = agDataKey
+        return self._agData
+
+
+def _ccFromSCPVArr(posArr, pmArr, parlaxArr, radVelArr):
+    """Array version of RO.Astro.Sph.ccFromSCPV.
+    
+    Inputs:
+    - posArr    position (deg); shape (N, 2)
+    - pmArr     proper motion (arcsec/century); shape (N, 2)
+    - parlaxArr parallax (arcsec); shape (N,)
+    - radVelArr radial velocity (km/sec, positive receding); shape (N,)
+    
+    Returns:
+    - p     cartesian position (au); shape (N, 3)
+    - v     cartesian velocity (au/year); shape (N, 3)
+    """
+    atInf = parlaxArr < _MinParallax
+    parlaxArr = numpy.where(atInf, _MinParallax, parlaxArr)
+    radVelArr = numpy.where(atInf, 0.0, radVelArr)
+    distAU = RO.PhysConst.AUPerParsec / parlaxArr
+
+    posRad = numpy.radians(posArr)
+    sinP0 = numpy.sin(posRad[:, 0])
+    cosP0 = numpy.cos(posRad[:, 0])
+    sinP1 = numpy.sin(posRad[:, 1])
+    cosP1 = numpy.cos(posRad[:, 1])
+    p = numpy.column_stack((cosP1 * cosP0, cosP1 * sinP0, sinP1)) * distAU[:, numpy.newaxis]
+
+    pm0AUPerYr = pmArr[:, 0] * distAU * _RadPerYear_per_ASPerCy
+    pm1AUPerYr = pmArr[:, 1] * distAU * _RadPerYear_per_ASPerCy
+    radVelAUPerYr = radVelArr * _AUPerYear_per_KMPerSec
+    v = numpy.column_stack((
+        - pm0AUPerYr*cosP1*sinP0 - pm1AUPerYr*sinP1*cosP0 + radVelAUPerYr*cosP1*cosP0,
+          pm0AUPerYr*cosP1*cosP0 - pm1AUPerYr*sinP1*sinP0 + radVelAUPerYr*cosP1*sinP0,
+                                   pm1AUPerYr*cosP1       + radVelAUPerYr*sinP1,
+    ))
+    return p, v
+
+
 class Catalog(RO.AddCallback.BaseMixin):
     """A catalog of TelTarget objects.
     
@@ -186,6 +409,7 @@ class Catalog(RO.AddCallback.BaseMixin):
         if not RO.SeqUtil.isSequence(objList):
             raise RuntimeError("objList=%r; must be a sequence" % objList)
         self.objList = objList
+        self._targetArray = None
 
         self.setDoDisplay(doDisplay)
         self.setDispColor(dispColor)
@@ -193,6 +417,18 @@ class Catalog(RO.AddCallback.BaseMixin):
         if callFunc:
             self.addCallback(callFunc)
     
+    def getAzAltArr(self, mjd=None):
+        """Return the az/alt of all objects as two numpy arrays: az, alt (deg).
+        
+        Objects with no position have az = alt = NaN.
+        See TargetArray.getAzAlt for details.
+        
+        Safe to call from a background thread.
+        """
+        if self._targetArray is None:
+            self._targetArray = TargetArray(self.objList)
+        return self._targetArray.getAzAlt(mjd)
+
     def getDispColor(self):
         """Returns the desired display color.
         """
@@ -233,3 +469,66 @@ class Catalog(RO.AddCallback.BaseMixin):
 #       print "setDoDisplay(%r)" % (doDisplay,)
         self._doDisplay = bool(doDisplay)
         self._doCallbacks()
+
+
+if __name__ == "__main__":
+    # benchmark Catalog.getAzAltArr against TelTarget.getAzAlt and check that they agree
+    import random
+
+    csysList = (RO.CoordSys.ICRS, RO.CoordSys.FK5, RO.CoordSys.FK4, RO.CoordSys.Galactic)
+    def makeObjList(nObj):
+        objList = []
+        for ind in xrange(nObj):
+            csys = csysList[ind % len(csysList)]
+            valueDict = dict(
+                Name = "obj%d" % (ind,),
+                ObjPos = ("%.6f" % (random.random() * 360.0,), "%.6f" % (random.uniform(-89, 89),)),
+                CSys = csys,
+                Date = random.choice(("", "1950", "2010")),
+                PM = ("%.3f" % random.uniform(-50, 50), "%.3f" % random.uniform(-50, 50)),
+                Px = random.choice(("", "0.1", "0.5")),
+                Rv = "%.1f" % random.uniform(-100, 100),
+            )
+            if csys == RO.CoordSys.ICRS and valueDict["Date"] == "1950":
+                valueDict["Date"] = ""
+            objList.append(TelTarget(valueDict))
+        return objList
+
+    mjd = RO.Astro.Tm.utcFromPySec()
+    for nObj in (1000, 10000, 100000):
+        objList = makeObjList(nObj)
+        catalog = Catalog("bench", objList)
+        
+        startTime = time.time()
+        catalog.getAzAltArr(mjd)
+        firstTime = time.time() - startTime
+        startTime = time.time()
+        azArr, altArr = catalog.getAzAltArr(mjd)
+        arrTime = time.time() - startTime
+        
+        # time TelTarget.getAzAlt for a subset of the objects and extrapolate
+        nScalar = min(nObj, 1000)
+        startTime = time.time()
+        for obj in objList[0:nScalar]:
+            obj.getAzAlt()
+        scalarTime = (time.time() - startTime) * nObj / float(nScalar)
+        
+        # check accuracy against RO.Astro.Sph.coordConv at the same date
+        # (TelTarget.getAzAlt uses the current date, which changes as the loop runs)
+        maxErrAS = 0.0
+        for ind, obj in enumerate(objList[0:nScalar]):
+            scalarAzAlt = RO.Astro.Sph.coordConv(
+                fromPos = obj.posDeg,
+                fromSys = obj.csysConst.name(),
+                fromDate = obj.dateFloat,
+                toSys = RO.CoordSys.Topocentric,
+                toDate = mjd,
+                obsData = TelTarget.ObsData,
+                fromPM = obj.pm,
+                fromParlax = obj.parlax,
+                fromRadVel = obj.radVel,
+            )[0]
+            errDeg = RO.Astro.Sph.angSep(scalarAzAlt, (azArr[ind], altArr[ind]))
+            maxErrAS = max(maxErrAS, errDeg * 3600.0)
+        print "%6d objects: getAzAlt loop %8.3f sec (est.); getAzAltArr %7.4f sec (first call %7.3f sec); max error %.3f\"" % \
+            (nObj, scalarTime, arrTime, firstTime, maxErrAS)
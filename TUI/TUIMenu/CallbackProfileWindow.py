@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+"""Callback Profile window: display keyword dispatch and callback timing statistics.
+
+Shows the statistics gathered by TUI.Base.CallbackProfiler: call count and total, mean,
+99th percentile and maximum time per actor.keyword, per callback function or per actor.
+Profiling may be enabled at startup by setting environment variable TUI_PROFILE_CALLBACKS
+or at any time using the Enable checkbox in this window.
+
+History:
+2026-10-18 ROwen
+"""
+import Tkinter
+import tkFileDialog
+import RO.Wdg
+from RO.TkUtil import Timer
+import TUI.Base.CallbackProfiler
+import TUI.Version
+
+WindowName = "%s.Callback Profile" % (TUI.Version.ApplicationName,)
+
+# interval between automatic updates of the display (sec)
+_UpdateInterval = 2.0
+
+# maximum number of items to display
+_MaxItems = 200
+
+# sort options: name, function that returns the sort key for a TimingStats, sort in reverse order?
+_SortList = (
+    ("Total", lambda st: st.totTime, True),
+    ("Mean", lambda st: st.meanTime, True),
+    ("P99", lambda st: st.p99Time, True),
+    ("Max", lambda st: st.maxTime, True),
+    ("Count", lambda st: st.count, True),
+    ("Name", lambda st: st.name, False),
+)
+_SortDict = dict((name, (keyFunc, reverse)) for name, keyFunc, reverse in _SortList)
+
+def addWindow(tlSet):
+    tlSet.createToplevel(
+        name = WindowName,
+        defGeom = "+300+200",
+        visible = False,
+        resizable = True,
+        wdgFunc = CallbackProfileWdg,
+    )
+
+class CallbackProfileWdg(Tkinter.Frame):
+    """Display keyword dispatch and callback timing statistics
+
+    Inputs:
+    - master    parent widget
+    - height    default height of text widget
+    - width     default width of text widget
+    - other keyword arguments are used for the frame
+    """
+    def __init__(self,
+        master = None,
+        height = 20,
+        width = 100,
+    **kargs):
+        Tkinter.Frame.__init__(self, master, **kargs)
+
+        self.profiler = TUI.Base.CallbackProfiler.getProfiler()
+        self._updateTimer = Timer()
+
+        ctrlFrame = Tkinter.Frame(self)
+        self.enableWdg = RO.Wdg.Checkbutton(
+            ctrlFrame,
+            text = "Enable",
+            defValue = self.profiler.isInstalled,
+            callFunc = self.doEnable,
+            helpText = "enable or disable callback profiling",
+        )
+        self.enableWdg.pack(side="left")
+        self.categoryWdg = RO.Wdg.OptionMenu(
+            ctrlFrame,
+            items = TUI.Base.CallbackProfiler.Categories,
+            defValue = TUI.Base.CallbackProfiler.Categories[0],
+            callFunc = self.updDisplay,
+            helpText = "show statistics by keyword, callback function or actor",
+        )
+        self.categoryWdg.pack(side="left")
+        RO.Wdg.StrLabel(ctrlFrame, text="Sort by").pack(side="left")
+        self.sortWdg = RO.Wdg.OptionMenu(
+            ctrlFrame,
+            items = [sortInfo[0] for sortInfo in _SortList],
+            defValue = _SortList[0][0],
+            callFunc = self.updDisplay,
+            helpText = "sort order",
+        )
+        self.sortWdg.pack(side="left")
+        RO.Wdg.Button(
+            ctrlFrame,
+            text = "Reset",
+            callFunc = self.doReset,
+            helpText = "discard all statistics",
+        ).pack(side="left")
+        RO.Wdg.Button(
+            ctrlFrame,
+            text = "Export CSV",
+            callFunc = self.doExport,
+            helpText = "save all statistics to a CSV file",
+        ).pack(side="left")
+        ctrlFrame.grid(row=0, column=0, columnspan=2, sticky="w")
+
+        self.yscroll = Tkinter.Scrollbar(
+            master = self,
+            orient = "vertical",
+        )
+        self.text = RO.Wdg.Text(
+            master = self,
+            yscrollcommand = self.yscroll.set,
+            wrap = "none",
+            readOnly = True,
+            height = height,
+            width = width,
+            helpText = "timing statistics; times are in msec",
+        )
+        self.yscroll.configure(command=self.text.yview)
+        self.text.grid(row=1, column=0, sticky="nsew")
+        self.yscroll.grid(row=1, column=1, sticky="ns")
+        self.rowconfigure(1, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.statusBar = RO.Wdg.StatusBar(self)
+        self.statusBar.grid(row=2, column=0, columnspan=2, sticky="ew")
+
+        self.bind("<Map>", self.updDisplay)
+
+    def doEnable(self, wdg=None):
+        """Enable or disable profiling"""
+        if self.enableWdg.getBool():
+            self.profiler.install()
+        else:
+            self.profiler.uninstall()
+        self.updDisplay()
+
+    def doExport(self, wdg=None):
+        """Save all statistics to a CSV file"""
+        outFile = tkFileDialog.asksaveasfile(
+            initialfile = "callbackProfile.csv",
+            defaultextension = ".csv",
+        )
+        if not outFile:
+            return
+        try:
+            self.profiler.writeCSV(outFile)
+        finally:
+            outFile.close()
+        self.statusBar.setMsg("Saved %s" % (outFile.name,))
+
+    def doReset(self, wdg=None):
+        """Discard all statistics"""
+        self.profiler.reset()
+        self.updDisplay()
+
+    def updDisplay(self, *args):
+        """Display the current statistics and (if the window is visible) schedule the next update
+        """
+        self._updateTimer.cancel()
+        if not self.winfo_ismapped():
+            return
+
+        category = self.categoryWdg.getString()
+        keyFunc, reverse = _SortDict[self.sortWdg.getString()]
+        statsList = sorted(self.profiler.getStatsList(category), key=keyFunc, reverse=reverse)
+
+        self.text.delete("1.0", "end")
+        self.text.insert("end", "%10s %10s %8s %8s %8s  %s\n" % ("Count", "Total", "Mean", "P99", "Max", category))
+        for stats in statsList[0:_MaxItems]:
+            self.text.insert("end", "%10d %10.1f %8.3f %8.3f %8.3f  %s\n" % (
+                stats.count, stats.totTime * 1000.0, stats.meanTime * 1000.0,
+                stats.p99Time * 1000.0, stats.maxTime * 1000.0, stats.name,
+            ))
+
+        if self.profiler.isInstalled:
+            self.statusBar.setMsg("Profiling enabled; %d items" % (len(statsList),))
+            self._updateTimer.start(_UpdateInterval, self.updDisplay)
+        else:
+            self.statusBar.setMsg("Profiling disabled; set environment variable %s or check Enable" % \
+                (TUI.Base.CallbackProfiler.EnvVarName,))
+
+
+if __name__ == "__main__":
+    import TUI.TUIModel
+
+    root = Tkinter.Tk()
+    tuiModel = TUI.TUIModel.getModel(True)
+    TUI.Base.CallbackProfiler.getProfiler().install()
+
+    addWindow(tuiModel.tlSet)
+    tuiModel.tlSet.makeVisible(WindowName)
+
+    root.lower()
+
+    root.mainloop()
@@ -3,25 +3,86 @@
 
 2005-07-08 ROwen
 2010-03-10 ROwen    Added WindowName
+2026-10-18 ROwen    Added DownloadsWdg, which owns the shared download scheduler
+                    and displays transfer statistics.
+2026-10-18 ROwen    Display guide image cache statistics.
 """
 import RO.Alg
+import RO.Wdg
 import RO.Wdg.HTTPGetWdg
 import TUI.Version
+import TUI.Base.DownloadScheduler
+import TUI.Base.ImageCache
 
 _MaxLines = 100
 _MaxTransfers = 5
+_MaxTransfersPerGroup = 2
 
 WindowName = "%s.Downloads" % (TUI.Version.ApplicationName,)
 
+class DownloadsWdg(RO.Wdg.HTTPGetWdg.HTTPGetWdg):
+    """An HTTPGetWdg with a shared download scheduler
+
+    Inputs are the same as HTTPGetWdg, plus:
+    - maxTransfersPerGroup: default maximum number of simultaneous transfers per download group
+    - imageCache: a TUI.Base.ImageCache.ImageCache whose statistics are to be displayed, or None
+
+    Attributes:
+    - scheduler: a TUI.Base.DownloadScheduler.DownloadScheduler;
+        use this (instead of getFile) to download images
+    """
+    def __init__(self,
+        master,
+        maxTransfers = _MaxTransfers,
+        maxTransfersPerGroup = _MaxTransfersPerGroup,
+        maxLines = _MaxLines,
+        helpURL = None,
+        imageCache = None,
+    **kargs):
+        RO.Wdg.HTTPGetWdg.HTTPGetWdg.__init__(self,
+            master = master,
+            maxTransfers = maxTransfers,
+            maxLines = maxLines,
+            helpURL = helpURL,
+        **kargs)
+
+        self.statsWdg = RO.Wdg.StrLabel(
+            master = self,
+            anchor = "w",
+            helpText = "Download statistics",
+            helpURL = helpURL,
+        )
+        self.statsWdg.grid(row=2, column=0, columnspan=2, sticky="ew")
+
+        self.scheduler = TUI.Base.DownloadScheduler.DownloadScheduler(
+            downloadWdg = self,
+            maxTransfers = maxTransfers,
+            maxTransfersPerGroup = maxTransfersPerGroup,
+            callFunc = self._updStats,
+        )
+
+        self.imageCache = imageCache
+        if self.imageCache is not None:
+            self.imageCache.addCallback(self._updStats, callNow=False)
+
+    def _updStats(self, *args):
+        """Display download and image cache statistics"""
+        statsStr = self.scheduler.getStatsStr()
+        if self.imageCache is not None:
+            statsStr = "%s; %s" % (statsStr, self.imageCache.getStatsStr())
+        self.statsWdg.set(statsStr)
+
+
 def addWindow(tlSet, visible=False):
     tlSet.createToplevel (
         name = WindowName,
         defGeom = "+835+290",
         wdgFunc = RO.Alg.GenericCallback(
-            RO.Wdg.HTTPGetWdg.HTTPGetWdg,
+            DownloadsWdg,
             maxTransfers = _MaxTransfers,
             maxLines = _MaxLines,
             helpURL = "TUIMenu/DownloadsWin.html",
+            imageCache = TUI.Base.ImageCache.getImageCache(),
         ),
         visible = visible,
     )
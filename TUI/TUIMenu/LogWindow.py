@@ -7,8 +7,8 @@ To do:
 Known Issues:
 - This log may hold more data than logSource (because it truncates excess data separately from logSource),
   but that extra data is fragile: you will lose it if you change the filter.
-- Uses Python to check regular expressions for highlighting, even though tcl implements them;
-  thus differences in Python and tcl's implementation of regular expression may result in subtle bugs.
+- Highlighting uses Python regular expressions, but Find uses tcl regular expressions;
+  thus differences in Python and tcl's implementation of regular expression may result in subtle differences.
 
 History:
 History:
@@ -68,8 +68,28 @@ History:
                     Cosmetic changes to make more similar to STUI's version (for easier diff).
 2012-11-29 ROwen    Fix spelling of Run_Commands (the s was missing).
 2015-11-05 ROwen    Ditched obsolete "except (SystemExit, KeyboardInterrupt): raise" code
+2026-10-18 ROwen    Filters use the log source's indexes (via a getSeqSet attribute on filter functions)
+                    so refiltering no longer calls a Python filter function on every log entry.
+                    Only the Text and Custom filters still test each entry.
+2026-10-18 ROwen    Use log source batch callbacks: new log entries are added in batches with one call
+                    to addOutputList, and highlighting is applied once per batch.
+                    highlightLastFunc now takes an nLines argument.
+                    Added a replay benchmark (run this module as a script with --bench [replyFile]).
+2026-10-18 ROwen    Page older log entries in from the log source and its archive when the user scrolls
+                    to the top of the log or searches backwards past the oldest displayed entry.
+2026-10-18 ROwen    Highlighting is computed in Python by HighlightEngine, which matches each log message once
+                    (all rules combined in one compiled regular expression) and caches the results;
+                    rehighlighting re-applies cached tag ranges instead of searching the Text widget.
+                    Command highlighting now matches the message, so it works with dated time stamps.
+                    Removed findRegExp, highlightAllFunc and highlightLastFunc.
+2026-10-18 ROwen    Regular expressions that contain groups (e.g. back references) are matched separately
+                    instead of in one combined regular expression.
+                    Prune cached highlight matches as old entries are trimmed from the log.
+2026-10-18 ROwen    Bug fix: paging in older entries skipped entries that had been trimmed from the log.
+                    Bug fix: searching backwards did not show a match more than maxLines entries back.
 """
 import bisect
+import collections
 import re
 import Tkinter
 import RO.Alg
@@ -108,10 +128,24 @@ HighlightColorScale = 0.92
 HighlightTag = "highlighttag"
 HighlightTextTag = "highlighttexttag"
 ShowTag = "showtag"
+# tag that RO.Wdg.LogWdg applies to all text it adds
+AllTextTag = "__alltext"
 
 ActorTagPrefix = "act_"
 CmdrTagPrefix = "cmdr_"
 
+# number of older log entries to page in when the user scrolls to the top of the log
+HistoryPageSize = 500
+# maximum number of archived log entries to examine when paging in older entries
+MaxHistoryScan = 200000
+
+# maximum number of highlight engines (and their cached matches) to retain
+MaxHighlightEngines = 4
+# number of cached highlight matches beyond twice the number of shown entries before the cache is pruned
+MinHighlightCacheSize = 1000
+# maximum number of tag ranges per call to tag_add
+MaxRangesPerTagAdd = 1000
+
 class RegExpInfo(object):
     """Object holding a regular expression
     and associated tags.
@@ -131,6 +165,104 @@ class RegExpInfo(object):
         return "RegExpInfo(regExp=%r, tag=%r, lineTag=%r)" % \
             (self.regExp, self.tag, self.lineTag)
 
+class HighlightEngine(object):
+    """Compute which parts of log entries to highlight, caching the results
+
+    Rules:
+    - regExpInfoList: RegExpInfo objects; each regular expression is matched (ignoring case)
+      against the message string of the log entry (not including the time stamp).
+      If no regular expression contains a group, all are combined into one compiled alternation,
+      so each message is scanned once (and where matches for different rules overlap only the first is found).
+      Otherwise (e.g. a regular expression uses a back reference) each is matched separately.
+    - actors: log entries to or from these actors are highlighted using actorLineTag
+
+    Matches are cached by log entry sequence number, so refiltering or rehighlighting
+    only needs to re-apply tags.
+    """
+    def __init__(self, regExpInfoList=(), actors=(), actorLineTag=HighlightTag):
+        self.regExpInfoList = tuple(regExpInfoList)
+        self.actorSet = frozenset(actor.lower() for actor in actors)
+        self.actorLineTag = actorLineTag
+        self.key = self.makeKey(self.regExpInfoList, self.actorSet, actorLineTag)
+        self._matchCache = {}
+        self._compiledRegExp = None
+        self._compiledRegExpList = []
+        for regExpInfo in self.regExpInfoList:
+            try:
+                self._compiledRegExpList.append(re.compile(regExpInfo.regExp, re.IGNORECASE))
+            except re.error:
+                raise RuntimeError("invalid regular expression %r" % (regExpInfo.regExp,))
+        if self._compiledRegExpList and not any(compRegExp.groups for compRegExp in self._compiledRegExpList):
+            # group numbers (and thus back references) would change in a combined regular expression
+            try:
+                self._compiledRegExp = re.compile(
+                    "|".join("(?P<r%d>%s)" % (ind, regExpInfo.regExp) for ind, regExpInfo in enumerate(self.regExpInfoList)),
+                    re.IGNORECASE,
+                )
+            except re.error:
+                pass
+
+    @staticmethod
+    def makeKey(regExpInfoList, actors, actorLineTag=HighlightTag):
+        """Return a key that uniquely identifies a set of rules
+        """
+        return (
+            tuple((regExpInfo.regExp, regExpInfo.tag, regExpInfo.lineTag) for regExpInfo in regExpInfoList),
+            frozenset(actor.lower() for actor in actors),
+            actorLineTag,
+        )
+
+    def getMatches(self, logEntry):
+        """Return highlight matches for a log entry as a tuple of (tag, startOffset, endOffset),
+        where the offsets are character offsets relative to the start of logEntry.getStr()
+        """
+        matches = self._matchCache.get(logEntry.seqNum)
+        if matches is not None:
+            return matches
+
+        matchList = []
+        prefixLen = len(logEntry.taiTimeStr) + 1
+        lineEndOffset = prefixLen + len(logEntry.msgStr)
+        lineTagSet = set()
+        if self.actorSet and ((logEntry.actor and logEntry.actor.lower() in self.actorSet) \
+            or (logEntry.cmdInfo and logEntry.cmdInfo.actor.lower() in self.actorSet)):
+            lineTagSet.add(self.actorLineTag)
+        if self._compiledRegExp:
+            for match in self._compiledRegExp.finditer(logEntry.msgStr):
+                if match.end() == match.start():
+                    continue
+                regExpInfo = self.regExpInfoList[int(match.lastgroup[1:])]
+                if regExpInfo.tag:
+                    matchList.append((regExpInfo.tag, prefixLen + match.start(), prefixLen + match.end()))
+                if regExpInfo.lineTag:
+                    lineTagSet.add(regExpInfo.lineTag)
+        else:
+            for regExpInfo, compRegExp in zip(self.regExpInfoList, self._compiledRegExpList):
+                for match in compRegExp.finditer(logEntry.msgStr):
+                    if match.end() == match.start():
+                        continue
+                    if regExpInfo.tag:
+                        matchList.append((regExpInfo.tag, prefixLen + match.start(), prefixLen + match.end()))
+                    if regExpInfo.lineTag:
+                        lineTagSet.add(regExpInfo.lineTag)
+        for lineTag in lineTagSet:
+            matchList.append((lineTag, 0, lineEndOffset))
+        matches = tuple(matchList)
+        if logEntry.seqNum is not None:
+            self._matchCache[logEntry.seqNum] = matches
+        return matches
+
+    def getCacheSize(self):
+        """Return the number of log entries whose matches are cached
+        """
+        return len(self._matchCache)
+
+    def pruneCache(self, minSeqNum):
+        """Discard cached matches for log entries with sequence number < minSeqNum
+        """
+        self._matchCache = dict((seqNum, matches) for seqNum, matches in self._matchCache.iteritems()
+            if seqNum >= minSeqNum)
+
 class TUILogWdg(Tkinter.Frame):
     """A log widget that displays messages from the hub
 
@@ -142,6 +274,9 @@ class TUILogWdg(Tkinter.Frame):
     and return True if the entry is to be shown, False otherwise.
     The doc string may be None or a brief one-line description of the filter
     (long or multi-line doc strings will result in garbage in the status bar).
+    A filter function may also have a getSeqSet attribute: a function that takes no arguments
+    and returns the set of sequence numbers of all entries in the log source that pass the filter,
+    computed from the log source's indexes; this makes applyFilter much faster for large logs.
     """
     def __init__(self,
         master,
@@ -172,10 +307,19 @@ class TUILogWdg(Tkinter.Frame):
         self.sevFilterFunc = lambda x: False
         # miscellaneous filter function: return True if non-severity filter criteria are met
         self.miscFilterFunc = lambda x: False
-        # highlightAllFunc(): clear existing highlighting and apply desired highlighting to all existing text
-        self.highlightAllFunc = lambda: None
-        # highlightLastFunc(): apply highlighting to last line of text and play sound if appropriate
-        self.highlightLastFunc = lambda: None
+        # current highlight engine; None if no highlighting
+        self.highlightEngine = None
+        # recently used highlight engines (and their cached matches), most recently used last
+        self._highlightEngineDict = collections.OrderedDict()
+        # displayed log entries, as a collection of (logEntry, number of lines), oldest first
+        self._shownEntries = collections.deque()
+        self._nShownLines = 0
+        # sequence number of the most recent log entry that has been considered for display
+        self._lastSeqNum = -1
+        # sequence number of the oldest log entry that has been considered for display;
+        # older entries are paged in from the log source or its archive as needed
+        self._oldestSeqNum = 0
+        self._historyTimer = RO.TkUtil.Timer()
 
         row = 0
 
@@ -420,6 +564,8 @@ class TUILogWdg(Tkinter.Frame):
             helpURL = HelpURL,
         )
         self.logWdg.grid(row=row, column=0, sticky="nwes")
+        self.logWdg.text.configure(yscrollcommand=self._textYScroll)
+        self.maxLines = self.logWdg.maxLineIndex - 1
         self.grid_rowconfigure(row, weight=1)
         self.grid_columnconfigure(0, weight=1)
         row += 1
@@ -485,9 +631,35 @@ class TUILogWdg(Tkinter.Frame):
         self.bind("<Map>", self.mapOrUnmap)
 
     def appendLogEntry(self, logEntry):
-        outStr = logEntry.getStr()
-        self.logWdg.addOutput(outStr, tags=logEntry.tags, severity=logEntry.severity)
-        self.highlightLastFunc()
+        self.appendLogEntries([logEntry])
+
+    def appendLogEntries(self, logEntries):
+        """Append a list of log entries with a single insert, then highlight them
+        and play a sound if appropriate
+        """
+        if not logEntries:
+            return
+        strTagsSevList = [(logEntry.getStr(), logEntry.tags, logEntry.severity) for logEntry in logEntries]
+        self.logWdg.addOutputList(strTagsSevList)
+        entryLinesList = [(logEntry, strTagsSev[0].count("\n"))
+            for logEntry, strTagsSev in zip(logEntries, strTagsSevList)]
+        self._shownEntries.extend(entryLinesList)
+        self._nShownLines += sum(entryLines[1] for entryLines in entryLinesList)
+        self._trimShownEntries()
+
+        # highlight the new entries that are still shown
+        nNewLines = 0
+        nNewEntries = 0
+        for logEntry, nLines in reversed(self._shownEntries):
+            if nNewEntries >= len(entryLinesList):
+                break
+            nNewLines += nLines
+            nNewEntries += 1
+        startLineNum = self._nShownLines - nNewLines + 1
+        newEntryLinesList = entryLinesList[len(entryLinesList) - nNewEntries:]
+        nHighlighted = self.highlightEntries(newEntryLinesList, startLineNum)
+        if nHighlighted > 0 and self.doPlayHighlightSound():
+            TUI.PlaySound.logHighlightedText()
 
     def applyFilter(self, wdg=None):
         """Apply current filter settings.
@@ -503,6 +675,7 @@ class TUILogWdg(Tkinter.Frame):
             )
         except Exception as e:
             miscFilterFunc = lambda x: False
+            miscFilterFunc.getSeqSet = set
             self.statusBar.setMsg(
                 str(e),
                 severity = RO.Constants.sevError,
@@ -521,12 +694,18 @@ class TUILogWdg(Tkinter.Frame):
 #             print "retainScrollPos: midLineIndex=%s, midLineDateStr=%s" % (midLineIndex, midLineDateStr)
 
         self.logWdg.clearOutput()
-        # this is inefficient; logWdg does a lot of processing that is unnecessary
-        # when inserting a lot of lines at once; add an insertMany method to avoid this
+        self.logWdg.maxLineIndex = self.maxLines + 1 # undo any increase from showOlderEntries
+        # entries logged up to now are displayed (if they pass the filter), so ignore them in batch callbacks
+        self._lastSeqNum = self.logSource.entryList.nextSeq - 1
+        logEntries = self.getFilteredEntries()[-self.maxLines:]
+        self._oldestSeqNum = logEntries[0].seqNum if logEntries else self._lastSeqNum + 1
         strTagsSevList = [(logEntry.getStr(), logEntry.tags, logEntry.severity)
-            for logEntry in self.logSource.entryList
-            if self.sevFilterFunc(logEntry) or self.miscFilterFunc(logEntry)]
+            for logEntry in logEntries]
         self.logWdg.addOutputList(strTagsSevList)
+        self._shownEntries = collections.deque((logEntry, strTagsSev[0].count("\n"))
+            for logEntry, strTagsSev in zip(logEntries, strTagsSevList))
+        self._nShownLines = sum(entryLines[1] for entryLines in self._shownEntries)
+        self._trimShownEntries()
 
         if retainScrollPos:
             strList = [strTagsSev[0] for strTagsSev in strTagsSevList]
@@ -536,7 +715,7 @@ class TUILogWdg(Tkinter.Frame):
             linesFromEnd = len(strList) - ind
             self.logWdg.text.see("end - %d lines" % (linesFromEnd,))
 
-        self.highlightAllFunc()
+        self.highlightAll()
 
     def clearHighlight(self, showMsg=True):
         """Remove all highlighting"""
@@ -580,6 +759,9 @@ class TUILogWdg(Tkinter.Frame):
 
         def nullFunc(logEntry):
             return False
+        nullFunc.getSeqSet = set
+
+        logIndex = self.logSource.index
 
         if not filterEnabled:
             return nullFunc
@@ -595,6 +777,7 @@ class TUILogWdg(Tkinter.Frame):
                 return (logEntry.actor == actor) \
                     or (logEntry.cmdInfo and (logEntry.cmdInfo.actor == actor))
             filterFunc.__doc__ = "actor=%s" % (actor,)
+            filterFunc.getSeqSet = lambda actorSet=set((actor,)): self.getActorSeqSet(actorSet)
             return filterFunc
 
         elif filterCat == "Actors":
@@ -607,6 +790,7 @@ class TUILogWdg(Tkinter.Frame):
                 return (logEntry.actor in actorSet) \
                     or (logEntry.cmdInfo and (logEntry.cmdInfo.actor in actorSet))
             filterFunc.__doc__ = "actor in %s" % (actorSet,)
+            filterFunc.getSeqSet = lambda actorSet=actorSet: self.getActorSeqSet(actorSet)
             return filterFunc
 
         elif filterCat == "Text":
@@ -630,6 +814,12 @@ class TUILogWdg(Tkinter.Frame):
                     and logEntry.cmdInfo \
                     and not logEntry.isKeys
             filterFunc.__doc__ = "most commands"
+            def getSeqSet():
+                seqSet = logIndex.getSeqSet("cmdrDict", self.getMostCmdrs())
+                seqSet.intersection_update(logIndex.cmdSeqs)
+                seqSet.difference_update(logIndex.keysSeqs)
+                return seqSet
+            filterFunc.getSeqSet = getSeqSet
             return filterFunc
 
         elif filterCat == "Commands and Replies":
@@ -639,6 +829,12 @@ class TUILogWdg(Tkinter.Frame):
                     and (logEntry.severity > RO.Constants.sevDebug) \
                     and not logEntry.isKeys
             filterFunc.__doc__ = "most commands and replies"
+            def getSeqSet():
+                seqSet = logIndex.getSeqSet("cmdrDict", self.getMostCmdrs())
+                seqSet.intersection_update(self.getSeveritySeqSet(RO.Constants.sevDebug + 1))
+                seqSet.difference_update(logIndex.keysSeqs)
+                return seqSet
+            filterFunc.getSeqSet = getSeqSet
             return filterFunc
 
         elif filterCat == "My Commands and Replies":
@@ -650,6 +846,15 @@ class TUILogWdg(Tkinter.Frame):
                     and not logEntry.isKeys \
                     and ((logEntry.cmdInfo is None) or (logEntry.cmdInfo.isMine))
             filterFunc.__doc__ = "my commands and replies"
+            def getSeqSet(cmdr=cmdr):
+                seqSet = logIndex.getSeqSet("cmdrDict", (cmdr,))
+                seqSet.intersection_update(self.getSeveritySeqSet(RO.Constants.sevDebug + 1))
+                seqSet.difference_update(logIndex.keysSeqs)
+                getBySeq = self.logSource.entryList.getBySeq
+                seqSet.difference_update([seqNum for seqNum in seqSet.intersection(logIndex.cmdSeqs)
+                    if not getBySeq(seqNum).cmdInfo.isMine])
+                return seqSet
+            filterFunc.getSeqSet = getSeqSet
             return filterFunc
 
         elif filterCat == "Custom":
@@ -765,8 +970,7 @@ class TUILogWdg(Tkinter.Frame):
     def doHighlight(self, wdg=None):
         """Show appropriate highlight widgets and apply appropriate function
         """
-        self.highlightAllFunc = lambda: None
-        self.highlightLastFunc = lambda: None
+        self.highlightEngine = None
         highlightCat = self.highlightMenu.getString()
         highlightEnabled = self.highlightOnOffWdg.getBool()
         #print "doHighlight; cat=%r; enabled=%r" % (highlightCat, highlightEnabled)
@@ -807,19 +1011,20 @@ class TUILogWdg(Tkinter.Frame):
 
     def doHighlightCommands(self, wdg=None):
         self.clearHighlight()
+        self.highlightEngine = None
         cmds = self.highlightCommandsWdg.getString().split()
         if not cmds:
             return
 
-        # create regular expression
+        # create regular expression, to be matched against the message (which excludes the time stamp)
         # it must include my username so only my commands are shown
-        # it must show both outgoing commands: UTCDate username cmdNum
-        # and replies: UTCDate cmdNum
+        # it must show both outgoing commands: username cmdNum
+        # and replies: cmdNum
         orCmds = "|".join(["(%s)" % (cmd,) for cmd in cmds])
 
         cmdr = self.dispatcher.connection.getCmdr()
 
-        regExp = r"^\d\d:\d\d:\d\d( +%s)? +(%s) " % (cmdr, orCmds)
+        regExp = r"^(%s +)?(%s) " % (re.escape(cmdr or ""), orCmds)
         try:
             regExpInfo = RegExpInfo(regExp, None, HighlightTag)
         except RuntimeError:
@@ -846,6 +1051,7 @@ class TUILogWdg(Tkinter.Frame):
 
     def doHighlightText(self, wdg=None):
         self.clearHighlight()
+        self.highlightEngine = None
         regExp = self.highlightTextWdg.getString()
         if not regExp:
             return
@@ -872,8 +1078,17 @@ class TUILogWdg(Tkinter.Frame):
         return self.highlightPlaySoundWdg.getBool() and self.winfo_ismapped()
 
     def doSearchBackwards(self, evt=None):
-        """Search backwards for search string"""
+        """Search backwards for search string
+
+        If there is no match in the displayed text then page in older log entries through the newest match
+        """
         searchStr = self.findEntry.get()
+        if searchStr:
+            selRange = self.logWdg.text.tag_ranges("sel")
+            startInd = selRange[0] if selRange else "end"
+            if not self.logWdg.text.search(searchStr, startInd, stopindex="1.0", backwards=True,
+                nocase=True, regexp=True):
+                self.showOlderMatch(searchStr)
         self.logWdg.search(searchStr, backwards=True, noCase=True, regExp=True)
 
     def doSearchForwards(self, evt=None):
@@ -895,28 +1110,13 @@ class TUILogWdg(Tkinter.Frame):
     def doShowPrevHighlight(self, wdg=None):
         self.logWdg.findTag(HighlightTag, backwards=True, doWrap=False)
 
-    def findRegExp(self, regExpInfo, removeTags=True, elide=False, startInd="1.0"):
-        """Find and tag all lines containing text that matches regExp.
-
-        Returns the number of matches.
-
-        This is just self.text.findAll with a particular set of options.
+    def getActorSeqSet(self, actorSet):
+        """Return the set of sequence numbers of log entries to or from any of the specified actors
         """
-        #print "findRegExp(regExpInfo=%r, removeTags=%r, elide=%r, startInd=%r)" % (regExpInfo, removeTags, elide, startInd)
-
-        # Warning: you must modify this to call findAll from "after"
-        # if this function is called from a variable trace (e.g. an Entry callFunc).
-        # Otherwise the count variable is not updated
-        # and the routine raises RuntimeError.
-        return self.logWdg.findAll(
-            searchStr = regExpInfo.regExp,
-            tag = regExpInfo.tag,
-            lineTag = regExpInfo.lineTag,
-            removeTags = removeTags,
-            noCase = True,
-            regExp = True,
-            startInd = startInd,
-        )
+        logIndex = self.logSource.index
+        seqSet = logIndex.getSeqSet("actorDict", actorSet)
+        seqSet.update(logIndex.getSeqSet("cmdActorDict", actorSet))
+        return seqSet
 
     def getActors(self, regExpList):
         """Return a sorted list of actor based on a set of actor name regular expressions.
@@ -969,6 +1169,41 @@ class TUILogWdg(Tkinter.Frame):
         else:
             return "severity >= %s" % (sevName,)
 
+    def getFilteredEntries(self):
+        """Return a list of the log entries in the log source that pass the current filter, oldest first
+
+        Uses getSeqSet for filter functions that have it; applies other filter functions to each entry.
+        """
+        seqSet = set()
+        entryFilterFuncs = []
+        for filterFunc in (self.sevFilterFunc, self.miscFilterFunc):
+            getSeqSet = getattr(filterFunc, "getSeqSet", None)
+            if getSeqSet:
+                seqSet.update(getSeqSet())
+            else:
+                entryFilterFuncs.append(filterFunc)
+
+        entryList = self.logSource.entryList
+        if entryFilterFuncs:
+            return [logEntry for logEntry in entryList
+                if logEntry.seqNum in seqSet or any(func(logEntry) for func in entryFilterFuncs)]
+        if len(seqSet) >= len(entryList):
+            return list(entryList)
+        getBySeq = entryList.getBySeq
+        return [getBySeq(seqNum) for seqNum in sorted(seqSet)]
+
+    def getMostCmdrs(self):
+        """Return a list of the commanders in the log source, excluding the hub and actors (.x) and MN01
+        """
+        return [cmdr for cmdr in self.logSource.index.cmdrDict.iterkeys()
+            if cmdr and cmdr[0] != "." and not cmdr.startswith("MN01")]
+
+    def getSeveritySeqSet(self, minSeverity):
+        """Return the set of sequence numbers of log entries whose severity >= minSeverity
+        """
+        logIndex = self.logSource.index
+        return logIndex.getSeqSet("sevDict", [sev for sev in logIndex.sevDict.iterkeys() if sev >= minSeverity])
+
     def getSeverityTags(self):
         """Return a list of severity tags that should be displayed
         based on the current setting of the severity menu.
@@ -984,8 +1219,7 @@ class TUILogWdg(Tkinter.Frame):
         return self._stateTracker
 
     def highlightActors(self, actors):
-        """Create highlight functions to highlight the supplied actors
-        and apply highlighting to all existing text.
+        """Highlight the supplied actors in all existing and new text
         """
         if len(actors) == 1:
             self.statusBar.setMsg(
@@ -997,57 +1231,81 @@ class TUILogWdg(Tkinter.Frame):
                 "Highlighting actors %s" % (" ".join(actors)),
                 isTemp = True,
             )
+        self.setHighlightEngine(actors=actors)
+
+    def highlightAll(self):
+        """Clear existing highlighting and apply highlighting to all displayed text
+        """
+        self.clearHighlight(showMsg=False)
+        self.highlightEntries(self._shownEntries, 1)
 
-        tags = [ActorTagPrefix + actor.lower() for actor in actors]
+    def highlightEntries(self, entryLinesList, startLineNum):
+        """Apply highlighting to displayed log entries
 
-        def highlightAllFunc(tags=tags):
-            self.clearHighlight()
-            for tag in tags:
-                tagRanges = self.logWdg.text.tag_ranges(tag)
-                if len(tagRanges) > 1:
-                    self.logWdg.text.tag_add(HighlightTag, *tagRanges)
-
-        def highlightLastFunc(tags=tags):
-            for tag in tags:
-                tagRanges = self.logWdg.text.tag_prevrange(tag, "end")
-                if tagRanges:
-                    self.logWdg.text.tag_add(HighlightTag, *tagRanges)
-                    if self.doPlayHighlightSound():
-                        TUI.PlaySound.logHighlightedText()
-                    return # no need to test more tags and must not play the sound again
-
-        self.highlightAllFunc = highlightAllFunc
-        self.highlightLastFunc = highlightLastFunc
-        self.highlightAllFunc()
+        Inputs:
+        - entryLinesList: a collection of (logEntry, number of lines) for consecutive displayed entries
+        - startLineNum: line number of the first entry in the Text widget
 
-    def highlightRegExp(self, regExpInfo):
-        """Create highlight functions based on a RegExpInfo object
-        and apply highlighting to all existing text.
+        Return the number of log entries highlighted.
         """
-        def highlightAllFunc(regExpInfo=regExpInfo):
-            self.clearHighlight()
-            self.findRegExp(regExpInfo, removeTags=False)
+        if not self.highlightEngine:
+            return 0
+        getMatches = self.highlightEngine.getMatches
+        tagIndexListDict = dict()
+        nHighlighted = 0
+        lineNum = startLineNum
+        for logEntry, nLines in entryLinesList:
+            matches = getMatches(logEntry)
+            if matches:
+                nHighlighted += 1
+                for tag, startOffset, endOffset in matches:
+                    tagIndexListDict.setdefault(tag, []).extend((
+                        "%d.0 + %d chars" % (lineNum, startOffset),
+                        "%d.0 + %d chars" % (lineNum, endOffset),
+                    ))
+            lineNum += nLines
+
+        text = self.logWdg.text
+        for tag, indexList in tagIndexListDict.iteritems():
+            for ind in range(0, len(indexList), MaxRangesPerTagAdd * 2):
+                text.tag_add(tag, *indexList[ind:ind + (MaxRangesPerTagAdd * 2)])
+        return nHighlighted
 
-        def highlightLastFunc(regExpInfo=regExpInfo):
-            nFound = self.findRegExp(regExpInfo, removeTags = False, startInd = "end - 2 lines")
-            if nFound > 0 and self.doPlayHighlightSound():
-                TUI.PlaySound.logHighlightedText()
+    def highlightRegExp(self, regExpInfo):
+        """Highlight text matching a RegExpInfo object in all existing and new text
+        """
+        self.setHighlightEngine(regExpInfoList=[regExpInfo])
 
-        self.highlightAllFunc = highlightAllFunc
-        self.highlightLastFunc = highlightLastFunc
-        self.highlightAllFunc()
+    def setHighlightEngine(self, regExpInfoList=(), actors=()):
+        """Set the highlight engine (reusing a recent one with the same rules, if any) and rehighlight
 
-    def logSourceCallback(self, logSource):
-        """Log a message from the log source
+        Inputs:
+        - regExpInfoList: a collection of RegExpInfo objects
+        - actors: a collection of actors
+        """
+        key = HighlightEngine.makeKey(regExpInfoList, actors)
+        engine = self._highlightEngineDict.pop(key, None)
+        if engine is None:
+            engine = HighlightEngine(regExpInfoList=regExpInfoList, actors=actors)
+        self._highlightEngineDict[key] = engine
+        while len(self._highlightEngineDict) > MaxHighlightEngines:
+            self._highlightEngineDict.popitem(last=False)
+        self.highlightEngine = engine
+        self.highlightAll()
+
+    def logSourceBatchCallback(self, logSource, logEntries):
+        """Log a batch of new messages from the log source
 
         Inputs:
-        - logEntry: a TUI.Models.LogSource.LogEntry object
+        - logSource: the log source, a TUI.LogSource.LogSource
+        - logEntries: a list of new TUI.LogSource.LogEntry objects, oldest first
         """
-        logEntry = logSource.lastEntry
-        if not logEntry:
-            return
-        if self.sevFilterFunc(logEntry) or self.miscFilterFunc(logEntry):
-            self.appendLogEntry(logEntry)
+        lastSeqNum = self._lastSeqNum
+        self._lastSeqNum = max(lastSeqNum, logEntries[-1].seqNum)
+        sevFilterFunc = self.sevFilterFunc
+        miscFilterFunc = self.miscFilterFunc
+        self.appendLogEntries([logEntry for logEntry in logEntries
+            if logEntry.seqNum > lastSeqNum and (sevFilterFunc(logEntry) or miscFilterFunc(logEntry))])
 
     def mapOrUnmap(self, evt=None):
         """Called when the window is mapped or unmapped
@@ -1057,14 +1315,104 @@ class TUILogWdg(Tkinter.Frame):
         wantConnection = self.winfo_toplevel().wm_state() != "withdrawn"
 #        print "mapOrUnmap: wantConnect=%s; isConnected=%s" % (wantConnection, self.isConnected)
         if self.isConnected and not wantConnection:
-            self.logSource.removeCallback(self.logSourceCallback)
+            self.logSource.removeBatchCallback(self.logSourceBatchCallback)
             self.isConnected=False
             self.logWdg.clearOutput()
+            self._shownEntries.clear()
+            self._nShownLines = 0
         elif wantConnection and not self.isConnected:
-            self.logSource.addCallback(self.logSourceCallback)
+            self.logSource.addBatchCallback(self.logSourceBatchCallback)
             self.isConnected=True
             self.applyFilter()
 
+    def prependLogEntries(self, logEntries):
+        """Insert a list of log entries (oldest first) at the beginning of the log, keeping the current view
+
+        Increases the maximum number of lines in the log widget so the new entries are not immediately
+        truncated (applyFilter restores the normal maximum).
+        """
+        if not logEntries:
+            return
+        text = self.logWdg.text
+        strTagsList = []
+        entryLinesList = []
+        for logEntry in logEntries:
+            outStr = logEntry.getStr()
+            entryLinesList.append((logEntry, outStr.count("\n")))
+            sevTag = self.logWdg.getSeverityTags(logEntry.severity)[0]
+            strTagsList += [outStr, (AllTextTag, sevTag) + tuple(logEntry.tags)]
+        nLines = sum(entryLines[1] for entryLines in entryLinesList)
+        self.logWdg.maxLineIndex += nLines
+        topInd = text.index("@0,0")
+        text.insert("1.0", *strTagsList)
+        text.yview("%s + %d lines" % (topInd, nLines))
+        self._shownEntries.extendleft(reversed(entryLinesList))
+        self._nShownLines += nLines
+        self._oldestSeqNum = logEntries[0].seqNum
+        self.highlightEntries(entryLinesList, 1)
+
+    def getOlderEntries(self, maxEntries, minSeqNum=None, filterFunc=None):
+        """Return up to maxEntries log entries older than the oldest displayed entry that pass the filter,
+        oldest first, from the log source or its archive.
+
+        Inputs:
+        - maxEntries: maximum number of entries to return
+        - minSeqNum: minimum sequence number; if None then limit the search to MaxHistoryScan entries
+        - filterFunc: additional filter function; if None then only the current filter is applied
+        """
+        def fullFilterFunc(logEntry):
+            return (self.sevFilterFunc(logEntry) or self.miscFilterFunc(logEntry)) \
+                and (filterFunc is None or filterFunc(logEntry))
+
+        entryList = self.logSource.entryList
+        endSeqNum = self._oldestSeqNum
+        if minSeqNum is None:
+            minSeqNum = endSeqNum - MaxHistoryScan
+        olderEntries = [logEntry for logEntry in entryList.iterFromSeq(minSeqNum)
+            if logEntry.seqNum < endSeqNum and fullFilterFunc(logEntry)][-maxEntries:]
+
+        archive = self.logSource.archive
+        if archive is not None and len(olderEntries) < maxEntries:
+            archiveEndSeqNum = min(endSeqNum, entryList.firstSeq)
+            olderEntries = archive.getEntriesBefore(
+                seqNum = archiveEndSeqNum,
+                maxEntries = maxEntries - len(olderEntries),
+                filterFunc = fullFilterFunc,
+                maxScan = archiveEndSeqNum - minSeqNum,
+            ) + olderEntries
+        return olderEntries
+
+    def showOlderEntries(self, nEntries=HistoryPageSize):
+        """Page in up to nEntries older log entries that pass the filter
+        """
+        logEntries = self.getOlderEntries(nEntries)
+        if not logEntries:
+            return
+        self.prependLogEntries(logEntries)
+        self.statusBar.setMsg(
+            "Showing %d older entries from %s" % (len(logEntries), logEntries[0].taiTimeStr),
+            isTemp = True,
+        )
+
+    def showOlderMatch(self, regExp):
+        """Page in all older log entries that pass the filter through the newest older entry that matches regExp
+
+        All entries from the match through the oldest displayed entry are shown (even if there are more
+        than maxLines of them), so the match is always shown and the displayed entries remain contiguous.
+        The search is limited to MaxHistoryScan entries, which also limits the number of entries shown.
+
+        Matching uses Python's regular expression engine (ignoring case).
+        """
+        try:
+            compiledRegExp = re.compile(regExp, re.I)
+        except re.error:
+            return
+        matchList = self.getOlderEntries(1, filterFunc = lambda logEntry: compiledRegExp.search(logEntry.msgStr))
+        if not matchList:
+            return
+        logEntries = self.getOlderEntries(MaxHistoryScan, minSeqNum = matchList[0].seqNum)
+        self.prependLogEntries(logEntries)
+
     def updHighlightColor(self, newColor, colorPrefVar=None):
         """Update highlight color and highlight line color"""
 
@@ -1079,11 +1427,13 @@ class TUILogWdg(Tkinter.Frame):
         if sevName == "none":
             def filterFunc(logEntry):
                 return False
+            filterFunc.getSeqSet = set
         else:
             minSeverity = RO.Constants.NameSevDict[sevName]
             def filterFunc(logEntry, minSeverity=minSeverity):
                 return logEntry.severity >= minSeverity
             filterFunc.__doc__ = "severity >= %s" % (sevName,)
+            filterFunc.getSeqSet = lambda minSeverity=minSeverity: self.getSeveritySeqSet(minSeverity)
         self.sevFilterFunc = filterFunc
         self.applyFilter()
 
@@ -1103,6 +1453,35 @@ class TUILogWdg(Tkinter.Frame):
         self.filterActorWdg.setItems(blankAndActors, isCurrent = isCurrent)
         self.highlightActorWdg.setItems(blankAndActors, isCurrent = isCurrent)
 
+    def _trimShownEntries(self):
+        """Discard the oldest entries from self._shownEntries that the log widget has truncated
+        """
+        nTextLines = int(self.logWdg.text.index("end").split(".")[0]) - 2
+        if self._nShownLines > nTextLines:
+            while self._nShownLines > nTextLines and self._shownEntries:
+                self._nShownLines -= self._shownEntries.popleft()[1]
+            # older entries are paged in from just before the oldest entry still shown
+            if self._shownEntries:
+                self._oldestSeqNum = self._shownEntries[0][0].seqNum
+            else:
+                self._oldestSeqNum = self._lastSeqNum + 1
+        # discard cached highlight matches for entries no longer shown; skip if the cache is small,
+        # to avoid rebuilding it for every batch of new entries
+        if self.highlightEngine and self._shownEntries \
+            and self.highlightEngine.getCacheSize() > 2 * len(self._shownEntries) + MinHighlightCacheSize:
+            self.highlightEngine.pruneCache(self._shownEntries[0][0].seqNum)
+
+    def _textYScroll(self, first, last):
+        """Log text widget scroll callback; page in older log entries if the user scrolls to the top
+        """
+        self.logWdg.yscroll.set(first, last)
+        if float(first) <= 0.0 and float(last) < 1.0 and not self._historyTimer.isActive:
+            self._historyTimer.start(0.2, self._showOlderIfAtTop)
+
+    def _showOlderIfAtTop(self):
+        if self.isConnected and self.logWdg.text.yview()[0] <= 0.0:
+            self.showOlderEntries()
+
     def _cmdCallback(self, msgType, msgDict, cmdVar):
         """Command callback; called when a command finishes.
         """
@@ -1114,11 +1493,81 @@ class TUILogWdg(Tkinter.Frame):
     def __del__ (self, *args):
         """Going away; remove myself as the dispatcher's logger.
         """
-        self.logSource.removeCallback(self.logSourceCallback)
+        self.logSource.removeBatchCallback(self.logSourceBatchCallback, doRaise=False)
+
+
+def _runReplayBenchmark(tuiModel, replyPath=None, burstSize=200, burstInterval=0.05, maxMsgs=20000):
+    """Replay hub replies through the dispatcher as fast bursts and report log throughput and Tk latency
+
+    Inputs:
+    - tuiModel: TUI model
+    - replyPath: path to a file of hub replies, one per line; each line may be prefixed by a
+        "YYYY-MM-DD HH:MM:SS " time stamp (as in the log window); if None then replies are synthesized
+    - burstSize: number of replies dispatched per burst
+    - burstInterval: interval between bursts (sec)
+    - maxMsgs: maximum number of replies to dispatch
+    """
+    import itertools
+    import random
+    import sys
+    import time
+    from RO.TkUtil import Timer
+
+    if replyPath:
+        timeStampRE = re.compile(r"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d ")
+        with open(replyPath, "rU") as replyFile:
+            replyList = [timeStampRE.sub("", line.rstrip("\n")) for line in replyFile if line.strip()]
+    else:
+        cmdrs = (".tcc", "TU01.me", "UW02.other")
+        cmdIDs = (0, 0, 0, 1, 2, 1001, 1002)
+        actors = ("ecam", "disExpose","dis", "keys")
+        msgTypes = ("d", "i", "w", "f")
+        replyList = ["%s %d %s %s AxePos=%0.4f, %0.4f, %0.4f; Text=\"sample reply %d\"" % \
+            (random.choice(cmdrs), random.choice(cmdIDs), random.choice(actors), random.choice(msgTypes),
+            ii * 0.1, ii * 0.2, ii * 0.3, ii) for ii in range(1000)]
+    replyIter = itertools.islice(itertools.cycle(replyList), maxMsgs)
+
+    dispatcher = tuiModel.dispatcher
+    logSource = tuiModel.logSource
+    stats = dict(nMsgs=0, nBatches=0, maxLatency=0.0, probeTime=None, startTime=time.time())
+    probeInterval = 0.01
+    probeTimer = Timer()
+
+    def countBatch(logSource, logEntries):
+        stats["nBatches"] += 1
+    logSource.addBatchCallback(countBatch)
+
+    def probe():
+        currTime = time.time()
+        if stats["probeTime"] is not None:
+            stats["maxLatency"] = max(stats["maxLatency"], currTime - stats["probeTime"] - probeInterval)
+        stats["probeTime"] = currTime
+        probeTimer.start(probeInterval, probe)
+
+    def report():
+        probeTimer.cancel()
+        duration = time.time() - stats["startTime"]
+        print "Replayed %d replies in %0.2f sec: %0.0f replies/sec; %0.1f batch callbacks/sec; " \
+            "worst event loop latency %0.1f msec" % (stats["nMsgs"], duration, stats["nMsgs"] / duration,
+            stats["nBatches"] / duration, stats["maxLatency"] * 1000.0)
+        sys.exit(0)
+
+    def sendBurst():
+        for msgStr in itertools.islice(replyIter, burstSize):
+            dispatcher.doRead(None, msgStr)
+            stats["nMsgs"] += 1
+        if stats["nMsgs"] >= maxMsgs:
+            Timer(logSource.batchInterval * 2, report)
+        else:
+            Timer(burstInterval, sendBurst)
+
+    probe()
+    sendBurst()
 
 
 if __name__ == '__main__':
     import random
+    import sys
     root = RO.Wdg.PythonTk()
     root.geometry("600x350")
     tuiModel = TUI.TUIModel.getModel(testMode = True)
@@ -1141,18 +1590,23 @@ if __name__ == '__main__':
     hubModel = TUI.Models.HubModel.getModel()
     hubModel.actors.set(actors)
 
-    for ii in range(100):
-        cmdr = random.choice(cmdrs)
-        cmdID = random.choice(cmdIDs)
-        actor = random.choice(actors)
-        msgType = random.choice(msgTypes)
-        msgDict = tuiModel.dispatcher.makeMsgDict(
-            dataStr = 'Text="sample entry %s from %s"' % (ii, actor),
-            msgType = msgType,
-            actor = actor,
-            cmdr = cmdr,
-            cmdID = cmdID,
-        )
-        tuiModel.dispatcher.logMsgDict(msgDict)
+    if "--bench" in sys.argv:
+        # usage: LogWindow.py --bench [replyFile]
+        benchArgs = sys.argv[sys.argv.index("--bench") + 1:]
+        root.after(100, _runReplayBenchmark, tuiModel, benchArgs[0] if benchArgs else None)
+    else:
+        for ii in range(100):
+            cmdr = random.choice(cmdrs)
+            cmdID = random.choice(cmdIDs)
+            actor = random.choice(actors)
+            msgType = random.choice(msgTypes)
+            msgDict = tuiModel.dispatcher.makeMsgDict(
+                dataStr = 'Text="sample entry %s from %s"' % (ii, actor),
+                msgType = msgType,
+                actor = actor,
+                cmdr = cmdr,
+                cmdID = cmdID,
+            )
+            tuiModel.dispatcher.logMsgDict(msgDict)
 
     root.mainloop()
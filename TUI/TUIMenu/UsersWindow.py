@@ -22,7 +22,14 @@ To do:
 2011-06-17 ROwen    Changed "type" to "msgType" in parsed message dictionaries (in test code only).
 2011-07-27 ROwen    Updated for new location of HubModel.
 2012-07-10 ROwen    Modified to use RO.TkUtil.Timer.
+2026-10-18 ROwen    Modified updDisplay to only insert, delete or retag rows that have changed,
+                    instead of redisplaying all users. Disconnected users are now removed
+                    by a single timer that fires when the next one expires,
+                    instead of by redisplaying all users every second.
+2026-10-18 ROwen    Added LoadEagerly.
 """
+import bisect
+import collections
 import time
 import Tkinter
 import RO.Wdg
@@ -35,6 +42,9 @@ WindowName = "%s.Users" % TUI.Version.ApplicationName
 
 _HelpPage = "TUIMenu/UsersWin.html"
 
+# load at startup even if hidden, so recently disconnected users are tracked while the window is hidden
+LoadEagerly = True
+
 def addWindow(tlSet):
     tlSet.createToplevel(
         name = WindowName,
@@ -163,17 +173,24 @@ class UsersWdg(Tkinter.Frame):
         hubModel = TUI.Models.HubModel.getModel()
         self.tuiModel = TUI.TUIModel.getModel()
         
-        # entries are commanders (prog.user)
-        self._cmdrList = []
-        # entries are (cmdr, time deleted); time is from time.time()
-        self._delCmdrTimeList = []
         # time to show deleted users
         self._retainSec = retainSec
         
         # dictionary of user name: User object
         self.userDict = dict()
         
+        # displayed commanders (prog.user), in display order (one per line of the text widget)
+        self._dispCmdrList = []
+        # dictionary of displayed commander: (display string, tags)
+        self._dispDict = dict()
+
+        # queue of (expiration time, cmdr) for disconnected users, in order of expiration;
+        # all users are retained for the same time, so new entries are simply appended.
+        # Entries for users who reconnect are left in the queue and ignored when they expire.
+        self._expireQueue = collections.deque()
+        
         self._updateTimer = Timer()
+        self._expireTimer = Timer()
                 
         self.yscroll = Tkinter.Scrollbar (
             master = self,
@@ -212,38 +229,75 @@ class UsersWdg(Tkinter.Frame):
 
     def updDisplay(self):
         """Display current data.
+
+        Only rows that have changed are modified.
         """
         self._updateTimer.cancel()
         
         myCmdr = self.tuiModel.getCmdr()
-        maxDisplayTime = time.time() - self._retainSec
 
-        self.text.delete("1.0", "end")
-        doScheduleUpdate = False
-        deleteCmdrList = []
-        for cmdr in sorted(self.userDict.keys()):
-            userObj = self.userDict[cmdr]
+        newDispDict = dict()
+        for cmdr, userObj in self.userDict.iteritems():
             if userObj.clientName == "monitor":
                 continue
             if userObj.isConnected:
                 tagList = ["curr"]
-            elif userObj.disconnTime < maxDisplayTime:
-                deleteCmdrList.append(cmdr)
-                continue
             else:
                 tagList = ["del"]
-                doScheduleUpdate = True
             if cmdr == myCmdr:
                 tagList.append("me")
             displayStr = "%s\t%s\t%s\t%s\t%s\n" % \
                 (userObj.prog, userObj.user, userObj.clientName, userObj.clientVersion, userObj.systemInfo)
-            self.text.insert("end", displayStr, " ".join(tagList))
+            newDispDict[cmdr] = (displayStr, " ".join(tagList))
+
+        # delete rows for users no longer displayed, last first so earlier line numbers stay valid
+        for ind in range(len(self._dispCmdrList) - 1, -1, -1):
+            cmdr = self._dispCmdrList[ind]
+            if cmdr not in newDispDict:
+                self.text.delete("%d.0" % (ind + 1,), "%d.0" % (ind + 2,))
+                del(self._dispCmdrList[ind])
+                del(self._dispDict[cmdr])
+
+        # add new rows and update changed rows
+        for cmdr, (displayStr, tags) in newDispDict.iteritems():
+            oldDispData = self._dispDict.get(cmdr)
+            if oldDispData == (displayStr, tags):
+                continue
+            ind = bisect.bisect_left(self._dispCmdrList, cmdr)
+            lineStart = "%d.0" % (ind + 1,)
+            if oldDispData is None:
+                self._dispCmdrList.insert(ind, cmdr)
+            elif oldDispData[0] == displayStr:
+                # only the tags have changed
+                lineEnd = "%d.0" % (ind + 2,)
+                for tag in oldDispData[1].split():
+                    self.text.tag_remove(tag, lineStart, lineEnd)
+                for tag in tags.split():
+                    self.text.tag_add(tag, lineStart, lineEnd)
+                self._dispDict[cmdr] = (displayStr, tags)
+                continue
+            else:
+                self.text.delete(lineStart, "%d.0" % (ind + 2,))
+            self.text.insert(lineStart, displayStr, tags)
+            self._dispDict[cmdr] = (displayStr, tags)
 
-        for cmdr in deleteCmdrList:
-            del(self.userDict[cmdr])
-        
-        if doScheduleUpdate:
-            self.scheduleUpdate()
+    def _expireUsers(self):
+        """Remove users that disconnected at least retainSec ago
+        and restart the timer for the next user to expire.
+        """
+        currTime = time.time()
+        didRemove = False
+        while self._expireQueue and self._expireQueue[0][0] <= currTime:
+            cmdr = self._expireQueue.popleft()[1]
+            userObj = self.userDict.get(cmdr)
+            if userObj and not userObj.isConnected and userObj.disconnTime + self._retainSec <= currTime:
+                del(self.userDict[cmdr])
+                didRemove = True
+
+        if self._expireQueue:
+            self._expireTimer.start(max(0.01, self._expireQueue[0][0] - currTime), self._expireUsers)
+        if didRemove:
+            self.updDisplay()
 
     def updUser(self, userInfo, isCurrent, keyVar=None):
         """User keyword callback; add user data to self.userDict"""
@@ -273,14 +327,16 @@ class UsersWdg(Tkinter.Frame):
             else:
                 self.userDict[cmdr] = User(cmdr)
 
-        # handle disconnected users (those in my userDict that aren't in newCmdrList)
-        # handle timeout and final deletion in updDisplay, since it has to remove
-        # stale entries even if the users keyword hasn't changed.
+        # handle disconnected users (those in my userDict that aren't in newCmdrList);
+        # _expireUsers removes them once retainSec has elapsed
         disconnCmdrSet = set(self.userDict.keys()) - set(newCmdrList)
-        for cmdr in disconnCmdrSet:
+        for cmdr in sorted(disconnCmdrSet):
             userObj = self.userDict[cmdr]
             if userObj.isConnected:
                 userObj.setDisconnected()
+                self._expireQueue.append((userObj.disconnTime + self._retainSec, cmdr))
+        if self._expireQueue and not self._expireTimer.isActive:
+            self._expireTimer.start(max(0.01, self._expireQueue[0][0] - time.time()), self._expireUsers)
 
         self.updDisplay()
 
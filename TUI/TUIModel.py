@@ -4,7 +4,7 @@ Includes the following items:
 - dispatcher: the keyword dispatcher (RO.KeyDispatcher.KeyDispatcher)
     note: the network connection is dispatcher.connection
 - prefs: the application preferences (TUI.TUIPrefs.TUIPrefs)
-- tlSet: the set of toplevels (windows) (RO.Wdg.ToplevelSet)
+- tlSet: the set of toplevels (windows) (TUI.LazyToplevelSet.LazyToplevelSet)
 - tkRoot: the root application window (Tkinter.Toplevel);
     mostly used when one to execute some Tkinter command
     (all of which require an arbitrary Tkinter object)
@@ -49,7 +49,12 @@ History:
 2011-08-11 ROwen    Added logFunc.
 2012-07-09 ROwen    Updated for changes to RO.KeyDispatcher.
 2013-07-19 ROwen    Replaced getLoginExtra function with getPlatform.
+2026-10-18 ROwen    Archive the log (all hub replies) to a TUI.LogArchive.LogArchive, except in test mode.
+2026-10-18 ROwen    Modified tlSet to be a TUI.LazyToplevelSet.LazyToplevelSet, so window modules can be loaded lazily.
+2026-10-18 ROwen    Mark startup phases for TUI.StartupTrace.
+2026-10-18 ROwen    Do not archive the log if environment variable TUI_NO_LOG_ARCHIVE is set.
 """
+import os
 import platform
 import sys
 import traceback
@@ -62,9 +67,12 @@ import RO.OS
 import RO.TkUtil
 import RO.Wdg
 import Tkinter
+import TUI.LazyToplevelSet
 import TUI.TUIPaths
+import TUI.StartupTrace
 import TUI.TUIPrefs
 import TUI.Version
+import LogArchive
 import LogSource
 
 MaxLogWindows = 5
@@ -111,12 +119,18 @@ class _Model (object):
             def logToStdOut(logSource):
                 print logSource.lastEntry.getStr(),
             self.logSource.addCallback(logToStdOut)
+        elif not os.environ.get(LogArchive.NoArchiveEnvVarName):
+            try:
+                self.logSource.setArchive(LogArchive.LogArchive.create(TUI.TUIPaths.getLogArchiveDir()))
+            except Exception as e:
+                sys.stderr.write("Could not create log archive; log will not be archived: %s\n" % (e,))
         
         # function to log a message
         self.logFunc = self.logSource.logMsg
     
         # TUI preferences
-        self.prefs = TUI.TUIPrefs.TUIPrefs()
+        with TUI.StartupTrace.phase("load preferences"):
+            self.prefs = TUI.TUIPrefs.TUIPrefs()
 
         # Dict of saved user-specified configurations for various instruments and other systems.
         # Keys are sysName: config
@@ -127,10 +141,12 @@ class _Model (object):
         
         # TUI window (topLevel) set;
         # this starts out empty; others add windows to it
-        self.tlSet = RO.Wdg.ToplevelSet(
-            fileName = TUI.TUIPaths.getGeomFile(),
-            createFile = True,  # create file if it doesn't exist
-        )
+        with TUI.StartupTrace.phase("read geometry file"):
+            self.tlSet = TUI.LazyToplevelSet.LazyToplevelSet(
+                fileName = TUI.TUIPaths.getGeomFile(),
+                createFile = True,  # create file if it doesn't exist
+                logFunc = self.logFunc,
+            )
 
         # set up standard bindings (since the defaults are poor)
         RO.Wdg.stdBindings(self.tkRoot)
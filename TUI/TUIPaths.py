@@ -14,6 +14,8 @@
                     Added getGeomFile and getPrefsFile.
 2014-02-04 ROwen    Added getUserPresetsFile.
 2014-03-14 ROwen    Added ".json" suffix to user presets file name.
+2026-10-18 ROwen    Added getLogArchiveDir.
+2026-10-18 ROwen    Added getAddManifestFile.
 """
 import os
 import RO.OS
@@ -57,6 +59,15 @@ def getAddPaths(ifExists=True):
 
     return addPathList
 
+def getAddManifestFile():
+    """Return the path of the file that caches the windows created by each additions window module
+    """
+    prefsDir = RO.OS.getPrefsDirs(inclNone=True)[0]
+    if prefsDir is None:
+        raise RuntimeError("Cannot determine prefs dir")
+    fileName = "%s%sAddManifest.json" % (RO.OS.getPrefsPrefix(), TUI.Version.ApplicationName)
+    return os.path.join(prefsDir, fileName)
+
 def getGeomFile():
     prefsDir = RO.OS.getPrefsDirs(inclNone=True)[0]
     if prefsDir is None:
@@ -78,6 +89,15 @@ def getUserPresetsFile():
     fileName = "%s%sUserPresets.json" % (RO.OS.getPrefsPrefix(), TUI.Version.ApplicationName)
     return os.path.join(prefsDir, fileName)
 
+def getLogArchiveDir():
+    """Return the directory for log archives: <documents>/<applicationName>_logs
+    (the same directory that runtuiWithLog uses for error logs)
+    """
+    docsDir = RO.OS.getDocsDir()
+    if not docsDir:
+        raise RuntimeError("Cannot determine documents dir")
+    return os.path.join(docsDir, "%s_logs" % (TUI.Version.ApplicationName.lower(),))
+
 def getResourceDir(*args):
     """Return the resource directory for a specified resource.
     Input:
@@ -93,4 +113,5 @@ if __name__ == "__main__":
     print "TUI Prefs =", getPrefsFile()
     print "TUI Geom = ", getGeomFile()
     print "TUI Additions =", getAddPaths()
+    print "TUI Log Archive =", getLogArchiveDir()
     print "TUI Sounds =", getResourceDir("Sounds")
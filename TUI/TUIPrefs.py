@@ -51,6 +51,7 @@ History:
 2012-12-19 ROwen    Changed font preferences to be for font size only and simplifies the settings.
 2014-08-31 ROwen    Improved help string for Keep Guide Images
 2014-09-17 ROwen    Modified to test for Exception instead of StandardError 
+2026-10-18 ROwen    Added "Guide Image Cache" preference.
 """
 #import pychecker.checker
 import os
@@ -160,6 +161,15 @@ class TUIPrefs(PrefVar.PrefSet):
                 helpText = "Keep all guide images, even after TUI quits? (eats disk space!)",
                 helpURL = _ExposuresHelpURL,
             ),
+            PrefVar.IntPrefVar(
+                name = "Guide Image Cache",
+                category = "Exposures",
+                defValue = 256,
+                minValue = 0,
+                maxValue = 9999,
+                helpText = "Memory for decoded guide images, for fast history browsing (MB)",
+                helpURL = _ExposuresHelpURL,
+            ),
 
             PrefVar.FontSizePrefVar(
                 name = "Main Font Size",
@@ -6,6 +6,10 @@
 2011-06-16 ROwen    Ditched obsolete "except (SystemExit, KeyboardInterrupt): raise" code
 2011-09-09 ROwen    Modified to restore working directory.
                     Modified to run paths through normpath to make the code more robust.
+2026-10-18 ROwen    Added manifestDict argument to loadWindows, to load window modules lazily.
+2026-10-18 ROwen    Always load modules that set LoadEagerly or create no windows.
+2026-10-18 ROwen    Only load modules lazily if they set LoadLazily = True, so by default additions
+                    are loaded at startup and keyword callbacks they add always run.
 """
 import os
 import sys
@@ -72,6 +76,7 @@ def loadWindows(
     isPackage = False,
     loadFirst = None,
     logFunc = None,
+    manifestDict = None,
 ):
     """Automatically load all windows in any subdirectory of the path.
     The path is assumed to be on the python path (sys.path).
@@ -88,6 +93,20 @@ def loadWindows(
                 - the text to log
                 - severity (by name): one of the RO.Constant.sev constants,
                     defaulting to RO.Constants.sevNormal.
+    - manifestDict  a dict (typically an RO.Alg.SavedDict) that caches the windows each module creates,
+                or None to always load all modules. If specified and tlSet is a TUI.LazyToplevelSet.LazyToplevelSet
+                then modules that opt in to lazy loading may be loaded when first needed (see below);
+                all other modules are loaded now.
+                Keys are module file paths and values are [module file modification time,
+                list of (window name, default geometry, default visible)].
+
+    Lazy loading: a window module opts in by setting module variable LoadLazily = True.
+    Such a module is loaded now (the first time it is seen, or if its file has changed)
+    and the windows it creates are cached in manifestDict; at later startups it is only registered,
+    and it is imported and its addWindow function called when one of its windows is first needed.
+    Thus a module that sets LoadLazily must not rely on addWindow being called at startup:
+    keyword callbacks it adds (e.g. to collect data or play sounds) do not run until one of its windows is shown.
+    Modules that do not set LoadLazily, or that create no windows, are loaded at every startup.
     
     Raises RuntimeError if loadFirst is specified and no modules are found.
     """
@@ -98,6 +117,16 @@ def loadWindows(
         isPackage = isPackage,
         loadFirst = loadFirst,
     ):
+        if manifestDict is not None and hasattr(tlSet, "addLazyModule"):
+            _loadWindowModuleLazily(
+                moduleName = moduleName,
+                moduleFilePath = _getModuleFilePath(path, moduleName, isPackage),
+                tlSet = tlSet,
+                logFunc = logFunc,
+                manifestDict = manifestDict,
+            )
+            continue
+
         # import the module
         try:
             module = __import__(moduleName, globals(), locals(), "addWindow")
@@ -110,3 +139,42 @@ def loadWindows(
                 logFunc(errMsg, severity=RO.Constants.sevError)
             sys.stderr.write(errMsg + "\n")
             traceback.print_exc(file=sys.stderr)
+
+def _getModuleFilePath(path, moduleName, isPackage):
+    """Return the path of the source file of a module found by findWindowsModules
+    """
+    pathList = moduleName.split(".")
+    if isPackage:
+        pathList = pathList[1:]
+    return os.path.join(path, *pathList) + ".py"
+
+def _loadWindowModuleLazily(moduleName, moduleFilePath, tlSet, logFunc, manifestDict):
+    """Register a window module with a lazy toplevel set if its windows are cached, else load it now
+
+    See loadWindows for details.
+    """
+    try:
+        modTime = os.path.getmtime(moduleFilePath)
+    except OSError:
+        modTime = None
+    cachedInfo = manifestDict.get(moduleFilePath)
+    if modTime is not None and cachedInfo and cachedInfo[0] == modTime and cachedInfo[1]:
+        try:
+            tlSet.addLazyModule(moduleName, [tuple(windowInfo) for windowInfo in cachedInfo[1]])
+            if logFunc:
+                logFunc("Registered %r" % (moduleName,))
+            return
+        except Exception as e:
+            sys.stderr.write("Could not register %s from cached manifest; loading it now: %s\n" % (moduleName, e))
+
+    windowInfoList = tlSet.loadModule(moduleName)
+    if windowInfoList is None:
+        return
+    if logFunc:
+        logFunc("Added %r" % (moduleName,))
+    # cache the windows only if the module opts in to lazy loading and creates windows
+    loadLazily = getattr(sys.modules.get(moduleName), "LoadLazily", False)
+    if modTime is not None and windowInfoList and loadLazily:
+        manifestDict[moduleFilePath] = [modTime, windowInfoList]
+    elif moduleFilePath in manifestDict:
+        del manifestDict[moduleFilePath]
@@ -10,19 +10,47 @@ at startup) and potentialy simplifies distribution
 as prebuilt packages by allowing TUI's python code
 to be run from a zip file.
 
+LoadStdModules contains a manifest of the windows each module creates
+(found by calling each module's addWindow function with a recording toplevel set),
+so the modules can be loaded lazily; see TUI.LazyToplevelSet.
+Modules that set LoadEagerly = True are listed in EagerModules and are loaded at startup.
+
 On the down side, one must remember to run this file
 and thus regenerate LoadStdModules whenever the list
-of TUI's standard windows modules changes.
+of TUI's standard windows modules changes
+(or a module changes the names, default geometry or default visibility of its windows).
 
 History:
 2005-08-01 ROwen
 2005-08-08 ROwen    Modified to use TUI.WindowModuleUtil
 2005-09-22 ROwen    Modified to not use TUI.TUIPaths.
+2026-10-18 ROwen    Modified to generate a window manifest, so window modules can be loaded lazily.
+2026-10-18 ROwen    Modified to list modules that set LoadEagerly in EagerModules.
 """
 import os
+import Tkinter
 import TUI
+import TUI.TUIModel
 import TUI.WindowModuleUtil
 
+class ManifestRecorder(object):
+    """A minimal toplevel set that records the windows created by a window module's addWindow
+    """
+    def __init__(self):
+        self.windowInfoList = []
+
+    def createToplevel(self, name, master=None, defGeom="", defVisible=None, **kargs):
+        if defVisible is None:
+            defVisible = kargs.get("visible", None)
+        if defVisible is not None:
+            defVisible = bool(defVisible)
+        self.windowInfoList.append((name, defGeom, defVisible))
+
+# some addWindow functions need the TUI model, which requires a Tk root
+root = Tkinter.Tk()
+root.withdraw()
+TUI.TUIModel.getModel(True)
+
 # get location to look for standard windows
 tuiPath = os.path.dirname(TUI.__file__)
 
@@ -34,17 +62,51 @@ modNames = list(TUI.WindowModuleUtil.findWindowsModules(
 modFilePath = os.path.join(tuiPath, "LoadStdModules.py")
 modFile = file(modFilePath, "w")
 try:
-    modFile.write("import TUI.TUIModel\n")
-    for modName in modNames:
-        modFile.write("import %s\n" % modName)
+    modFile.write('''"""Load TUI's standard window modules.
+
+Generated by genLoadStdModules.py; do not edit.
+"""
+import TUI.TUIModel
+
+''')
+    moduleList = [__import__(modName, globals(), locals(), "addWindow") for modName in modNames]
+
+    modFile.write("# names of modules that set LoadEagerly; they are loaded at startup even if their windows are hidden\n")
+    modFile.write("EagerModules = (\n")
+    for modName, module in zip(modNames, moduleList):
+        if getattr(module, "LoadEagerly", False):
+            modFile.write("    %r,\n" % (modName,))
+    modFile.write(")\n\n")
+
+    modFile.write("# a list of (module name, list of (window name, default geometry, default visible))\n")
+    modFile.write("WindowManifest = (\n")
+    for modName, module in zip(modNames, moduleList):
+        recorder = ManifestRecorder()
+        module.addWindow(recorder)
+        modFile.write("    (%r, (\n" % (modName,))
+        for windowInfo in recorder.windowInfoList:
+            modFile.write("        %r,\n" % (windowInfo,))
+        modFile.write("    )),\n")
+
+    modFile.write(''')
+
+def loadAll(lazy=True):
+    """Add TUI's standard windows to the TUI model's toplevel set
 
-    modFile.write("""
-def loadAll():
+    Inputs:
+    - lazy: if True then register the window modules, and only load the modules
+        of windows that should be visible and the modules in EagerModules
+        (in manifest order); other modules are loaded on demand.
+        If False then load all window modules now.
+    """
     tuiModel = TUI.TUIModel.getModel()
     tlSet = tuiModel.tlSet
-""")
-    for modName in modNames:
-        modFile.write("    %s.addWindow(tlSet)\n" % modName)
-    
+    for modName, windowInfoList in WindowManifest:
+        if lazy:
+            tlSet.addLazyModule(modName, windowInfoList)
+        else:
+            tlSet.loadModule(modName)
+    tlSet.loadVisibleModules(EagerModules)
+''')
 finally:
-    modFile.close()
\ No newline at end of file
+    modFile.close()
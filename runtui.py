@@ -6,11 +6,19 @@ This script's directory is automatically added to sys.path,
 so having this script in the same directory as RO and TUI
 makes those packages available without setting PYTHONPATH.
 
+To print and save a trace of where the time goes during startup, use:
+    runtui.py --trace-startup[=reportPath]
+(or set environment variable TUI_TRACE_STARTUP); see TUI.StartupTrace for details.
+
 History:
 2004-05-17 ROwen    Bug fix: automatic ftp hung due to import lock contention,
                     because execution was part of importing.
                     Fixed by first importing TUI.Main and then running the app.
 2007-01-23 ROwen    Changed #!/usr/local/bin/python to #!/usr/bin/env python
+2026-10-18 ROwen    Start tracing startup (if requested) before importing TUI.Main.
 """
-import TUI.Main
+import TUI.StartupTrace
+TUI.StartupTrace.startFromEnv()
+with TUI.StartupTrace.phase("import TUI.Main"):
+    import TUI.Main
 TUI.Main.runTUI()